@@ -0,0 +1,490 @@
+"""
+Document Chunking - Phase 2: AI Integration
+
+Splits extracted RFP content (web page or file) into section-aware chunks so
+analysis only ever sees bounded, relevant pieces of a document:
+
+- Prose is split at headings, keeping each chunk's heading path
+- Lists and tables become chunks of their own
+- Repeated boilerplate (page headers/footers, navigation, cookie banners) is
+  dropped using MinHash near-duplicate detection across pages
+- Chunk ids are content hashes, so a ChunkMemo can skip sections that were
+  already analyzed
+"""
+
+import bisect
+import hashlib
+import re
+import struct
+import uuid
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Set
+import logging
+
+logger = logging.getLogger(__name__)
+
+MAX_CHUNK_CHARS = 3000
+
+WHITESPACE_RE = re.compile(r'\s+')
+DIGITS_RE = re.compile(r'\d+')
+SENTENCE_END_RE = re.compile(r'(?<=[.!?;:])\s+')
+
+# Heading keywords mapping a section to the RFP field it most likely informs
+SECTION_TOPICS = {
+    "scope_of_work": ("scope", "statement of work", "description", "background", "overview", "purpose", "project", "summary"),
+    "requirements": ("requirement", "specification", "deliverable", "task", "technical", "minimum", "mandatory"),
+    "eligibility": ("eligib", "qualification", "experience", "certif", "licens", "insurance", "bonding"),
+    "timeline": ("schedule", "timeline", "key date", "deadline", "calendar", "due date", "important date"),
+    "contact_info": ("contact", "questions", "inquir", "procurement officer", "buyer"),
+    "budget_range": ("budget", "price", "pricing", "cost", "compensation", "fee", "funding"),
+    "submission": ("submission", "submittal", "how to submit", "instructions", "proposal format"),
+}
+
+
+def normalize_text(text: str) -> str:
+    return WHITESPACE_RE.sub(" ", text or "").strip()
+
+
+def content_hash(kind: str, text: str) -> str:
+    return hashlib.sha1(f"{kind}\x00{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+def classify_section(heading_path: List[str]) -> Optional[str]:
+    """The topic of the innermost heading that names one, if any."""
+    for heading in reversed(heading_path):
+        lowered = heading.lower()
+        for topic, keywords in SECTION_TOPICS.items():
+            if any(keyword in lowered for keyword in keywords):
+                return topic
+    return None
+
+
+class Chunk:
+    """A bounded piece of a document with its place in the heading hierarchy."""
+
+    __slots__ = ("id", "kind", "path", "text", "order", "topic", "table")
+
+    def __init__(self, kind: str, path: List[str], text: str, order: int, table: Optional[Dict] = None):
+        self.kind = kind
+        self.path = path
+        self.text = text
+        self.order = order
+        self.table = table
+        self.topic = classify_section(path)
+        self.id = content_hash(kind, text)
+
+    @property
+    def heading(self) -> str:
+        return self.path[-1] if self.path else ""
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "path": self.path,
+            "topic": self.topic,
+            "order": self.order,
+            "chars": len(self.text),
+        }
+
+
+class MinHasher:
+    """MinHash signatures over word shingles with digits masked (so "Page 3 of 90" ≈ "Page 4 of 90")."""
+
+    _PRIME = (1 << 61) - 1
+
+    def __init__(self, num_perm: int = 32, shingle_words: int = 3, seed: int = 7):
+        self.num_perm = num_perm
+        self.shingle_words = shingle_words
+        digest = hashlib.sha256(str(seed).encode()).digest() * (num_perm // 2 + 1)
+        self._params = [
+            (struct.unpack_from(">I", digest, i * 8)[0] | 1, struct.unpack_from(">I", digest, i * 8 + 4)[0])
+            for i in range(num_perm)
+        ]
+
+    def shingles(self, text: str) -> Set[int]:
+        words = DIGITS_RE.sub("#", text.lower()).split()
+        if len(words) < self.shingle_words:
+            words = [" ".join(words)]
+        else:
+            words = [" ".join(words[i:i + self.shingle_words]) for i in range(len(words) - self.shingle_words + 1)]
+        return {int.from_bytes(hashlib.blake2b(w.encode("utf-8"), digest_size=8).digest(), "big") for w in words}
+
+    def signature(self, text: str) -> tuple:
+        shingles = self.shingles(text)
+        return tuple(min((a * s + b) % self._PRIME for s in shingles) for a, b in self._params)
+
+    @staticmethod
+    def similarity(left: tuple, right: tuple) -> float:
+        return sum(1 for a, b in zip(left, right) if a == b) / len(left)
+
+
+class BoilerplateDetector:
+    """
+    Finds short text blocks that repeat across pages.
+
+    A block is boilerplate when it (or a near-duplicate, by MinHash with LSH
+    banding) occurs on at least ``min_repeats`` pages of one document, or in
+    at least ``min_documents`` other documents seen by this detector (keep
+    one detector per site to learn its navigation and footer text). Scanning
+    the same document id again does not count as another document.
+    """
+
+    def __init__(self,
+                 num_perm: int = 32,
+                 bands: int = 8,
+                 threshold: float = 0.8,
+                 min_repeats: int = 3,
+                 min_documents: int = 3,
+                 max_block_chars: int = 400,
+                 min_words: int = 8,
+                 max_remembered: int = 50000):
+        self.hasher = MinHasher(num_perm)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.min_repeats = min_repeats
+        self.min_documents = min_documents
+        self.max_block_chars = max_block_chars
+        self.min_words = min_words
+        self.max_remembered = max_remembered
+
+        # Cross-document memory: cluster representative -> ids of documents it appeared in
+        self._signatures: "OrderedDict[str, tuple]" = OrderedDict()
+        self._documents: Dict[str, Set[str]] = {}
+        self._buckets: Dict[tuple, Set[str]] = defaultdict(set)
+
+    @staticmethod
+    def _key(block: str) -> str:
+        return DIGITS_RE.sub("#", normalize_text(block).lower())
+
+    def _bands(self, signature: tuple):
+        for band in range(self.bands):
+            yield (band, signature[band * self.rows:(band + 1) * self.rows])
+
+    def _representative(self, key: str, signature: tuple) -> str:
+        """Known near-duplicate of ``key`` (or ``key`` itself, registered as new)."""
+        if key in self._signatures:
+            self._signatures.move_to_end(key)
+            return key
+        if signature is None:
+            # Too short for a reliable MinHash estimate: exact (digit-masked) matches only
+            self._signatures[key] = None
+            self._forget_oldest()
+            return key
+        for band in self._bands(signature):
+            for candidate in self._buckets.get(band, ()):
+                candidate_signature = self._signatures[candidate]
+                if self.hasher.similarity(signature, candidate_signature) >= self.threshold:
+                    self._signatures.move_to_end(candidate)
+                    return candidate
+        self._signatures[key] = signature
+        for band in self._bands(signature):
+            self._buckets[band].add(key)
+        self._forget_oldest()
+        return key
+
+    def _forget_oldest(self):
+        while len(self._signatures) > self.max_remembered:
+            key, signature = self._signatures.popitem(last=False)
+            self._documents.pop(key, None)
+            if signature is None:
+                continue
+            for band in self._bands(signature):
+                bucket = self._buckets.get(band)
+                if bucket is not None:
+                    bucket.discard(key)
+                    if not bucket:
+                        del self._buckets[band]
+
+    def scan(self, blocks: Iterable[str], document_id: Optional[str] = None) -> Set[str]:
+        """
+        Record one document's blocks and return the normalized keys of those that are boilerplate.
+
+        Use ``is_boilerplate(block, result)`` to test individual blocks.
+        """
+        document_id = document_id or uuid.uuid4().hex
+        occurrences: Dict[str, int] = defaultdict(int)
+        members: Dict[str, Set[str]] = defaultdict(set)
+        cross_keys: Dict[str, Set[str]] = defaultdict(set)
+        representatives: Dict[str, str] = {}
+        for block in blocks:
+            if not block or len(block) > self.max_block_chars:
+                continue
+            key = self._key(block)
+            if len(key.split()) >= self.min_words:
+                # Long blocks: near-duplicates (by MinHash) count together everywhere
+                if key not in representatives:
+                    representatives[key] = self._representative(key, self.hasher.signature(key))
+                within = cross = representatives[key]
+            else:
+                # Short blocks: page numbers may differ within a document, but across
+                # documents only identical text counts ("Bid 3" is not "Bid 4")
+                within = key
+                cross = self._representative(normalize_text(block).lower(), None)
+            occurrences[within] += 1
+            members[within].add(key)
+            cross_keys[within].add(cross)
+
+        boilerplate = set()
+        for within, count in occurrences.items():
+            other_documents = 0
+            for cross in cross_keys[within]:
+                documents = self._documents.setdefault(cross, set())
+                other_documents = max(other_documents, len(documents - {document_id}))
+                if len(documents) <= self.min_documents:
+                    documents.add(document_id)
+            if count >= self.min_repeats or other_documents >= self.min_documents:
+                boilerplate |= members[within]
+        return boilerplate
+
+    def is_boilerplate(self, block: str, boilerplate: Set[str]) -> bool:
+        return len(block) <= self.max_block_chars and self._key(block) in boilerplate
+
+
+def _split_long(text: str, max_chars: int) -> List[str]:
+    if len(text) <= max_chars:
+        return [text]
+    pieces, current = [], ""
+    for sentence in SENTENCE_END_RE.split(text):
+        while len(sentence) > max_chars:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(sentence[:max_chars])
+            sentence = sentence[max_chars:]
+        if current and len(current) + len(sentence) + 1 > max_chars:
+            pieces.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+class _Spans:
+    """Disjoint (start, end) spans with O(log n) overlap checks."""
+
+    def __init__(self, spans: Iterable[tuple] = ()):
+        self.starts: List[int] = []
+        self.ends: List[int] = []
+        for start, end in spans:
+            self.add(start, end)
+
+    def overlaps(self, start: int, end: int) -> bool:
+        index = bisect.bisect_left(self.starts, end) - 1
+        return index >= 0 and self.ends[index] > start
+
+    def add(self, start: int, end: int):
+        index = bisect.bisect_left(self.starts, start)
+        self.starts.insert(index, start)
+        self.ends.insert(index, end)
+
+    def within(self, start: int, end: int):
+        """Spans that intersect [start, end), in order."""
+        index = bisect.bisect_right(self.ends, start)
+        while index < len(self.starts) and self.starts[index] < end:
+            yield self.starts[index], self.ends[index]
+            index += 1
+
+
+def _locate(haystack: str, needle: str, start: int, taken: _Spans) -> int:
+    """First occurrence of ``needle`` at or after ``start`` that does not overlap a taken span."""
+    position = haystack.find(needle, start)
+    while position != -1 and taken.overlaps(position, position + len(needle)):
+        position = haystack.find(needle, position + 1)
+    return position
+
+
+def _locate_sequence(haystack: str, items: List[str], taken: _Spans, max_gap: int = 40) -> Optional[tuple]:
+    """
+    Span of the first place where ``items`` appear in order, each starting
+    within ``max_gap`` characters of the previous one (how list items and
+    table cells sit in extracted text).
+    """
+    position = _locate(haystack, items[0], 0, taken)
+    while position != -1:
+        end = position + len(items[0])
+        for item in items[1:]:
+            found = haystack.find(item, end, end + max_gap + len(item))
+            if found == -1 or taken.overlaps(found, found + len(item)):
+                break
+            end = found + len(item)
+        else:
+            return position, end
+        position = _locate(haystack, items[0], position + 1, taken)
+    return None
+
+
+def _render_table(table: Dict) -> str:
+    lines = [" | ".join(table.get("headers", []))]
+    lines.extend(" | ".join(row) for row in table.get("rows", []))
+    return "\n".join(line for line in lines if line.strip())
+
+
+def chunk_document(text_content: Dict,
+                   tables: Optional[List[Dict]] = None,
+                   detector: Optional[BoilerplateDetector] = None,
+                   document_id: Optional[str] = None,
+                   max_chars: int = MAX_CHUNK_CHARS) -> Dict[str, Any]:
+    """
+    Split extracted content into section-aware chunks.
+
+    Headings are located in ``full_text`` to recover document order (the
+    extractors group them by level). List items and table cells are cut out
+    of the surrounding prose and emitted as their own chunks.
+
+    Args:
+        text_content (Dict): ``full_text``, ``headings``, ``paragraphs`` and ``lists``
+        tables (List[Dict], optional): Tables with ``headers`` and ``rows``
+        detector (BoilerplateDetector, optional): Drops repeated blocks when given
+        document_id (str, optional): Stable id (e.g. URL) so re-scans are not counted as new documents
+        max_chars (int): Longest prose chunk
+
+    Returns:
+        Dict: ``chunks`` in document order and ``boilerplate_removed`` (count)
+    """
+    full_text = normalize_text(text_content.get("full_text", ""))
+    headings = text_content.get("headings", [])
+    lists = text_content.get("lists", [])
+    tables = tables or []
+
+    # Boilerplate is judged on the smallest units the extractors give us
+    boilerplate: Set[str] = set()
+    if detector is not None:
+        blocks = list(text_content.get("paragraphs", []))
+        blocks.extend(item for entry in lists for item in entry.get("items", []))
+        blocks.extend(heading["text"] for heading in headings)
+        boilerplate = detector.scan(blocks, document_id)
+
+    def is_boilerplate(text: str) -> bool:
+        return detector is not None and detector.is_boilerplate(text, boilerplate)
+
+    # Headings first: their positions recover document order (extractors group them by level)
+    heading_spans = []
+    taken = _Spans()
+    for heading in headings:
+        text = normalize_text(heading.get("text", ""))
+        if not text or is_boilerplate(text):
+            continue
+        position = _locate(full_text, text, 0, taken)
+        if position != -1:
+            heading_spans.append((position, heading.get("level", 1), text))
+            taken.add(position, position + len(text))
+    heading_spans.sort()
+
+    # Spans of full_text owned by lists/tables or boilerplate are cut from the prose too
+    boilerplate_removed = 0
+    for text in {normalize_text(p) for p in text_content.get("paragraphs", []) if is_boilerplate(p)}:
+        if text:
+            position = _locate(full_text, text, 0, taken)
+            while position != -1:
+                taken.add(position, position + len(text))
+                boilerplate_removed += 1
+                position = _locate(full_text, text, position + len(text), taken)
+
+    anchored = []  # (position, kind, payload)
+    for entry in lists:
+        items = [normalize_text(item) for item in entry.get("items", []) if normalize_text(item)]
+        kept = [item for item in items if not is_boilerplate(item)]
+        boilerplate_removed += len(items) - len(kept)
+        if not kept:
+            # A list that is all boilerplate (e.g. a nav menu) still owns its text
+            span = _locate_sequence(full_text, items, taken) if items else None
+            if span:
+                taken.add(*span)
+            continue
+        span = _locate_sequence(full_text, items, taken)
+        if span:
+            taken.add(*span)
+        anchored.append((span[0] if span else -1, "list", {"type": entry.get("type", "ul"), "items": kept}))
+
+    for table in tables:
+        cells = [normalize_text(cell) for row in [table.get("headers", [])] + table.get("rows", []) for cell in row]
+        cells = [cell for cell in cells if cell]
+        if not cells:
+            continue
+        span = _locate_sequence(full_text, cells, taken)
+        if span:
+            taken.add(*span)
+        anchored.append((span[0] if span else -1, "table", table))
+
+    # Walk the text section by section, skipping taken spans
+    placed: List[tuple] = []  # (position, sequence, kind, path, text, table)
+
+    def prose(start: int, end: int) -> str:
+        parts, cursor = [], start
+        for a, b in taken.within(start, end):
+            if a > cursor:
+                parts.append(full_text[cursor:a])
+            cursor = max(cursor, b)
+        if cursor < end:
+            parts.append(full_text[cursor:end])
+        return normalize_text(" ".join(parts))
+
+    def path_at(position: int) -> List[str]:
+        stack: List[tuple] = []
+        for start, level, text in heading_spans:
+            if start > position:
+                break
+            while stack and stack[-1][0] >= level:
+                stack.pop()
+            stack.append((level, text))
+        return [text for _, text in stack]
+
+    section_starts = [0] + [position for position, _, _ in heading_spans] + [len(full_text)]
+    for index in range(len(section_starts) - 1):
+        start, end = section_starts[index], section_starts[index + 1]
+        path = path_at(start) if index > 0 else []
+        for piece in _split_long(prose(start, end), max_chars):
+            if piece:
+                placed.append((start, len(placed), "section", path, piece, None))
+
+    # Lists/tables that could not be located go last
+    for position, kind, payload in anchored:
+        path = path_at(position) if position != -1 else []
+        position = position if position != -1 else len(full_text)
+        if kind == "list":
+            text = "\n".join(f"- {item}" for item in payload["items"])
+            for piece in _split_long(text, max_chars):
+                placed.append((position, len(placed), "list", path, piece, None))
+        else:
+            placed.append((position, len(placed), "table", path, _render_table(payload)[:max_chars * 2], payload))
+
+    chunks: Dict[str, Chunk] = {}
+    for order, (_, _, kind, path, text, table) in enumerate(sorted(placed, key=lambda item: item[:2])):
+        chunk = Chunk(kind, path, text, order, table=table)
+        # Identical chunks (e.g. a repeated table) are analyzed once
+        chunks.setdefault(chunk.id, chunk)
+    return {"chunks": list(chunks.values()), "boilerplate_removed": boilerplate_removed}
+
+
+class ChunkMemo:
+    """LRU of per-chunk analysis results keyed by content hash."""
+
+    def __init__(self, max_items: int = 10000):
+        self.max_items = max_items
+        self._items: "OrderedDict[str, Any]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, chunk_id: str) -> Optional[Any]:
+        if chunk_id in self._items:
+            self._items.move_to_end(chunk_id)
+            self.hits += 1
+            return self._items[chunk_id]
+        self.misses += 1
+        return None
+
+    def put(self, chunk_id: str, analysis: Any):
+        self._items[chunk_id] = analysis
+        self._items.move_to_end(chunk_id)
+        while len(self._items) > self.max_items:
+            self._items.popitem(last=False)
+
+    def __contains__(self, chunk_id: str) -> bool:
+        return chunk_id in self._items
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._items), "hits": self.hits, "misses": self.misses}
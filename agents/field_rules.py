@@ -0,0 +1,517 @@
+"""
+Rule-Based Field Extraction - Phase 2: AI Integration
+
+Deterministic extraction of the RFP fields that rarely need a language model:
+due date and timeline, budget range, contact details, reference numbers and
+third-party needs (hotels, catering, transportation, ...).
+
+All patterns are compiled once into a single alternation, so ``full_text``
+and all table cells (joined into one string with an offset index) are each
+scanned in one pass over the lowercased text. Keyword lists are compiled as
+prefix tries, and context keywords ("due", "not to exceed", "contact") are
+matched in the same pass and attached to nearby values by position.
+Every match carries its location and a confidence so the analyzer can send
+only low-confidence fields to a model.
+"""
+
+import bisect
+import re
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+MAX_MATCHES_PER_FIELD = 200
+CONTEXT_WINDOW = 120  # characters before a value searched for its context keyword
+
+MONTHS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12,
+}
+_MONTH = r'jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?'
+
+_TIME = (
+    r'(?:\s*(?:at|@|by|,|-)?\s*(?:'
+    r'(?P<hour>\d{1,2})(?::(?P<minute>\d{2}))?\s*(?P<ampm>[ap]\.?\s?m\.?)'
+    r'|(?P<hour24>[01]?\d|2[0-3]):(?P<minute24>[0-5]\d)(?!\d)'
+    r')(?:\s*(?P<tz>[ecmp][sd]?t\b|central|eastern|mountain|pacific))?)?'
+)
+
+_DATE = (
+    r'(?<![\w/])(?:'
+    rf'(?P<md_month>{_MONTH})\.?\s+(?P<md_day>\d{{1,2}})(?:st|nd|rd|th)?,?\s+(?P<md_year>\d{{4}})'
+    rf'|(?P<dm_day>\d{{1,2}})(?:st|nd|rd|th)?\s+(?P<dm_month>{_MONTH})\.?,?\s+(?P<dm_year>\d{{4}})'
+    r'|(?P<us_month>\d{1,2})/(?P<us_day>\d{1,2})/(?P<us_year>\d{4}|\d{2})(?![\d/])'
+    r'|(?P<iso_year>\d{4})-(?P<iso_month>\d{2})-(?P<iso_day>\d{2})(?!\d)'
+    r')' + _TIME
+)
+
+_MONEY = (
+    r'(?:\$|usd\s?)\s?(?P<amount>\d{1,3}(?:,\d{3})+|\d+)(?:\.(?P<cents>\d{1,2}))?'
+    r'(?:\s*(?P<scale>million|billion|thousand|mm|[mkb])\b)?'
+)
+
+_EMAIL = r'(?P<email>[\w.+-]+@[\w-]+(?:\.[\w-]+)*\.[a-z]{2,})'
+
+_PHONE = (
+    r'(?<![\d-])(?:\+?1[\s.-]?)?(?:\((?P<area_p>\d{3})\)|(?P<area>\d{3}))[\s.-]?'
+    r'(?P<prefix>\d{3})[\s.-](?P<line>\d{4})(?!\d)'
+    r'(?:\s*(?:x|ext\.?|extension)\s*(?P<ext>\d{1,5}))?'
+)
+
+_REFERENCE = (
+    r'\b(?P<ref_kind>rfp|rfq|rfi|rfb|ifb|itb|solicitation|bid|event|contract|project|reference|ref)\.?'
+    r'\s*(?:no\.?|number|num\.?|#|id)?\s*[:#]?\s*'
+    r'(?P<ref_id>(?=[\w\-/.]*\d)[a-z0-9][\w\-/.]{1,30}[a-z0-9])'
+)
+
+# Context keywords that tell what a nearby value means
+CONTEXT_KEYWORDS = {
+    "due": ("due", "deadline", "closing", "close date", "closes", "must be received", "received no later than",
+            "received by", "submission", "submissions", "submittal", "submittals", "bid opening", "opening date"),
+    "question": ("question", "questions", "inquiry", "inquiries", "clarification", "clarifications",
+                 "pre-bid", "prebid", "pre-proposal", "preproposal"),
+    "budget": ("budget", "not to exceed", "not-to-exceed", "nte", "estimated value", "estimated cost",
+               "estimated amount", "estimated contract value", "estimated annual value", "estimated total cost",
+               "funding", "maximum value", "maximum amount", "maximum contract amount", "award amount",
+               "available funds"),
+    "contact": ("contact", "procurement officer", "contracting officer", "buyer", "purchasing agent",
+                "issuing officer"),
+}
+
+# Third-party needs: category -> keywords
+THIRD_PARTY_KEYWORDS = {
+    "lodging": ("hotel", "hotels", "lodging", "accommodations", "accommodation", "room block", "guest rooms", "overnight stay"),
+    "catering": ("catering", "caterer", "food and beverage", "meals", "breakfast", "lunch", "dinner", "refreshments", "coffee service"),
+    "transportation": ("transportation", "shuttle", "shuttles", "bus service", "charter bus", "motor coach", "airport transfer"),
+    "venue": ("venue", "conference center", "meeting space", "event space", "ballroom", "banquet hall"),
+    "audio_visual": ("audio visual", "audio-visual", "audiovisual", "av equipment", "projector", "sound system", "livestream", "live stream"),
+    "printing": ("printing", "signage", "banners", "printed materials"),
+    "security": ("security guards", "security personnel", "security services"),
+    "staffing": ("temporary staff", "staffing agency", "event staff"),
+    "translation": ("interpreter", "interpreters", "interpretation services", "translation services", "sign language"),
+    "equipment_rental": ("equipment rental", "tent rental", "furniture rental", "staging"),
+}
+
+
+def trie_pattern(words) -> str:
+    """
+    Compile a keyword list into a prefix-factored alternation.
+
+    ``("hotel", "hotels", "lodging")`` becomes ``(?:hotel(?:s)?|lodging)``, so
+    the regex engine tests each leading character once instead of once per
+    keyword.
+    """
+    root: Dict[str, Dict] = {}
+    for word in words:
+        node = root
+        for char in word.lower():
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: Dict[str, Dict]) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        optional = "" in node
+        body = branches[0] if len(branches) == 1 and not optional else "(?:" + "|".join(branches) + ")"
+        if optional and len(branches) == 1:
+            body = "(?:" + body + ")"
+        return body + ("?" if optional else "")
+
+    return build(root)
+
+
+# Only try matches at the start of a token; inside a word everything fails fast
+_PATTERN = r'(?<![\w.+-])(?:' + "|".join(
+    [
+        _EMAIL,
+        rf'(?P<date>{_DATE})',
+        rf'(?P<phone>{_PHONE})',
+        rf'(?P<money>{_MONEY})',
+        rf'(?P<ref>{_REFERENCE})',
+    ]
+    + [rf'(?P<ctx_{name}>{trie_pattern(words)})\b' for name, words in CONTEXT_KEYWORDS.items()]
+    + [rf'(?P<tp_{name}>{trie_pattern(words)})\b' for name, words in THIRD_PARTY_KEYWORDS.items()]
+) + ')'
+
+# Patterns are written in lowercase and run over ``text.lower()``, which is
+# markedly faster than re.I; the re.I copy covers text whose length changes
+# when lowercased.
+MASTER_PATTERN = re.compile(_PATTERN)
+MASTER_PATTERN_I = re.compile(_PATTERN, re.I)
+CONTEXT_RES = {name: re.compile(rf'\b{trie_pattern(words)}\b', re.I) for name, words in CONTEXT_KEYWORDS.items()}
+
+CONTACT_NAME_RE = re.compile(
+    r'(?i:contact|buyer|procurement officer|contracting officer|purchasing agent|issuing officer)'
+    r'(?i:\s+(?:person|information|info))?\s*[:\-]\s*'
+    r'(?P<name>[A-Z][a-z]+(?:\s+[A-Z]\.)?\s+[A-Z][A-Za-z\'\-]+)'
+)
+
+RANGE_JOINER_RE = re.compile(r'^\s*(?:-|–|—|to|and|through)\s*$', re.I)
+SENTENCE_BREAK_RE = re.compile(r'[.;:!?\n|]')
+
+SCALES = {"thousand": 1e3, "k": 1e3, "million": 1e6, "mm": 1e6, "m": 1e6, "billion": 1e9, "b": 1e9}
+
+
+def _month(name: str) -> int:
+    return MONTHS[name[:3].lower()]
+
+
+def parse_date(match: re.Match) -> Optional[Dict[str, Any]]:
+    """Turn a date match into ``{"date": ISO date, "time": "HH:MM" or None, "tz": ...}``."""
+    groups = match.groupdict()
+    try:
+        if groups["md_month"]:
+            year, month, day = int(groups["md_year"]), _month(groups["md_month"]), int(groups["md_day"])
+        elif groups["dm_month"]:
+            year, month, day = int(groups["dm_year"]), _month(groups["dm_month"]), int(groups["dm_day"])
+        elif groups["us_month"]:
+            year, month, day = int(groups["us_year"]), int(groups["us_month"]), int(groups["us_day"])
+            if year < 100:
+                year += 2000
+        else:
+            year, month, day = int(groups["iso_year"]), int(groups["iso_month"]), int(groups["iso_day"])
+        parsed = date(year, month, day)
+    except (ValueError, KeyError):
+        return None
+
+    time = None
+    if groups["hour"]:
+        hour = int(groups["hour"]) % 12
+        if groups["ampm"].lower().startswith("p"):
+            hour += 12
+        if hour < 24:
+            time = f"{hour:02d}:{int(groups['minute'] or 0):02d}"
+    elif groups["hour24"]:
+        time = f"{int(groups['hour24']):02d}:{groups['minute24']}"
+    return {"date": parsed.isoformat(), "time": time, "tz": groups["tz"].upper() if groups["tz"] else None}
+
+
+def parse_money(match: re.Match) -> float:
+    amount = float(match.group("amount").replace(",", ""))
+    if match.group("cents"):
+        amount += float(f"0.{match.group('cents')}")
+    scale = (match.group("scale") or "").lower()
+    return amount * SCALES.get(scale, 1)
+
+
+class _TextIndex:
+    """
+    One string to scan plus a way to map offsets back to their source:
+    ``full_text`` itself, or table cells joined with newlines.
+    """
+
+    def __init__(self, text: str, cells: Optional[List[Tuple[int, int, int]]] = None, starts: Optional[List[int]] = None):
+        self.text = text
+        self.cells = cells  # (table, row, col) per cell, aligned with starts
+        self.starts = starts
+        lowered = text.lower()
+        if len(lowered) == len(text):
+            self.scan_text, self.pattern = lowered, MASTER_PATTERN
+        else:
+            self.scan_text, self.pattern = text, MASTER_PATTERN_I
+
+    def slice(self, match: re.Match, group: int = 0) -> str:
+        """Original (not lowercased) text of a match group."""
+        return self.text[match.start(group):match.end(group)].strip()
+
+    @classmethod
+    def from_tables(cls, tables: List[Dict]) -> "_TextIndex":
+        parts, cells, starts, offset = [], [], [], 0
+        for t, table in enumerate(tables):
+            rows = [table.get("headers", [])] + table.get("rows", [])
+            for r, row in enumerate(rows):
+                for c, cell in enumerate(row):
+                    cell = cell or ""
+                    starts.append(offset)
+                    cells.append((t, r, c))
+                    parts.append(cell)
+                    offset += len(cell) + 1
+        return cls("\n".join(parts), cells, starts)
+
+    def location(self, offset: int) -> Dict[str, Any]:
+        if self.cells is None:
+            return {"source": "text", "offset": offset}
+        index = bisect.bisect_right(self.starts, offset) - 1
+        table, row, col = self.cells[index]
+        return {"source": "table", "table": table, "row": row, "col": col}
+
+
+class FieldExtractor:
+    """Runs the combined pattern over text and tables and resolves fields with confidences."""
+
+    def __init__(self, text_content: Dict, tables: Optional[List[Dict]] = None):
+        self.text_content = text_content or {}
+        self.tables = tables or []
+
+    def _scan(self, index: _TextIndex):
+        values = []
+        contexts: Dict[str, List[int]] = {name: [] for name in CONTEXT_KEYWORDS}
+        third_party: Dict[str, Dict[str, Any]] = {}
+        for match in index.pattern.finditer(index.scan_text):
+            kind = match.lastgroup
+            if kind.startswith("ctx_"):
+                contexts[kind[4:]].append(match.end())
+            elif kind.startswith("tp_"):
+                entry = third_party.setdefault(kind[3:], {"keywords": set(), "mentions": 0, "locations": []})
+                entry["keywords"].add(match.group(kind).lower())
+                entry["mentions"] += 1
+                if len(entry["locations"]) < 5:
+                    entry["locations"].append(index.location(match.start()))
+            else:
+                values.append((kind if kind in ("date", "phone", "money", "ref") else "email", match))
+        return values, contexts, third_party
+
+    @staticmethod
+    def _context_distance(contexts: List[int], position: int) -> Optional[int]:
+        """Characters between ``position`` and the nearest preceding context keyword."""
+        index = bisect.bisect_right(contexts, position) - 1
+        if index < 0:
+            return None
+        distance = position - contexts[index]
+        return distance if distance <= CONTEXT_WINDOW else None
+
+    def _label(self, index: _TextIndex, match: re.Match) -> str:
+        """What a value refers to: the rest of its table row, or the words just before it."""
+        if index.cells is not None:
+            cell = bisect.bisect_right(index.starts, match.start()) - 1
+            table, row, col = index.cells[cell]
+            rows = [self.tables[table].get("headers", [])] + self.tables[table].get("rows", [])
+            others = [value for c, value in enumerate(rows[row]) if c != col and value and not MASTER_PATTERN_I.fullmatch(value.strip())]
+            return " ".join(others)[:120]
+        before = index.text[max(0, match.start() - CONTEXT_WINDOW):match.start()]
+        parts = SENTENCE_BREAK_RE.split(before)
+        label = parts[-1].strip() if parts[-1].strip() else (parts[-2].strip() if len(parts) > 1 else "")
+        return label[-120:]
+
+    def _context_near(self, index: _TextIndex, contexts: Dict[str, List[int]], name: str, match: re.Match) -> Optional[int]:
+        if index.cells is not None:
+            # In a table the label cell carries the context, wherever it sits in the row
+            return 0 if CONTEXT_RES[name].search(self._label(index, match)) else None
+        return self._context_distance(contexts[name], match.start())
+
+    def extract(self) -> Dict[str, Any]:
+        """
+        Returns:
+            Dict: ``fields`` (value + confidence + location per field) and ``matches`` (every raw match)
+        """
+        indexes = [_TextIndex(self.text_content.get("full_text", "")), _TextIndex.from_tables(self.tables)]
+
+        dates, money, emails, phones, refs = [], [], [], [], []
+        third_party: Dict[str, Dict[str, Any]] = {}
+        names = []
+
+        for index in indexes:
+            values, contexts, found_third_party = self._scan(index)
+            for category, entry in found_third_party.items():
+                merged = third_party.setdefault(category, {"keywords": set(), "mentions": 0, "locations": []})
+                merged["keywords"] |= entry["keywords"]
+                merged["mentions"] += entry["mentions"]
+                merged["locations"].extend(entry["locations"][:5 - len(merged["locations"])])
+
+            for kind, match in values:
+                location = index.location(match.start())
+                if kind == "date":
+                    parsed = parse_date(match)
+                    if parsed is None:
+                        continue
+                    label = self._label(index, match)
+                    dates.append({
+                        **parsed,
+                        "label": label,
+                        "text": index.slice(match),
+                        "location": location,
+                        "due_distance": self._context_near(index, contexts, "due", match),
+                        # "Questions due ..." is a deadline, but not the submission deadline
+                        "question": bool(CONTEXT_RES["question"].search(label)),
+                    })
+                elif kind == "money":
+                    money.append({
+                        "amount": parse_money(match),
+                        "text": index.slice(match),
+                        "location": location,
+                        "budget_distance": self._context_near(index, contexts, "budget", match),
+                        "span": (id(index), match.start(), match.end()),
+                    })
+                elif kind == "email":
+                    emails.append({
+                        "value": index.slice(match, "email"),
+                        "location": location,
+                        "contact_distance": self._context_near(index, contexts, "contact", match),
+                    })
+                elif kind == "phone":
+                    area = match.group("area_p") or match.group("area")
+                    phone = f"({area}) {match.group('prefix')}-{match.group('line')}"
+                    if match.group("ext"):
+                        phone += f" x{match.group('ext')}"
+                    phones.append({
+                        "value": phone,
+                        "location": location,
+                        "contact_distance": self._context_near(index, contexts, "contact", match),
+                    })
+                elif kind == "ref":
+                    refs.append({
+                        "value": match.group("ref_id").upper(),
+                        "kind": match.group("ref_kind").upper(),
+                        "text": index.slice(match),
+                        "location": location,
+                    })
+
+            if index.cells is None:
+                for match in CONTACT_NAME_RE.finditer(index.text):
+                    names.append({"value": match.group("name"), "location": index.location(match.start("name"))})
+
+        fields = {
+            "due_date": self._resolve_due_date(dates),
+            "timeline": self._resolve_timeline(dates),
+            "budget_range": self._resolve_budget(money, indexes),
+            "contact_info": self._resolve_contact(emails, phones, names),
+            "reference_number": self._resolve_reference(refs),
+            "third_party_needs": self._resolve_third_party(third_party),
+        }
+        matches = {
+            "dates": dates[:MAX_MATCHES_PER_FIELD],
+            "money": [{k: v for k, v in m.items() if k != "span"} for m in money[:MAX_MATCHES_PER_FIELD]],
+            "emails": emails[:MAX_MATCHES_PER_FIELD],
+            "phones": phones[:MAX_MATCHES_PER_FIELD],
+            "references": refs[:MAX_MATCHES_PER_FIELD],
+        }
+        return {"fields": fields, "matches": matches}
+
+    # Field resolution
+
+    @staticmethod
+    def _resolve_due_date(dates: List[Dict]) -> Dict[str, Any]:
+        candidates = [d for d in dates if d["due_distance"] is not None and not d["question"]]
+        if not candidates:
+            return {"value": None, "confidence": 0.0}
+        # Close to its keyword first, then the one that also states a time
+        best = min(candidates, key=lambda d: (d["due_distance"] > 60, d["time"] is None, d["due_distance"]))
+        confidence = 0.9 if best["due_distance"] <= 60 else 0.75
+        if best["time"]:
+            confidence = min(0.95, confidence + 0.05)
+        # Several different "due" dates means we may have picked the wrong one
+        if len({d["date"] for d in candidates}) > 1:
+            confidence -= 0.15
+        value = best["date"] if not best["time"] else f"{best['date']}T{best['time']}"
+        return {"value": value, "confidence": round(confidence, 2), "tz": best["tz"],
+                "text": best["text"], "label": best["label"], "location": best["location"]}
+
+    @staticmethod
+    def _resolve_timeline(dates: List[Dict]) -> Dict[str, Any]:
+        # Table rows carry the best labels, so they win when a date appears in both;
+        # a time found anywhere for that date is kept
+        entries: Dict[str, Dict] = {}
+        for d in sorted(dates, key=lambda d: d["location"]["source"] != "table"):
+            entry = entries.get(d["date"])
+            if entry is not None:
+                entry["time"] = entry["time"] or d["time"]
+                entry["event"] = entry["event"] or d["label"]
+            else:
+                entries[d["date"]] = {
+                    "date": d["date"],
+                    "time": d["time"],
+                    "event": d["label"],
+                    "location": d["location"],
+                    "confidence": 0.85 if d["location"]["source"] == "table" and d["label"] else 0.6,
+                }
+        timeline = sorted(entries.values(), key=lambda e: (e["date"], e["time"] or ""))[:MAX_MATCHES_PER_FIELD]
+        confidence = max((e["confidence"] for e in timeline), default=0.0)
+        return {"value": timeline, "confidence": confidence}
+
+    @staticmethod
+    def _resolve_budget(money: List[Dict], indexes: List[_TextIndex]) -> Dict[str, Any]:
+        texts = {id(index): index.text for index in indexes}
+        candidates = [m for m in money if m["budget_distance"] is not None]
+        if not candidates:
+            return {"value": None, "confidence": 0.0}
+        best = min(candidates, key=lambda m: m["budget_distance"])
+        low = high = best["amount"]
+
+        # "$50,000 - $75,000" / "$50,000 to $75,000"
+        position = money.index(best)
+        if position + 1 < len(money):
+            following = money[position + 1]
+            source, _, end = best["span"]
+            next_source, next_start, _ = following["span"]
+            if source == next_source and RANGE_JOINER_RE.match(texts[source][end:next_start]):
+                high = following["amount"]
+        confidence = 0.85 if best["budget_distance"] <= 60 else 0.7
+        return {
+            "value": {"min": min(low, high), "max": max(low, high), "currency": "USD"},
+            "confidence": confidence,
+            "text": best["text"],
+            "location": best["location"],
+        }
+
+    @staticmethod
+    def _resolve_contact(emails: List[Dict], phones: List[Dict], names: List[Dict]) -> Dict[str, Any]:
+        def pick(items: List[Dict]) -> Tuple[Optional[Dict], float]:
+            if not items:
+                return None, 0.0
+            near = [item for item in items if item["contact_distance"] is not None]
+            if near:
+                return min(near, key=lambda item: item["contact_distance"]), 0.9
+            return items[0], 0.55
+
+        email, email_confidence = pick(emails)
+        phone, phone_confidence = pick(phones)
+        value = {}
+        locations = {}
+        if email:
+            value["email"] = email["value"]
+            locations["email"] = email["location"]
+        if phone:
+            value["phone"] = phone["value"]
+            locations["phone"] = phone["location"]
+        if names:
+            value["name"] = names[0]["value"]
+            locations["name"] = names[0]["location"]
+        confidence = max(email_confidence, phone_confidence)
+        if names:
+            confidence = min(0.95, confidence + 0.05) if confidence else 0.5
+        return {"value": value or None, "confidence": round(confidence, 2), "location": locations}
+
+    @staticmethod
+    def _resolve_reference(refs: List[Dict]) -> Dict[str, Any]:
+        if not refs:
+            return {"value": None, "confidence": 0.0}
+        strong = [r for r in refs if r["kind"] in ("RFP", "RFQ", "RFI", "RFB", "IFB", "ITB", "SOLICITATION")]
+        best = strong[0] if strong else refs[0]
+        # The same number repeated across the document is a good sign
+        repeats = sum(1 for r in refs if r["value"] == best["value"])
+        confidence = (0.8 if strong else 0.55) + min(0.15, 0.05 * (repeats - 1))
+        return {"value": best["value"], "confidence": round(confidence, 2), "kind": best["kind"],
+                "text": best["text"], "location": best["location"]}
+
+    @staticmethod
+    def _resolve_third_party(third_party: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        needs = []
+        for category, entry in third_party.items():
+            needs.append({
+                "category": category,
+                "keywords": sorted(entry["keywords"]),
+                "mentions": entry["mentions"],
+                "locations": entry["locations"],
+                "confidence": round(min(0.95, 0.5 + 0.15 * entry["mentions"]), 2),
+            })
+        needs.sort(key=lambda need: -need["mentions"])
+        return {"value": needs, "confidence": max((n["confidence"] for n in needs), default=0.0)}
+
+
+def extract_fields(text_content: Dict, tables: Optional[List[Dict]] = None) -> Dict[str, Any]:
+    """
+    Extract due date, timeline, budget, contacts, reference number and third-party needs.
+
+    Module-level so it can run on the extraction process pool.
+
+    Args:
+        text_content (Dict): ``full_text`` etc. as produced by the scraper or file ingestion
+        tables (List[Dict], optional): Tables with ``headers`` and ``rows``
+
+    Returns:
+        Dict: ``fields`` with ``value``/``confidence``/``location`` each, and raw ``matches``
+    """
+    return FieldExtractor(text_content, tables).extract()
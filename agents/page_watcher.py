@@ -0,0 +1,678 @@
+"""
+Page Watcher - Phase 2: AI Integration
+
+Watches RFP pages for amendments. Each watched URL keeps a structural
+snapshot (per-section text fingerprints, table rows, links, forms, due
+dates); every check produces a diff of what changed.
+
+Checks escalate only as far as needed:
+
+1. conditional GET (ETag / Last-Modified)        -> 304 means unchanged
+2. raw body hash                                 -> identical bytes, unchanged
+3. snapshot of the HTML served without a browser -> same structure, unchanged
+   (rotating tokens and markup noise don't count)
+4. full Playwright render, only when the static HTML is known not to carry
+   the page's content (JavaScript-built pages) or on request
+
+so thousands of bids can be watched without re-rendering each every cycle.
+"""
+
+import asyncio
+import difflib
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import zlib
+from collections import Counter
+from typing import Any, Dict, List, Optional
+import logging
+
+import requests
+
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+from cpu_pool import ExtractionExecutor, get_extraction_executor
+from extraction import extract_all
+from metrics import span
+from scrape_cache import PROBE_HEADERS
+from web_scraper import scrape_url
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from chunking import SENTENCE_END_RE, BoilerplateDetector, chunk_document, normalize_text
+from field_rules import extract_fields
+
+logger = logging.getLogger(__name__)
+
+MAX_SECTIONS = 500
+MAX_SECTION_CHARS = 4000
+MAX_TABLE_ROWS = 500
+MAX_LINKS = 2000
+MAX_DIFF_ITEMS = 50
+DOCUMENT_SUFFIXES = (".pdf", ".doc", ".docx", ".xls", ".xlsx", ".zip")
+
+# Static HTML must carry at least this share of the rendered text to be
+# trusted for later checks without a browser
+STATIC_COVERAGE = 0.8
+
+_sessions = threading.local()
+
+
+def _hash(value: Any) -> str:
+    return hashlib.sha1(json.dumps(value, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def _session() -> requests.Session:
+    session = getattr(_sessions, "session", None)
+    if session is None:
+        session = _sessions.session = requests.Session()
+        session.headers.update(PROBE_HEADERS)
+    return session
+
+
+def http_probe(url: str, validators: Dict[str, Optional[str]], timeout: float = 15.0) -> Optional[Dict[str, Any]]:
+    """
+    Conditional GET of ``url``.
+
+    Returns:
+        Dict: ``status``, new validators, ``body_hash``, ``content_type`` and
+        ``html`` (None for 304s and non-HTML bodies), or None when the request failed
+    """
+    headers = {}
+    if validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+    try:
+        response = _session().get(url, headers=headers, timeout=timeout)
+    except requests.RequestException as e:
+        logger.debug(f"Probe failed for {url}: {str(e)}")
+        return None
+    content_type = response.headers.get("Content-Type", "")
+    probe = {
+        "status": response.status_code,
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "content_type": content_type,
+        "body_hash": None,
+        "html": None,
+    }
+    if response.status_code == 200:
+        probe["body_hash"] = hashlib.sha256(response.content).hexdigest()
+        if "html" in content_type or not content_type:
+            probe["html"] = response.text
+    return probe
+
+
+def build_snapshot(content: Dict[str, Any], forms: Optional[List[Dict]] = None) -> Dict[str, Any]:
+    """
+    Structural fingerprint of extracted page content.
+
+    Args:
+        content (Dict): ``text``, ``tables`` and ``links`` as produced by the
+            scraper (``result["content"]``) or ``extract_all``
+        forms (List[Dict], optional): Rendered forms (None when not available)
+
+    Returns:
+        Dict: headings, per-section hashes and text, table rows, links, forms,
+        due date/timeline and an overall ``hash``
+    """
+    text_content = content.get("text", {})
+    tables = content.get("tables", [])
+
+    # Fresh detector: boilerplate is judged within this page only
+    chunked = chunk_document(text_content, tables, detector=BoilerplateDetector())
+    sections: Dict[str, Dict[str, str]] = {}
+    for chunk in chunked["chunks"]:
+        if chunk.kind == "table" or len(sections) >= MAX_SECTIONS:
+            continue
+        key = " > ".join(chunk.path) or "(top)"
+        suffix = 2
+        while key in sections:
+            key = f"{' > '.join(chunk.path) or '(top)'} #{suffix}"
+            suffix += 1
+        text = normalize_text(chunk.text)
+        sections[key] = {"hash": hashlib.sha1(text.encode("utf-8")).hexdigest(), "text": text[:MAX_SECTION_CHARS]}
+
+    heading_list = [f"h{heading['level']} {normalize_text(heading['text'])}"
+                    for heading in text_content.get("headings", [])]
+
+    table_snapshots = []
+    for table in tables:
+        rows = [" | ".join(normalize_text(cell) for cell in row) for row in table.get("rows", [])[:MAX_TABLE_ROWS]]
+        table_snapshots.append({
+            "headers": [normalize_text(h) for h in table.get("headers", [])],
+            "rows": rows,
+        })
+
+    links = sorted({link.get("absolute_url") or link.get("href", "") for link in content.get("links", [])})[:MAX_LINKS]
+    form_signatures = None
+    if forms is not None:
+        form_signatures = sorted(
+            _hash({"action": form.get("action"), "method": form.get("method"),
+                   "fields": sorted((field.get("name") or "") for field in form.get("inputs", []))})
+            for form in forms
+        )
+
+    rules = extract_fields(text_content, tables)["fields"]
+    snapshot = {
+        "headings": heading_list,
+        "sections": sections,
+        "tables": table_snapshots,
+        "links": links,
+        "forms": form_signatures,
+        "due_date": rules["due_date"]["value"],
+        "timeline": sorted(" ".join(part for part in (entry["date"], entry["time"], entry["event"]) if part)
+                           for entry in rules["timeline"]["value"]),
+        "text_chars": len(text_content.get("full_text", "")),
+    }
+    fingerprint = {key: value for key, value in snapshot.items() if key not in ("forms", "text_chars")}
+    fingerprint["sections"] = {key: value["hash"] for key, value in sections.items()}
+    snapshot["hash"] = _hash(fingerprint)
+    return snapshot
+
+
+def snapshot_from_html(html: str, url: str) -> Dict[str, Any]:
+    """``build_snapshot`` over HTML fetched without a browser (runs on the extraction pool)."""
+    return build_snapshot(extract_all(html, url))
+
+
+def _list_diff(before: List[str], after: List[str]) -> Dict[str, List[str]]:
+    old, new = Counter(before), Counter(after)
+    return {
+        "added": list((new - old).elements())[:MAX_DIFF_ITEMS],
+        "removed": list((old - new).elements())[:MAX_DIFF_ITEMS],
+    }
+
+
+def _text_changes(before: str, after: str) -> List[str]:
+    """Changed sentences as ``- old`` / ``+ new`` lines."""
+    lines = difflib.ndiff(SENTENCE_END_RE.split(before), SENTENCE_END_RE.split(after))
+    lines = [line for line in lines if line[:2] in ("- ", "+ ")]
+    return lines[:MAX_DIFF_ITEMS]
+
+
+def diff_snapshots(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Structural diff of two snapshots.
+
+    Returns:
+        Dict: ``changed`` flag, ``summary`` lines and per-part details for
+        headings, sections, tables, links, forms, due date and timeline
+    """
+    diff: Dict[str, Any] = {"changed": False, "summary": []}
+
+    headings = _list_diff(old["headings"], new["headings"])
+    if headings["added"] or headings["removed"]:
+        diff["headings"] = headings
+        diff["summary"].append(f"headings: +{len(headings['added'])} -{len(headings['removed'])}")
+
+    old_sections, new_sections = old["sections"], new["sections"]
+    sections = {
+        "added": [key for key in new_sections if key not in old_sections][:MAX_DIFF_ITEMS],
+        "removed": [key for key in old_sections if key not in new_sections][:MAX_DIFF_ITEMS],
+        "changed": [
+            {"section": key, "changes": _text_changes(old_sections[key]["text"], new_sections[key]["text"])}
+            for key in new_sections
+            if key in old_sections and old_sections[key]["hash"] != new_sections[key]["hash"]
+        ][:MAX_DIFF_ITEMS],
+    }
+    if any(sections.values()):
+        diff["sections"] = sections
+        diff["summary"].append(
+            f"sections: {len(sections['changed'])} changed, +{len(sections['added'])} -{len(sections['removed'])}"
+        )
+
+    table_diffs = []
+    for position in range(max(len(old["tables"]), len(new["tables"]))):
+        before = old["tables"][position] if position < len(old["tables"]) else {"headers": [], "rows": []}
+        after = new["tables"][position] if position < len(new["tables"]) else {"headers": [], "rows": []}
+        rows = _list_diff(before["rows"], after["rows"])
+        if rows["added"] or rows["removed"] or before["headers"] != after["headers"]:
+            table_diffs.append({
+                "table": position,
+                "headers": after["headers"] or before["headers"],
+                "rows_added": rows["added"],
+                "rows_removed": rows["removed"],
+            })
+    if table_diffs:
+        diff["tables"] = table_diffs[:MAX_DIFF_ITEMS]
+        diff["summary"].append(f"tables: {len(table_diffs)} changed")
+
+    links = _list_diff(old["links"], new["links"])
+    if links["added"] or links["removed"]:
+        diff["links"] = links
+        documents = [link for link in links["added"] if link.lower().split("?")[0].endswith(DOCUMENT_SUFFIXES)]
+        if documents:
+            # New attachments are usually addenda
+            diff["documents_added"] = documents
+        diff["summary"].append(f"links: +{len(links['added'])} -{len(links['removed'])}"
+                               + (f" ({len(documents)} documents)" if documents else ""))
+
+    # Forms are only known from rendered snapshots
+    if old.get("forms") is not None and new.get("forms") is not None and old["forms"] != new["forms"]:
+        diff["forms"] = {"before": len(old["forms"]), "after": len(new["forms"])}
+        diff["summary"].append("forms changed")
+
+    if old.get("due_date") != new.get("due_date"):
+        diff["due_date"] = {"before": old.get("due_date"), "after": new.get("due_date")}
+        diff["summary"].append(f"due date: {old.get('due_date')} -> {new.get('due_date')}")
+
+    timeline = _list_diff(old.get("timeline", []), new.get("timeline", []))
+    if timeline["added"] or timeline["removed"]:
+        diff["timeline"] = timeline
+        diff["summary"].append(f"timeline: +{len(timeline['added'])} -{len(timeline['removed'])}")
+
+    diff["changed"] = bool(diff["summary"])
+    return diff
+
+
+def _pack(data: Any) -> bytes:
+    return zlib.compress(json.dumps(data).encode("utf-8"), 3)
+
+
+def _unpack(blob: Optional[bytes]) -> Any:
+    return json.loads(zlib.decompress(blob)) if blob else None
+
+
+class WatchStore:
+    """SQLite persistence for watches (with their latest snapshot) and detected changes."""
+
+    WATCH_COLUMNS = ("id", "url", "interval", "next_check_at", "last_checked_at", "last_changed_at",
+                     "last_method", "last_error", "checks", "changes", "renders", "failures",
+                     "static_ok", "created_at")
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS watches (
+                id INTEGER PRIMARY KEY,
+                url TEXT NOT NULL UNIQUE,
+                interval REAL NOT NULL,
+                next_check_at REAL NOT NULL,
+                last_checked_at REAL,
+                last_changed_at REAL,
+                last_method TEXT,
+                last_error TEXT,
+                checks INTEGER NOT NULL DEFAULT 0,
+                changes INTEGER NOT NULL DEFAULT 0,
+                renders INTEGER NOT NULL DEFAULT 0,
+                failures INTEGER NOT NULL DEFAULT 0,
+                static_ok INTEGER NOT NULL DEFAULT 0,
+                static_hash TEXT,
+                validators TEXT NOT NULL DEFAULT '{}',
+                snapshot BLOB,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_watches_next ON watches(next_check_at);
+
+            CREATE TABLE IF NOT EXISTS watch_changes (
+                id INTEGER PRIMARY KEY,
+                watch_id INTEGER NOT NULL,
+                url TEXT NOT NULL,
+                detected_at REAL NOT NULL,
+                method TEXT,
+                summary TEXT NOT NULL,
+                diff BLOB NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_watch_changes_watch ON watch_changes(watch_id, id);
+        """)
+        self._db.commit()
+
+    def add(self, url: str, interval: float) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT INTO watches (url, interval, next_check_at, created_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(url) DO UPDATE SET interval = excluded.interval",
+                (url, interval, now, now)
+            )
+        return self.get_by_url(url)
+
+    def _public(self, row: sqlite3.Row) -> Dict[str, Any]:
+        watch = {column: row[column] for column in self.WATCH_COLUMNS}
+        watch["static_ok"] = bool(watch["static_ok"])
+        return watch
+
+    def get(self, watch_id: int, internal: bool = False) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute("SELECT * FROM watches WHERE id = ?", (watch_id,)).fetchone()
+        if row is None:
+            return None
+        if not internal:
+            return self._public(row)
+        watch = dict(row)
+        watch["validators"] = json.loads(watch["validators"])
+        watch["snapshot"] = _unpack(watch["snapshot"])
+        return watch
+
+    def get_by_url(self, url: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute("SELECT * FROM watches WHERE url = ?", (url,)).fetchone()
+        return self._public(row) if row else None
+
+    def list(self, limit: int = 100, offset: int = 0) -> Dict[str, Any]:
+        with self._lock:
+            total = self._db.execute("SELECT COUNT(*) FROM watches").fetchone()[0]
+            rows = self._db.execute("SELECT * FROM watches ORDER BY id LIMIT ? OFFSET ?", (limit, offset)).fetchall()
+        return {"total": total, "watches": [self._public(row) for row in rows]}
+
+    def due(self, now: float, limit: int) -> List[int]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id FROM watches WHERE next_check_at <= ? ORDER BY next_check_at LIMIT ?", (now, limit)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def claim(self, watch_id: int, until: float):
+        """Push next_check_at out while a check runs so it isn't picked up twice."""
+        with self._lock, self._db:
+            self._db.execute("UPDATE watches SET next_check_at = ? WHERE id = ?", (until, watch_id))
+
+    def update(self, watch_id: int, **fields):
+        if "validators" in fields:
+            fields["validators"] = json.dumps(fields["validators"])
+        if "snapshot" in fields:
+            fields["snapshot"] = _pack(fields["snapshot"])
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock, self._db:
+            self._db.execute(f"UPDATE watches SET {assignments} WHERE id = ?", list(fields.values()) + [watch_id])
+
+    def increment(self, watch_id: int, *counters: str):
+        assignments = ", ".join(f"{name} = {name} + 1" for name in counters)
+        with self._lock, self._db:
+            self._db.execute(f"UPDATE watches SET {assignments} WHERE id = ?", (watch_id,))
+
+    def remove(self, watch_id: int) -> bool:
+        with self._lock, self._db:
+            deleted = self._db.execute("DELETE FROM watches WHERE id = ?", (watch_id,)).rowcount
+            self._db.execute("DELETE FROM watch_changes WHERE watch_id = ?", (watch_id,))
+        return deleted > 0
+
+    def add_change(self, watch_id: int, url: str, method: str, diff: Dict[str, Any]) -> int:
+        with self._lock, self._db:
+            cursor = self._db.execute(
+                "INSERT INTO watch_changes (watch_id, url, detected_at, method, summary, diff) VALUES (?, ?, ?, ?, ?, ?)",
+                (watch_id, url, time.time(), method, "; ".join(diff["summary"]), _pack(diff))
+            )
+        return cursor.lastrowid
+
+    def list_changes(self, watch_id: Optional[int] = None, since_id: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+        query = "SELECT * FROM watch_changes WHERE id > ?"
+        params: List[Any] = [since_id]
+        if watch_id is not None:
+            query += " AND watch_id = ?"
+            params.append(watch_id)
+        with self._lock:
+            rows = self._db.execute(query + " ORDER BY id LIMIT ?", params + [limit]).fetchall()
+        return [{**{key: row[key] for key in row.keys() if key != "diff"}, "diff": _unpack(row["diff"])} for row in rows]
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "watches": self._db.execute("SELECT COUNT(*) FROM watches").fetchone()[0],
+                "changes": self._db.execute("SELECT COUNT(*) FROM watch_changes").fetchone()[0],
+            }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class PageWatcher:
+    """
+    Checks due watches on an interval, escalating from HTTP probes to a full
+    render only when needed, and records structural diffs.
+    """
+
+    def __init__(self,
+                 store: WatchStore,
+                 concurrency: int = 8,
+                 min_interval: float = 300.0,
+                 poll_interval: float = 15.0,
+                 http_timeout: float = 15.0,
+                 executor: Optional[ExtractionExecutor] = None,
+                 **scrape_options):
+        """
+        Args:
+            store (WatchStore): Watches and change history
+            concurrency (int): Checks running at once
+            min_interval (float): Smallest allowed check interval in seconds
+            poll_interval (float): How often the loop looks for due watches
+            http_timeout (float): Timeout for HTTP probes
+            executor (ExtractionExecutor, optional): Where snapshots are built (shared pool by default)
+            **scrape_options: Passed to scrape_url for full renders
+        """
+        self.store = store
+        self.concurrency = concurrency
+        self.min_interval = min_interval
+        self.poll_interval = poll_interval
+        self.http_timeout = http_timeout
+        self.executor = executor
+        self.scrape_options = scrape_options
+
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._task: Optional[asyncio.Task] = None
+        self._running: Dict[int, asyncio.Task] = {}
+        self.counters = {"checks": 0, "unchanged": 0, "changed": 0, "baseline": 0, "errors": 0, "renders": 0}
+        self.methods: Counter = Counter()
+
+    @classmethod
+    def from_env(cls, store_path: Optional[str] = None) -> "PageWatcher":
+        return cls(
+            WatchStore(store_path or os.environ.get("SCRAPER_WATCH_DB", os.path.join("data", "watches.sqlite"))),
+            concurrency=int(os.environ.get("SCRAPER_WATCH_CONCURRENCY", "8")),
+            min_interval=float(os.environ.get("SCRAPER_WATCH_MIN_INTERVAL", "300")),
+        )
+
+    def add(self, url: str, interval: float) -> Dict[str, Any]:
+        """Watch ``url`` every ``interval`` seconds (re-adding updates the interval)."""
+        if interval < self.min_interval:
+            raise ValueError(f"interval must be at least {self.min_interval:g} seconds")
+        return self.store.add(url, interval)
+
+    def remove(self, watch_id: int) -> bool:
+        task = self._running.get(watch_id)
+        if task is not None:
+            task.cancel()
+        return self.store.remove(watch_id)
+
+    async def _snapshot(self, fn, *args) -> Dict[str, Any]:
+        return await (self.executor or get_extraction_executor()).run(fn, *args)
+
+    async def check(self, watch_id: int, force_render: bool = False) -> Dict[str, Any]:
+        """
+        Check one watch now.
+
+        Returns:
+            Dict: ``status`` (baseline, unchanged, changed or error), the
+            ``method`` that decided it and, for changes, the ``diff`` and ``change_id``
+        """
+        # Store calls (SQLite, zlib of whole snapshots) run in worker threads, not on the loop
+        watch = await asyncio.to_thread(self.store.get, watch_id, True)
+        if watch is None:
+            raise KeyError(watch_id)
+        url = watch["url"]
+        old = watch["snapshot"]
+        validators = watch["validators"]
+        now = time.time()
+        self.counters["checks"] += 1
+
+        try:
+            with span("watch_check"):
+                outcome = await self._check(watch, force_render)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"⚠️ Watch check failed for {url}: {str(e)}")
+            self.counters["errors"] += 1
+            await asyncio.to_thread(self._save, watch_id, ["checks", "failures"], {
+                "last_checked_at": now, "last_error": str(e), "next_check_at": self._next_check(watch, failed=True)
+            })
+            return {"watch_id": watch_id, "url": url, "status": "error", "error": str(e)}
+
+        method = outcome["method"]
+        self.methods[method] += 1
+        fields = {
+            "last_checked_at": now,
+            "last_method": method,
+            "last_error": None,
+            "next_check_at": self._next_check(watch),
+            "validators": outcome.get("validators", validators),
+        }
+        for name in ("static_ok", "static_hash"):
+            if name in outcome:
+                fields[name] = outcome[name]
+        counters = ["checks"] + (["renders"] if method == "render" else [])
+        result = {"watch_id": watch_id, "url": url, "method": method}
+
+        snapshot = outcome.get("snapshot")
+        same = old is not None and snapshot is not None and snapshot["hash"] == old["hash"] \
+            and snapshot.get("forms") in (None, old.get("forms"))
+        if snapshot is None or same:
+            result["status"] = "unchanged"
+        elif old is None:
+            result["status"] = "baseline"
+            fields["snapshot"] = snapshot
+        else:
+            diff = outcome.get("diff") or diff_snapshots(old, snapshot)
+            fields["snapshot"] = snapshot
+            if diff["changed"]:
+                result.update(status="changed", diff=diff)
+                result["change_id"] = await asyncio.to_thread(self.store.add_change, watch_id, url, method, diff)
+                fields["last_changed_at"] = now
+                counters.append("changes")
+                logger.info(f"🔔 {url} changed: {'; '.join(diff['summary'])}")
+            else:
+                result["status"] = "unchanged"  # only hash-irrelevant details moved
+
+        self.counters[result["status"]] += 1
+        await asyncio.to_thread(self._save, watch_id, counters, fields)
+        return result
+
+    def _save(self, watch_id: int, counters: List[str], fields: Dict[str, Any]):
+        self.store.increment(watch_id, *counters)
+        self.store.update(watch_id, **fields)
+
+    async def _check(self, watch: Dict[str, Any], force_render: bool) -> Dict[str, Any]:
+        url = watch["url"]
+        validators = watch["validators"]
+        probe = None
+        if not force_render:
+            probe = await asyncio.to_thread(http_probe, url, validators, self.http_timeout)
+
+        new_validators = {
+            key: probe[key] for key in ("etag", "last_modified", "body_hash")
+        } if probe and probe["status"] == 200 else validators
+        if probe is not None and watch["snapshot"] is not None:
+            if probe["status"] == 304:
+                return {"method": "http_304"}
+            if probe["body_hash"] and probe["body_hash"] == validators.get("body_hash"):
+                # Same bytes; the server may only now have started sending validators
+                return {"method": "http_body", "validators": new_validators}
+
+        static = None
+        if probe is not None and probe["html"]:
+            static = await self._snapshot(snapshot_from_html, probe["html"], url)
+            if watch["snapshot"] is not None and watch["static_ok"]:
+                if static["hash"] == watch["static_hash"]:
+                    return {"method": "http_static", "validators": new_validators}
+                return {"method": "http_static", "validators": new_validators, "snapshot": static,
+                        "static_hash": static["hash"]}
+        elif probe is not None and probe["status"] == 200 and watch["snapshot"] is not None:
+            # A document (PDF, ...) whose bytes changed: no structure to diff
+            diff = {"changed": True, "summary": ["document changed"], "document_changed": True}
+            return {"method": "http_body", "validators": new_validators,
+                    "snapshot": {**watch["snapshot"], "hash": probe["body_hash"]}, "diff": diff}
+
+        # The static HTML can't decide: render
+        self.counters["renders"] += 1
+        result = await scrape_url(url, force_refresh=True, fetch_mode="browser", **self.scrape_options)
+        if result.get("status") != "success":
+            raise RuntimeError(result.get("error", "render failed"))
+        rendered = await self._snapshot(build_snapshot, result["content"], result["content"].get("forms"))
+
+        outcome = {"method": "render", "validators": new_validators, "snapshot": rendered}
+        if static is not None:
+            # Later checks can skip the browser if the static HTML shows the same content
+            static_ok = static["text_chars"] >= STATIC_COVERAGE * max(1, rendered["text_chars"])
+            outcome["static_ok"] = int(static_ok)
+            outcome["static_hash"] = static["hash"]
+            if static_ok:
+                # Keep comparing like with like: static snapshots from now on
+                outcome["snapshot"] = {**static, "forms": rendered["forms"]}
+        return outcome
+
+    def _next_check(self, watch: Dict[str, Any], failed: bool = False) -> float:
+        interval = watch["interval"]
+        if failed:
+            # Back off on repeated failures, up to 8x the interval
+            interval *= min(8, 2 ** watch["failures"])
+        # Jitter so watches added together don't stay in lockstep
+        return time.time() + interval * random.uniform(0.9, 1.1)
+
+    async def run_due(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """Check every watch that is due (up to ``limit``), ``concurrency`` at a time."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        now = time.time()
+        due = [watch_id for watch_id in await asyncio.to_thread(self.store.due, now, limit)
+               if watch_id not in self._running]
+        # A check may take a while; don't hand it out again meanwhile
+        await asyncio.to_thread(self._claim, due, now + 3600)
+
+        async def run(watch_id: int):
+            async with self._semaphore:
+                task = asyncio.ensure_future(self.check(watch_id))
+                self._running[watch_id] = task
+                try:
+                    return await task
+                except (asyncio.CancelledError, KeyError):
+                    return None
+                finally:
+                    self._running.pop(watch_id, None)
+
+        results = await asyncio.gather(*(run(watch_id) for watch_id in due))
+        return [result for result in results if result is not None]
+
+    def _claim(self, watch_ids: List[int], until: float):
+        for watch_id in watch_ids:
+            self.store.claim(watch_id, until)
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.run_due()
+            except Exception as e:
+                logger.error(f"❌ Watch loop error: {str(e)}")
+            await asyncio.sleep(self.poll_interval)
+
+    def start(self):
+        """Start checking due watches in the background (call on the running loop)."""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        for task in list(self._running.values()):
+            task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.store.counts(),
+            "running": len(self._running),
+            "active": self._task is not None,
+            **self.counters,
+            "methods": dict(self.methods),
+        }
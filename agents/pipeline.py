@@ -0,0 +1,297 @@
+"""
+RFP Analysis Pipeline - Phase 2: AI Integration
+
+Runs many RFP sources through the RFPReaderAgent stages
+(fetch -> extract -> analyze -> score) with a bounded queue in front of each
+stage and a concurrency limit per stage. Fetching one source overlaps with
+extracting and analyzing others, so a large backlog moves at the pace of the
+slowest stage instead of the sum of all stages.
+"""
+
+import asyncio
+import math
+import time
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional
+import logging
+
+from rfp_reader import RFPReaderAgent, get_rfp_reader
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("fetch", "extract", "analyze", "score")
+
+# Fetching waits on the network/browser, extract is CPU-bound (process pool),
+# analyze fans out per chunk, score is trivial
+DEFAULT_CONCURRENCY = {"fetch": 4, "extract": 2, "analyze": 4, "score": 1}
+
+
+class PipelineItem:
+    """One source moving through the pipeline, with per-stage timings."""
+
+    def __init__(self, index: int, source: str):
+        self.index = index
+        self.source = source
+        self.stage: Optional[str] = None
+        self.status = "queued"
+        self.error: Optional[str] = None
+        self.timings: Dict[str, float] = {}
+        self.waits: Dict[str, float] = {}
+        self.enqueued_at = time.perf_counter()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.deadline = math.inf
+        self.task: Optional[asyncio.Task] = None
+        self.cancel_requested = False
+
+        # Stage outputs
+        self.raw: Optional[Dict[str, Any]] = None
+        self.extracted: Optional[Dict[str, Any]] = None
+        self.structured: Optional[Dict[str, Any]] = None
+        self.confidence: Optional[Dict[str, float]] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.finished_at is not None
+
+    def pipeline_info(self) -> Dict[str, Any]:
+        total = (self.finished_at - self.started_at) if self.started_at and self.finished_at else 0.0
+        return {
+            "index": self.index,
+            "stage": self.stage,
+            "timings": {stage: round(seconds, 4) for stage, seconds in self.timings.items()},
+            "waits": {stage: round(seconds, 4) for stage, seconds in self.waits.items()},
+            "total": round(total, 4),
+        }
+
+
+class RFPPipeline:
+    """
+    Stage-parallel analysis of many RFP sources with a shared agent.
+
+    Each stage has its own worker tasks; a full queue blocks the stage in
+    front of it, so at most ``queue_size`` items wait between two stages and
+    memory stays bounded however long the backlog is.
+    """
+
+    def __init__(self,
+                 agent: Optional[RFPReaderAgent] = None,
+                 concurrency: Optional[Dict[str, int]] = None,
+                 queue_size: int = 8,
+                 item_timeout: float = 600.0,
+                 stage_timeouts: Optional[Dict[str, float]] = None,
+                 include_raw: bool = False):
+        """
+        Args:
+            agent (RFPReaderAgent, optional): Agent to run the stages with (shared agent by default)
+            concurrency (Dict[str, int], optional): Workers per stage, merged over DEFAULT_CONCURRENCY
+            queue_size (int): Capacity of the queue in front of each stage
+            item_timeout (float): Seconds an item may take from the start of its fetch
+            stage_timeouts (Dict[str, float], optional): Per-stage time limits
+            include_raw (bool): Keep ``raw_scraped`` in results (large on long backlogs)
+        """
+        unknown = set(concurrency or {}) - set(STAGES)
+        if unknown:
+            raise ValueError(f"Unknown pipeline stages: {sorted(unknown)}")
+        self.agent = agent or get_rfp_reader()
+        self.concurrency = {**DEFAULT_CONCURRENCY, **(concurrency or {})}
+        self.queue_size = max(1, queue_size)
+        self.item_timeout = item_timeout
+        self.stage_timeouts = stage_timeouts or {}
+        self.include_raw = include_raw
+
+        self._items: List[PipelineItem] = []
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._done: Optional[asyncio.Queue] = None
+        self._busy = {stage: 0 for stage in STAGES}
+        self._processed = {stage: 0 for stage in STAGES}
+        self._stage_seconds = {stage: 0.0 for stage in STAGES}
+        self._statuses: Dict[str, int] = {}
+
+    async def run(self, sources: Iterable[str]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Analyze ``sources`` and yield each result as soon as it finishes.
+
+        Results have the ``analyze_rfp`` shape plus a ``pipeline`` block with
+        the item's input index and per-stage ``timings`` and queue ``waits``.
+        Failed, timed-out and cancelled items are yielded as error results.
+        """
+        self._items = [PipelineItem(index, source) for index, source in enumerate(sources)]
+        self._queues = {stage: asyncio.Queue(maxsize=self.queue_size) for stage in STAGES}
+        self._done = asyncio.Queue()
+        if not self._items:
+            return
+
+        logger.info(f"🚚 Pipeline starting: {len(self._items)} sources, concurrency {self.concurrency}")
+
+        async def feed():
+            for item in self._items:
+                item.enqueued_at = time.perf_counter()
+                await self._queues[STAGES[0]].put(item)
+
+        tasks = [asyncio.create_task(feed())]
+        for position, stage in enumerate(STAGES):
+            next_stage = STAGES[position + 1] if position + 1 < len(STAGES) else None
+            tasks += [
+                asyncio.create_task(self._worker(stage, next_stage))
+                for _ in range(max(1, self.concurrency[stage]))
+            ]
+
+        try:
+            for _ in range(len(self._items)):
+                item = await self._done.get()
+                yield self._result(item)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def cancel(self, index: int) -> bool:
+        """
+        Cancel one item by its input index.
+
+        Returns:
+            bool: False if the item does not exist or already finished
+        """
+        if not 0 <= index < len(self._items):
+            return False
+        item = self._items[index]
+        if item.finished or item.cancel_requested:
+            return False
+        item.cancel_requested = True
+        if item.task is not None and not item.task.done():
+            item.task.cancel()  # its worker records the cancellation
+        else:
+            self._finish(item, "cancelled", "Cancelled")
+        return True
+
+    async def _worker(self, stage: str, next_stage: Optional[str]):
+        inbox = self._queues[stage]
+        while True:
+            item = await inbox.get()
+            if item.finished:
+                continue  # cancelled while waiting in the queue
+
+            now = time.perf_counter()
+            item.waits[stage] = now - item.enqueued_at
+            if item.started_at is None:
+                item.started_at = now
+                item.deadline = now + self.item_timeout
+            timeout = min(item.deadline - now, self.stage_timeouts.get(stage, math.inf))
+            if timeout <= 0:
+                self._finish(item, "timeout", f"Timed out before the {stage} stage after {self.item_timeout}s")
+                continue
+
+            item.stage = stage
+            item.status = "running"
+            item.task = asyncio.ensure_future(self._run_stage(stage, item))
+            self._busy[stage] += 1
+            try:
+                await asyncio.wait_for(item.task, None if math.isinf(timeout) else timeout)
+            except asyncio.TimeoutError:
+                self._finish(item, "timeout", f"{stage} stage timed out after {timeout:.1f}s")
+                continue
+            except asyncio.CancelledError:
+                if not item.cancel_requested:
+                    raise  # the pipeline itself is shutting down
+                self._finish(item, "cancelled", f"Cancelled during {stage}")
+                continue
+            except Exception as e:
+                logger.error(f"❌ {stage} failed for {item.source}: {str(e)}")
+                self._finish(item, "error", str(e) or type(e).__name__)
+                continue
+            finally:
+                self._busy[stage] -= 1
+                item.task = None
+                elapsed = time.perf_counter() - now
+                item.timings[stage] = elapsed
+                self._processed[stage] += 1
+                self._stage_seconds[stage] += elapsed
+
+            if item.cancel_requested:
+                continue  # finished by cancel() right after the stage completed
+            if next_stage is None:
+                self._finish(item, "success")
+            else:
+                item.status = "queued"
+                item.enqueued_at = time.perf_counter()
+                await self._queues[next_stage].put(item)
+
+    async def _run_stage(self, stage: str, item: PipelineItem):
+        agent = self.agent
+        if stage == "fetch":
+            item.raw = await agent.fetch(item.source)
+        elif stage == "extract":
+            item.extracted = await agent.extract(item.raw)
+        elif stage == "analyze":
+            item.structured = await agent.analyze(item.raw, item.extracted)
+            item.extracted = None  # chunks are no longer needed
+        else:
+            item.confidence = agent.score(item.structured)
+
+    def _finish(self, item: PipelineItem, status: str, error: Optional[str] = None):
+        if item.finished:
+            return
+        item.status = status
+        item.error = error
+        item.finished_at = time.perf_counter()
+        self._statuses[status] = self._statuses.get(status, 0) + 1
+        self._done.put_nowait(item)
+
+    def _result(self, item: PipelineItem) -> Dict[str, Any]:
+        if item.status == "success":
+            result = self.agent.build_result(item.source, item.raw, item.structured, item.confidence)
+            if not self.include_raw:
+                result.pop("raw_scraped", None)
+        else:
+            result = self.agent.error_result(item.source, Exception(item.error), status=item.status)
+        result["pipeline"] = item.pipeline_info()
+        # Drop stage outputs so a long run doesn't hold every document
+        item.raw = item.extracted = item.structured = None
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        stages = {}
+        for stage in STAGES:
+            processed = self._processed[stage]
+            average = self._stage_seconds[stage] / processed if processed else 0.0
+            stages[stage] = {
+                "workers": self.concurrency[stage],
+                "busy": self._busy[stage],
+                "queued": self._queues[stage].qsize() if stage in self._queues else 0,
+                "processed": processed,
+                "avg_seconds": round(average, 4),
+                # Seconds per item the stage can sustain with all its workers
+                "capacity_seconds": round(average / self.concurrency[stage], 4),
+            }
+        measured = [stage for stage in STAGES if self._processed[stage]]
+        return {
+            "items": len(self._items),
+            "finished": sum(self._statuses.values()),
+            "statuses": dict(self._statuses),
+            "stages": stages,
+            "bottleneck": max(measured, key=lambda stage: stages[stage]["capacity_seconds"]) if measured else None,
+        }
+
+
+async def analyze_many(sources: Iterable[str], agent: Optional[RFPReaderAgent] = None,
+                       **options) -> List[Dict[str, Any]]:
+    """
+    Analyze many RFP URLs/files concurrently with stage-level parallelism.
+
+    Args:
+        sources (Iterable[str]): URLs or file paths
+        agent (RFPReaderAgent, optional): Agent to use (shared agent by default)
+        **options: RFPPipeline options (concurrency, queue_size, item_timeout, ...)
+
+    Returns:
+        List[Dict]: One result per source, in input order
+    """
+    pipeline = RFPPipeline(agent, **options)
+    results: List[Optional[Dict[str, Any]]] = []
+    async for result in pipeline.run(sources):
+        index = result["pipeline"]["index"]
+        results.extend([None] * (index + 1 - len(results)))
+        results[index] = result
+    stats = pipeline.stats()
+    logger.info(f"🏁 Pipeline finished: {stats['statuses']} (bottleneck: {stats['bottleneck']})")
+    return results
@@ -7,6 +7,8 @@ Built on top of the existing web scraper foundation from Phase 1.
 
 import asyncio
 import logging
+import re
+import threading
 from typing import Dict, List, Optional, Any
 from datetime import datetime
 from pathlib import Path
@@ -16,14 +18,55 @@ import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
 from web_scraper import scrape_url
+from browser_pool import BrowserPool, shutdown_browser_pool
+from document_ingest import ingest_document
+from url_utils import url_domain
+from cpu_pool import get_extraction_executor
+from llm_client import LLMClient, LLMError, get_llm_client
+from metrics import span
 
-# Future Phase 2 imports (to be implemented)
-# import openai
-# import pymupdf
-# import pdfplumber
+# Phase 2 analysis building blocks (agents/)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from chunking import BoilerplateDetector, Chunk, ChunkMemo, chunk_document
+from field_rules import extract_fields
 
 logger = logging.getLogger(__name__)
 
+# Sentences that state an obligation on the bidder
+REQUIREMENT_RE = re.compile(r'\b(shall|must|is required to|are required to|will be required)\b', re.I)
+SENTENCE_RE = re.compile(r'(?<=[.!?])\s+')
+
+MAX_LIST_FIELD_ITEMS = 100
+MAX_SCOPE_CHARS = 1500
+
+# Fields the rule extractor fills; below this confidence they are left for the model
+RULE_FIELDS = ("due_date", "timeline", "budget_range", "contact_info", "reference_number", "third_party_needs")
+RULE_CONFIDENCE_THRESHOLD = 0.6
+
+# Chunk topics worth showing the model for each field it has to fill
+LLM_FIELD_TOPICS = {
+    "due_date": ("timeline", "submission"),
+    "timeline": ("timeline", "submission"),
+    "budget_range": ("budget_range",),
+    "contact_info": ("contact_info", "submission"),
+    "reference_number": (),
+    "third_party_needs": ("scope_of_work", "requirements"),
+}
+LLM_FIELD_FORMATS = {
+    "due_date": '"YYYY-MM-DD" or "YYYY-MM-DDTHH:MM", the proposal submission deadline',
+    "timeline": '[{"date": "YYYY-MM-DD", "time": "HH:MM" or null, "event": str}]',
+    "budget_range": '{"min": number, "max": number, "currency": "USD"}',
+    "contact_info": '{"name": str, "email": str, "phone": str}',
+    "reference_number": 'the solicitation/RFP number as a string',
+    "third_party_needs": '[{"category": str, "keywords": [str]}] for services the bidder must subcontract (hotels, catering, transportation, AV, ...)',
+}
+LLM_CHUNKS_PER_FIELD = 3
+LLM_FIELD_CONFIDENCE = 0.7
+LLM_SYSTEM_PROMPT = (
+    "You extract fields from government RFP documents. Answer with a JSON object containing only "
+    "the requested keys; use null when the excerpt does not state a value. Never guess."
+)
+
 class RFPReaderAgent:
     """
     AI-powered agent for reading and analyzing RFP documents.
@@ -35,10 +78,23 @@ class RFPReaderAgent:
     - Generate confidence scores for extracted information
     """
     
-    def __init__(self, openai_api_key: Optional[str] = None):
+    def __init__(self, openai_api_key: Optional[str] = None,
+                 browser_pool: Optional[BrowserPool] = None,
+                 chunk_concurrency: int = 8,
+                 llm: Optional[LLMClient] = None):
         self.openai_api_key = openai_api_key
+        # Only fields the rules could not fill are sent to the model
+        self.llm = llm or get_llm_client(openai_api_key)
+        self.browser_pool = browser_pool  # None leases from the shared pool
         self.supported_formats = ['pdf', 'html', 'docx']
         
+        # Chunk analyses are memoized by content hash across documents
+        self.chunk_memo = ChunkMemo()
+        self.chunk_concurrency = chunk_concurrency
+        self._boilerplate_detectors: Dict[str, BoilerplateDetector] = {}
+        # Chunking is pure Python and updates shared detectors: one document at a time
+        self._chunk_lock = threading.Lock()
+        
     async def analyze_rfp(self, url_or_path: str) -> Dict[str, Any]:
         """
         Main method to analyze an RFP document.
@@ -52,36 +108,129 @@ class RFPReaderAgent:
         try:
             logger.info(f"🔍 Starting RFP analysis: {url_or_path}")
             
-            # Phase 1: Use existing web scraper (WORKING)
-            if url_or_path.startswith(('http://', 'https://')):
-                scraped_data = await self._scrape_rfp_webpage(url_or_path)
-            else:
-                scraped_data = await self._parse_rfp_file(url_or_path)
-            
-            # Phase 2: AI Analysis (TO BE IMPLEMENTED)
-            structured_data = await self._ai_analyze_content(scraped_data)
+            scraped_data = await self.fetch(url_or_path)
+            extracted = await self.extract(scraped_data)
+            structured_data = await self.analyze(scraped_data, extracted)
+            confidence_scores = self.score(structured_data)
             
-            # Phase 2: Confidence scoring (TO BE IMPLEMENTED) 
-            confidence_scores = self._calculate_confidence(structured_data)
-            
-            return {
-                "status": "success",
-                "agent": "rfp_reader",
-                "timestamp": datetime.now().isoformat(),
-                "source": url_or_path,
-                "data": structured_data,
-                "confidence": confidence_scores,
-                "raw_scraped": scraped_data  # Include raw data for debugging
-            }
+            return self.build_result(url_or_path, scraped_data, structured_data, confidence_scores)
             
         except Exception as e:
             logger.error(f"❌ RFP analysis failed: {str(e)}")
-            return {
-                "status": "error",
-                "agent": "rfp_reader", 
-                "error": str(e),
-                "timestamp": datetime.now().isoformat()
-            }
+            return self.error_result(url_or_path, e)
+    
+    # Stages: analyze_rfp runs them in sequence, agents/pipeline.py overlaps
+    # them across many sources
+    
+    @span("rfp_fetch")
+    async def fetch(self, url_or_path: str) -> Dict[str, Any]:
+        """Stage 1: scrape the RFP page or parse the uploaded file"""
+        if url_or_path.startswith(('http://', 'https://')):
+            return await self._scrape_rfp_webpage(url_or_path)
+        return await self._parse_rfp_file(url_or_path)
+    
+    @span("rfp_extract")
+    async def extract(self, raw_content: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Stage 2: CPU-bound preparation of the fetched content
+        The rule-based field extractor runs on the extraction pool while the
+        content is split into section chunks in a worker thread
+        
+        Returns:
+            Dict with ``chunks``, ``boilerplate_removed`` and ``rule_fields``
+        """
+        # Dates, amounts, contacts and reference numbers don't need a model
+        rules = asyncio.ensure_future(get_extraction_executor().run(
+            extract_fields,
+            raw_content.get("text_content", {}),
+            raw_content.get("tables", [])
+        ))
+        try:
+            chunked = await asyncio.to_thread(self._chunk, raw_content)
+        except BaseException:
+            rules.cancel()
+            raise
+        chunked["rule_fields"] = (await rules)["fields"]
+        return chunked
+    
+    def _chunk(self, raw_content: Dict[str, Any]) -> Dict[str, Any]:
+        with self._chunk_lock:
+            return chunk_document(
+                raw_content.get("text_content", {}),
+                raw_content.get("tables", []),
+                detector=self._boilerplate_detector(raw_content),
+                document_id=raw_content.get("url") or raw_content.get("file_path")
+            )
+    
+    @span("rfp_analyze")
+    async def analyze(self, raw_content: Dict[str, Any], extracted: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Stage 3: AI-powered content analysis
+        Analyzes only chunks not seen before (concurrently) and merges the
+        per-chunk results with the rule fields
+        """
+        logger.info("🧠 AI analysis starting...")
+        chunks = extracted["chunks"]
+        
+        analyses = {}
+        new_chunks = []
+        for chunk in chunks:
+            cached = self.chunk_memo.get(chunk.id)
+            if cached is not None:
+                analyses[chunk.id] = cached
+            else:
+                new_chunks.append(chunk)
+        
+        semaphore = asyncio.Semaphore(self.chunk_concurrency)
+        
+        async def analyze_one(chunk: Chunk):
+            async with semaphore:
+                return chunk.id, await self._analyze_chunk(chunk)
+        
+        for chunk_id, analysis in await asyncio.gather(*(analyze_one(chunk) for chunk in new_chunks)):
+            self.chunk_memo.put(chunk_id, analysis)
+            analyses[chunk_id] = analysis
+        
+        logger.info(f"🧩 {len(chunks)} chunks ({len(new_chunks)} new, {extracted['boilerplate_removed']} boilerplate blocks dropped)")
+        
+        structured_data = self._merge_chunk_analyses(raw_content, chunks, analyses)
+        self._apply_rule_fields(structured_data, extracted["rule_fields"])
+        if self.llm is not None and structured_data["needs_llm"]:
+            with span("rfp_llm"):
+                await self._llm_fill_fields(structured_data, chunks)
+        structured_data["chunks"] = {
+            "total": len(chunks),
+            "analyzed": len(new_chunks),
+            "reused": len(chunks) - len(new_chunks),
+            "boilerplate_removed": extracted["boilerplate_removed"]
+        }
+        return structured_data
+    
+    @span("rfp_score")
+    def score(self, structured_data: Dict[str, Any]) -> Dict[str, float]:
+        """Stage 4: confidence scoring"""
+        return self._calculate_confidence(structured_data)
+    
+    def build_result(self, source: str, scraped_data: Dict[str, Any], structured_data: Dict[str, Any],
+                     confidence_scores: Dict[str, float]) -> Dict[str, Any]:
+        return {
+            "status": "success",
+            "agent": "rfp_reader",
+            "timestamp": datetime.now().isoformat(),
+            "source": source,
+            "data": structured_data,
+            "confidence": confidence_scores,
+            "raw_scraped": scraped_data  # Include raw data for debugging
+        }
+    
+    def error_result(self, source: str, error: Exception, status: str = "error") -> Dict[str, Any]:
+        return {
+            "status": status,
+            "agent": "rfp_reader",
+            "source": source,
+            "error": str(error) or type(error).__name__,
+            "timestamp": datetime.now().isoformat()
+        }
     
     async def _scrape_rfp_webpage(self, url: str) -> Dict[str, Any]:
         """
@@ -89,7 +238,14 @@ class RFPReaderAgent:
         Leverage the proven web scraper from project-moose
         """
         logger.info("📄 Using Phase 1 web scraper...")
-        scraped_data = await scrape_url(url)
+        scraped_data = await scrape_url(url, pool=self.browser_pool)
+        if scraped_data.get("status") != "success":
+            raise RuntimeError(f"Scrape failed: {scraped_data.get('error') or scraped_data.get('status')}")
+        # The scraper returns error pages as pages; an RFP analysis of one is not a result
+        http_status = (scraped_data.get("fetch") or {}).get("http_status") \
+            or (scraped_data.get("readiness") or {}).get("http_status")
+        if http_status and http_status >= 400:
+            raise RuntimeError(f"HTTP {http_status} from {url}")
         
         # Extract relevant content for RFP analysis
         return {
@@ -106,79 +262,209 @@ class RFPReaderAgent:
     
     async def _parse_rfp_file(self, file_path: str) -> Dict[str, Any]:
         """
-        Phase 2: Parse uploaded RFP files (PDF, DOCX)
-        TO BE IMPLEMENTED with PyMuPDF/pdfplumber
+        Phase 2: Parse uploaded RFP files (PDF, DOCX, HTML)
+        Streams pages through the extraction worker pool and returns the
+        same shape as _scrape_rfp_webpage
         """
         logger.info("📁 Parsing uploaded RFP file...")
-        
-        # TODO Phase 2: Implement PDF parsing
-        # if file_path.endswith('.pdf'):
-        #     return self._parse_pdf(file_path)
-        # elif file_path.endswith('.docx'):
-        #     return self._parse_docx(file_path)
-        
-        return {
-            "source_type": "file",
-            "file_path": file_path,
-            "status": "not_implemented",
-            "note": "PDF parsing will be implemented in Phase 2"
-        }
+        parsed = await ingest_document(file_path)
+        logger.info(f"📑 Parsed {parsed['meta']['pages']} pages, {len(parsed['tables'])} tables")
+        return parsed
+    
+    def _boilerplate_detector(self, raw_content: Dict[str, Any]) -> BoilerplateDetector:
+        """One detector per website so it learns the site's navigation and footers"""
+        if raw_content.get("source_type") != "webpage":
+            # Files only share boilerplate between their own pages
+            return BoilerplateDetector()
+        domain = url_domain(raw_content.get("url", ""))
+        if domain not in self._boilerplate_detectors:
+            self._boilerplate_detectors[domain] = BoilerplateDetector()
+        return self._boilerplate_detectors[domain]
     
     async def _ai_analyze_content(self, raw_content: Dict[str, Any]) -> Dict[str, Any]:
         """
-        Phase 2: AI-powered content analysis with OpenAI
-        TO BE IMPLEMENTED
+        Phase 2: AI-powered content analysis (extract + analyze stages)
         """
-        logger.info("🧠 AI analysis starting...")
+        return await self.analyze(raw_content, await self.extract(raw_content))
+    
+    async def _analyze_chunk(self, chunk: Chunk) -> Dict[str, Any]:
+        """
+        Analyze one chunk with section/sentence heuristics
+        Fields the rules leave weak are asked of the LLM in _llm_fill_fields
+        """
+        sentences = chunk.text.splitlines() if chunk.kind != "section" else SENTENCE_RE.split(chunk.text)
+        sentences = [sentence.strip("- ").strip() for sentence in sentences if sentence.strip("- ").strip()]
         
-        # TODO Phase 2: Implement OpenAI integration
-        # Extract structured data using GPT-4o:
-        # - RFP title and reference number
-        # - Due date and timeline
-        # - Scope of work
-        # - Requirements and specifications
-        # - Eligibility criteria
-        # - Third-party dependencies
-        # - Budget range (if mentioned)
-        # - Contact information
+        analysis = {"topic": chunk.topic, "requirements": [], "eligibility": [], "timeline": []}
+        if chunk.topic == "eligibility":
+            analysis["eligibility"] = sentences
+        elif chunk.topic == "timeline":
+            analysis["timeline"] = sentences
+        else:
+            analysis["requirements"] = [s for s in sentences if REQUIREMENT_RE.search(s)]
+        if chunk.topic == "scope_of_work" and chunk.kind == "section":
+            analysis["scope"] = chunk.text
+        return analysis
+    
+    def _merge_chunk_analyses(self, raw_content: Dict[str, Any], chunks: List[Chunk],
+                              analyses: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """Combine per-chunk results in document order into the structured RFP dict"""
+        merged = {"requirements": [], "eligibility": [], "timeline": []}
+        seen = set()
+        scope_parts = []
+        for chunk in chunks:
+            analysis = analyses[chunk.id]
+            for field in merged:
+                for item in analysis.get(field, []):
+                    if (field, item) not in seen and len(merged[field]) < MAX_LIST_FIELD_ITEMS:
+                        seen.add((field, item))
+                        merged[field].append(item)
+            if analysis.get("scope"):
+                scope_parts.append(analysis["scope"])
         
-        # For now, return basic extracted data from web scraper
-        text_content = raw_content.get("text_content", {})
+        if not scope_parts:
+            # No section is labelled as scope: fall back to the opening prose
+            scope_parts = [chunk.text for chunk in chunks if chunk.kind == "section"][:1]
+        scope = " ".join(scope_parts)
+        if len(scope) > MAX_SCOPE_CHARS:
+            scope = scope[:MAX_SCOPE_CHARS] + "..."
         
         return {
             "title": raw_content.get("title", ""),
-            "due_date": None,  # TODO: Extract with AI
-            "scope_of_work": text_content.get("full_text", "")[:500] + "...",
-            "requirements": [],  # TODO: Extract with AI
-            "eligibility": [],   # TODO: Extract with AI
-            "third_party_needs": [],  # TODO: Identify vendor requirements
-            "contact_info": {},  # TODO: Extract contact details
-            "budget_range": None,  # TODO: Extract if available
-            "timeline": [],      # TODO: Extract key dates
+            "due_date": None,
+            "scope_of_work": scope,
+            "requirements": merged["requirements"],
+            "eligibility": merged["eligibility"],
+            "reference_number": None,
+            "third_party_needs": [],
+            "contact_info": {},
+            "budget_range": None,
+            "timeline": [{"date": None, "time": None, "event": item} for item in merged["timeline"]],
             "status": "basic_extraction",
-            "note": "Full AI analysis will be implemented in Phase 2"
+            "note": "Rule-based fields and chunked heuristic extraction; weak fields go to the LLM client when one is configured"
         }
     
+    def _apply_rule_fields(self, structured_data: Dict[str, Any], fields: Dict[str, Dict[str, Any]]):
+        """
+        Fill the deterministic fields from the rule extractor and record which
+        ones are still weak, so only those are escalated to a model
+        """
+        field_confidence = {}
+        sources = {}
+        for name in RULE_FIELDS:
+            field = fields.get(name, {})
+            value = field.get("value")
+            if name == "timeline" and not value and structured_data["timeline"]:
+                # No dated events found; keep the timeline section sentences
+                field_confidence[name] = 0.3
+                continue
+            if value is not None:
+                structured_data[name] = value
+            field_confidence[name] = field.get("confidence", 0.0)
+            if field.get("location"):
+                sources[name] = field["location"]
+        
+        structured_data["field_confidence"] = field_confidence
+        structured_data["field_sources"] = sources
+        structured_data["needs_llm"] = [
+            name for name, confidence in field_confidence.items()
+            if confidence < RULE_CONFIDENCE_THRESHOLD
+        ]
+    
+    async def _llm_fill_fields(self, structured_data: Dict[str, Any], chunks: List[Chunk]):
+        """
+        Ask the model for the fields still in ``needs_llm``, one request per
+        relevant chunk. Requests are keyed by chunk text and field list, so the
+        response cache makes re-analyzing the same chunk free.
+        """
+        fields_by_chunk: Dict[str, List[str]] = {}
+        chunk_by_id = {}
+        for field in structured_data["needs_llm"]:
+            topics = LLM_FIELD_TOPICS.get(field, ())
+            relevant = [chunk for chunk in chunks if chunk.topic in topics][:LLM_CHUNKS_PER_FIELD]
+            if not relevant:
+                # Nothing labelled for this field: the opening sections usually state it
+                relevant = [chunk for chunk in chunks if chunk.kind == "section"][:1]
+            for chunk in relevant:
+                chunk_by_id[chunk.id] = chunk
+                fields_by_chunk.setdefault(chunk.id, []).append(field)
+        
+        semaphore = asyncio.Semaphore(self.chunk_concurrency)
+        
+        async def ask(chunk_id: str, fields: List[str]):
+            chunk = chunk_by_id[chunk_id]
+            wanted = "\n".join(f"- {field}: {LLM_FIELD_FORMATS[field]}" for field in sorted(fields))
+            prompt = f"Fields:\n{wanted}\n\nExcerpt ({' > '.join(chunk.path) or 'document'}):\n{chunk.text}"
+            async with semaphore:
+                try:
+                    return chunk, await self.llm.complete_json(prompt, system=LLM_SYSTEM_PROMPT)
+                except LLMError as e:
+                    logger.warning(f"⚠️ LLM field extraction failed for chunk {chunk.id[:8]}: {str(e)}")
+                    return chunk, None
+        
+        responses = await asyncio.gather(*(ask(chunk_id, fields) for chunk_id, fields in fields_by_chunk.items()))
+        
+        filled = []
+        for chunk, response in responses:
+            if response is None:
+                continue
+            for field in fields_by_chunk[chunk.id]:
+                value = response["data"].get(field)
+                if value in (None, "", [], {}) or field in filled:
+                    continue
+                structured_data[field] = value
+                structured_data["field_confidence"][field] = LLM_FIELD_CONFIDENCE
+                structured_data["field_sources"][field] = {"source": "llm", "chunk": chunk.id}
+                filled.append(field)
+        
+        structured_data["needs_llm"] = [field for field in structured_data["needs_llm"] if field not in filled]
+        structured_data["llm"] = {
+            "requests": len(responses),
+            "cached": sum(1 for _, response in responses if response and response["cached"]),
+            "filled": filled,
+        }
+        if filled:
+            structured_data["status"] = "ai_assisted_extraction"
+            structured_data["note"] = f"Rule-based fields and chunked heuristic extraction; LLM filled {', '.join(filled)}"
+        logger.info(f"🤖 LLM filled {len(filled)} field(s) with {len(responses)} request(s)")
+    
     def _calculate_confidence(self, structured_data: Dict[str, Any]) -> Dict[str, float]:
         """
         Phase 2: Calculate confidence scores for extracted information
-        TO BE IMPLEMENTED
+        Rule-extracted fields carry their own match confidence; the chunk
+        heuristics are scored by how much they found; LLM-filled fields carry
+        LLM_FIELD_CONFIDENCE
         """
-        # TODO Phase 2: Implement confidence scoring
-        # Based on:
-        # - Text clarity and completeness
-        # - Presence of key fields
-        # - Consistency across document
-        # - AI model confidence scores
+        field_confidence = structured_data.get("field_confidence", {})
+        requirements = structured_data.get("requirements", [])
         
-        return {
-            "overall": 0.7,  # Placeholder
-            "title": 0.9,
-            "due_date": 0.0,
-            "scope": 0.5,
-            "requirements": 0.0,
-            "contact_info": 0.0
+        scores = {
+            "title": 0.9 if structured_data.get("title") else 0.0,
+            "scope": 0.5 if structured_data.get("scope_of_work") else 0.0,
+            "requirements": min(0.9, 0.3 + 0.05 * len(requirements)) if requirements else 0.0,
         }
+        for name in RULE_FIELDS:
+            scores[name] = round(field_confidence.get(name, 0.0), 2)
+        
+        # Overall weighs the fields a bidder needs first
+        weights = {"title": 1, "due_date": 2, "scope": 1, "requirements": 1, "contact_info": 1,
+                   "budget_range": 0.5, "reference_number": 0.5, "timeline": 0.5, "third_party_needs": 0.5}
+        scores["overall"] = round(
+            sum(scores[name] * weight for name, weight in weights.items()) / sum(weights.values()), 2
+        )
+        return scores
+
+# Shared agents, one per API key, so the chunk memo and boilerplate detectors are reused
+_agents: Dict[Optional[str], RFPReaderAgent] = {}
+_agents_lock = threading.Lock()
+
+
+def get_rfp_reader(openai_api_key: Optional[str] = None) -> RFPReaderAgent:
+    """Return the process-wide RFPReaderAgent for this API key (created on first use)"""
+    with _agents_lock:
+        if openai_api_key not in _agents:
+            _agents[openai_api_key] = RFPReaderAgent(openai_api_key)
+        return _agents[openai_api_key]
 
 # Convenience function for external use
 async def analyze_rfp(url_or_path: str, openai_api_key: Optional[str] = None) -> Dict[str, Any]:
@@ -192,8 +478,7 @@ async def analyze_rfp(url_or_path: str, openai_api_key: Optional[str] = None) ->
     Returns:
         Structured RFP analysis results
     """
-    agent = RFPReaderAgent(openai_api_key)
-    return await agent.analyze_rfp(url_or_path)
+    return await get_rfp_reader(openai_api_key).analyze_rfp(url_or_path)
 
 # Example usage for testing
 if __name__ == "__main__":
@@ -202,7 +487,10 @@ if __name__ == "__main__":
         test_url = "https://guest.supplier.systems.state.mn.us/psc/fmssupap/SUPPLIER/ERP/c/SCP_PUBLIC_MENU_FL.SCP_PUB_BID_CMP_FL.GBL"
         
         print("🧪 Testing RFP Reader Agent...")
-        result = await analyze_rfp(test_url)
+        try:
+            result = await analyze_rfp(test_url)
+        finally:
+            await shutdown_browser_pool()
         
         print(f"✅ Status: {result['status']}")
         if result['status'] == 'success':
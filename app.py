@@ -4,25 +4,565 @@ Web Content Scraper - Main Flask Application
 A comprehensive web scraping tool built with Playwright and Flask
 """
 
-from flask import Flask, render_template, request, jsonify, send_from_directory
+from flask import Flask, Response, g, render_template, request, jsonify, send_from_directory
 import asyncio
+import atexit
 import json
 import os
-from datetime import datetime
+import re
+import threading
+import time
+from datetime import date, datetime
 import sys
 
-# Add src directory to path for imports
+# Add src and agents directories to path for imports
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+sys.path.append(os.path.join(os.path.dirname(__file__), 'agents'))
 
-from web_scraper import scrape_url
+from web_scraper import scrape_url, iter_scrape_many, warm_session
+from browser_pool import current_browser_pool, shutdown_browser_pool
+from readiness import READINESS_STRATEGIES
+from resource_policy import ResourcePolicy
+from http_fetch import FETCH_MODES, get_fetch_profiles, get_http_fetcher
+from scrape_cache import get_scrape_cache
+from cpu_pool import get_extraction_executor, shutdown_extraction_executor
+from async_runtime import iterate_sync, run_sync, stop_background_loop
+from jobs import JobQueue, JobStore, QueueFull
+from crawler import Crawler
+from serialization import OutputOptions, choose_encoding, compress_stream, encode_stream
+from storage import RFP_ORDERINGS, RFP_STATUSES, get_result_store, get_screenshot_store
+from table_engine import TableIndex
+from url_utils import normalize_url
+from metrics import REGISTRY, collect_timings, get_profiler, untimed
+from screenshots import ScreenshotOptions, get_screenshot_pipeline
+from session_cache import get_session_cache
+from cluster import current_coordinator, get_coordinator
+from pipeline import RFPPipeline
+from page_watcher import PageWatcher
 
 # Initialize Flask app
 app = Flask(__name__, 
            template_folder='templates',
            static_folder='static')
 
-# Configure upload folder for screenshots
-app.config['SCREENSHOT_FOLDER'] = os.path.join(os.path.dirname(__file__), 'screenshots')
+# Screenshots are served straight from the content-addressed store
+app.config['SCREENSHOT_FOLDER'] = get_screenshot_store().root
+
+# Limits for /api/scrape/batch
+MAX_BATCH_URLS = int(os.environ.get('SCRAPER_MAX_BATCH_URLS', '1000'))
+MAX_BATCH_CONCURRENCY = int(os.environ.get('SCRAPER_MAX_BATCH_CONCURRENCY', '16'))
+
+# Background job queue for /api/jobs
+JOB_WORKERS = int(os.environ.get('SCRAPER_JOB_WORKERS', '4'))
+JOB_MAX_DEPTH = int(os.environ.get('SCRAPER_JOB_MAX_DEPTH', '100'))
+JOB_RETRY_AFTER = int(os.environ.get('SCRAPER_JOB_RETRY_AFTER', '5'))
+JOBS_DB = os.environ.get('SCRAPER_JOBS_DB')
+
+# Limits and state for crawl jobs
+MAX_CRAWL_PAGES = int(os.environ.get('SCRAPER_MAX_CRAWL_PAGES', '2000'))
+MAX_CRAWL_DEPTH = int(os.environ.get('SCRAPER_MAX_CRAWL_DEPTH', '5'))
+CRAWL_DIR = os.environ.get('SCRAPER_CRAWL_DIR', os.path.join('.cache', 'crawls'))
+
+# Results are written to the store in batches of this many pages
+STORE_FLUSH_EVERY = 50
+MAX_QUERY_LIMIT = 1000
+
+# RFP analysis jobs
+MAX_ANALYZE_SOURCES = int(os.environ.get('SCRAPER_MAX_ANALYZE_SOURCES', '500'))
+ANALYZE_ITEM_TIMEOUT = float(os.environ.get('SCRAPER_ANALYZE_ITEM_TIMEOUT', '600'))
+
+# Cross-table queries (one cached index per domain filter)
+MAX_TABLE_INDEXES = 32
+
+# Longest a request waits for a screenshot that is still being encoded
+SCREENSHOT_WAIT = float(os.environ.get('SCRAPER_SCREENSHOT_WAIT', '30'))
+
+# Watched pages (change detection)
+WATCH_ENABLED = os.environ.get('SCRAPER_WATCH', '1') != '0'
+DEFAULT_WATCH_INTERVAL = float(os.environ.get('SCRAPER_WATCH_INTERVAL', '3600'))
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+_page_watcher = None
+_page_watcher_lock = threading.Lock()
+_table_indexes = {}
+_table_indexes_lock = threading.Lock()
+_sessions_prewarming = False
+_sessions_lock = threading.Lock()
+
+async def _shutdown_async():
+    if _job_queue is not None:
+        await _job_queue.stop()
+    if _page_watcher is not None:
+        await _page_watcher.stop()
+    if _sessions_prewarming:
+        await get_session_cache().stop()
+    await get_screenshot_pipeline().drain()
+    await get_http_fetcher().close()
+    await shutdown_browser_pool()
+
+def shutdown_services():
+    """Stop the job queue, close the browser pool (and its event loop), drain the cluster workers and stop the extraction workers"""
+    stop_background_loop(_shutdown_async())
+    if current_coordinator() is not None:
+        current_coordinator().close()
+    shutdown_extraction_executor()
+
+atexit.register(shutdown_services)
+
+# Metrics: API request counts/latency, per-request stage timings (Server-Timing
+# header, ``timings`` block on request) and opt-in slow-request profiles
+HTTP_REQUESTS = REGISTRY.counter('scraper_http_requests_total', 'API requests by endpoint, method and status')
+HTTP_SECONDS = REGISTRY.histogram('scraper_http_request_duration_seconds', 'API request latency by endpoint')
+UNPROFILED_ENDPOINTS = ('metrics', 'metric_profiles', 'static', 'health_check', 'get_screenshot', 'screenshot_status')
+
+def _browser_stat(key):
+    pool = current_browser_pool()
+    return pool.stats()[key] if pool is not None and pool.started else None
+
+def _labelled(counters, label):
+    return [({label: name}, value) for name, value in counters.items()] if counters else None
+
+def register_metrics():
+    """Expose the components' own counters and gauges on /metrics"""
+    extraction = lambda: get_extraction_executor().stats()
+    REGISTRY.collected('scraper_extraction_in_flight', 'Extraction tasks queued or running',
+                       lambda: extraction()['in_flight'])
+    REGISTRY.collected('scraper_extraction_tasks_total', 'Finished extraction tasks by outcome',
+                       lambda: [({'outcome': 'completed'}, extraction()['completed']),
+                                ({'outcome': 'failed'}, extraction()['failed'])], kind='counter')
+    REGISTRY.collected('scraper_extraction_queued_seconds_total', 'Time extraction tasks waited for a worker',
+                       lambda: extraction()['total_queued_ms'] / 1000, kind='counter')
+    REGISTRY.collected('scraper_browser_contexts_active', 'Browser contexts leased to scrapers',
+                       lambda: _browser_stat('active_contexts'))
+    REGISTRY.collected('scraper_browser_waiting', 'Scrapers waiting for a browser context',
+                       lambda: _browser_stat('waiting'))
+    REGISTRY.collected('scraper_browser_launches_total', 'Browser launches (including restarts)',
+                       lambda: sum(slot['launches'] for slot in _browser_stat('browsers') or []), kind='counter')
+    REGISTRY.collected('scraper_cache_lookups_total', 'Scrape cache lookups by result',
+                       lambda: _labelled(get_scrape_cache().counters if get_scrape_cache() else None, 'result'),
+                       kind='counter')
+    REGISTRY.collected('scraper_http_fetch_total', 'Plain HTTP page fetches (requests, errors, bytes)',
+                       lambda: _labelled(get_http_fetcher().counters, 'counter'), kind='counter')
+    REGISTRY.collected('scraper_jobs_queue_depth', 'Jobs waiting to run',
+                       lambda: _job_queue.stats()['depth'] if _job_queue else None)
+    REGISTRY.collected('scraper_jobs_running', 'Jobs running',
+                       lambda: _job_queue.stats()['running'] if _job_queue else None)
+    REGISTRY.collected('scraper_screenshots_total', 'Screenshot pipeline events (encoded, deduplicated, evicted, ...)',
+                       lambda: _labelled(get_screenshot_pipeline().counters, 'event'), kind='counter')
+    REGISTRY.collected('scraper_screenshots_pending', 'Screenshots waiting to be encoded',
+                       lambda: get_screenshot_pipeline().pending)
+    REGISTRY.collected('scraper_sessions_total', 'Browser session cache events (hit, miss, recipe_runs, ...)',
+                       lambda: _labelled(get_session_cache().counters if get_session_cache() else None, 'event'),
+                       kind='counter')
+    cluster = lambda: current_coordinator().stats() if current_coordinator() else None
+    REGISTRY.collected('scraper_cluster_workers', 'Cluster worker processes by state',
+                       lambda: _labelled(cluster()['states'] if cluster() else None, 'state'))
+    REGISTRY.collected('scraper_cluster_requests_in_flight', 'Requests running or waiting on each cluster worker',
+                       lambda: [({'worker': str(worker['id'])}, worker['requests'])
+                                for worker in cluster()['per_worker']] if cluster() else None)
+    REGISTRY.collected('scraper_cluster_events_total', 'Cluster events (completed, failed, retried, crashes, restarts, ...)',
+                       lambda: _labelled(current_coordinator().counters if current_coordinator() else None, 'event'),
+                       kind='counter')
+    REGISTRY.collected('scraper_store_rows', 'Stored rows by table (recounted at most once a minute)',
+                       lambda: _labelled(get_result_store().row_counts() if get_result_store() else None, 'table'))
+    REGISTRY.collected('scraper_watch_checks_total', 'Watched page checks by outcome',
+                       lambda: _labelled(_page_watcher.counters if _page_watcher else None, 'outcome'),
+                       kind='counter')
+
+register_metrics()
+
+@app.before_request
+def start_request_metrics():
+    g.request_started = time.perf_counter()
+    g.timings_scope = collect_timings()
+    g.timings = g.timings_scope.__enter__()
+    profiler = get_profiler()
+    if profiler is not None and request.endpoint not in UNPROFILED_ENDPOINTS:
+        g.profile_scope = profiler.profile(f'{request.method} {request.path}')
+        g.profile_scope.__enter__()
+
+@app.after_request
+def finish_request_metrics(response):
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    HTTP_REQUESTS.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+    if 'request_started' in g:
+        HTTP_SECONDS.observe(time.perf_counter() - g.request_started, endpoint=endpoint)
+    timings = g.get('timings')
+    if timings is not None and timings.stages:
+        response.headers['Server-Timing'] = timings.server_timing()
+    return response
+
+@app.teardown_request
+def close_request_metrics(error=None):
+    for name in ('profile_scope', 'timings_scope'):
+        scope = g.pop(name, None)
+        if scope is not None:
+            scope.__exit__(None, None, None)
+
+def wants_timings(data):
+    """True if the request asked for a ``timings`` block (JSON body or query string)"""
+    value = (data or {}).get('timings', request.args.get('timings'))
+    return value is True or str(value).lower() in ('1', 'true', 'yes')
+
+def with_timings(payload, data):
+    """``payload`` plus this request's stage timings when they were asked for"""
+    if not wants_timings(data) or 'timings' not in g:
+        return payload
+    return {**payload, 'timings': g.timings.as_dict()}
+
+def normalize_request_url(url):
+    """Add https:// if no protocol was given, rejecting malformed and host-less URLs with a ValueError"""
+    if not url.startswith(('http://', 'https://')):
+        url = f'https://{url}'
+    normalize_url(url)
+    return url
+
+def publish_screenshot(result):
+    """Rewrite a result's screenshot path to its URL under /screenshots/"""
+    screenshot = result.get('screenshot')
+    if screenshot and os.path.exists(screenshot):
+        if not get_screenshot_store().contains(screenshot):
+            # Not from the store (e.g. an old cached result): hash it in
+            with open(screenshot, 'rb') as f:
+                stored = get_screenshot_store().put(f.read())
+            result['screenshot_hash'] = stored['hash']
+            screenshot = stored['path']
+        result['screenshot'] = f'/screenshots/{os.path.basename(screenshot)}'
+    return result
+
+def store_results(results):
+    """Publish screenshots and save successful pages to the result store"""
+    for result in results:
+        publish_screenshot(result)
+    store = get_result_store()
+    if store is not None:
+        try:
+            store.save_pages(results)
+        except Exception as e:
+            # Storage is a side effect; never fail the scrape over it
+            app.logger.warning(f"Could not store results: {e}")
+    return results
+
+def scrape_options_from_request(data):
+    """Validate per-request scrape options shared by the scrape endpoints"""
+    options = {}
+    
+    readiness = data.get('readiness', 'auto')
+    if readiness not in READINESS_STRATEGIES:
+        raise ValueError(f"readiness must be one of: {', '.join(READINESS_STRATEGIES)}")
+    options['readiness'] = readiness
+    
+    wait_selector = data.get('wait_selector')
+    if wait_selector:
+        options['wait_selector'] = str(wait_selector)
+    elif readiness == 'selector_present':
+        raise ValueError('wait_selector is required for selector_present readiness')
+    
+    allow_domains = data.get('allow_domains') or []
+    deny_domains = data.get('deny_domains') or []
+    if not isinstance(allow_domains, list) or not isinstance(deny_domains, list):
+        raise ValueError('allow_domains and deny_domains must be lists')
+    options['resource_policy'] = ResourcePolicy.from_preset(
+        data.get('resource_policy'),
+        allow_domains=[str(d) for d in allow_domains],
+        deny_domains=[str(d) for d in deny_domains]
+    )
+    
+    if data.get('max_age') is not None:
+        try:
+            options['max_age'] = float(data['max_age'])
+        except (TypeError, ValueError):
+            raise ValueError('max_age must be a number of seconds')
+        if options['max_age'] < 0:
+            raise ValueError('max_age must not be negative')
+    options['force_refresh'] = bool(data.get('force_refresh', False))
+    
+    fetch_mode = data.get('fetch_mode')
+    if fetch_mode is not None:
+        if fetch_mode not in FETCH_MODES:
+            raise ValueError(f"fetch_mode must be one of: {', '.join(FETCH_MODES)}")
+        options['fetch_mode'] = fetch_mode
+    options['screenshot'] = ScreenshotOptions.parse(data.get('screenshot', False))
+    
+    return options
+
+def output_options_from_request(data):
+    """Validate how a result should be shaped and encoded (fields, paging, table and output format)"""
+    fields = data.get('fields')
+    if isinstance(fields, str):
+        fields = [f.strip() for f in fields.split(',') if f.strip()]
+    elif fields is not None and not isinstance(fields, list):
+        raise ValueError('fields must be a list or a comma-separated string')
+    paging = {}
+    try:
+        for name in ('limit', 'offset', 'row_limit', 'row_offset'):
+            if data.get(name) is not None:
+                paging[name] = int(data[name])
+    except (TypeError, ValueError):
+        raise ValueError('limit, offset, row_limit and row_offset must be integers')
+    return OutputOptions(
+        fields=fields,
+        table_format=data.get('table_format', 'rows'),
+        output_format=data.get('format', 'json'),
+        **paging
+    )
+
+def encoded_response(results, output, single=True):
+    """Stream results in the requested shape, compressed if the client accepts it"""
+    encoding = choose_encoding(request.headers.get('Accept-Encoding'))
+    # Batch lines are flushed one by one so clients see each result as it finishes
+    chunks = compress_stream(encode_stream(results, output, single=single), encoding, flush_each=not single)
+    response = Response(chunks, mimetype=output.mimetype if single else 'application/x-ndjson')
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+def batch_params_from_request(data):
+    """Validate the URL list and concurrency settings of a batch request"""
+    urls = data.get('urls')
+    if not isinstance(urls, list):
+        raise ValueError('urls must be a non-empty list')
+    urls = [u.strip() for u in urls if isinstance(u, str) and u.strip()]
+    if not urls:
+        raise ValueError('urls must be a non-empty list')
+    if len(urls) > MAX_BATCH_URLS:
+        raise ValueError(f'At most {MAX_BATCH_URLS} URLs per batch')
+    
+    try:
+        concurrency = min(int(data.get('concurrency', 4)), MAX_BATCH_CONCURRENCY)
+        per_host_limit = int(data.get('per_host_limit', 2))
+        if concurrency < 1 or per_host_limit < 1:
+            raise ValueError
+    except (TypeError, ValueError):
+        raise ValueError('concurrency and per_host_limit must be positive integers')
+    
+    return [normalize_request_url(u) for u in urls], concurrency, per_host_limit
+
+async def run_scrape_job(job, report):
+    """Job handler: scrape a single page"""
+    url = normalize_request_url(job.payload['url'])
+    options = scrape_options_from_request(job.payload)
+    report({'url': url, 'stage': 'scraping'})
+    cluster = get_coordinator()
+    if cluster is not None:
+        result = await cluster.acall('scrape', url, options)
+    else:
+        result = await scrape_url(url, **options)
+    # SQLite writes and screenshot hashing stay off the loop that drives the browsers
+    return (await asyncio.to_thread(store_results, [result]))[0]
+
+async def run_batch_job(job, report):
+    """Job handler: scrape many pages, reporting each one as it finishes"""
+    urls, concurrency, per_host_limit = batch_params_from_request(job.payload)
+    options = scrape_options_from_request(job.payload)
+    results = [None] * len(urls)
+    completed = 0
+    cluster = get_coordinator()
+    if cluster is not None:
+        scraped = cluster.submit('scrape', urls, options, loop=asyncio.get_running_loop(),
+                                 concurrency=concurrency, per_host_limit=per_host_limit)
+    else:
+        scraped = iter_scrape_many(urls, concurrency=concurrency, per_host_limit=per_host_limit, **options)
+    async for result in scraped:
+        await asyncio.to_thread(publish_screenshot, result)
+        results[result['index']] = result
+        completed += 1
+        report({
+            'completed': completed,
+            'total': len(urls),
+            'url': result.get('url'),
+            'page_status': result.get('status')
+        })
+    await asyncio.to_thread(store_results, results)
+    return {'status': 'success', 'results': results}
+
+def crawl_params_from_request(data):
+    """Validate the seeds and limits of a crawl request"""
+    seeds = data.get('seeds')
+    if not isinstance(seeds, list):
+        raise ValueError('seeds must be a non-empty list')
+    seeds = [u.strip() for u in seeds if isinstance(u, str) and u.strip()]
+    if not seeds:
+        raise ValueError('seeds must be a non-empty list')
+    
+    allowed_domains = data.get('allowed_domains')
+    if allowed_domains is not None and not isinstance(allowed_domains, list):
+        raise ValueError('allowed_domains must be a list')
+    
+    try:
+        params = {
+            'max_depth': min(int(data.get('max_depth', 2)), MAX_CRAWL_DEPTH),
+            'max_pages': min(int(data.get('max_pages', 200)), MAX_CRAWL_PAGES),
+            'concurrency': min(int(data.get('concurrency', 4)), MAX_BATCH_CONCURRENCY),
+            'per_host_delay': float(data.get('per_host_delay', 1.0)),
+        }
+    except (TypeError, ValueError):
+        raise ValueError('max_depth, max_pages, concurrency and per_host_delay must be numbers')
+    if params['max_depth'] < 0 or params['max_pages'] < 1 or params['concurrency'] < 1 or params['per_host_delay'] < 0:
+        raise ValueError('crawl limits must be positive')
+    
+    params['seeds'] = [normalize_request_url(u) for u in seeds]
+    if allowed_domains:
+        params['allowed_domains'] = [str(d) for d in allowed_domains]
+    params['respect_robots'] = bool(data.get('respect_robots', True))
+    return params
+
+async def run_crawl_job(job, report):
+    """Job handler: crawl a portal, skipping pages unchanged since the last crawl"""
+    params = crawl_params_from_request(job.payload)
+    options = scrape_options_from_request(job.payload)
+    crawler = Crawler(
+        params.pop('seeds'),
+        # Keyed by job id so a re-queued job resumes where it stopped
+        checkpoint_path=os.path.join(CRAWL_DIR, f'{job.id}.json'),
+        state_path=os.path.join(CRAWL_DIR, 'crawl_state.sqlite'),
+        **params,
+        **options
+    )
+    pages = []
+    unsaved = []
+    async for result in crawler.crawl():
+        unsaved.append(result)
+        if len(unsaved) >= STORE_FLUSH_EVERY:
+            await asyncio.to_thread(store_results, unsaved)
+            unsaved = []
+        pages.append({
+            'url': result.get('url'),
+            'title': result.get('title'),
+            'status': result.get('status'),
+            'depth': result['crawl']['depth']
+        })
+        report({'url': result.get('url'), 'page_status': result.get('status'), **crawler.stats()})
+    await asyncio.to_thread(store_results, unsaved)
+    return {
+        'status': 'success',
+        'pages': pages,
+        'documents': list(crawler.documents.values()),
+        'stats': crawler.stats()
+    }
+
+def analyze_params_from_request(data):
+    """Validate the RFP URLs of an analysis request"""
+    sources = data.get('sources')
+    if not isinstance(sources, list):
+        raise ValueError('sources must be a non-empty list')
+    sources = [u.strip() for u in sources if isinstance(u, str) and u.strip()]
+    if not sources:
+        raise ValueError('sources must be a non-empty list')
+    if len(sources) > MAX_ANALYZE_SOURCES:
+        raise ValueError(f'At most {MAX_ANALYZE_SOURCES} sources per job')
+    # Only URLs: file paths would let clients read arbitrary files on the server
+    return [normalize_request_url(u) for u in sources]
+
+async def run_analyze_job(job, report):
+    """Job handler: analyze RFP pages through the stage pipeline and store the extracted fields"""
+    sources = analyze_params_from_request(job.payload)
+    cluster = get_coordinator()
+    if cluster is not None:
+        # Each worker runs its share of the sources through its own pipeline
+        pipeline = cluster.submit('analyze', sources, loop=asyncio.get_running_loop(),
+                                  item_timeout=ANALYZE_ITEM_TIMEOUT)
+        analyzed = pipeline
+    else:
+        pipeline = RFPPipeline(item_timeout=ANALYZE_ITEM_TIMEOUT)
+        analyzed = pipeline.run(sources)
+    store = get_result_store()
+    rfps = []
+    async for result in analyzed:
+        if store is not None:
+            await asyncio.to_thread(store.save_rfp, result)
+        data = result.get('data', {})
+        rfps.append({
+            'source': result['source'],
+            'status': result['status'],
+            'title': data.get('title'),
+            'due_date': data.get('due_date'),
+            'error': result.get('error')
+        })
+        report({
+            'completed': len(rfps),
+            'total': len(sources),
+            'source': result['source'],
+            'rfp_status': result['status']
+        })
+    return {'status': 'success', 'rfps': rfps, 'stats': pipeline.stats()}
+
+JOB_HANDLERS = {
+    'scrape': run_scrape_job,
+    'scrape_batch': run_batch_job,
+    'crawl': run_crawl_job,
+    'analyze_rfps': run_analyze_job,
+}
+
+def validate_job_payload(kind, payload):
+    """Reject bad job submissions up front instead of failing in the worker"""
+    if kind == 'scrape':
+        url = payload.get('url')
+        if not isinstance(url, str) or not url.strip():
+            raise ValueError('URL is required')
+        normalize_request_url(url.strip())
+    elif kind == 'scrape_batch':
+        batch_params_from_request(payload)
+    elif kind == 'crawl':
+        crawl_params_from_request(payload)
+    elif kind == 'analyze_rfps':
+        analyze_params_from_request(payload)
+        return
+    else:
+        raise ValueError(f"kind must be one of: {', '.join(JOB_HANDLERS)}")
+    scrape_options_from_request(payload)
+
+def get_job_queue():
+    """Start the job queue on the shared background loop on first use"""
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            queue = JobQueue(
+                JOB_HANDLERS,
+                workers=JOB_WORKERS,
+                max_depth=JOB_MAX_DEPTH,
+                store=JobStore(JOBS_DB) if JOBS_DB else None
+            )
+            with untimed():
+                run_sync(queue.start())
+            _job_queue = queue
+        return _job_queue
+
+def get_page_watcher():
+    """Start checking watched pages on the shared background loop on first use (None if disabled)"""
+    global _page_watcher
+    if not WATCH_ENABLED:
+        return None
+    with _page_watcher_lock:
+        if _page_watcher is None:
+            watcher = PageWatcher.from_env()
+
+            async def start():
+                watcher.start()
+
+            with untimed():
+                run_sync(start())
+            _page_watcher = watcher
+        return _page_watcher
+
+def get_sessions():
+    """Session cache, refreshing recipe sessions on the shared background loop from first use (None if disabled)"""
+    global _sessions_prewarming
+    sessions = get_session_cache()
+    if sessions is None:
+        return None
+    with _sessions_lock:
+        # With a cluster each worker prewarms the domains it is home to
+        if not _sessions_prewarming and get_coordinator() is None:
+            async def start():
+                sessions.start(warm_session)
+
+            with untimed():
+                run_sync(start())
+            _sessions_prewarming = True
+    return sessions
 
 @app.route('/')
 def index():
@@ -42,21 +582,26 @@ def scrape_page():
                 'error': 'URL is required'
             }), 400
         
-        # Add https:// if no protocol
-        if not url.startswith(('http://', 'https://')):
-            url = f'https://{url}'
+        try:
+            url = normalize_request_url(url)
+            options = scrape_options_from_request(data)
+            output = output_options_from_request(data)
+        except ValueError as e:
+            return jsonify({
+                'status': 'error',
+                'error': str(e)
+            }), 400
         
-        # Run the async scraper
-        result = asyncio.run(scrape_url(url))
+        cluster = get_coordinator()
+        if cluster is not None:
+            result = cluster.call('scrape', url, options)
+        else:
+            # Run the async scraper on the shared loop that owns the browser pool
+            result = run_sync(scrape_url(url, **options))
         
-        # Move screenshot to proper folder if it exists
-        if result.get('screenshot') and os.path.exists(result['screenshot']):
-            screenshot_name = f"screenshot_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
-            new_path = os.path.join(app.config['SCREENSHOT_FOLDER'], screenshot_name)
-            os.rename(result['screenshot'], new_path)
-            result['screenshot'] = f'/screenshots/{screenshot_name}'
+        store_results([result])
         
-        return jsonify(result)
+        return encoded_response([with_timings(result, data)], output)
         
     except Exception as e:
         return jsonify({
@@ -64,18 +609,657 @@ def scrape_page():
             'error': str(e)
         }), 500
 
+@app.route('/api/scrape/batch', methods=['POST'])
+def scrape_batch():
+    """API endpoint to scrape many pages, streaming NDJSON as each finishes"""
+    data = request.get_json(silent=True) or {}
+    
+    try:
+        urls, concurrency, per_host_limit = batch_params_from_request(data)
+        options = scrape_options_from_request(data)
+        output = output_options_from_request(data)
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'error': str(e)
+        }), 400
+    
+    def generate():
+        cluster = get_coordinator()
+        if cluster is not None:
+            results = cluster.submit('scrape', urls, options, concurrency=concurrency, per_host_limit=per_host_limit)
+        else:
+            results = iterate_sync(iter_scrape_many(urls, concurrency=concurrency, per_host_limit=per_host_limit, **options))
+        unsaved = []
+        try:
+            for result in results:
+                publish_screenshot(result)
+                unsaved.append(result)
+                if len(unsaved) >= STORE_FLUSH_EVERY:
+                    store_results(unsaved)
+                    unsaved = []
+                yield result
+        except Exception as e:
+            yield {'status': 'error', 'error': str(e)}
+        finally:
+            store_results(unsaved)
+    
+    return encoded_response(generate(), output, single=False)
+
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    """Queue a scrape job and return immediately with its id"""
+    data = request.get_json(silent=True) or {}
+    kind = data.get('kind', 'scrape')
+    payload = data.get('payload', {})
+    if not isinstance(payload, dict):
+        return jsonify({
+            'status': 'error',
+            'error': 'payload must be an object'
+        }), 400
+    
+    try:
+        priority = int(data.get('priority', 0))
+    except (TypeError, ValueError):
+        return jsonify({
+            'status': 'error',
+            'error': 'priority must be an integer'
+        }), 400
+    
+    try:
+        validate_job_payload(kind, payload)
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'error': str(e)
+        }), 400
+    
+    try:
+        job = get_job_queue().submit(kind, payload, priority=priority)
+    except QueueFull as e:
+        response = jsonify({
+            'status': 'error',
+            'error': str(e)
+        })
+        response.headers['Retry-After'] = str(JOB_RETRY_AFTER)
+        return response, 429
+    
+    return jsonify({
+        'job_id': job.id,
+        'status': job.status,
+        'links': {
+            'self': f'/api/jobs/{job.id}',
+            'events': f'/api/jobs/{job.id}/events'
+        }
+    }), 202
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Job status, latest progress and (once finished) its result"""
+    job = get_job_queue().get(job_id)
+    if job is None:
+        return jsonify({
+            'status': 'error',
+            'error': 'Job not found'
+        }), 404
+    return jsonify(job.to_dict())
+
+@app.route('/api/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """Cancel a queued or running job"""
+    queue = get_job_queue()
+    job = queue.get(job_id)
+    if job is None:
+        return jsonify({
+            'status': 'error',
+            'error': 'Job not found'
+        }), 404
+    if not queue.cancel(job_id):
+        return jsonify({
+            'status': 'error',
+            'error': f'Job already {job.status}'
+        }), 409
+    return jsonify(job.to_dict(include_result=False))
+
+@app.route('/api/jobs/<job_id>/events')
+def job_events(job_id):
+    """Stream a job's progress as server-sent events"""
+    queue = get_job_queue()
+    if queue.get(job_id) is None:
+        return jsonify({
+            'status': 'error',
+            'error': 'Job not found'
+        }), 404
+    
+    # Resume after the last event a reconnecting client saw
+    last_seen = request.headers.get('Last-Event-ID', request.args.get('since', -1))
+    try:
+        since = int(last_seen) + 1
+    except (TypeError, ValueError):
+        since = 0
+    
+    def generate():
+        for event in queue.events(job_id, since=max(0, since)):
+            if event is None:
+                yield ': keepalive\n\n'
+                continue
+            yield f"id: {event['seq']}\nevent: {event['event']}\ndata: {json.dumps(event, default=str)}\n\n"
+    
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+def paging_from_request(args):
+    """Validate limit/offset query parameters"""
+    try:
+        limit = min(int(args.get('limit', 100)), MAX_QUERY_LIMIT)
+        offset = int(args.get('offset', 0))
+    except (TypeError, ValueError):
+        raise ValueError('limit and offset must be integers')
+    if limit < 1 or offset < 0:
+        raise ValueError('limit must be positive and offset not negative')
+    return limit, offset
+
+def rfp_query_from_request(args):
+    """Validate /api/rfps query parameters"""
+    query = {}
+    query['limit'], query['offset'] = paging_from_request(args)
+    query['status'] = args.get('status', 'open')
+    if query['status'] not in RFP_STATUSES:
+        raise ValueError(f"status must be one of: {', '.join(RFP_STATUSES)}")
+    query['order'] = args.get('order', 'due_date')
+    if query['order'] not in RFP_ORDERINGS:
+        raise ValueError(f"order must be one of: {', '.join(RFP_ORDERINGS)}")
+    try:
+        if args.get('due_within') is not None:
+            query['due_within'] = int(args['due_within'])
+        if args.get('min_confidence') is not None:
+            query['min_confidence'] = float(args['min_confidence'])
+    except ValueError:
+        raise ValueError('due_within must be an integer and min_confidence a number')
+    query['domain'] = args.get('domain')
+    query['search'] = args.get('q')
+    return query
+
+def store_or_503():
+    store = get_result_store()
+    if store is None:
+        return None, (jsonify({
+            'status': 'error',
+            'error': 'Result storage is disabled'
+        }), 503)
+    return store, None
+
+@app.route('/api/rfps')
+def list_rfps():
+    """Stored RFPs, e.g. /api/rfps?due_within=14 for open RFPs due in the next two weeks"""
+    store, error = store_or_503()
+    if error:
+        return error
+    try:
+        query = rfp_query_from_request(request.args)
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'error': str(e)
+        }), 400
+    return jsonify(store.query_rfps(**query))
+
+@app.route('/api/rfps/<int:rfp_id>')
+def get_rfp(rfp_id):
+    """Full stored analysis of one RFP"""
+    store, error = store_or_503()
+    if error:
+        return error
+    rfp = store.get_rfp(rfp_id)
+    if rfp is None:
+        return jsonify({
+            'status': 'error',
+            'error': 'RFP not found'
+        }), 404
+    return jsonify(rfp)
+
+@app.route('/api/pages')
+def list_pages():
+    """Stored page summaries (by domain / fetch time), or the full latest snapshot with ?url="""
+    store, error = store_or_503()
+    if error:
+        return error
+    
+    if request.args.get('url'):
+        try:
+            url = normalize_request_url(request.args['url'])
+            # limit/offset page the snapshot's collections here, not the page list
+            output = output_options_from_request(request.args)
+        except ValueError as e:
+            return jsonify({
+                'status': 'error',
+                'error': str(e)
+            }), 400
+        page = store.get_page(url)
+        if page is None:
+            return jsonify({
+                'status': 'error',
+                'error': 'Page not stored'
+            }), 404
+        return encoded_response([page], output)
+    
+    try:
+        limit, offset = paging_from_request(request.args)
+        try:
+            since = float(request.args['since']) if request.args.get('since') else None
+        except ValueError:
+            raise ValueError('since must be a Unix timestamp')
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'error': str(e)
+        }), 400
+    return jsonify(store.query_pages(
+        domain=request.args.get('domain'),
+        since=since,
+        content_hash=request.args.get('content_hash'),
+        limit=limit,
+        offset=offset
+    ))
+
+def table_query_from_request(args):
+    """Validate /api/tables query parameters"""
+    query = {'header': args.get('header'), 'kind': args.get('type')}
+    query['limit'], _ = paging_from_request(args)
+    if query['kind'] not in (None, 'date', 'money', 'number'):
+        raise ValueError('type must be one of: date, money, number')
+    if query['header']:
+        try:
+            re.compile(query['header'])
+        except re.error:
+            raise ValueError('header must be a valid regular expression')
+    for key in ('after', 'before'):
+        value = args.get(key)
+        if value is None:
+            continue
+        try:
+            query[key] = date.today() if value == 'today' else date.fromisoformat(value)
+        except ValueError:
+            raise ValueError(f'{key} must be an ISO date (YYYY-MM-DD) or "today"')
+    try:
+        for key, name in (('min', 'min_value'), ('max', 'max_value')):
+            if args.get(key) is not None:
+                query[name] = float(args[key])
+    except ValueError:
+        raise ValueError('min and max must be numbers')
+    return query
+
+def table_index(store, domain=None):
+    """Typed-cell index over stored tables, rebuilt only when they change"""
+    version = store.tables_version()
+    with _table_indexes_lock:
+        cached = _table_indexes.get(domain)
+        if cached and cached[0] == version:
+            return cached[1]
+        index = TableIndex()
+        for url, tables in store.iter_tables(domain):
+            index.add(url, tables)
+        if len(_table_indexes) >= MAX_TABLE_INDEXES:
+            _table_indexes.clear()
+        _table_indexes[domain] = (version, index)
+        return index
+
+@app.route('/api/tables')
+def query_tables():
+    """Rows of stored tables by typed cell, e.g. /api/tables?header=due&after=today"""
+    store, error = store_or_503()
+    if error:
+        return error
+    try:
+        query = table_query_from_request(request.args)
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'error': str(e)
+        }), 400
+    index = table_index(store, request.args.get('domain'))
+    rows = index.query(**query)
+    return jsonify({
+        'rows': rows,
+        'count': len(rows),
+        'index': index.stats()
+    })
+
+def watcher_or_503():
+    watcher = get_page_watcher()
+    if watcher is None:
+        return None, (jsonify({
+            'status': 'error',
+            'error': 'Page watching is disabled'
+        }), 503)
+    return watcher, None
+
+def watch_not_found():
+    return jsonify({
+        'status': 'error',
+        'error': 'Watch not found'
+    }), 404
+
+@app.route('/api/watches', methods=['POST'])
+def add_watch():
+    """Watch a URL for changes, e.g. {"url": ..., "interval": 3600}"""
+    watcher, error = watcher_or_503()
+    if error:
+        return error
+    data = request.get_json(silent=True) or {}
+    url = data.get('url', '').strip()
+    try:
+        if not url:
+            raise ValueError('URL is required')
+        try:
+            interval = float(data.get('interval', DEFAULT_WATCH_INTERVAL))
+        except (TypeError, ValueError):
+            raise ValueError('interval must be a number of seconds')
+        watch = watcher.add(normalize_request_url(url), interval)
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'error': str(e)
+        }), 400
+    return jsonify(watch), 201
+
+@app.route('/api/watches')
+def list_watches():
+    """Watched URLs with their check counters"""
+    watcher, error = watcher_or_503()
+    if error:
+        return error
+    try:
+        limit, offset = paging_from_request(request.args)
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'error': str(e)
+        }), 400
+    return jsonify(watcher.store.list(limit=limit, offset=offset))
+
+@app.route('/api/watches/<int:watch_id>', methods=['GET'])
+def get_watch(watch_id):
+    """One watch"""
+    watcher, error = watcher_or_503()
+    if error:
+        return error
+    watch = watcher.store.get(watch_id)
+    if watch is None:
+        return watch_not_found()
+    return jsonify(watch)
+
+@app.route('/api/watches/<int:watch_id>', methods=['DELETE'])
+def remove_watch(watch_id):
+    """Stop watching a URL and drop its change history"""
+    watcher, error = watcher_or_503()
+    if error:
+        return error
+    if not watcher.remove(watch_id):
+        return watch_not_found()
+    return jsonify({'status': 'removed', 'id': watch_id})
+
+@app.route('/api/watches/<int:watch_id>/check', methods=['POST'])
+def check_watch(watch_id):
+    """Check a watch now; {"render": true} skips the HTTP checks"""
+    watcher, error = watcher_or_503()
+    if error:
+        return error
+    data = request.get_json(silent=True) or {}
+    try:
+        result = run_sync(watcher.check(watch_id, force_render=bool(data.get('render'))))
+    except KeyError:
+        return watch_not_found()
+    return jsonify(with_timings(result, data))
+
+def changes_response(watcher, watch_id=None):
+    try:
+        limit, _ = paging_from_request(request.args)
+        try:
+            since = int(request.args.get('since', 0))
+        except ValueError:
+            raise ValueError('since must be a change id')
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'error': str(e)
+        }), 400
+    changes = watcher.store.list_changes(watch_id, since_id=since, limit=limit)
+    return jsonify({
+        'changes': changes,
+        # Poll again with ?since=<next_since> for newer changes only
+        'next_since': changes[-1]['id'] if changes else since
+    })
+
+@app.route('/api/watches/<int:watch_id>/changes')
+def watch_changes(watch_id):
+    """Structural diffs detected for one watch"""
+    watcher, error = watcher_or_503()
+    if error:
+        return error
+    if watcher.store.get(watch_id) is None:
+        return watch_not_found()
+    return changes_response(watcher, watch_id)
+
+@app.route('/api/changes')
+def list_changes():
+    """Structural diffs detected across all watches"""
+    watcher, error = watcher_or_503()
+    if error:
+        return error
+    return changes_response(watcher)
+
+def sessions_or_503():
+    sessions = get_sessions()
+    if sessions is None:
+        return None, (jsonify({
+            'status': 'error',
+            'error': 'Session caching is disabled'
+        }), 503)
+    return sessions, None
+
+def sessions_changed(domain):
+    """Tell the cluster workers to re-read a domain's recipe and session"""
+    cluster = current_coordinator()
+    if cluster is not None:
+        cluster.broadcast({'type': 'sessions', 'domain': domain})
+
+def recipe_not_found():
+    return jsonify({
+        'status': 'error',
+        'error': 'No navigation recipe for this domain'
+    }), 404
+
+@app.route('/api/sessions')
+def list_sessions():
+    """Cached browser sessions per domain (without their cookies)"""
+    sessions, error = sessions_or_503()
+    if error:
+        return error
+    return jsonify({'sessions': sessions.list()})
+
+@app.route('/api/sessions/<domain>', methods=['DELETE'])
+def remove_session(domain):
+    """Forget a domain's session; the next scrape starts from scratch"""
+    sessions, error = sessions_or_503()
+    if error:
+        return error
+    if not sessions.invalidate(domain.lower()):
+        return jsonify({
+            'status': 'error',
+            'error': 'No session for this domain'
+        }), 404
+    sessions_changed(domain.lower())
+    return jsonify({'status': 'removed', 'domain': domain.lower()})
+
+@app.route('/api/sessions/<domain>/warm', methods=['POST'])
+def warm_domain_session(domain):
+    """Run a domain's navigation recipe now and cache the session it ends with"""
+    sessions, error = sessions_or_503()
+    if error:
+        return error
+    recipe = sessions.recipe_for(domain)
+    if recipe is None:
+        return recipe_not_found()
+    cluster = get_coordinator()
+    if cluster is not None:
+        # Warm it on the worker whose browser will use it
+        result = cluster.call('warm', recipe.domain)
+        if result['status'] != 'success':
+            return jsonify({
+                'status': 'error',
+                'error': result['error']
+            }), 502
+        return jsonify(result['session'])
+    try:
+        session = run_sync(warm_session(recipe))
+    except Exception as e:
+        sessions.record_failure(recipe.domain, e)
+        return jsonify({
+            'status': 'error',
+            'error': f'Recipe failed: {str(e)}'
+        }), 502
+    return jsonify(session)
+
+@app.route('/api/recipes', methods=['POST'])
+def add_recipe():
+    """Add or replace a domain's navigation recipe, e.g. {"start_url", "steps": [...], "expect"}"""
+    sessions, error = sessions_or_503()
+    if error:
+        return error
+    try:
+        recipe = sessions.add_recipe(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'error': str(e)
+        }), 400
+    sessions_changed(recipe.domain)
+    return jsonify(recipe.to_dict()), 201
+
+@app.route('/api/recipes')
+def list_recipes():
+    """Navigation recipes per domain"""
+    sessions, error = sessions_or_503()
+    if error:
+        return error
+    return jsonify({'recipes': sessions.recipes()})
+
+@app.route('/api/recipes/<domain>', methods=['DELETE'])
+def remove_recipe(domain):
+    """Drop a domain's navigation recipe (its cached session stays until it expires)"""
+    sessions, error = sessions_or_503()
+    if error:
+        return error
+    if not sessions.remove_recipe(domain.lower()):
+        return recipe_not_found()
+    sessions_changed(domain.lower())
+    return jsonify({'status': 'removed', 'domain': domain.lower()})
+
+def cluster_or_503():
+    cluster = get_coordinator()
+    if cluster is None:
+        return None, (jsonify({
+            'status': 'error',
+            'error': 'Cluster mode is off (set SCRAPER_CLUSTER_WORKERS)'
+        }), 503)
+    return cluster, None
+
+@app.route('/api/cluster')
+def cluster_status():
+    """Worker processes, their state and the coordinator's counters"""
+    cluster, error = cluster_or_503()
+    if error:
+        return error
+    return jsonify(cluster.stats())
+
+@app.route('/api/cluster/workers/<int:worker_id>/drain', methods=['POST'])
+def drain_worker(worker_id):
+    """Stop sending work to a worker and stop it once idle; ?restart=1 starts it again afterwards"""
+    cluster, error = cluster_or_503()
+    if error:
+        return error
+    if worker_id not in cluster.workers:
+        return jsonify({
+            'status': 'error',
+            'error': 'No such worker'
+        }), 404
+    restart = request.args.get('restart', '0').lower() in ('1', 'true', 'yes')
+    if not cluster.drain(worker_id, restart=restart):
+        return jsonify({
+            'status': 'error',
+            'error': 'Worker is not running'
+        }), 409
+    return jsonify({'status': 'draining', 'worker': worker_id, 'restart': restart})
+
 @app.route('/screenshots/<filename>')
 def get_screenshot(filename):
-    """Serve screenshot files"""
-    return send_from_directory(app.config['SCREENSHOT_FOLDER'], filename)
+    """Serve screenshot files, waiting for one that is still being encoded"""
+    pipeline = get_screenshot_pipeline()
+    if not pipeline.store.exists(filename):
+        pipeline.wait(pipeline.handle_for_file(filename), SCREENSHOT_WAIT)
+    pipeline.touch(filename)
+    # Names are content hashes: a file never changes once written
+    return send_from_directory(app.config['SCREENSHOT_FOLDER'], filename, max_age=365 * 86400)
+
+@app.route('/api/screenshots/<screenshot_id>')
+def screenshot_status(screenshot_id):
+    """A screenshot's handle; ?wait=<seconds> blocks while it is still pending"""
+    pipeline = get_screenshot_pipeline()
+    try:
+        wait = min(float(request.args.get('wait', 0)), SCREENSHOT_WAIT)
+    except ValueError:
+        return jsonify({
+            'status': 'error',
+            'error': 'wait must be a number of seconds'
+        }), 400
+    handle = pipeline.wait(screenshot_id, wait) if wait > 0 else pipeline.status(screenshot_id)
+    if handle is None:
+        return jsonify({
+            'status': 'error',
+            'error': 'Screenshot not found'
+        }), 404
+    return jsonify(handle)
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus text-format metrics"""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/metrics/profiles')
+def metric_profiles():
+    """Aggregated stack samples of recent slow requests (SCRAPER_PROFILE_SLOW_MS)"""
+    profiler = get_profiler()
+    if profiler is None:
+        return jsonify({
+            'status': 'error',
+            'error': 'Slow-request profiling is disabled'
+        }), 503
+    return jsonify({
+        **profiler.stats(),
+        'reports': list(profiler.reports)
+    })
 
 @app.route('/health')
 def health_check():
     """Health check endpoint"""
+    cache = get_scrape_cache()
     return jsonify({
         'status': 'healthy',
         'timestamp': datetime.now().isoformat(),
-        'version': '1.0.0'
+        'version': '1.0.0',
+        'extraction': get_extraction_executor().stats(),
+        'cache': cache.stats() if cache else None,
+        'http_fetch': {**get_http_fetcher().stats(), 'profiles': get_fetch_profiles().stats()},
+        'jobs': _job_queue.stats() if _job_queue else None,
+        'store': get_result_store().stats() if get_result_store() else None,
+        'watches': _page_watcher.stats() if _page_watcher else None,
+        'sessions': get_session_cache().stats() if get_session_cache() else None,
+        'cluster': current_coordinator().stats() if current_coordinator() else None,
+        'profiler': get_profiler().stats() if get_profiler() else None,
+        'screenshots': get_screenshot_pipeline().stats()
     })
 
 @app.errorhandler(404)
@@ -96,6 +1280,14 @@ if __name__ == '__main__':
     # Ensure directories exist
     os.makedirs(app.config['SCREENSHOT_FOLDER'], exist_ok=True)
     
+    # Check watched pages from startup, not only after the first watch request
+    get_page_watcher()
+    # Start the cluster workers (if configured) before taking requests
+    if get_coordinator() is not None:
+        get_coordinator().wait_ready(60)
+    # Keep portal sessions warm from startup too
+    get_sessions()
+    
     print("🚀 Starting Web Content Scraper...")
     print("🌐 Server will be available at: http://localhost:8080")
     print("📝 Use Ctrl+C to stop the server")
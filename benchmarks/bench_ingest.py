@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Benchmark file ingestion on large synthetic PDFs.
+
+Writes RFP-like PDFs (numbered sections, paragraphs and a ruled table on
+every page) and ingests each one in a fresh subprocess, so peak RSS is
+measured per run. Reports pages/sec and the peak RSS of the parent and of
+the extraction worker processes.
+
+Usage:
+    python benchmarks/bench_ingest.py --pages 200 800 --executor process inline
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(os.path.join(ROOT, "src"))
+
+LOREM = (
+    "The contractor shall provide all labor, materials and equipment necessary to "
+    "complete the work described in this solicitation in accordance with the terms "
+    "and conditions of the agreement and all applicable state and federal regulations."
+)
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _page_stream(number: int) -> bytes:
+    ops = ["BT /F1 14 Tf 72 740 Td", f"({_escape(f'{number}. SECTION {number} REQUIREMENTS')}) Tj ET"]
+    y = 710
+    for paragraph in range(3):
+        ops.append(f"BT /F1 10 Tf 72 {y} Td 12 TL")
+        for line in range(4):
+            ops.append(f"({_escape(LOREM[line * 45:(line + 1) * 45])}) '")
+        ops.append("ET")
+        y -= 70
+
+    # 4x5 ruled table with text in each cell
+    left, top, col, row = 72, y - 10, 110, 20
+    for r in range(6):
+        ops.append(f"{left} {top - r * row} m {left + 4 * col} {top - r * row} l S")
+    for c in range(5):
+        ops.append(f"{left + c * col} {top} m {left + c * col} {top - 5 * row} l S")
+    for r in range(5):
+        for c in range(4):
+            cell = f"Item {number}-{r}" if c == 0 else ("Header" if r == 0 else f"${(r * 100 + c):,}.00")
+            ops.append(f"BT /F1 9 Tf {left + c * col + 4} {top - r * row - 14} Td ({_escape(cell)}) Tj ET")
+    return "\n".join(ops).encode("latin-1")
+
+
+def write_synthetic_pdf(path: str, pages: int):
+    """Write a text PDF with ``pages`` pages without any PDF library."""
+    offsets = []
+    with open(path, "wb") as f:
+        def obj(number: int, body: bytes):
+            offsets.append((number, f.tell()))
+            f.write(f"{number} 0 obj\n".encode() + body + b"\nendobj\n")
+
+        f.write(b"%PDF-1.4\n")
+        kids = " ".join(f"{4 + i * 2} 0 R" for i in range(pages))
+        obj(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        obj(2, f"<< /Type /Pages /Kids [{kids}] /Count {pages} >>".encode())
+        obj(3, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+        for i in range(pages):
+            stream = _page_stream(i + 1)
+            obj(4 + i * 2, (
+                f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + i * 2} 0 R >>"
+            ).encode())
+            obj(5 + i * 2, f"<< /Length {len(stream)} >>\nstream\n".encode() + stream + b"\nendstream")
+
+        xref_at = f.tell()
+        count = 4 + pages * 2
+        f.write(f"xref\n0 {count}\n0000000000 65535 f \n".encode())
+        for _, offset in sorted(offsets):
+            f.write(f"{offset:010d} 00000 n \n".encode())
+        f.write(f"trailer\n<< /Size {count} /Root 1 0 R >>\nstartxref\n{xref_at}\n%%EOF\n".encode())
+
+
+def _peak_rss_mb(who: int) -> float:
+    # ru_maxrss is KiB on Linux
+    return round(resource.getrusage(who).ru_maxrss / 1024, 1)
+
+
+def run_child(path: str, executor_kind: str, workers: int, tables: bool) -> dict:
+    """Ingest one file in this process and report throughput and memory."""
+    from cpu_pool import ExtractionExecutor
+    from document_ingest import ingest_document
+
+    executor = ExtractionExecutor(executor_kind, max_workers=workers)
+    started = time.perf_counter()
+    result = asyncio.run(ingest_document(path, executor=executor, tables=tables))
+    elapsed = time.perf_counter() - started
+    executor.shutdown()
+
+    pages = result["meta"]["pages"]
+    return {
+        "executor": executor_kind,
+        "workers": executor.max_workers,
+        "pages": pages,
+        "tables": len(result["tables"]),
+        "text_chars": len(result["text_content"]["full_text"]),
+        "seconds": round(elapsed, 2),
+        "pages_per_sec": round(pages / elapsed, 1),
+        "peak_rss_mb": _peak_rss_mb(resource.RUSAGE_SELF),
+        "worker_peak_rss_mb": _peak_rss_mb(resource.RUSAGE_CHILDREN),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, nargs="+", default=[200, 800])
+    parser.add_argument("--executor", nargs="+", default=["process", "inline"],
+                        choices=["process", "thread", "inline"])
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--no-tables", action="store_true", help="Skip table extraction")
+    parser.add_argument("--json", help="Also write the results to this file")
+    parser.add_argument("--child", nargs=2, metavar=("PATH", "EXECUTOR"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        path, executor_kind = args.child
+        print(json.dumps(run_child(path, executor_kind, args.workers, not args.no_tables)))
+        return
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for pages in args.pages:
+            path = os.path.join(tmp, f"synthetic_{pages}.pdf")
+            write_synthetic_pdf(path, pages)
+            size_mb = os.path.getsize(path) / 1024 / 1024
+            for executor_kind in args.executor:
+                command = [sys.executable, __file__, "--child", path, executor_kind]
+                if args.workers:
+                    command += ["--workers", str(args.workers)]
+                if args.no_tables:
+                    command.append("--no-tables")
+                output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+                result = {**json.loads(output.strip().splitlines()[-1]), "file_mb": round(size_mb, 2)}
+                results.append(result)
+                print(
+                    f"{pages:>5} pages  {executor_kind:<8} {result['pages_per_sec']:>8} pages/s  "
+                    f"peak RSS {result['peak_rss_mb']} MB (workers {result['worker_peak_rss_mb']} MB)  "
+                    f"{result['tables']} tables"
+                )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,480 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark suite for the scraper, its extractors and RFPReaderAgent.
+
+Serves the fixture corpus (benchmarks/fixtures.py) from 127.0.0.1 and runs
+each suite in a fresh subprocess, so every suite reports its own peak RSS:
+
+    extract     CPU time of each extractor per page (no browser, no network)
+    scrape      end-to-end scrape_url latency per page and fetch mode
+    throughput  pages/sec of scrape_many at several concurrency levels
+    rfp         RFPReaderAgent stage timings on the RFP pages (offline LLM backend)
+    cluster     pages/sec through the multi-process coordinator at several worker
+                counts, over the corpus served from many loopback hosts
+
+Results are flat metrics (``extract.extract_all.tabulation.cpu_ms``) written
+as JSON. Given a baseline report, every metric that got worse by more than
+its threshold (benchmarks/thresholds.json, ``--threshold PATTERN=FRACTION``)
+is a regression and the exit status is 1. Browser metrics are skipped, with a
+note, when no Playwright browser is installed.
+
+Usage:
+    python benchmarks/bench_scrape.py --json report.json
+    python benchmarks/bench_scrape.py --save-baseline benchmarks/baseline.json
+    python benchmarks/bench_scrape.py --baseline benchmarks/baseline.json --threshold 'scrape.*=0.5'
+"""
+
+import argparse
+import asyncio
+import fnmatch
+import gc
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(BENCH_DIR, "..")
+sys.path.append(os.path.join(ROOT, "src"))
+sys.path.append(os.path.join(ROOT, "agents"))
+sys.path.append(BENCH_DIR)
+
+SUITES = ("extract", "scrape", "throughput", "rfp", "cluster")
+FETCH_MODES = ("auto", "http", "browser")
+DEFAULT_THRESHOLDS = os.path.join(BENCH_DIR, "thresholds.json")
+
+# Keeps every run offline and independent of local state
+CHILD_ENV = {
+    "SCRAPER_CACHE": "0",
+    "SCRAPER_SESSIONS": "0",
+    "SCRAPER_STORE": "0",
+    "SCRAPER_LLM_BACKEND": "fake",
+    "SCRAPER_LLM_CACHE": "0",
+    "NO_PROXY": "127.0.0.1,localhost",
+    "no_proxy": "127.0.0.1,localhost",
+}
+
+
+def _peak_rss_mb(who: int) -> float:
+    # ru_maxrss is KiB on Linux
+    return round(resource.getrusage(who).ru_maxrss / 1024, 1)
+
+
+def _page_name(path: str) -> str:
+    # /bids/tabulation.html -> bids-tabulation
+    return os.path.splitext(path.strip("/"))[0].replace("/", "-").replace(".", "_")
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+class Report:
+    """Metrics of one suite run, named ``suite.part.page.measure``."""
+
+    def __init__(self):
+        self.metrics: Dict[str, Dict[str, Any]] = {}
+        self.notes: List[str] = []
+
+    def add(self, name: str, value: float, unit: str, better: str = "lower"):
+        self.metrics[name] = {"value": round(value, 3), "unit": unit, "better": better}
+
+    def note(self, text: str):
+        self.notes.append(text)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"metrics": self.metrics, "notes": self.notes}
+
+
+# ---- suites (each runs in its own child process) -----------------------
+
+def cpu_ms(fn: Callable, repeat: int) -> float:
+    """Best CPU time of ``fn()`` over ``repeat`` runs in milliseconds (GC paused, like timeit)."""
+    samples = []
+    for _ in range(repeat):
+        gc.collect()
+        gc.disable()
+        try:
+            started = time.process_time()
+            fn()
+            samples.append((time.process_time() - started) * 1000)
+        finally:
+            gc.enable()
+    return min(samples)
+
+
+def suite_extract(server, report: Report, args):
+    """CPU time per extractor: the streaming pass, the HTTP path and the legacy _extract_* methods."""
+    from bs4 import BeautifulSoup
+    from extraction import extract_all
+    from http_fetch import extract_forms, extract_static
+    from web_scraper import WebScraper
+
+    scraper = WebScraper(use_cache=False, use_sessions=False)
+    for path, url in server.representatives().items():
+        html = server.corpus[path]["html"]
+        name = _page_name(path)
+        soup = BeautifulSoup(html, "html.parser")
+        extractors = {
+            "extract_all": lambda: extract_all(html, url),
+            "extract_static": lambda: extract_static(html, url),
+            "extract_forms": lambda: extract_forms(html),
+            "soup_parse": lambda: BeautifulSoup(html, "html.parser"),
+            # Legacy per-extractor methods on a parsed tree (_extract_text_content mutates it, so it runs last)
+            "_extract_links": lambda: asyncio.run(scraper._extract_links(soup, url)),
+            "_extract_images": lambda: scraper._extract_images(soup, url),
+            "_extract_tables": lambda: scraper._extract_tables(soup),
+            "_extract_meta_info": lambda: scraper._extract_meta_info(soup),
+            "_extract_navigation": lambda: scraper._extract_navigation(soup),
+            "_extract_text_content": lambda: scraper._extract_text_content(BeautifulSoup(html, "html.parser")),
+        }
+        for extractor, fn in extractors.items():
+            report.add(f"extract.{extractor}.{name}.cpu_ms", cpu_ms(fn, args.repeat), "ms")
+
+
+async def _scrape_latency(url: str, mode: str, repeat: int) -> Optional[List[float]]:
+    from web_scraper import scrape_url
+
+    samples = []
+    # The first scrape warms the browser pool, the HTTP client and the extraction workers
+    for attempt in range(repeat + 1):
+        started = time.perf_counter()
+        result = await scrape_url(url, fetch_mode=mode)
+        elapsed = (time.perf_counter() - started) * 1000
+        if result.get("status") != "success":
+            raise RuntimeError(result.get("error") or "scrape failed")
+        if attempt:
+            samples.append(elapsed)
+    return samples
+
+
+def suite_scrape(server, report: Report, args):
+    """End-to-end scrape_url latency per page and fetch mode."""
+    from browser_pool import shutdown_browser_pool
+    from cpu_pool import shutdown_extraction_executor
+
+    async def run():
+        for mode in args.modes:
+            for path, url in server.representatives().items():
+                name = _page_name(path)
+                try:
+                    samples = await _scrape_latency(url, mode, args.repeat)
+                except Exception as e:
+                    report.note(f"scrape {mode} {name}: skipped ({str(e).splitlines()[0][:120]})")
+                    continue
+                report.add(f"scrape.{mode}.{name}.p50_ms", statistics.median(samples), "ms")
+                report.add(f"scrape.{mode}.{name}.p95_ms", _percentile(samples, 0.95), "ms")
+        await shutdown_browser_pool()
+
+    try:
+        asyncio.run(run())
+    finally:
+        shutdown_extraction_executor()
+
+
+def suite_throughput(server, report: Report, args):
+    """Pages/sec of scrape_many over the corpus at each concurrency level."""
+    from browser_pool import shutdown_browser_pool
+    from cpu_pool import shutdown_extraction_executor
+    from web_scraper import scrape_many
+
+    async def run():
+        # Only pages this environment can serve in the chosen mode count
+        probe = await scrape_many(list(server.urls().values()), concurrency=4, fetch_mode=args.throughput_mode)
+        urls = [result["url"] for result in probe if result.get("status") == "success"]
+        skipped = len(probe) - len(urls)
+        if skipped:
+            report.note(f"throughput: {skipped} pages skipped in {args.throughput_mode} mode "
+                        f"(e.g. {next(r['error'] for r in probe if r.get('status') != 'success').splitlines()[0][:120]})")
+        if not urls:
+            return
+        batch = (urls * (args.pages // len(urls) + 1))[:args.pages]
+        for concurrency in args.concurrency:
+            started = time.perf_counter()
+            results = await scrape_many(batch, concurrency=concurrency, per_host_limit=concurrency,
+                                        fetch_mode=args.throughput_mode)
+            elapsed = time.perf_counter() - started
+            ok = sum(1 for result in results if result.get("status") == "success")
+            report.add(f"throughput.{args.throughput_mode}.c{concurrency}.pages_per_s", ok / elapsed, "pages/s", "higher")
+            if ok < len(results):
+                report.note(f"throughput c{concurrency}: {len(results) - ok} of {len(results)} scrapes failed")
+        await shutdown_browser_pool()
+
+    try:
+        asyncio.run(run())
+    finally:
+        shutdown_extraction_executor()
+
+
+def suite_rfp(server, report: Report, args):
+    """RFPReaderAgent over the RFP pages: per-stage time and documents/sec."""
+    from cpu_pool import shutdown_extraction_executor
+    from metrics import collect_timings
+    from rfp_reader import RFPReaderAgent
+
+    urls = list(server.urls(["rfp"]).values())
+
+    async def run():
+        agent = RFPReaderAgent()
+        await agent.analyze_rfp(urls[0])
+        stages: Dict[str, List[float]] = {}
+        started = time.perf_counter()
+        for url in urls:
+            with collect_timings() as timings:
+                result = await agent.analyze_rfp(url)
+            if result.get("status") == "error":
+                raise RuntimeError(result.get("error"))
+            for stage, ms in timings.as_dict()["stages"].items():
+                if stage.startswith("rfp_"):
+                    stages.setdefault(stage, []).append(ms)
+        elapsed = time.perf_counter() - started
+        for stage, samples in stages.items():
+            report.add(f"rfp.{stage}.mean_ms", statistics.mean(samples), "ms")
+        report.add("rfp.docs_per_s", len(urls) / elapsed, "docs/s", "higher")
+
+    try:
+        asyncio.run(run())
+    except Exception as e:
+        report.note(f"rfp: skipped ({str(e).splitlines()[0][:120]})")
+    finally:
+        shutdown_extraction_executor()
+
+
+def suite_cluster(server, report: Report, args):
+    """Pages/sec through the cluster coordinator per worker count, and how close to linear it scales."""
+    from cluster import Coordinator
+    from fixtures import FixtureServer
+
+    # Work is sharded by domain: serve the corpus from several hosts so every worker gets some
+    servers = [FixtureServer(server.corpus, host=f"127.0.0.{i}").start() for i in range(2, 2 + args.cluster_hosts)]
+    hosts = ",".join(extra.host for extra in servers)
+    os.environ["NO_PROXY"] = os.environ["no_proxy"] = f"{os.environ.get('NO_PROXY', '')},{hosts}"
+    urls = [source.url(path) for source in [server] + servers for path in server.corpus]
+    options = {"fetch_mode": args.throughput_mode}
+    rates = {}
+    try:
+        for workers in args.workers:
+            coordinator = Coordinator(workers=workers)
+            try:
+                coordinator.start()
+                if not coordinator.wait_ready(120):
+                    report.note(f"cluster w{workers}: workers did not start")
+                    continue
+                # Warms each worker's clients; only pages this environment can serve count
+                probe = list(coordinator.submit("scrape", urls, options, concurrency=4 * workers))
+                served = [result["url"] for result in probe if result.get("status") == "success"]
+                if len(served) < len(probe) and workers == args.workers[0]:
+                    report.note(f"cluster: {len(probe) - len(served)} pages skipped in {args.throughput_mode} mode")
+                if not served:
+                    continue
+                batch = (served * (args.pages // len(served) + 1))[:max(args.pages, len(served))]
+                started = time.perf_counter()
+                # Same in-flight pages per worker at every worker count
+                results = list(coordinator.submit("scrape", batch, options, concurrency=args.cluster_concurrency * workers,
+                                                  per_host_limit=args.cluster_concurrency))
+                elapsed = time.perf_counter() - started
+                ok = sum(1 for result in results if result.get("status") == "success")
+                rates[workers] = ok / elapsed
+                report.add(f"cluster.{args.throughput_mode}.w{workers}.pages_per_s", rates[workers], "pages/s", "higher")
+            finally:
+                coordinator.close()
+    finally:
+        for extra in servers:
+            extra.stop()
+    if 1 in rates:
+        for workers, rate in rates.items():
+            if workers > 1:
+                # 1.0 is perfectly linear
+                report.add(f"cluster.{args.throughput_mode}.w{workers}.scaling", rate / (rates[1] * workers),
+                           "ratio", "higher")
+    if max(args.workers) > (os.cpu_count() or 1):
+        report.note(f"cluster: only {os.cpu_count()} CPUs; scaling beyond that is not expected")
+
+
+SUITE_RUNNERS = {
+    "extract": suite_extract,
+    "scrape": suite_scrape,
+    "throughput": suite_throughput,
+    "rfp": suite_rfp,
+    "cluster": suite_cluster,
+}
+
+
+def run_child(suite: str, args) -> Dict[str, Any]:
+    """Run one suite in this process against a fresh fixture server."""
+    from fixtures import FixtureServer, build_corpus
+
+    report = Report()
+    with FixtureServer(build_corpus(args.scale, args.corpus)) as server:
+        started = time.perf_counter()
+        SUITE_RUNNERS[suite](server, report, args)
+        report.add(f"{suite}.wall_s", time.perf_counter() - started, "s")
+    report.add(f"{suite}.peak_rss_mb", _peak_rss_mb(resource.RUSAGE_SELF), "MB")
+    report.add(f"{suite}.worker_peak_rss_mb", _peak_rss_mb(resource.RUSAGE_CHILDREN), "MB")
+    return report.as_dict()
+
+
+# ---- baseline comparison -------------------------------------------------
+
+def load_thresholds(path: Optional[str], overrides: List[str]) -> Dict[str, Any]:
+    """Thresholds file (``default``, ``metrics`` patterns, ``min_delta`` per unit) plus CLI overrides."""
+    thresholds = {"default": 0.15, "metrics": {}, "min_delta": {}}
+    if path and os.path.exists(path):
+        with open(path) as f:
+            loaded = json.load(f)
+        thresholds.update({key: loaded[key] for key in ("default", "min_delta") if key in loaded})
+        thresholds["metrics"] = dict(loaded.get("metrics", {}))
+    for override in overrides:
+        pattern, _, fraction = override.rpartition("=")
+        try:
+            thresholds["metrics"][pattern or "*"] = float(fraction)
+        except ValueError:
+            raise SystemExit(f"--threshold expects PATTERN=FRACTION, got {override!r}")
+    return thresholds
+
+
+def threshold_for(name: str, thresholds: Dict[str, Any]) -> float:
+    """The most specific (longest) matching pattern wins."""
+    matches = [pattern for pattern in thresholds["metrics"] if fnmatch.fnmatchcase(name, pattern)]
+    if not matches:
+        return thresholds["default"]
+    return thresholds["metrics"][max(matches, key=len)]
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], thresholds: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Compare two reports metric by metric.
+
+    Returns:
+        List[Dict]: One row per baseline metric with ``change`` (positive is
+        worse) and ``status``: ok, improved, regressed or missing
+    """
+    rows = []
+    for name, base in sorted(baseline["metrics"].items()):
+        metric = current["metrics"].get(name)
+        if metric is None:
+            rows.append({"metric": name, "baseline": base["value"], "current": None, "status": "missing"})
+            continue
+        delta = metric["value"] - base["value"]
+        if base.get("better", "lower") == "higher":
+            delta = -delta
+        change = delta / base["value"] if base["value"] else 0.0
+        limit = threshold_for(name, thresholds)
+        noise = thresholds["min_delta"].get(base["unit"], 0.0)
+        if change > limit and abs(delta) > noise:
+            status = "regressed"
+        elif change < -limit and abs(delta) > noise:
+            status = "improved"
+        else:
+            status = "ok"
+        rows.append({"metric": name, "baseline": base["value"], "current": metric["value"],
+                     "unit": base["unit"], "change": round(change, 4), "threshold": limit, "status": status})
+    return rows
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment(args) -> Dict[str, Any]:
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "scale": args.scale,
+        "repeat": args.repeat,
+        "executor": args.executor,
+        "workers": args.workers,
+        "corpus": args.corpus,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--suites", nargs="+", default=list(SUITES), choices=SUITES)
+    parser.add_argument("--scale", type=float, default=1.0, help="Size of the generated corpus")
+    parser.add_argument("--corpus", help="Directory of saved .html pages to benchmark as well")
+    parser.add_argument("--repeat", type=int, default=5, help="Samples per measurement")
+    parser.add_argument("--modes", nargs="+", default=["http", "browser"], choices=FETCH_MODES,
+                        help="Fetch modes for the scrape suite")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--pages", type=int, default=60, help="Pages per throughput run")
+    parser.add_argument("--throughput-mode", default="auto", choices=FETCH_MODES)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="Worker counts for the cluster suite")
+    parser.add_argument("--cluster-hosts", type=int, default=8, help="Extra loopback hosts serving the corpus")
+    parser.add_argument("--cluster-concurrency", type=int, default=4, help="In-flight pages per cluster worker")
+    parser.add_argument("--executor", default="process", choices=["process", "thread", "inline"],
+                        help="Extraction executor for the scrape, throughput and rfp suites")
+    parser.add_argument("--json", help="Write the report to this file")
+    parser.add_argument("--baseline", help="Compare against this report; exit 1 on regressions")
+    parser.add_argument("--save-baseline", help="Write the report as the new baseline")
+    parser.add_argument("--thresholds", default=DEFAULT_THRESHOLDS, help="Regression thresholds file")
+    parser.add_argument("--threshold", action="append", default=[], metavar="PATTERN=FRACTION",
+                        help="Override the allowed slowdown for matching metrics (e.g. 'rfp.*=0.3')")
+    parser.add_argument("--child", choices=SUITES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_child(args.child, args)))
+        return
+
+    env = {**os.environ, **CHILD_ENV, "SCRAPER_EXTRACTION_EXECUTOR": args.executor}
+    report = {"meta": environment(args), "metrics": {}, "notes": []}
+    for suite in args.suites:
+        output = subprocess.run([sys.executable, __file__, "--child", suite] + sys.argv[1:],
+                                capture_output=True, text=True, env=env)
+        if output.returncode != 0:
+            report["notes"].append(f"{suite}: failed ({(output.stderr.strip().splitlines() or ['?'])[-1][:200]})")
+            print(f"{suite:<11} FAILED", file=sys.stderr)
+            continue
+        result = json.loads(output.stdout.strip().splitlines()[-1])
+        report["metrics"].update(result["metrics"])
+        report["notes"].extend(result["notes"])
+        print(f"{suite:<11} {len(result['metrics']):>4} metrics  "
+              f"peak RSS {result['metrics'][f'{suite}.peak_rss_mb']['value']} MB  "
+              f"{result['metrics'][f'{suite}.wall_s']['value']:.1f}s")
+
+    for name, metric in sorted(report["metrics"].items()):
+        print(f"  {name:<64} {metric['value']:>12,.3f} {metric['unit']}")
+    for note in report["notes"]:
+        print(f"  note: {note}")
+
+    regressed = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if {key: baseline["meta"].get(key) for key in ("cpus", "scale", "repeat")} != \
+                {key: report["meta"][key] for key in ("cpus", "scale", "repeat")}:
+            print("warning: baseline was recorded with different cpus/scale/repeat", file=sys.stderr)
+        report["comparison"] = compare(report, baseline, load_thresholds(args.thresholds, args.threshold))
+        report["baseline"] = baseline["meta"]
+        for row in report["comparison"]:
+            if row["status"] in ("regressed", "improved"):
+                print(f"  {row['status'].upper():<9} {row['metric']:<64} {row['baseline']:,.3f} -> "
+                      f"{row['current']:,.3f} {row['unit']} ({row['change']:+.1%}, limit {row['threshold']:.0%})")
+        regressed = [row for row in report["comparison"] if row["status"] == "regressed"]
+        missing = sum(1 for row in report["comparison"] if row["status"] == "missing")
+        print(f"{len(regressed)} regressions, {missing} baseline metrics not measured")
+
+    for path in (args.json, args.save_baseline):
+        if path:
+            with open(path, "w") as f:
+                json.dump(report, f, indent=2)
+    sys.exit(1 if regressed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+"""
+Offline corpus of procurement pages and a local server for the benchmarks.
+
+The pages are generated from a fixed seed so every run sees the same bytes:
+a bid tabulation with thousands of rows (row and column spans, money and
+date cells), a supplier registration page with dozens of forms, a listing
+built entirely by JavaScript, a notice whose stylesheet, script and images
+are slow to load, bid listings and RFP notices. A directory of saved pages
+(``*.html``) can be served alongside them.
+
+Nothing leaves 127.0.0.1.
+"""
+
+import json
+import os
+import random
+import threading
+import time
+from datetime import date, timedelta
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+SEED = 20240601
+
+AGENCIES = ["Department of Transportation", "Department of Administration", "Department of Health",
+            "Metropolitan Council", "Department of Natural Resources", "State Colleges and Universities"]
+COMMODITIES = ["Road salt", "Janitorial services", "Laboratory equipment", "IT consulting", "Snow plowing",
+               "Office furniture", "Fleet vehicles", "Catering services", "Bridge inspection", "Printing"]
+STATUSES = ["Open", "Closed", "Awarded", "Cancelled"]
+LOREM = (
+    "The contractor shall provide all labor, materials and equipment necessary to complete the work "
+    "described in this solicitation in accordance with the terms and conditions of the agreement and "
+    "all applicable state and federal regulations."
+)
+
+# Delay of each slow subresource and how many the slow page references
+SLOW_RESOURCE_MS = 400
+SLOW_RESOURCES = 6
+
+ASSET_TYPES = {
+    "css": "text/css",
+    "js": "application/javascript",
+    "png": "image/png",
+}
+# Smallest valid PNG (1x1 transparent pixel)
+PNG_PIXEL = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000d49444154789c63000100000500010d0a2db40000000049454e44ae426082"
+)
+
+
+def _page(title: str, body: str, head: str = "") -> str:
+    return (
+        f"<!DOCTYPE html><html lang=\"en\"><head><meta charset=\"utf-8\"><title>{escape(title)}</title>"
+        f"<meta name=\"description\" content=\"{escape(title)} - State procurement portal\">{head}</head>"
+        f"<body><nav><ul><li><a href=\"/\">Home</a></li><li><a href=\"/bids/listing-0.html\">Open bids</a></li>"
+        f"<li><a href=\"/bids/forms.html\">Supplier registration</a></li></ul></nav>"
+        f"<main>{body}</main><footer><p>State of Minnesota procurement portal</p></footer></body></html>"
+    )
+
+
+def bid_table_page(rows: int, rng: random.Random) -> str:
+    """A bid tabulation: grouped header rows, a rowspan per solicitation, colspan notes."""
+    start = date(2024, 1, 1)
+    out = [
+        "<h1>Bid Tabulation</h1><p>Results of the sealed bid opening.</p>",
+        "<table class=\"tabulation\"><caption>Bid results by solicitation</caption><thead>",
+        "<tr><th rowspan=\"2\">Solicitation</th><th rowspan=\"2\">Vendor</th>"
+        "<th colspan=\"2\">Price</th><th colspan=\"2\">Dates</th></tr>",
+        "<tr><th>Unit</th><th>Total</th><th>Opened</th><th>Due</th></tr></thead><tbody>",
+    ]
+    row = 0
+    while row < rows:
+        vendors = rng.randint(1, 4)
+        number = f"RFB-{2024}-{row:05d}"
+        for index in range(vendors):
+            unit = rng.uniform(5, 5000)
+            opened = start + timedelta(days=rng.randint(0, 365))
+            cells = (f"<td>Vendor {rng.randint(1, 400)} LLC</td><td>${unit:,.2f}</td>"
+                     f"<td>${unit * rng.randint(10, 900):,.2f}</td>"
+                     f"<td>{opened:%m/%d/%Y}</td><td>{opened + timedelta(days=30):%B %d, %Y}</td>")
+            lead = f"<td rowspan=\"{vendors}\">{number}</td>" if index == 0 else ""
+            out.append(f"<tr>{lead}{cells}</tr>")
+        if rng.random() < 0.05:
+            out.append("<tr><td colspan=\"6\">No award - solicitation cancelled</td></tr>")
+        row += vendors
+    out.append("</tbody></table>")
+    return _page("Bid Tabulation", "".join(out))
+
+
+def forms_page(forms: int, rng: random.Random) -> str:
+    """Supplier registration: many forms with labelled inputs and long selects."""
+    out = ["<h1>Supplier Registration</h1>"]
+    for number in range(forms):
+        options = "".join(f"<option value=\"{code}\">{code} - {escape(rng.choice(COMMODITIES))}</option>"
+                          for code in range(rng.randint(20, 120)))
+        out.append(
+            f"<form id=\"form-{number}\" action=\"/register/{number}\" method=\"post\">"
+            f"<h2>Section {number + 1}</h2>"
+            f"<label for=\"name-{number}\">Business name</label><input id=\"name-{number}\" name=\"name\" required>"
+            f"<label for=\"email-{number}\">Email</label><input id=\"email-{number}\" name=\"email\" type=\"email\">"
+            f"<label for=\"code-{number}\">Commodity code</label><select id=\"code-{number}\" name=\"code\">{options}</select>"
+            f"<label><input type=\"checkbox\" name=\"small_business\" value=\"yes\"> Small business</label>"
+            f"<textarea name=\"notes\" aria-label=\"Notes\"></textarea>"
+            f"<input type=\"password\" name=\"secret\" value=\"hidden\"><button type=\"submit\">Save</button></form>"
+        )
+    return _page("Supplier Registration", "".join(out))
+
+
+def js_rendered_page(items: int, rng: random.Random) -> str:
+    """A listing whose content only exists after its script runs (needs the browser)."""
+    rows = [[f"RFP-{rng.randint(10000, 99999)}", rng.choice(COMMODITIES), rng.choice(AGENCIES),
+             f"{date(2024, 1, 1) + timedelta(days=rng.randint(0, 365)):%Y-%m-%d}"] for _ in range(items)]
+    script = (
+        "<script>const rows = " + json.dumps(rows) + ";"
+        "document.addEventListener('DOMContentLoaded', () => {"
+        "const root = document.getElementById('app');"
+        "const table = document.createElement('table');"
+        "table.innerHTML = '<tr><th>Number</th><th>Title</th><th>Agency</th><th>Due</th></tr>' +"
+        "rows.map((r) => '<tr>' + r.map((c) => '<td>' + c + '</td>').join('') + '</tr>').join('');"
+        "root.appendChild(table);});</script>"
+    )
+    return (f"<!DOCTYPE html><html><head><title>Open Solicitations</title>{script}</head>"
+            f"<body><div id=\"app\"></div><noscript>Please enable JavaScript.</noscript></body></html>")
+
+
+def slow_resources_page(rng: random.Random) -> str:
+    """A notice with slow stylesheet, script and images (what resource policies and readiness skip)."""
+    head = (f"<link rel=\"stylesheet\" href=\"/assets/slow.css?ms={SLOW_RESOURCE_MS}\">"
+            f"<script src=\"/assets/slow.js?ms={SLOW_RESOURCE_MS}\" defer></script>")
+    images = "".join(f"<img src=\"/assets/slow.png?ms={SLOW_RESOURCE_MS}&n={n}\" alt=\"Site photo {n}\">"
+                     for n in range(SLOW_RESOURCES - 2))
+    sections = "".join(f"<h2>{n}. {escape(rng.choice(COMMODITIES))}</h2><p>{LOREM}</p>" for n in range(1, 12))
+    return _page("Notice of Pre-Bid Site Visit", f"<h1>Notice of Pre-Bid Site Visit</h1>{images}{sections}", head)
+
+
+def listing_page(number: int, links: int, rng: random.Random) -> str:
+    """A paginated bid listing: headings, a short table and many links."""
+    items = "".join(
+        f"<li><a href=\"/rfp/{rng.randint(0, 999)}.html\">{escape(rng.choice(COMMODITIES))} - "
+        f"{escape(rng.choice(AGENCIES))}</a></li>" for _ in range(links)
+    )
+    table = "".join(f"<tr><td>RFB-{number}-{n}</td><td>{rng.choice(STATUSES)}</td>"
+                    f"<td>{date(2024, 3, 1) + timedelta(days=n):%m/%d/%Y}</td></tr>" for n in range(25))
+    body = (f"<h1>Open Bids - page {number + 1}</h1><p>{LOREM}</p><ul class=\"results\">{items}</ul>"
+            f"<table><tr><th>Number</th><th>Status</th><th>Due date</th></tr>{table}</table>"
+            f"<a class=\"next\" href=\"/bids/listing-{number + 1}.html\">Next</a>")
+    return _page(f"Open Bids - page {number + 1}", body)
+
+
+def rfp_page(number: int, rng: random.Random) -> str:
+    """An RFP notice with the fields RFPReaderAgent looks for."""
+    due = date(2024, 1, 1) + timedelta(days=rng.randint(30, 400))
+    amount = rng.randint(50, 5000) * 1000
+    sections = "".join(
+        f"<h2>{n}. {title}</h2><p>{LOREM} {LOREM}</p><ul><li>{LOREM[:80]}</li><li>{LOREM[40:140]}</li></ul>"
+        for n, title in enumerate(["Scope of Work", "Requirements", "Insurance", "Evaluation Criteria",
+                                   "Submission Instructions", "Terms and Conditions"], 1)
+    )
+    body = (
+        f"<h1>Request for Proposals: {escape(rng.choice(COMMODITIES))} (RFP-{number:05d})</h1>"
+        f"<p>Issued by the {escape(rng.choice(AGENCIES))}. Proposals are due {due:%B %d, %Y} at 2:00 PM CT. "
+        f"Estimated contract value: ${amount:,}. Contact: buyer{number}@state.mn.us, 651-555-{number % 10000:04d}.</p>"
+        f"{sections}<table><tr><th>Milestone</th><th>Date</th></tr>"
+        f"<tr><td>Questions due</td><td>{due - timedelta(days=14):%m/%d/%Y}</td></tr>"
+        f"<tr><td>Proposals due</td><td>{due:%m/%d/%Y}</td></tr></table>"
+    )
+    return _page(f"RFP-{number:05d}", body)
+
+
+def build_corpus(scale: float = 1.0, saved_dir: Optional[str] = None, seed: int = SEED) -> Dict[str, Dict]:
+    """
+    Generate the fixture pages.
+
+    Args:
+        scale (float): Multiplies table rows, forms, links and page counts
+        saved_dir (str, optional): Directory of saved ``*.html`` pages served under ``/saved/``
+        seed (int): Random seed (the same seed and scale give the same bytes)
+
+    Returns:
+        Dict: ``{path: {"kind": ..., "html": ...}}``
+    """
+    rng = random.Random(seed)
+    count = lambda n: max(1, int(n * scale))
+    corpus = {
+        "/bids/tabulation.html": {"kind": "large_table", "html": bid_table_page(count(3000), rng)},
+        "/bids/forms.html": {"kind": "forms", "html": forms_page(count(60), rng)},
+        "/bids/js-listing.html": {"kind": "js_rendered", "html": js_rendered_page(count(300), rng)},
+        "/bids/site-visit.html": {"kind": "slow_resources", "html": slow_resources_page(rng)},
+    }
+    for number in range(count(4)):
+        corpus[f"/bids/listing-{number}.html"] = {"kind": "listing", "html": listing_page(number, count(150), rng)}
+    for number in range(count(8)):
+        corpus[f"/rfp/{number}.html"] = {"kind": "rfp", "html": rfp_page(number, rng)}
+
+    if saved_dir:
+        for name in sorted(os.listdir(saved_dir)):
+            if name.endswith((".html", ".htm")):
+                with open(os.path.join(saved_dir, name), "r", encoding="utf-8", errors="replace") as f:
+                    corpus[f"/saved/{name}"] = {"kind": "saved", "html": f.read()}
+    return corpus
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "FixtureServer/1.0"
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        page = self.server.corpus.get(parsed.path)
+        if page is not None:
+            return self._send(200, "text/html; charset=utf-8", page["body"])
+
+        name, _, ext = parsed.path.rpartition(".")
+        if name == "/assets/slow" and ext in ASSET_TYPES:
+            delay_ms = int(parse_qs(parsed.query).get("ms", ["0"])[0])
+            time.sleep(min(delay_ms, 10000) / 1000)
+            body = PNG_PIXEL if ext == "png" else b"/* slow */"
+            return self._send(200, ASSET_TYPES[ext], body)
+        self._send(404, "text/plain", b"not found")
+
+    def _send(self, status: int, content_type: str, body: bytes):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FixtureServer:
+    """Serves a corpus from ``build_corpus`` on a loopback address (127.0.0.1) in a background thread."""
+
+    def __init__(self, corpus: Dict[str, Dict], port: int = 0, host: str = "127.0.0.1"):
+        self.corpus = corpus
+        self.host = host
+        self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.corpus = {path: {**page, "body": page["html"].encode("utf-8")} for path, page in corpus.items()}
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.httpd.server_address[1]}"
+
+    def url(self, path: str) -> str:
+        return self.base_url + path
+
+    def urls(self, kinds: Optional[List[str]] = None) -> Dict[str, str]:
+        """``{path: url}`` of the pages of the given kinds (all by default)."""
+        return {path: self.url(path) for path, page in self.corpus.items()
+                if kinds is None or page["kind"] in kinds}
+
+    def representatives(self) -> Dict[str, str]:
+        """``{path: url}`` of the first page of each generated kind and every saved page."""
+        picked, kinds = {}, set()
+        for path, page in self.corpus.items():
+            if page["kind"] == "saved" or page["kind"] not in kinds:
+                kinds.add(page["kind"])
+                picked[path] = self.url(path)
+        return picked
+
+    def start(self) -> "FixtureServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="fixture-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> "FixtureServer":
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
@@ -0,0 +1,143 @@
+import asyncio
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, AsyncIterator, Coroutine, Iterator, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundLoop:
+    """
+    A long-lived asyncio event loop running in a daemon thread.
+
+    Flask request handlers are synchronous; instead of calling ``asyncio.run()``
+    per request (which creates a fresh loop and strands loop-bound resources
+    such as the browser pool), they submit coroutines to this shared loop.
+    """
+
+    def __init__(self, name: str = "scraper-loop"):
+        self.name = name
+        self.loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.call_soon(self._ready.set)
+        self.loop.run_forever()
+
+    @property
+    def running(self) -> bool:
+        return self._thread.is_alive() and not self.loop.is_closed()
+
+    def submit(self, coro: Coroutine) -> Future:
+        """Schedule a coroutine on the loop and return a concurrent Future."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+        """Run a coroutine on the loop and block the calling thread for its result."""
+        future = self.submit(coro)
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            future.cancel()
+            raise
+
+    def iterate(self, agen: AsyncIterator, maxsize: int = 64) -> Iterator[Any]:
+        """
+        Consume an async iterator on the loop from synchronous code.
+
+        Items are handed over through a bounded queue so a slow consumer (e.g.
+        a streaming HTTP response) applies backpressure. Closing the returned
+        generator early cancels the producer.
+        """
+        handoff = queue.Queue(maxsize=maxsize)
+        stopped = threading.Event()
+        finished = object()
+
+        def put(entry):
+            while not stopped.is_set():
+                try:
+                    handoff.put(entry, timeout=0.1)
+                    return
+                except queue.Full:
+                    continue
+
+        async def pump():
+            try:
+                async for item in agen:
+                    await asyncio.to_thread(put, (True, item))
+                await asyncio.to_thread(put, (True, finished))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                await asyncio.to_thread(put, (False, e))
+            finally:
+                aclose = getattr(agen, "aclose", None)
+                if aclose is not None:
+                    await aclose()
+
+        future = self.submit(pump())
+        try:
+            while True:
+                ok, item = handoff.get()
+                if not ok:
+                    raise item
+                if item is finished:
+                    break
+                yield item
+        finally:
+            stopped.set()
+            future.cancel()
+
+    def stop(self, shutdown: Optional[Coroutine] = None, timeout: float = 30.0):
+        """Optionally run a shutdown coroutine, then stop and close the loop."""
+        if not self.running:
+            return
+        if shutdown is not None:
+            try:
+                self.run(shutdown, timeout)
+            except Exception as e:
+                logger.warning(f"Shutdown hook failed: {str(e)}")
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout)
+        if not self._thread.is_alive():
+            self.loop.close()
+
+
+_background_loop: Optional[BackgroundLoop] = None
+_background_lock = threading.Lock()
+
+
+def get_background_loop() -> BackgroundLoop:
+    """Return the process-wide background loop, starting it on first use."""
+    global _background_loop
+    with _background_lock:
+        if _background_loop is None or not _background_loop.running:
+            _background_loop = BackgroundLoop()
+        return _background_loop
+
+
+def run_sync(coro: Coroutine, timeout: Optional[float] = None) -> Any:
+    """Run a coroutine on the shared background loop from synchronous code."""
+    return get_background_loop().run(coro, timeout)
+
+
+def iterate_sync(agen: AsyncIterator, maxsize: int = 64) -> Iterator[Any]:
+    """Iterate an async iterator on the shared background loop from synchronous code."""
+    return get_background_loop().iterate(agen, maxsize)
+
+
+def stop_background_loop(shutdown: Optional[Coroutine] = None, timeout: float = 30.0):
+    """Stop the shared background loop, running ``shutdown`` on it first."""
+    global _background_loop
+    with _background_lock:
+        loop, _background_loop = _background_loop, None
+    if loop is not None:
+        loop.stop(shutdown, timeout)
+    elif shutdown is not None:
+        shutdown.close()
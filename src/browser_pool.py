@@ -0,0 +1,404 @@
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional
+import logging
+
+from playwright.async_api import async_playwright
+
+logger = logging.getLogger(__name__)
+
+
+class PooledBrowser:
+    """A single warm browser process owned by the pool."""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.browser = None
+        self.active_contexts = 0
+        self.pages_served = 0
+        self.launches = 0
+        self.launched_at = None
+        self.crashed = False
+        self.retiring = False
+        self.recycling = False
+        self.launch_failures = 0
+
+    @property
+    def available(self) -> bool:
+        return (
+            self.browser is not None
+            and not self.crashed
+            and not self.retiring
+            and not self.recycling
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "index": self.index,
+            "active_contexts": self.active_contexts,
+            "pages_served": self.pages_served,
+            "launches": self.launches,
+            "uptime_s": round(time.monotonic() - self.launched_at, 1) if self.launched_at else 0.0,
+            "crashed": self.crashed,
+            "retiring": self.retiring,
+            "launch_failures": self.launch_failures,
+        }
+
+
+class BrowserLease:
+    """An isolated BrowserContext borrowed from one pooled browser."""
+
+    def __init__(self, slot: PooledBrowser, context):
+        self.slot = slot
+        self.browser = slot.browser
+        self.context = context
+        self.pages = 0
+
+    async def new_page(self):
+        """Open a page in the leased context."""
+        return await self.context.new_page()
+
+    def record_page(self):
+        """Count one navigation towards the browser's recycle budget."""
+        self.pages += 1
+
+
+class BrowserPool:
+    """
+    Long-lived pool of headless browsers handing out isolated contexts.
+
+    Browsers are launched once and reused across scrapes. Each browser serves
+    at most ``max_contexts_per_browser`` concurrent contexts and is relaunched
+    after ``recycle_after_pages`` pages or as soon as it disconnects; failed
+    relaunches are retried with backoff. ``acquire`` gives up after
+    ``acquire_timeout`` seconds instead of waiting on a pool that has no
+    working browser.
+    """
+
+    RELAUNCH_BACKOFF = 1.0
+    RELAUNCH_BACKOFF_MAX = 60.0
+
+    def __init__(self,
+                 size: int = 2,
+                 max_contexts_per_browser: int = 4,
+                 recycle_after_pages: int = 200,
+                 browser_type: str = "firefox",
+                 headless: bool = True,
+                 launch_options: Optional[Dict[str, Any]] = None,
+                 acquire_timeout: Optional[float] = 120.0):
+        if size < 1:
+            raise ValueError("size must be at least 1")
+        if max_contexts_per_browser < 1:
+            raise ValueError("max_contexts_per_browser must be at least 1")
+
+        self.size = size
+        self.max_contexts_per_browser = max_contexts_per_browser
+        self.recycle_after_pages = recycle_after_pages
+        self.browser_type = browser_type
+        self.headless = headless
+        self.launch_options = launch_options or {}
+        self.acquire_timeout = acquire_timeout
+
+        self.loop = None
+        self.playwright = None
+        self.slots: List[PooledBrowser] = []
+        self.started = False
+        self.closed = False
+        self._closing = False
+        self._start_lock = asyncio.Lock()
+        self._condition = None
+        self._waiting = 0
+        self._recycle_tasks = set()
+
+    @classmethod
+    def from_env(cls) -> "BrowserPool":
+        """Build a pool configured from SCRAPER_POOL_* environment variables."""
+        return cls(
+            size=int(os.environ.get("SCRAPER_POOL_SIZE", "2")),
+            max_contexts_per_browser=int(os.environ.get("SCRAPER_POOL_MAX_CONTEXTS", "4")),
+            recycle_after_pages=int(os.environ.get("SCRAPER_POOL_RECYCLE_PAGES", "200")),
+            browser_type=os.environ.get("SCRAPER_BROWSER", "firefox"),
+            # 0 waits indefinitely
+            acquire_timeout=float(os.environ.get("SCRAPER_POOL_ACQUIRE_TIMEOUT", "120")) or None,
+        )
+
+    @property
+    def capacity(self) -> int:
+        return self.size * self.max_contexts_per_browser
+
+    async def start(self):
+        """Start the Playwright driver and launch all browsers (idempotent)."""
+        async with self._start_lock:
+            if self.started:
+                return
+            if self.closed:
+                raise RuntimeError("Browser pool has been shut down")
+
+            self.loop = asyncio.get_running_loop()
+            self._condition = asyncio.Condition()
+            self.playwright = await async_playwright().start()
+            self.slots = [PooledBrowser(i) for i in range(self.size)]
+            try:
+                await asyncio.gather(*(self._launch(slot) for slot in self.slots))
+            except Exception:
+                await self._teardown()
+                raise
+
+            self.started = True
+            logger.info(f"Browser pool started: {self.size} x {self.browser_type}, "
+                        f"{self.max_contexts_per_browser} contexts each")
+
+    async def _launch(self, slot: PooledBrowser):
+        launcher = getattr(self.playwright, self.browser_type)
+        browser = await launcher.launch(headless=self.headless, **self.launch_options)
+        browser.on("disconnected", lambda _browser: self._on_disconnected(slot, _browser))
+
+        slot.browser = browser
+        slot.active_contexts = 0
+        slot.pages_served = 0
+        slot.launches += 1
+        slot.launched_at = time.monotonic()
+        slot.crashed = False
+        slot.retiring = False
+
+    def _on_disconnected(self, slot: PooledBrowser, browser):
+        # Ignore late events from a browser that has already been replaced
+        if slot.browser is not browser or slot.recycling or self._closing:
+            return
+        logger.warning(f"Pooled browser #{slot.index} disconnected, scheduling relaunch")
+        slot.crashed = True
+        self._schedule_recycle(slot)
+
+    def _pick_slot(self) -> Optional[PooledBrowser]:
+        candidates = [
+            slot for slot in self.slots
+            if slot.available and slot.active_contexts < self.max_contexts_per_browser
+        ]
+        if not candidates:
+            return None
+        # Spread load: prefer the least busy browser
+        return min(candidates, key=lambda slot: (slot.active_contexts, slot.pages_served))
+
+    async def acquire(self, timeout: Optional[float] = None, **context_options) -> BrowserLease:
+        """
+        Wait for a free context slot and open a new BrowserContext on it.
+
+        Args:
+            timeout: Seconds to wait for capacity (default: the pool's ``acquire_timeout``)
+            **context_options: Passed through to ``browser.new_context()``
+
+        Returns:
+            BrowserLease: Must be handed back with ``release()``
+
+        Raises:
+            TimeoutError: No context slot became free within ``timeout``
+        """
+        await self.start()
+        if self._closing:
+            raise RuntimeError("Browser pool is shutting down")
+        if timeout is None:
+            timeout = self.acquire_timeout
+
+        async with self._condition:
+            self._waiting += 1
+            try:
+                await asyncio.wait_for(
+                    self._condition.wait_for(lambda: self._closing or self._pick_slot() is not None),
+                    timeout
+                )
+            except asyncio.TimeoutError:
+                down = sum(1 for slot in self.slots if slot.browser is None)
+                raise TimeoutError(f"No browser context free after {timeout}s "
+                                   f"({down}/{self.size} browsers down)") from None
+            finally:
+                self._waiting -= 1
+            if self._closing:
+                raise RuntimeError("Browser pool is shutting down")
+            slot = self._pick_slot()
+            slot.active_contexts += 1
+
+        try:
+            context = await slot.browser.new_context(**context_options)
+        except Exception:
+            slot.crashed = not slot.browser.is_connected()
+            await self._finish_lease(slot, pages=0)
+            raise
+
+        return BrowserLease(slot, context)
+
+    async def release(self, lease: BrowserLease, crashed: bool = False):
+        """Close a leased context and return its slot to the pool."""
+        slot = lease.slot
+        try:
+            await lease.context.close()
+        except Exception as e:
+            logger.warning(f"Failed to close context on browser #{slot.index}: {str(e)}")
+            crashed = True
+
+        # The slot may already hold a relaunched browser if this one crashed
+        if lease.browser is not slot.browser:
+            return
+        if crashed or not slot.browser.is_connected():
+            slot.crashed = True
+        await self._finish_lease(slot, pages=lease.pages)
+
+    async def _finish_lease(self, slot: PooledBrowser, pages: int):
+        async with self._condition:
+            slot.active_contexts = max(0, slot.active_contexts - 1)
+            slot.pages_served += pages
+            if self.recycle_after_pages and slot.pages_served >= self.recycle_after_pages:
+                slot.retiring = True
+            self._condition.notify_all()
+
+        if (slot.crashed or slot.retiring) and slot.active_contexts == 0:
+            self._schedule_recycle(slot)
+
+    def _schedule_recycle(self, slot: PooledBrowser):
+        if slot.recycling or self._closing:
+            return
+        # Wait for in-flight contexts to drain unless the browser is gone anyway
+        if slot.active_contexts and not slot.crashed:
+            return
+        slot.recycling = True
+        task = self.loop.create_task(self._recycle(slot))
+        self._recycle_tasks.add(task)
+        task.add_done_callback(self._recycle_tasks.discard)
+
+    async def _recycle(self, slot: PooledBrowser):
+        reason = "crash" if slot.crashed else f"{slot.pages_served} pages"
+        logger.info(f"Recycling pooled browser #{slot.index} ({reason})")
+        old_browser = slot.browser
+        try:
+            if old_browser is not None and old_browser.is_connected():
+                await old_browser.close()
+        except Exception as e:
+            logger.warning(f"Error closing browser #{slot.index}: {str(e)}")
+
+        slot.browser = None
+
+        # Keep the slot recycling until a browser comes up, so it is never left empty
+        delay = self.RELAUNCH_BACKOFF
+        try:
+            while not self._closing:
+                try:
+                    await self._launch(slot)
+                    slot.launch_failures = 0
+                    break
+                except Exception as e:
+                    slot.launch_failures += 1
+                    logger.error(f"Failed to relaunch browser #{slot.index} "
+                                 f"(attempt {slot.launch_failures}, retrying in {delay:g}s): {str(e)}")
+                # close() notifies the condition, which cuts the backoff short
+                async with self._condition:
+                    try:
+                        await asyncio.wait_for(self._condition.wait_for(lambda: self._closing), delay)
+                    except asyncio.TimeoutError:
+                        pass
+                delay = min(delay * 2, self.RELAUNCH_BACKOFF_MAX)
+        finally:
+            slot.recycling = False
+            async with self._condition:
+                self._condition.notify_all()
+
+    @asynccontextmanager
+    async def lease(self, timeout: Optional[float] = None, **context_options):
+        """Async context manager yielding a BrowserLease that is always released."""
+        lease = await self.acquire(timeout=timeout, **context_options)
+        crashed = False
+        try:
+            yield lease
+        except Exception:
+            crashed = not lease.browser.is_connected()
+            raise
+        finally:
+            await self.release(lease, crashed=crashed)
+
+    async def close(self, timeout: float = 30.0):
+        """
+        Gracefully shut the pool down.
+
+        New leases are refused immediately; in-flight leases get ``timeout``
+        seconds to finish before the browsers are closed underneath them.
+        """
+        if self.closed:
+            return
+        self._closing = True
+
+        if self.started:
+            async with self._condition:
+                self._condition.notify_all()
+                try:
+                    await asyncio.wait_for(
+                        self._condition.wait_for(
+                            lambda: all(slot.active_contexts == 0 for slot in self.slots)
+                        ),
+                        timeout
+                    )
+                except asyncio.TimeoutError:
+                    logger.warning("Browser pool shutdown timed out with active contexts")
+
+        if self._recycle_tasks:
+            await asyncio.gather(*self._recycle_tasks, return_exceptions=True)
+        await self._teardown()
+        self.closed = True
+        logger.info("Browser pool shut down")
+
+    async def _teardown(self):
+        for slot in self.slots:
+            if slot.browser is not None:
+                try:
+                    await slot.browser.close()
+                except Exception as e:
+                    logger.warning(f"Error closing browser #{slot.index}: {str(e)}")
+                slot.browser = None
+        if self.playwright:
+            await self.playwright.stop()
+            self.playwright = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of pool utilisation for health checks."""
+        return {
+            "browser_type": self.browser_type,
+            "size": self.size,
+            "max_contexts_per_browser": self.max_contexts_per_browser,
+            "recycle_after_pages": self.recycle_after_pages,
+            "acquire_timeout": self.acquire_timeout,
+            "started": self.started,
+            "closed": self.closed,
+            "active_contexts": sum(slot.active_contexts for slot in self.slots),
+            "waiting": self._waiting,
+            "browsers": [slot.stats() for slot in self.slots],
+        }
+
+
+_pool: Optional[BrowserPool] = None
+
+
+async def get_browser_pool() -> BrowserPool:
+    """
+    Return the process-wide browser pool, starting it on first use.
+
+    Playwright objects are bound to the event loop that created them, so a new
+    pool is built if the previous one belongs to a different (closed) loop.
+    """
+    global _pool
+    loop = asyncio.get_running_loop()
+    if _pool is None or _pool.closed or (_pool.loop is not None and _pool.loop is not loop):
+        _pool = BrowserPool.from_env()
+    await _pool.start()
+    return _pool
+
+
+def current_browser_pool() -> Optional[BrowserPool]:
+    """The process-wide pool if one was started (without starting it), e.g. for metrics."""
+    return _pool
+
+
+async def shutdown_browser_pool(timeout: float = 30.0):
+    """Gracefully close the process-wide pool if one is running."""
+    global _pool
+    pool, _pool = _pool, None
+    if pool is not None and pool.started:
+        await pool.close(timeout=timeout)
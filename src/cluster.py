@@ -0,0 +1,989 @@
+"""
+Multi-process scraping: a coordinator that shards work across worker processes.
+
+The Flask app is one process, so rendering, extraction and analysis share a
+single event loop and browser pool however many cores the box has. With
+``SCRAPER_CLUSTER_WORKERS=N`` the app becomes a coordinator: it spawns N
+worker processes, each with its own event loop, browser pool, extraction
+executor and in-memory caches, and hands scrape and analysis work to them.
+
+Work is assigned by rendezvous hashing of the source's domain, so a domain
+keeps landing on the same worker (its readiness profile, HTTP connections and
+browser session stay warm there) and only the domains of a lost worker move
+when the set of workers changes. The coordinator pings every worker, restarts
+crashed ones with backoff (re-sending their unfinished items once) and drains
+workers before stopping them.
+
+Coordinator and workers talk over a ``Transport``. The default is a UNIX
+socket in a private temp directory; a ``host:port`` address uses TCP with the
+same protocol, which is what a network transport would build on.
+"""
+
+import asyncio
+import hashlib
+import itertools
+import math
+import multiprocessing
+import os
+import queue
+import resource
+import secrets
+import shutil
+import signal
+import tempfile
+import threading
+import time
+from datetime import datetime
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import logging
+
+from cpu_pool import spawn_context
+from url_utils import url_domain
+
+logger = logging.getLogger(__name__)
+
+CLUSTER_KINDS = ("scrape", "analyze", "warm")
+WORKER_STATES = ("starting", "ready", "draining", "stopped", "crashed")
+
+# Longest a worker holds a result back while its screenshot is still encoding
+SCREENSHOT_SETTLE_SECONDS = 30.0
+
+
+def shard_key(source: str) -> str:
+    """The part of a source that decides its worker: the domain of a URL, else the source itself."""
+    return url_domain(source) if "://" in source else source.lower()
+
+
+def rendezvous(key: str, worker_ids: Iterable[int]) -> Optional[int]:
+    """
+    The worker with the highest hash for ``key`` (highest random weight).
+
+    Removing a worker only moves the keys that worker owned; every other key
+    keeps its worker, unlike ``hash(key) % n``.
+    """
+    best, best_score = None, None
+    for worker_id in worker_ids:
+        score = hashlib.sha1(f"{worker_id}:{key}".encode("utf-8")).digest()
+        if best_score is None or score > best_score:
+            best, best_score = worker_id, score
+    return best
+
+
+def _error_result(kind: str, source: str, message: str) -> Dict[str, Any]:
+    # Same shapes as WebScraper._error_result and RFPReaderAgent.error_result
+    if kind == "analyze":
+        return {"status": "error", "agent": "rfp_reader", "source": source, "error": message,
+                "timestamp": datetime.now().isoformat()}
+    if kind == "warm":
+        return {"status": "error", "domain": source, "error": message}
+    return {"url": source, "status": "error", "error": message, "content": {}, "meta": {}, "statistics": {}}
+
+
+# ---- transport ------------------------------------------------------------
+
+
+class Transport:
+    """
+    How the coordinator and its workers exchange messages.
+
+    The coordinator calls ``listen`` once and ``accept``s one connection per
+    worker; a worker calls ``connect``. Connections carry picklable dicts via
+    ``send``/``recv``/``close``. A transport must itself be picklable (minus
+    the listener) because it is handed to each spawned worker.
+    """
+
+    def listen(self):
+        raise NotImplementedError
+
+    def accept(self) -> Connection:
+        raise NotImplementedError
+
+    def connect(self) -> Connection:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def describe(self) -> Dict[str, Any]:
+        return {"kind": type(self).__name__}
+
+
+class SocketTransport(Transport):
+    """
+    Authenticated ``multiprocessing.connection`` sockets.
+
+    Without an address it listens on a UNIX socket in a private temp
+    directory; ``"host:port"`` listens on TCP instead (set ``authkey`` to the
+    same secret on every host then).
+    """
+
+    def __init__(self, address: Optional[str] = None, authkey: Optional[bytes] = None):
+        self.authkey = authkey or secrets.token_bytes(32)
+        self._tempdir: Optional[str] = None
+        self._listener: Optional[Listener] = None
+        if address and ":" in address:
+            host, _, port = address.rpartition(":")
+            self.address: Any = (host, int(port))
+        else:
+            self.address = address
+
+    @property
+    def family(self) -> str:
+        return "tcp" if isinstance(self.address, tuple) else "unix"
+
+    def listen(self):
+        if self.address is None:
+            self._tempdir = tempfile.mkdtemp(prefix="scraper-cluster-")
+            self.address = os.path.join(self._tempdir, "coordinator.sock")
+        self._listener = Listener(self.address, authkey=self.authkey)
+        # Port 0 picks a free port; workers need the real one
+        self.address = self._listener.address
+
+    def accept(self) -> Connection:
+        return self._listener.accept()
+
+    def connect(self) -> Connection:
+        return Client(self.address, authkey=self.authkey)
+
+    def close(self):
+        if self._listener is not None:
+            self._listener.close()
+            self._listener = None
+        if self._tempdir is not None:
+            shutil.rmtree(self._tempdir, ignore_errors=True)
+            self._tempdir = None
+
+    def describe(self) -> Dict[str, Any]:
+        address = self.address if self.family == "unix" else f"{self.address[0]}:{self.address[1]}"
+        return {"kind": self.family, "address": address}
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state["_listener"] = None
+        state["_tempdir"] = None  # only the coordinator removes it
+        return state
+
+
+# ---- coordinator ------------------------------------------------------------
+
+
+class ClusterBatch:
+    """
+    Results of one submission, in completion order.
+
+    Iterate it with ``for`` (synchronous submissions) or ``async for``
+    (submissions made with a ``loop``). Every source yields exactly one result
+    carrying its ``index`` into the submitted sources; closing the iterator
+    early cancels what is still running.
+    """
+
+    def __init__(self, coordinator: "Coordinator", kind: str, sources: List[str],
+                 loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.coordinator = coordinator
+        self.kind = kind
+        self.sources = sources
+        self.total = len(sources)
+        self.delivered = 0
+        self.loop = loop
+        self.requests: List["_Request"] = []
+        self.shards: Dict[int, Dict[str, Any]] = {}
+        self._queue = asyncio.Queue() if loop is not None else queue.Queue()
+
+    def _put(self, result: Dict[str, Any]):
+        if self.loop is None:
+            self._queue.put(result)
+            return
+        try:
+            self.loop.call_soon_threadsafe(self._queue.put_nowait, result)
+        except RuntimeError:
+            pass  # the loop is gone; nobody is waiting any more
+
+    def _deliver(self, index: int, result: Dict[str, Any]):
+        self.delivered += 1
+        self._put({**result, "index": index})
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        if self.loop is not None:
+            raise TypeError("Batch was submitted with a loop; use async for")
+        try:
+            for _ in range(self.total):
+                yield self._queue.get()
+        finally:
+            self.cancel()
+
+    async def __aiter__(self):
+        if self.loop is None:
+            raise TypeError("Batch was submitted without a loop; use for")
+        try:
+            for _ in range(self.total):
+                yield await self._queue.get()
+        finally:
+            self.cancel()
+
+    def cancel(self):
+        """Stop whatever is still running for this batch."""
+        self.coordinator._cancel(self)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "items": self.total,
+            "delivered": self.delivered,
+            "retried": sum(request.attempts for request in self.requests),
+            "workers": {str(worker_id): shard for worker_id, shard in sorted(self.shards.items())},
+        }
+
+
+class _Request:
+    """The part of a batch sent to one worker."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, batch: ClusterBatch, key: str, items: Dict[int, str], params: Dict[str, Any],
+                 options: Dict[str, Any]):
+        self.id = next(self._ids)
+        self.batch = batch
+        self.key = key
+        self.items = items  # index -> source, still waiting for a result
+        self.params = params
+        self.options = options
+        self.worker: Optional[int] = None
+        self.attempts = 0
+        self.cancelled = False
+
+    def message(self) -> Dict[str, Any]:
+        return {"type": "run", "id": self.id, "kind": self.batch.kind, "items": list(self.items.items()),
+                "params": self.params, "options": self.options}
+
+
+class WorkerHandle:
+    """Coordinator-side state of one worker slot (kept across restarts)."""
+
+    def __init__(self, worker_id: int):
+        self.id = worker_id
+        self.process: Optional[multiprocessing.Process] = None
+        self.conn: Optional[Connection] = None
+        self.state = "stopped"
+        self.pid: Optional[int] = None
+        self.started_at = 0.0
+        self.ready_at = 0.0
+        self.last_seen = 0.0
+        self.last_stats: Dict[str, Any] = {}
+        self.requests: Dict[int, _Request] = {}
+        self.waiting: List[_Request] = []  # routed here while it starts
+        self.send_lock = threading.Lock()
+        self.restarts = 0
+        self.crashes_in_row = 0
+        self.restart_at = 0.0
+        self.restart_after_drain = False
+        self.drain_started = 0.0
+        self.last_error: Optional[str] = None
+
+    def describe(self, now: float) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "state": self.state,
+            "pid": self.pid,
+            "requests": len(self.requests) + len(self.waiting),
+            "restarts": self.restarts,
+            "uptime_s": round(now - self.ready_at, 1) if self.state in ("ready", "draining") else None,
+            "last_seen_s": round(now - self.last_seen, 1) if self.last_seen else None,
+            "last_error": self.last_error,
+            **{key: self.last_stats.get(key) for key in ("in_flight", "completed", "failed", "rss_mb", "browser")},
+        }
+
+
+class Coordinator:
+    """
+    Spawns worker processes and routes work to them by domain.
+
+    ``submit`` splits sources by their home worker and returns a
+    ``ClusterBatch`` to iterate; ``call`` runs one source and returns its
+    result. A monitor thread pings workers every ``health_interval`` seconds,
+    restarts those that exit or stop answering for ``health_timeout``
+    seconds, and re-sends their unfinished items (``retries`` times).
+    """
+
+    def __init__(self,
+                 workers: int = 2,
+                 transport: Optional[Transport] = None,
+                 health_interval: float = 5.0,
+                 health_timeout: float = 30.0,
+                 start_timeout: float = 60.0,
+                 retries: int = 1,
+                 max_restart_delay: float = 60.0,
+                 drain_timeout: float = 60.0,
+                 worker_env: Optional[Dict[str, str]] = None):
+        """
+        Args:
+            workers (int): Number of worker processes
+            transport (Transport, optional): Defaults to a UNIX socket
+            health_interval (float): Seconds between health pings
+            health_timeout (float): A worker silent this long is killed and restarted
+            start_timeout (float): A worker not ready this long after spawning is restarted
+            retries (int): Times a crashed worker's unfinished items are re-sent
+            max_restart_delay (float): Cap on the backoff between restarts of a crashing worker
+            drain_timeout (float): Longest a draining worker may take to finish its in-flight work
+            worker_env (Dict[str, str], optional): Extra environment for the workers
+        """
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.size = workers
+        self.transport = transport or SocketTransport()
+        self.health_interval = health_interval
+        self.health_timeout = health_timeout
+        self.start_timeout = start_timeout
+        self.retries = retries
+        self.max_restart_delay = max_restart_delay
+        self.drain_timeout = drain_timeout
+        self.worker_env = dict(worker_env or {})
+        # Workers run the same components; they must never start clusters of their own
+        self.worker_env["SCRAPER_CLUSTER_WORKERS"] = "0"
+        self.worker_env.setdefault(
+            "SCRAPER_EXTRACTION_WORKERS",
+            os.environ.get("SCRAPER_EXTRACTION_WORKERS") or str(max(1, (os.cpu_count() or 2) // workers))
+        )
+
+        self.workers = {worker_id: WorkerHandle(worker_id) for worker_id in range(workers)}
+        self._lock = threading.RLock()
+        self._ready = threading.Condition(self._lock)
+        self._backlog: List[_Request] = []
+        self._pings = itertools.count(1)
+        self._started = False
+        self._closing = False
+        self._threads: List[threading.Thread] = []
+        self.counters = {"submitted": 0, "completed": 0, "failed": 0, "retried": 0, "crashes": 0,
+                         "restarts": 0, "unhealthy": 0}
+
+    @classmethod
+    def from_env(cls) -> Optional["Coordinator"]:
+        """Coordinator configured from SCRAPER_CLUSTER_* (None unless ``SCRAPER_CLUSTER_WORKERS`` > 0)."""
+        workers = int(os.environ.get("SCRAPER_CLUSTER_WORKERS", "0") or 0)
+        if workers < 1:
+            return None
+        authkey = os.environ.get("SCRAPER_CLUSTER_AUTHKEY")
+        return cls(
+            workers=workers,
+            transport=SocketTransport(os.environ.get("SCRAPER_CLUSTER_ADDRESS"),
+                                      authkey.encode("utf-8") if authkey else None),
+            health_interval=float(os.environ.get("SCRAPER_CLUSTER_HEALTH_INTERVAL", "5")),
+            health_timeout=float(os.environ.get("SCRAPER_CLUSTER_HEALTH_TIMEOUT", "30")),
+            retries=int(os.environ.get("SCRAPER_CLUSTER_RETRIES", "1")),
+            drain_timeout=float(os.environ.get("SCRAPER_CLUSTER_DRAIN_TIMEOUT", "60")),
+        )
+
+    # ---- lifecycle --------------------------------------------------------
+
+    def start(self, wait: Optional[float] = None):
+        """Listen, spawn every worker, and optionally wait up to ``wait`` seconds for them to be ready."""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+            self.transport.listen()
+        for target, name in ((self._accept_loop, "cluster-accept"), (self._monitor_loop, "cluster-monitor")):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        for handle in self.workers.values():
+            self._spawn(handle)
+        logger.info(f"🧩 Cluster started: {self.size} workers on {self.transport.describe()}")
+        if wait:
+            self.wait_ready(wait)
+
+    def wait_ready(self, timeout: float) -> bool:
+        """Block until every worker is ready (False on timeout)."""
+        deadline = time.monotonic() + timeout
+        with self._ready:
+            while any(handle.state != "ready" for handle in self.workers.values()):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._ready.wait(remaining)
+        return True
+
+    def _spawn(self, handle: WorkerHandle):
+        process = spawn_context().Process(
+            target=run_worker,
+            args=(handle.id, self.size, self.transport, self.worker_env),
+            name=f"scraper-worker-{handle.id}",
+            # Not a daemon: workers start their own extraction processes
+            daemon=False,
+        )
+        with self._lock:
+            handle.process = process
+            handle.state = "starting"
+            handle.started_at = time.monotonic()
+            handle.conn = None
+            handle.last_stats = {}
+            # Under the lock so the worker's hello cannot be checked against the old pid
+            process.start()
+            handle.pid = process.pid
+
+    def _accept_loop(self):
+        while not self._closing:
+            try:
+                conn = self.transport.accept()
+                hello = conn.recv()
+            except Exception as e:
+                if self._closing:
+                    return
+                logger.warning(f"Rejected a cluster connection: {str(e)}")
+                continue
+            handle = self.workers.get(hello.get("worker")) if isinstance(hello, dict) else None
+            with self._lock:
+                if handle is None or hello.get("pid") != handle.pid or handle.state != "starting":
+                    conn.close()  # a stale or unknown process
+                    continue
+                threading.Thread(target=self._read_loop, args=(handle, conn),
+                                 name=f"cluster-worker-{handle.id}", daemon=True).start()
+                handle.conn = conn
+                handle.state = "ready"
+                handle.ready_at = handle.last_seen = time.monotonic()
+                handle.last_error = None
+                waiting, handle.waiting = handle.waiting, []
+                backlog, self._backlog = self._backlog, []
+                self._ready.notify_all()
+            logger.info(f"✅ Cluster worker {handle.id} ready (pid {handle.pid})")
+            for request in waiting + backlog:
+                self._route(request)
+
+    def _monitor_loop(self):
+        while not self._closing:
+            time.sleep(min(self.health_interval, 1.0))
+            now = time.monotonic()
+            for handle in list(self.workers.values()):
+                if self._closing:
+                    return
+                process = handle.process
+                if handle.state in ("starting", "ready", "draining") and process is not None and not process.is_alive():
+                    self._lost(handle, f"exited with code {process.exitcode}")
+                elif handle.state == "starting" and now - handle.started_at > self.start_timeout:
+                    self.counters["unhealthy"] += 1
+                    self._kill(handle)
+                    self._lost(handle, f"not ready after {self.start_timeout:.0f}s")
+                elif handle.state == "ready" and now - handle.last_seen > self.health_timeout:
+                    self.counters["unhealthy"] += 1
+                    self._kill(handle)
+                    self._lost(handle, f"unresponsive for {now - handle.last_seen:.0f}s")
+                elif handle.state == "draining" and now - handle.drain_started > self.drain_timeout + self.health_timeout:
+                    self._kill(handle)
+                    self._lost(handle, f"did not finish draining in {self.drain_timeout:.0f}s")
+                elif handle.state == "ready" and now - handle.last_stats.get("pinged_at", 0) >= self.health_interval:
+                    handle.last_stats["pinged_at"] = now
+                    self._send(handle, {"type": "ping", "seq": next(self._pings)})
+                elif handle.state == "crashed" and now >= handle.restart_at:
+                    self.counters["restarts"] += 1
+                    handle.restarts += 1
+                    self._spawn(handle)
+                elif handle.state == "stopped" and handle.restart_after_drain:
+                    handle.restart_after_drain = False
+                    handle.restarts += 1
+                    self._spawn(handle)
+
+    def _read_loop(self, handle: WorkerHandle, conn: Connection):
+        while True:
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                break
+            handle.last_seen = time.monotonic()
+            kind = message.get("type")
+            if kind == "item":
+                self._on_item(handle, message)
+            elif kind == "done":
+                self._on_done(handle, message)
+            elif kind == "pong":
+                pinged_at = handle.last_stats.get("pinged_at", 0)
+                handle.last_stats = {**message["stats"], "pinged_at": pinged_at}
+                # A worker that stayed up a while is no longer "crashing"
+                if handle.last_seen - handle.ready_at > self.max_restart_delay:
+                    handle.crashes_in_row = 0
+            elif kind == "bye":
+                with self._lock:
+                    if handle.conn is conn:
+                        handle.state = "stopped"
+        with self._lock:
+            current = handle.conn is conn
+        if current:
+            self._lost(handle, "closed its connection")
+
+    def _on_item(self, handle: WorkerHandle, message: Dict[str, Any]):
+        with self._lock:
+            request = handle.requests.get(message["id"])
+            if request is None or request.items.pop(message["index"], None) is None:
+                return  # cancelled, or already answered
+            self.counters["completed"] += 1
+            request.batch.shards.setdefault(handle.id, {"items": 0})["items"] += 1
+        request.batch._deliver(message["index"], message["result"])
+
+    def _on_done(self, handle: WorkerHandle, message: Dict[str, Any]):
+        with self._lock:
+            request = handle.requests.pop(message["id"], None)
+            if request is None:
+                return
+            if message.get("stats"):
+                request.batch.shards.setdefault(handle.id, {"items": 0})["stats"] = message["stats"]
+            missing = dict(request.items)
+            request.items.clear()
+        # A worker-side failure (``error``) fails whatever it had not answered
+        for index, source in missing.items():
+            self._fail_item(request, index, source, message.get("error") or "Worker returned no result")
+
+    def _fail_item(self, request: _Request, index: int, source: str, error: str):
+        with self._lock:
+            self.counters["failed"] += 1
+        request.batch._deliver(index, _error_result(request.batch.kind, source, error))
+
+    def _kill(self, handle: WorkerHandle):
+        # The whole process group: a killed worker would orphan its extraction processes
+        if handle.pid is not None and hasattr(os, "killpg"):
+            try:
+                os.killpg(handle.pid, signal.SIGKILL)
+            except (ProcessLookupError, PermissionError):
+                pass
+        process = handle.process
+        if process is not None and process.is_alive():
+            process.kill()
+
+    def _lost(self, handle: WorkerHandle, reason: str):
+        """A worker's process or connection went away: re-route or fail what it was running."""
+        with self._lock:
+            if handle.state == "crashed" or (handle.state == "stopped" and handle.conn is None):
+                return
+            # Exiting after (or while) draining is not a crash
+            drained = handle.state in ("stopped", "draining")
+            conn, handle.conn = handle.conn, None
+            orphans = list(handle.requests.values()) + handle.waiting
+            handle.requests = {}
+            handle.waiting = []
+            if drained or self._closing:
+                handle.state = "stopped"
+            else:
+                handle.state = "crashed"
+                handle.last_error = reason
+                handle.crashes_in_row += 1
+                self.counters["crashes"] += 1
+                delay = min(self.max_restart_delay, 2 ** (handle.crashes_in_row - 1))
+                handle.restart_at = time.monotonic() + delay
+            self._ready.notify_all()
+        if conn is not None:
+            conn.close()
+        if not drained:
+            logger.warning(f"💥 Cluster worker {handle.id} {reason}; {len(orphans)} requests affected")
+            self._kill(handle)
+        for request in orphans:
+            if request.cancelled or not request.items:
+                continue
+            request.attempts += 1
+            if request.attempts > self.retries or self._closing:
+                for index, source in list(request.items.items()):
+                    request.items.pop(index)
+                    self._fail_item(request, index, source, f"Cluster worker {handle.id} {reason}")
+            else:
+                self.counters["retried"] += len(request.items)
+                self._route(request)
+
+    # ---- routing ----------------------------------------------------------
+
+    def home(self, source: str) -> int:
+        """The worker a source belongs to when every worker is up."""
+        return rendezvous(shard_key(source), self.workers)
+
+    def _route(self, request: _Request):
+        """Send a request to the best available worker for its key (or park it until one is)."""
+        with self._lock:
+            if self._closing:
+                target = None
+            else:
+                candidates = [worker_id for worker_id, handle in self.workers.items()
+                              if handle.state in ("ready", "starting")]
+                target = self.workers[rendezvous(request.key, candidates)] if candidates else None
+            if target is None:
+                if not self._closing:
+                    self._backlog.append(request)
+                    return
+            elif target.state == "starting":
+                request.worker = target.id
+                target.waiting.append(request)
+                return
+            else:
+                request.worker = target.id
+                target.requests[request.id] = request
+        if target is None:
+            for index, source in list(request.items.items()):
+                request.items.pop(index)
+                self._fail_item(request, index, source, "Cluster is shutting down")
+            return
+        self._send(target, request.message())
+
+    def _send(self, handle: WorkerHandle, message: Dict[str, Any]) -> bool:
+        conn = handle.conn
+        if conn is None:
+            return False
+        try:
+            with handle.send_lock:
+                conn.send(message)
+            return True
+        except (OSError, ValueError) as e:
+            self._lost(handle, f"could not be reached: {str(e)}")
+            return False
+
+    def submit(self, kind: str, sources: Iterable[str], options: Optional[Dict[str, Any]] = None,
+               loop: Optional[asyncio.AbstractEventLoop] = None, **params) -> ClusterBatch:
+        """
+        Start running ``sources`` on their home workers.
+
+        Args:
+            kind (str): ``scrape``, ``analyze`` or ``warm``
+            sources: URLs (or domains for ``warm``)
+            options (Dict, optional): Per-source options, e.g. ``scrape_page`` keyword arguments
+            loop (AbstractEventLoop, optional): Deliver results to this loop for ``async for``
+            **params: Batch settings: ``concurrency`` (split across workers by
+                their share of the sources), ``per_host_limit``, ``item_timeout``
+
+        Returns:
+            ClusterBatch: Iterable of results with their ``index``
+        """
+        if kind not in CLUSTER_KINDS:
+            raise ValueError(f"kind must be one of: {', '.join(CLUSTER_KINDS)}")
+        if self._closing:
+            raise RuntimeError("Cluster is shutting down")
+        self.start()
+        sources = list(sources)
+        batch = ClusterBatch(self, kind, sources, loop)
+        groups: Dict[int, Dict[int, str]] = {}
+        for index, source in enumerate(sources):
+            groups.setdefault(self.home(source), {})[index] = source
+        concurrency = params.get("concurrency")
+        for worker_id, items in groups.items():
+            shard_params = dict(params)
+            if concurrency:
+                shard_params["concurrency"] = max(1, math.ceil(concurrency * len(items) / len(sources)))
+            # All of a group share the home worker; any of its keys routes the same way
+            request = _Request(batch, shard_key(next(iter(items.values()))), items, shard_params, options or {})
+            batch.requests.append(request)
+        with self._lock:
+            self.counters["submitted"] += len(sources)
+        for request in batch.requests:
+            self._route(request)
+        return batch
+
+    def call(self, kind: str, source: str, options: Optional[Dict[str, Any]] = None, **params) -> Dict[str, Any]:
+        """Run one source and block for its result."""
+        result = self.submit(kind, [source], options, **params)._queue.get()
+        result.pop("index", None)
+        return result
+
+    async def acall(self, kind: str, source: str, options: Optional[Dict[str, Any]] = None, **params) -> Dict[str, Any]:
+        """Run one source from a coroutine."""
+        batch = self.submit(kind, [source], options, loop=asyncio.get_running_loop(), **params)
+        try:
+            result = await batch._queue.get()
+        finally:
+            batch.cancel()
+        result.pop("index", None)
+        return result
+
+    def _cancel(self, batch: ClusterBatch):
+        cancels = []
+        with self._lock:
+            for request in batch.requests:
+                if request.cancelled or not request.items:
+                    continue
+                request.cancelled = True
+                request.items.clear()
+                if request in self._backlog:
+                    self._backlog.remove(request)
+                handle = self.workers.get(request.worker)
+                if handle is None:
+                    continue
+                if request in handle.waiting:
+                    handle.waiting.remove(request)
+                elif handle.requests.pop(request.id, None) is not None:
+                    cancels.append((handle, request.id))
+        for handle, request_id in cancels:
+            self._send(handle, {"type": "cancel", "id": request_id})
+
+    def broadcast(self, message: Dict[str, Any]):
+        """Send a control message (e.g. ``{"type": "sessions", "domain": ...}``) to every ready worker."""
+        for handle in list(self.workers.values()):
+            if handle.state == "ready":
+                self._send(handle, message)
+
+    # ---- draining -----------------------------------------------------------
+
+    def drain(self, worker_id: int, restart: bool = False) -> bool:
+        """
+        Stop routing work to a worker and stop it once its in-flight work is done.
+
+        New work for its domains goes to their next-best worker meanwhile.
+        With ``restart`` the worker is started again afterwards (a rolling
+        restart). Returns False if the worker is not running.
+        """
+        handle = self.workers.get(worker_id)
+        if handle is None:
+            raise KeyError(worker_id)
+        with self._lock:
+            if handle.state != "ready":
+                return False
+            handle.state = "draining"
+            handle.drain_started = time.monotonic()
+            handle.restart_after_drain = restart
+        logger.info(f"🚰 Draining cluster worker {worker_id}")
+        return self._send(handle, {"type": "stop", "timeout": self.drain_timeout})
+
+    def close(self, timeout: float = 30.0):
+        """Drain every worker, wait up to ``timeout`` seconds for them to exit, then kill stragglers."""
+        with self._lock:
+            if not self._started or self._closing:
+                return
+            # No new work, no restarts; results of draining workers still arrive
+            self._closing = True
+        for handle in self.workers.values():
+            if not self.drain(handle.id):
+                self._kill(handle)
+        deadline = time.monotonic() + timeout
+        for handle in self.workers.values():
+            if handle.process is not None:
+                handle.process.join(max(0.0, deadline - time.monotonic()))
+        for handle in self.workers.values():
+            if handle.process is not None and handle.process.is_alive():
+                logger.warning(f"Cluster worker {handle.id} did not stop in time; killing it")
+                self._kill(handle)
+                handle.process.join(5)
+            self._lost(handle, "stopped")
+        backlog, self._backlog = self._backlog, []
+        for request in backlog:
+            self._route(request)  # fails them: the cluster is closing
+        self.transport.close()
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            workers = [handle.describe(now) for handle in self.workers.values()]
+            backlog = len(self._backlog)
+        states = {state: sum(1 for worker in workers if worker["state"] == state) for state in WORKER_STATES}
+        return {
+            "workers": self.size,
+            "states": states,
+            "transport": self.transport.describe(),
+            "backlog": backlog,
+            **self.counters,
+            "per_worker": workers,
+        }
+
+
+# ---- worker -----------------------------------------------------------------
+
+
+def run_worker(worker_id: int, size: int, transport: Transport, env: Dict[str, str]):
+    """Entry point of a worker process: connect to the coordinator and serve until told to stop."""
+    os.environ.update(env)
+    if hasattr(os, "setpgrp"):
+        os.setpgrp()  # so the coordinator can kill it together with its children
+    logging.basicConfig(level=logging.INFO, format=f"%(asctime)s [worker {worker_id}] %(levelname)s %(message)s")
+    WorkerRuntime(worker_id, size, transport.connect()).serve()
+
+
+class WorkerRuntime:
+    """Runs the coordinator's requests on this process's background loop."""
+
+    def __init__(self, worker_id: int, size: int, conn: Connection):
+        self.id = worker_id
+        self.size = size
+        self.conn = conn
+        self.send_lock = threading.Lock()
+        self.tasks: Dict[int, Any] = {}
+        self.started_at = time.monotonic()
+        self.counters = {"completed": 0, "failed": 0, "items": 0}
+
+    def send(self, message: Dict[str, Any]):
+        with self.send_lock:
+            self.conn.send(message)
+
+    def owns(self, domain: str) -> bool:
+        return rendezvous(shard_key(domain), range(self.size)) == self.id
+
+    def serve(self):
+        from async_runtime import get_background_loop
+        from session_cache import get_session_cache
+        from web_scraper import warm_session
+
+        loop = get_background_loop()
+        sessions = get_session_cache()
+        if sessions is not None:
+            # Each worker keeps the sessions of the domains it is home to warm
+            async def start():
+                sessions.start(warm_session, owns=self.owns)
+
+            loop.run(start())
+        self.send({"type": "hello", "worker": self.id, "pid": os.getpid()})
+        drain_timeout = 30.0
+        try:
+            while True:
+                try:
+                    message = self.conn.recv()
+                except (EOFError, OSError):
+                    logger.warning("Lost the coordinator; stopping")
+                    break
+                kind = message.get("type")
+                if kind == "run":
+                    future = loop.submit(self._run(message))
+                    self.tasks[message["id"]] = future
+                    future.add_done_callback(lambda _, request_id=message["id"]: self.tasks.pop(request_id, None))
+                elif kind == "cancel":
+                    future = self.tasks.pop(message["id"], None)
+                    if future is not None:
+                        future.cancel()
+                elif kind == "ping":
+                    self.send({"type": "pong", "seq": message["seq"], "stats": self.stats()})
+                elif kind == "sessions" and sessions is not None:
+                    sessions.reload(message.get("domain"))
+                elif kind == "stop":
+                    drain_timeout = message.get("timeout", drain_timeout)
+                    break
+        finally:
+            self._drain(drain_timeout)
+            from async_runtime import stop_background_loop
+            from cpu_pool import shutdown_extraction_executor
+            stop_background_loop(_shutdown_worker())
+            shutdown_extraction_executor()
+            try:
+                self.send({"type": "bye", "worker": self.id})
+            except (OSError, ValueError):
+                pass
+            self.conn.close()
+
+    def _drain(self, timeout: float):
+        deadline = time.monotonic() + timeout
+        for future in list(self.tasks.values()):
+            try:
+                future.result(max(0.0, deadline - time.monotonic()))
+            except Exception:
+                future.cancel()
+
+    async def _run(self, message: Dict[str, Any]):
+        request_id = message["id"]
+        items: List[Tuple[int, str]] = message["items"]
+        stats = None
+        try:
+            handler = {"scrape": self._scrape, "analyze": self._analyze, "warm": self._warm}[message["kind"]]
+            stats = await handler(request_id, items, message["params"], message["options"])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"❌ Request {request_id} failed: {str(e)}")
+            self.counters["failed"] += 1
+            self.send({"type": "done", "id": request_id, "error": str(e) or type(e).__name__})
+            return
+        self.counters["completed"] += 1
+        self.send({"type": "done", "id": request_id, "stats": stats})
+
+    def _item(self, request_id: int, index: int, result: Dict[str, Any]):
+        self.counters["items"] += 1
+        self.send({"type": "item", "id": request_id, "index": index, "result": result})
+
+    async def _scrape(self, request_id: int, items: List[Tuple[int, str]], params: Dict[str, Any],
+                      options: Dict[str, Any]):
+        from screenshots import get_screenshot_pipeline
+        from web_scraper import iter_scrape_many
+
+        urls = [source for _, source in items]
+        async for result in iter_scrape_many(urls,
+                                             concurrency=params.get("concurrency", 1),
+                                             per_host_limit=params.get("per_host_limit", 2),
+                                             **options):
+            handle = result.get("screenshot_status")
+            if handle and handle.get("status") == "pending":
+                # Handles live in this process; finish encoding so the coordinator finds the files
+                result["screenshot_status"] = await asyncio.to_thread(
+                    get_screenshot_pipeline().wait, handle["id"], SCREENSHOT_SETTLE_SECONDS
+                ) or handle
+            self._item(request_id, items[result.pop("index")][0], result)
+        return None
+
+    async def _analyze(self, request_id: int, items: List[Tuple[int, str]], params: Dict[str, Any],
+                       options: Dict[str, Any]):
+        from pipeline import RFPPipeline
+
+        pipeline = RFPPipeline(item_timeout=params.get("item_timeout", 600.0), **options)
+        async for result in pipeline.run([source for _, source in items]):
+            index = items[result["pipeline"]["index"]][0]
+            result["pipeline"]["index"] = index
+            self._item(request_id, index, result)
+        return pipeline.stats()
+
+    async def _warm(self, request_id: int, items: List[Tuple[int, str]], params: Dict[str, Any],
+                    options: Dict[str, Any]):
+        from session_cache import get_session_cache
+        from web_scraper import warm_session
+
+        sessions = get_session_cache()
+        for index, domain in items:
+            if sessions is None:
+                raise RuntimeError("Session caching is disabled")
+            await asyncio.to_thread(sessions.reload, domain)
+            recipe = sessions.recipe_for(domain)
+            if recipe is None:
+                self._item(request_id, index, _error_result("warm", domain, "No navigation recipe for this domain"))
+                continue
+            try:
+                session = await warm_session(recipe)
+            except Exception as e:
+                sessions.record_failure(recipe.domain, e)
+                self._item(request_id, index, _error_result("warm", domain, f"Recipe failed: {str(e)}"))
+                continue
+            self._item(request_id, index, {"status": "success", "session": session})
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        from browser_pool import current_browser_pool
+
+        pool = current_browser_pool()
+        # ru_maxrss is in kilobytes on Linux
+        rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        return {
+            "pid": os.getpid(),
+            "in_flight": len(self.tasks),
+            "uptime_s": round(time.monotonic() - self.started_at, 1),
+            "rss_mb": round(rss_mb, 1),
+            "browser": pool.stats() if pool is not None and pool.started else None,
+            **self.counters,
+        }
+
+
+async def _shutdown_worker():
+    from browser_pool import shutdown_browser_pool
+    from http_fetch import get_http_fetcher
+    from screenshots import get_screenshot_pipeline
+    from session_cache import get_session_cache
+
+    sessions = get_session_cache()
+    if sessions is not None:
+        await sessions.stop()
+    await get_screenshot_pipeline().drain()
+    await get_http_fetcher().close()
+    await shutdown_browser_pool()
+
+
+_coordinator: Optional[Coordinator] = None
+_coordinator_initialized = False
+_coordinator_lock = threading.Lock()
+
+
+def get_coordinator() -> Optional[Coordinator]:
+    """Return the process-wide coordinator (started), or None when clustering is off."""
+    global _coordinator, _coordinator_initialized
+    with _coordinator_lock:
+        if not _coordinator_initialized:
+            _coordinator = Coordinator.from_env()
+            _coordinator_initialized = True
+            if _coordinator is not None:
+                _coordinator.start()
+        return _coordinator
+
+
+def current_coordinator() -> Optional[Coordinator]:
+    """The coordinator if one was started, without starting it."""
+    return _coordinator
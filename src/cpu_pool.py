@@ -0,0 +1,190 @@
+import asyncio
+import importlib.util
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+EXECUTOR_KINDS = ("process", "thread", "inline")
+
+
+def spawn_context() -> multiprocessing.context.BaseContext:
+    """
+    Spawn context whose children start from ``worker_main``, not the parent's script.
+
+    Spawn re-runs a script ``__main__`` (e.g. ``python app.py``) in every child;
+    giving it the spec of the import-free ``worker_main`` module makes the
+    children import that instead. Targets and tasks sent to the children are
+    module-level functions of importable modules, never of the script itself.
+    """
+    main = sys.modules.get("__main__")
+    if main is not None and getattr(main, "__spec__", None) is None and getattr(main, "__file__", None):
+        main.__spec__ = importlib.util.find_spec("worker_main")
+    return multiprocessing.get_context("spawn")
+
+
+def _timed_call(fn: Callable, args: Tuple) -> Tuple[Any, float, float]:
+    # Wall-clock stamps so queue time can be measured across processes
+    started = time.time()
+    result = fn(*args)
+    return result, started, time.time()
+
+
+class ExtractionExecutor:
+    """
+    Runs CPU-bound parsing/extraction away from the event loop.
+
+    ``process`` uses a spawn-based ProcessPoolExecutor so extraction scales
+    across cores; ``thread`` keeps the loop responsive without the pickling
+    cost (useful for small pages); ``inline`` runs on the loop for debugging.
+    Tracks how long tasks waited for a worker versus how long they ran.
+    """
+
+    def __init__(self, kind: str = "process", max_workers: Optional[int] = None):
+        if kind not in EXECUTOR_KINDS:
+            raise ValueError(f"kind must be one of: {', '.join(EXECUTOR_KINDS)}")
+        self.kind = kind
+        self.max_workers = max_workers or max(1, (os.cpu_count() or 2) - 1)
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.in_flight = 0
+        self.total_queued_ms = 0.0
+        self.total_exec_ms = 0.0
+        self.max_queued_ms = 0.0
+
+    @classmethod
+    def from_env(cls) -> "ExtractionExecutor":
+        workers = os.environ.get("SCRAPER_EXTRACTION_WORKERS")
+        return cls(
+            kind=os.environ.get("SCRAPER_EXTRACTION_EXECUTOR", "process"),
+            max_workers=int(workers) if workers else None,
+        )
+
+    def _get_executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                if self.kind == "process":
+                    # Spawn, not fork: the parent runs browser and event-loop threads
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        mp_context=spawn_context()
+                    )
+                else:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix="extraction"
+                    )
+            return self._executor
+
+    def _reset_broken(self, broken: Executor):
+        with self._lock:
+            if self._executor is broken:
+                self._executor = None
+        broken.shutdown(wait=False)
+
+    async def run_timed(self, fn: Callable, *args) -> Tuple[Any, Dict]:
+        """
+        Run ``fn(*args)`` on the executor.
+
+        ``fn`` and its arguments must be picklable for the process executor
+        (module-level functions and plain data such as the raw HTML string).
+
+        Returns:
+            Tuple[Any, Dict]: The result and its queued/exec timings in ms
+        """
+        submitted_at = time.time()
+        self.submitted += 1
+        self.in_flight += 1
+        try:
+            if self.kind == "inline":
+                result, started, finished = _timed_call(fn, args)
+            else:
+                loop = asyncio.get_running_loop()
+                executor = self._get_executor()
+                try:
+                    result, started, finished = await loop.run_in_executor(
+                        executor, _timed_call, fn, args
+                    )
+                except BrokenProcessPool:
+                    # A worker died (e.g. OOM on a huge page); rebuild and retry once
+                    logger.warning("Extraction process pool broke, restarting it")
+                    self._reset_broken(executor)
+                    result, started, finished = await loop.run_in_executor(
+                        self._get_executor(), _timed_call, fn, args
+                    )
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.in_flight -= 1
+
+        queued_ms = max(0.0, (started - submitted_at) * 1000)
+        exec_ms = (finished - started) * 1000
+        self.completed += 1
+        self.total_queued_ms += queued_ms
+        self.total_exec_ms += exec_ms
+        self.max_queued_ms = max(self.max_queued_ms, queued_ms)
+
+        return result, {
+            "executor": self.kind,
+            "queued_ms": round(queued_ms, 1),
+            "exec_ms": round(exec_ms, 1),
+        }
+
+    async def run(self, fn: Callable, *args) -> Any:
+        result, _ = await self.run_timed(fn, *args)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        completed = self.completed or 1
+        return {
+            "executor": self.kind,
+            "max_workers": self.max_workers,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "in_flight": self.in_flight,
+            "avg_queued_ms": round(self.total_queued_ms / completed, 1),
+            "avg_exec_ms": round(self.total_exec_ms / completed, 1),
+            "max_queued_ms": round(self.max_queued_ms, 1),
+            "total_queued_ms": round(self.total_queued_ms, 1),
+            "total_exec_ms": round(self.total_exec_ms, 1),
+        }
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+
+_executor: Optional[ExtractionExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_extraction_executor() -> ExtractionExecutor:
+    """Return the process-wide extraction executor (configured from the environment)."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ExtractionExecutor.from_env()
+        return _executor
+
+
+def shutdown_extraction_executor(wait: bool = True):
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=wait)
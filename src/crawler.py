@@ -0,0 +1,535 @@
+import asyncio
+import base64
+import hashlib
+import heapq
+import itertools
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+from urllib.robotparser import RobotFileParser
+import logging
+
+import requests
+
+from browser_pool import BrowserPool
+from scrape_cache import PROBE_HEADERS, capture_validators, check_unchanged
+from url_utils import normalize_url, url_domain
+from web_scraper import WebScraper
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = PROBE_HEADERS["User-Agent"]
+
+# Words in a URL or link text that suggest a page lists or describes an opportunity
+PRIORITY_KEYWORDS = (
+    "bid", "rfp", "rfq", "rfi", "solicitation", "procurement", "tender",
+    "opportunit", "contract", "proposal", "award", "purchasing",
+)
+
+# Linked files worth reporting but not worth rendering in a browser
+DOCUMENT_EXTENSIONS = (".pdf", ".doc", ".docx", ".xls", ".xlsx", ".zip", ".rtf")
+SKIP_EXTENSIONS = (
+    ".jpg", ".jpeg", ".png", ".gif", ".svg", ".webp", ".ico", ".css", ".js",
+    ".mp3", ".mp4", ".avi", ".mov", ".woff", ".woff2", ".ttf", ".xml", ".rss",
+)
+
+
+class BloomFilter:
+    """
+    Fixed-size probabilistic set for the seen-URLs of very large crawls.
+
+    Never reports a seen URL as new; reports a new URL as seen with
+    probability ``error_rate`` once ``capacity`` URLs have been added.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        digest = hashlib.sha256(item.encode("utf-8")).digest()
+        first = int.from_bytes(digest[:8], "big")
+        second = int.from_bytes(digest[8:16], "big") | 1
+        for i in range(self.hashes):
+            yield (first + i * second) % self.size
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    def __len__(self) -> int:
+        return self.count
+
+    def to_dict(self) -> Dict:
+        return {
+            "capacity": self.capacity,
+            "error_rate": self.error_rate,
+            "count": self.count,
+            "bits": base64.b64encode(bytes(self.bits)).decode("ascii"),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "BloomFilter":
+        bloom = cls(data["capacity"], data["error_rate"])
+        bloom.bits = bytearray(base64.b64decode(data["bits"]))
+        bloom.count = data["count"]
+        return bloom
+
+
+class RobotsCache:
+    """Fetches and caches robots.txt per host."""
+
+    def __init__(self, user_agent: str = USER_AGENT, timeout: float = 10.0):
+        self.user_agent = user_agent
+        self.timeout = timeout
+        self._parsers: Dict[str, RobotFileParser] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def _fetch(self, origin: str) -> RobotFileParser:
+        parser = RobotFileParser(f"{origin}/robots.txt")
+        try:
+            response = requests.get(parser.url, timeout=self.timeout, headers=PROBE_HEADERS)
+        except requests.RequestException as e:
+            logger.debug(f"robots.txt unavailable for {origin}: {str(e)}")
+            parser.allow_all = True
+            return parser
+        # Same rules as RobotFileParser.read(): auth errors block, other errors allow
+        if response.status_code in (401, 403):
+            parser.disallow_all = True
+        elif response.status_code >= 400:
+            parser.allow_all = True
+        else:
+            parser.parse(response.text.splitlines())
+        return parser
+
+    async def _parser_for(self, url: str) -> RobotFileParser:
+        parsed = urlparse(url)
+        origin = f"{parsed.scheme}://{parsed.netloc}"
+        if origin not in self._parsers:
+            lock = self._locks.setdefault(origin, asyncio.Lock())
+            async with lock:
+                if origin not in self._parsers:
+                    self._parsers[origin] = await asyncio.to_thread(self._fetch, origin)
+        return self._parsers[origin]
+
+    async def allowed(self, url: str) -> bool:
+        parser = await self._parser_for(url)
+        return parser.can_fetch(self.user_agent, url)
+
+    async def crawl_delay(self, url: str) -> Optional[float]:
+        parser = await self._parser_for(url)
+        delay = parser.crawl_delay(self.user_agent)
+        return float(delay) if delay is not None else None
+
+
+class HostThrottle:
+    """Spaces out requests to the same host by at least ``delay`` seconds."""
+
+    def __init__(self, delay: float = 1.0):
+        self.delay = delay
+        self._next_slot: Dict[str, float] = {}
+        self._delays: Dict[str, float] = {}
+
+    def set_delay(self, host: str, delay: float):
+        self._delays[host] = max(self.delay, delay)
+
+    async def wait(self, host: str):
+        # Reserve the next slot before sleeping so concurrent workers queue up behind it
+        now = time.monotonic()
+        slot = max(now, self._next_slot.get(host, now))
+        self._next_slot[host] = slot + self._delays.get(host, self.delay)
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class CrawlState:
+    """
+    What the last crawl saw for each page: HTTP validators (ETag,
+    Last-Modified, body hash) and outlinks. Lets a repeat crawl skip
+    rendering pages that have not changed while still following their links.
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS crawl_pages (
+                url TEXT PRIMARY KEY,
+                validators TEXT NOT NULL,
+                outlinks TEXT NOT NULL,
+                title TEXT,
+                crawled_at REAL NOT NULL
+            )
+        """)
+        self._db.commit()
+
+    def get(self, url: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT validators, outlinks, title, crawled_at FROM crawl_pages WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "validators": json.loads(row[0]),
+            "outlinks": json.loads(row[1]),
+            "title": row[2],
+            "crawled_at": row[3],
+        }
+
+    def put(self, url: str, validators: Dict, outlinks: List[Dict], title: Optional[str]):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO crawl_pages (url, validators, outlinks, title, crawled_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (url, json.dumps(validators), json.dumps(outlinks), title, time.time())
+            )
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class Crawler:
+    """
+    Breadth-limited, priority-ordered crawler built on ``WebScraper``.
+
+    Links that look like bid/RFP pages are crawled first. URLs are normalized
+    and deduplicated (optionally with a Bloom filter), restricted to the seed
+    domains and ``max_depth``, checked against robots.txt and rate limited per
+    host. Progress can be checkpointed to JSON and resumed, and with a
+    ``state_path`` pages whose content is unchanged since the last crawl are
+    not rendered again.
+    """
+
+    def __init__(self,
+                 seeds: Iterable[str],
+                 max_depth: int = 2,
+                 max_pages: int = 500,
+                 allowed_domains: Optional[Iterable[str]] = None,
+                 concurrency: int = 4,
+                 per_host_delay: float = 1.0,
+                 respect_robots: bool = True,
+                 keywords: Iterable[str] = PRIORITY_KEYWORDS,
+                 bloom_capacity: Optional[int] = None,
+                 checkpoint_path: Optional[str] = None,
+                 checkpoint_every: int = 25,
+                 state_path: Optional[str] = None,
+                 pool: Optional[BrowserPool] = None,
+                 **scrape_options):
+        self.seeds = [normalize_url(url) for url in seeds]
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.allowed_domains = [d.lower().lstrip(".") for d in (allowed_domains or map(url_domain, self.seeds))]
+        self.concurrency = concurrency
+        self.respect_robots = respect_robots
+        self.keywords = tuple(k.lower() for k in keywords)
+        self.bloom_capacity = bloom_capacity
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_every = checkpoint_every
+        self.state = CrawlState(state_path) if state_path else None
+        self.pool = pool
+        self.scrape_options = scrape_options
+
+        self.robots = RobotsCache()
+        self.throttle = HostThrottle(per_host_delay)
+        self.frontier: List[Tuple[float, int, str, int]] = []
+        self.seen = BloomFilter(bloom_capacity) if bloom_capacity else set()
+        self.documents: Dict[str, Dict] = {}
+        self._active: Dict[str, Tuple[float, int, str, int]] = {}
+        self._sequence = itertools.count()
+        self.counters = {
+            "crawled": 0, "unchanged": 0, "failed": 0,
+            "robots_blocked": 0, "out_of_scope": 0, "invalid": 0,
+        }
+
+    def in_scope(self, url: str) -> bool:
+        parsed = urlparse(url)
+        if parsed.scheme not in ("http", "https"):
+            return False
+        host = (parsed.hostname or "").lower()
+        return any(host == domain or host.endswith(f".{domain}") for domain in self.allowed_domains)
+
+    def score(self, url: str, text: str, depth: int) -> float:
+        """Higher scores are crawled first: shallow pages and bid-related links."""
+        haystack = f"{url} {text}".lower()
+        boost = sum(1 for keyword in self.keywords if keyword in haystack)
+        return boost * 2.0 - depth
+
+    def _push(self, url: str, depth: int, text: str = "") -> bool:
+        if url in self.seen:
+            return False
+        self.seen.add(url)
+        heapq.heappush(self.frontier, (-self.score(url, text, depth), next(self._sequence), url, depth))
+        return True
+
+    def _pop(self) -> Optional[Tuple[str, int]]:
+        if not self.frontier:
+            return None
+        entry = heapq.heappop(self.frontier)
+        self._active[entry[2]] = entry
+        return entry[2], entry[3]
+
+    def _enqueue_links(self, links: List[Dict], depth: int) -> int:
+        if depth >= self.max_depth:
+            return 0
+        added = 0
+        for link in links:
+            try:
+                url = normalize_url(link["url"])
+            except ValueError:
+                self.counters["invalid"] += 1
+                continue
+            path = urlparse(url).path.lower()
+            if path.endswith(SKIP_EXTENSIONS):
+                continue
+            if not self.in_scope(url):
+                self.counters["out_of_scope"] += 1
+                continue
+            if path.endswith(DOCUMENT_EXTENSIONS):
+                self.documents.setdefault(url, {"url": url, "text": link.get("text", ""), "depth": depth + 1})
+                continue
+            if self._push(url, depth + 1, link.get("text", "")):
+                added += 1
+        return added
+
+    # Checkpointing
+
+    def checkpoint(self, complete: bool = False):
+        """Atomically write the frontier, seen-set and counters to ``checkpoint_path``."""
+        if not self.checkpoint_path:
+            return
+        data = {
+            "seeds": self.seeds,
+            "complete": complete,
+            "saved_at": time.time(),
+            # Pages still being fetched go back in the queue on resume
+            "frontier": self.frontier + list(self._active.values()),
+            "seen": self.seen.to_dict() if isinstance(self.seen, BloomFilter) else sorted(self.seen),
+            "documents": list(self.documents.values()),
+            "counters": self.counters,
+        }
+        os.makedirs(os.path.dirname(os.path.abspath(self.checkpoint_path)), exist_ok=True)
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def _resume(self) -> bool:
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return False
+        try:
+            with open(self.checkpoint_path) as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable crawl checkpoint: {str(e)}")
+            return False
+        if data.get("complete") or data.get("seeds") != self.seeds:
+            return False
+
+        self.frontier = [tuple(entry) for entry in data["frontier"]]
+        heapq.heapify(self.frontier)
+        self._sequence = itertools.count(max((entry[1] for entry in self.frontier), default=0) + 1)
+        seen = data["seen"]
+        self.seen = BloomFilter.from_dict(seen) if isinstance(seen, dict) else set(seen)
+        self.documents = {doc["url"]: doc for doc in data.get("documents", [])}
+        self.counters.update(data.get("counters", {}))
+        logger.info(f"Resuming crawl with {len(self.frontier)} queued pages")
+        return True
+
+    # Crawling
+
+    @staticmethod
+    def _outlinks(result: Dict) -> List[Dict]:
+        return [
+            {"url": link["absolute_url"], "text": link.get("text", "")[:200]}
+            for link in result.get("content", {}).get("links", [])
+            if link.get("absolute_url")
+        ]
+
+    async def _visit(self, scraper: WebScraper, url: str, depth: int) -> Dict:
+        previous = await asyncio.to_thread(self.state.get, url) if self.state else None
+        if previous and previous["validators"] and await asyncio.to_thread(
+            check_unchanged, url, previous["validators"]
+        ):
+            # Same content as last time: reuse its links instead of rendering
+            self.counters["unchanged"] += 1
+            added = self._enqueue_links(previous["outlinks"], depth)
+            return {
+                "status": "unchanged",
+                "url": url,
+                "title": previous["title"],
+                "crawl": {"depth": depth, "links_queued": added, "last_crawled": previous["crawled_at"]},
+            }
+
+        # A changed page must not be served from the scrape cache
+        options = dict(self.scrape_options)
+        if previous:
+            options["force_refresh"] = True
+        result = await scraper.scrape_page(url, **options)
+        if result.get("status") != "success":
+            self.counters["failed"] += 1
+            result["crawl"] = {"depth": depth, "links_queued": 0}
+            return result
+
+        self.counters["crawled"] += 1
+        outlinks = self._outlinks(result)
+        added = self._enqueue_links(outlinks, depth)
+        if self.state:
+            # Browser renders without a scrape cache come back without validators
+            validators = result.get("validators")
+            if validators is None:
+                validators = await asyncio.to_thread(capture_validators, url)
+            if validators:
+                await asyncio.to_thread(self.state.put, url, validators, outlinks, result.get("title"))
+        result["crawl"] = {"depth": depth, "links_queued": added}
+        return result
+
+    async def crawl(self) -> AsyncIterator[Dict]:
+        """
+        Crawl from the seeds (or the checkpoint), yielding each page result.
+
+        Unchanged pages yield a small ``{"status": "unchanged", ...}`` record
+        instead of a full scrape result. Every result carries a ``crawl``
+        block with its depth and how many new links it queued.
+        """
+        if not self._resume():
+            for seed in self.seeds:
+                self._push(seed, 0)
+        # Scrapers start the shared pool themselves, only once a page needs the browser
+        pool = self.pool
+
+        results = asyncio.Queue()
+        condition = asyncio.Condition()
+        in_flight = 0
+        visited = 0
+
+        async def next_url() -> Optional[Tuple[str, int]]:
+            nonlocal in_flight, visited
+            async with condition:
+                while True:
+                    if visited >= self.max_pages:
+                        return None
+                    task = self._pop()
+                    if task is not None:
+                        in_flight += 1
+                        visited += 1
+                        return task
+                    if in_flight == 0:
+                        return None
+                    # Another worker may still discover links
+                    await condition.wait()
+
+        async def worker():
+            nonlocal in_flight
+            scraper = None
+            try:
+                while True:
+                    task = await next_url()
+                    if task is None:
+                        break
+                    url, depth = task
+                    try:
+                        if self.respect_robots:
+                            if not await self.robots.allowed(url):
+                                self.counters["robots_blocked"] += 1
+                                continue
+                            delay = await self.robots.crawl_delay(url)
+                            if delay:
+                                self.throttle.set_delay(url_domain(url), delay)
+                        await self.throttle.wait(url_domain(url))
+                        if scraper is None:
+                            scraper = WebScraper(pool)
+                            await scraper.__aenter__()
+                        result = await self._visit(scraper, url, depth)
+                    except Exception as e:
+                        self.counters["failed"] += 1
+                        result = {**WebScraper._error_result(url, e), "crawl": {"depth": depth, "links_queued": 0}}
+                    finally:
+                        self._active.pop(url, None)
+                        async with condition:
+                            in_flight -= 1
+                            condition.notify_all()
+
+                    if scraper is not None and scraper.crashed:
+                        await scraper.__aexit__(None, None, None)
+                        scraper = None
+                    await results.put(result)
+            finally:
+                if scraper is not None:
+                    await scraper.__aexit__(None, None, None)
+                await results.put(None)
+
+        workers = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+        finished_workers = 0
+        emitted = 0
+        complete = False
+        try:
+            while finished_workers < len(workers):
+                result = await results.get()
+                if result is None:
+                    finished_workers += 1
+                    continue
+                yield result
+                emitted += 1
+                if self.checkpoint_every and emitted % self.checkpoint_every == 0:
+                    self.checkpoint()
+            complete = not self.frontier
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            self.checkpoint(complete=complete)
+            if self.state:
+                self.state.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.counters,
+            "queued": len(self.frontier),
+            "seen": len(self.seen),
+            "documents": len(self.documents),
+        }
+
+
+async def crawl_site(seeds: Iterable[str], **crawler_options) -> Dict:
+    """
+    Crawl and collect a compact summary of every page.
+
+    Args:
+        seeds: Start URLs (their domains bound the crawl unless ``allowed_domains`` is given)
+        **crawler_options: Passed through to ``Crawler``
+
+    Returns:
+        Dict: ``pages`` (url, title, status, depth), linked ``documents`` and counters
+    """
+    crawler = Crawler(seeds, **crawler_options)
+    pages = []
+    async for result in crawler.crawl():
+        pages.append({
+            "url": result.get("url"),
+            "title": result.get("title"),
+            "status": result.get("status"),
+            "depth": result["crawl"]["depth"],
+        })
+    return {
+        "status": "success",
+        "pages": pages,
+        "documents": list(crawler.documents.values()),
+        "stats": crawler.stats(),
+    }
@@ -0,0 +1,477 @@
+"""
+Streaming ingestion of RFP files on disk (PDF, DOCX, HTML).
+
+Documents are read one page at a time through generators, so a worker only
+ever holds the pages of the range it is parsing. Large PDFs are split into
+page ranges that run in parallel on the extraction executor and are yielded
+back in page order with a bounded number of ranges in flight.
+
+``ingest_document`` folds the pages into the same ``text_content``/``tables``
+structure ``RFPReaderAgent._scrape_rfp_webpage`` returns, with ``full_text``
+capped at ``max_text_chars`` so an 800-page packet cannot exhaust memory.
+
+PyMuPDF (preferred) or pdfplumber is required for PDFs and python-docx for
+DOCX files; HTML files only need the extraction engine.
+"""
+
+import asyncio
+import os
+import re
+from collections import deque
+from pathlib import Path
+from typing import AsyncIterator, Dict, Iterator, List, Optional
+import logging
+
+from extraction import extract_all
+from cpu_pool import ExtractionExecutor, get_extraction_executor
+
+try:
+    import pymupdf as fitz
+    HAS_PYMUPDF = True
+except ImportError:  # pragma: no cover - optional dependency
+    try:
+        import fitz  # PyMuPDF < 1.24
+        HAS_PYMUPDF = True
+    except ImportError:
+        fitz = None
+        HAS_PYMUPDF = False
+
+try:
+    import pdfplumber
+    HAS_PDFPLUMBER = True
+except ImportError:  # pragma: no cover - optional dependency
+    pdfplumber = None
+    HAS_PDFPLUMBER = False
+
+try:
+    import docx
+    from docx.table import Table as DocxTable
+    from docx.text.paragraph import Paragraph as DocxParagraph
+    HAS_DOCX = True
+except ImportError:  # pragma: no cover - optional dependency
+    docx = None
+    HAS_DOCX = False
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_FORMATS = ("pdf", "docx", "html")
+
+DEFAULT_MAX_TEXT_CHARS = int(os.environ.get("SCRAPER_INGEST_MAX_TEXT", str(2_000_000)))
+DEFAULT_BATCH_PAGES = int(os.environ.get("SCRAPER_INGEST_BATCH_PAGES", "16"))
+MAX_TABLES = 1000
+
+# DOCX has no physical pages; without explicit page breaks, group this many blocks per page
+DOCX_BLOCKS_PER_PAGE = 60
+
+WHITESPACE_RE = re.compile(r'\s+')
+
+# "1.", "2.3", "IV.", "SECTION 4", "Article 2", "Part B" style section headings
+SECTION_HEADING_RE = re.compile(
+    r'^(?:(?P<number>\d+(?:\.\d+)*)\.?|[IVXLC]+\.|(?:section|article|part|attachment|appendix|exhibit)\s+\w+)\s+\S',
+    re.I
+)
+
+
+def _clean(text: Optional[str]) -> str:
+    return WHITESPACE_RE.sub(" ", text or "").strip()
+
+
+def _heading_level(block: str) -> Optional[int]:
+    """Guess whether a text block is a section heading from its shape alone."""
+    if not block or len(block) > 120 or "\n" in block.strip():
+        return None
+    text = _clean(block)
+    match = SECTION_HEADING_RE.match(text)
+    if match:
+        number = match.group("number")
+        return min(6, number.count(".") + 1) if number else 1
+    letters = [c for c in text if c.isalpha()]
+    if len(letters) >= 4 and all(c.isupper() for c in letters) and not text.endswith("."):
+        return 1
+    return None
+
+
+def _table_dict(rows: List[List[Optional[str]]]) -> Optional[Dict]:
+    rows = [[_clean(cell) for cell in row] for row in rows if row]
+    rows = [row for row in rows if any(row)]
+    if not rows:
+        return None
+    return {
+        "headers": rows[0],
+        "rows": rows[1:],
+        "total_rows": len(rows)
+    }
+
+
+def _page_dict(number: int, blocks: List[str], tables: List[Dict], links: Optional[List[Dict]] = None) -> Dict:
+    headings = []
+    paragraphs = []
+    for block in blocks:
+        level = _heading_level(block)
+        text = _clean(block)
+        if not text:
+            continue
+        if level:
+            headings.append({"level": level, "text": text})
+        else:
+            paragraphs.append(text)
+    return {
+        "page": number,
+        "text": _clean(" ".join(blocks)),
+        "headings": headings,
+        "paragraphs": paragraphs,
+        "lists": [],
+        "tables": tables,
+        "links": links or [],
+    }
+
+
+def detect_format(path: str) -> str:
+    """``pdf``, ``docx`` or ``html`` from the extension, falling back to magic bytes."""
+    suffix = Path(path).suffix.lower().lstrip(".")
+    if suffix in ("htm", "xhtml"):
+        suffix = "html"
+    if suffix in SUPPORTED_FORMATS:
+        return suffix
+    with open(path, "rb") as f:
+        head = f.read(8)
+    if head.startswith(b"%PDF"):
+        return "pdf"
+    if head.startswith(b"PK"):
+        return "docx"
+    return "html"
+
+
+def page_count(path: str, fmt: Optional[str] = None) -> Optional[int]:
+    """Number of pages for PDFs (None for formats without physical pages)."""
+    fmt = fmt or detect_format(path)
+    if fmt != "pdf":
+        return None
+    if HAS_PYMUPDF:
+        with fitz.open(path) as document:
+            return document.page_count
+    if HAS_PDFPLUMBER:
+        with pdfplumber.open(path) as document:
+            return len(document.pages)
+    raise ImportError("PDF ingestion requires PyMuPDF or pdfplumber (pip install pymupdf)")
+
+
+# PDF
+
+def _iter_pdf_pymupdf(path: str, start: int, stop: Optional[int], tables: bool) -> Iterator[Dict]:
+    with fitz.open(path) as document:
+        stop = document.page_count if stop is None else min(stop, document.page_count)
+        for index in range(start, stop):
+            page = document.load_page(index)
+            # Text blocks come back roughly one per paragraph
+            blocks = [block[4] for block in page.get_text("blocks", sort=True) if block[6] == 0]
+            page_tables = []
+            if tables:
+                for table in page.find_tables().tables:
+                    table_data = _table_dict(table.extract())
+                    if table_data:
+                        page_tables.append(table_data)
+            links = [
+                {"text": "", "href": link["uri"], "absolute_url": link["uri"], "is_external": True}
+                for link in page.get_links() if link.get("uri")
+            ]
+            yield _page_dict(index + 1, blocks, page_tables, links)
+
+
+def _iter_pdf_pdfplumber(path: str, start: int, stop: Optional[int], tables: bool) -> Iterator[Dict]:
+    with pdfplumber.open(path) as document:
+        stop = len(document.pages) if stop is None else min(stop, len(document.pages))
+        for index in range(start, stop):
+            page = document.pages[index]
+            text = page.extract_text() or ""
+            blocks = [block for block in re.split(r'\n\s*\n', text) if block.strip()]
+            # pdfplumber returns paragraphs as lines; treat each short line as a candidate heading
+            if len(blocks) == 1:
+                blocks = text.splitlines()
+            page_tables = []
+            if tables:
+                for rows in page.extract_tables():
+                    table_data = _table_dict(rows)
+                    if table_data:
+                        page_tables.append(table_data)
+            page.close()  # Drop the page's cached layout objects
+            yield _page_dict(index + 1, blocks, page_tables)
+
+
+def iter_pdf_pages(path: str, start: int = 0, stop: Optional[int] = None, tables: bool = True) -> Iterator[Dict]:
+    """Yield PDF pages ``start`` (0-based) up to ``stop`` one at a time."""
+    if HAS_PYMUPDF:
+        return _iter_pdf_pymupdf(path, start, stop, tables)
+    if HAS_PDFPLUMBER:
+        return _iter_pdf_pdfplumber(path, start, stop, tables)
+    raise ImportError("PDF ingestion requires PyMuPDF or pdfplumber (pip install pymupdf)")
+
+
+# DOCX
+
+def iter_docx_pages(path: str, tables: bool = True) -> Iterator[Dict]:
+    """
+    Yield a DOCX file as pages split at its page breaks (or every
+    ``DOCX_BLOCKS_PER_PAGE`` blocks when it has none), in body order.
+    """
+    if not HAS_DOCX:
+        raise ImportError("DOCX ingestion requires python-docx (pip install python-docx)")
+    document = docx.Document(path)
+
+    page = _page_dict(1, [], [])
+    blocks = 0
+    current_list = None
+
+    def append_text(text: str):
+        page["text"] = f"{page['text']} {text}" if page["text"] else text
+
+    for element in document.element.body.iterchildren():
+        tag = element.tag.rsplit("}", 1)[-1]
+        if tag not in ("p", "tbl"):
+            continue
+
+        # Word marks where it last laid out a new page; an explicit break ends the page after it
+        starts_page = tag == "p" and bool(element.xpath(".//w:lastRenderedPageBreak"))
+        ends_page = tag == "p" and bool(element.xpath('.//w:br[@w:type="page"]'))
+        if blocks and (starts_page or blocks >= DOCX_BLOCKS_PER_PAGE):
+            yield page
+            page = _page_dict(page["page"] + 1, [], [])
+            blocks = 0
+            current_list = None
+
+        if tag == "p":
+            paragraph = DocxParagraph(element, document)
+            text = _clean(paragraph.text)
+            style = (paragraph.style.name if paragraph.style is not None else "") or ""
+            if text:
+                blocks += 1
+                append_text(text)
+                if style == "Title" or (style.startswith("Heading ") and style[8:].isdigit()):
+                    level = 1 if style == "Title" else min(6, int(style[8:]))
+                    page["headings"].append({"level": level, "text": text})
+                    current_list = None
+                elif style.startswith("List"):
+                    if current_list is None:
+                        current_list = {"type": "ol" if "Number" in style else "ul", "items": []}
+                        page["lists"].append(current_list)
+                    current_list["items"].append(text)
+                else:
+                    page["paragraphs"].append(text)
+                    current_list = None
+        else:
+            current_list = None
+            rows = [[cell.text for cell in row.cells] for row in DocxTable(element, document).rows]
+            table_data = _table_dict(rows)
+            if table_data:
+                blocks += 1
+                if tables:
+                    page["tables"].append(table_data)
+                append_text(" ".join(" ".join(row) for row in [table_data["headers"]] + table_data["rows"]))
+
+        if ends_page and blocks:
+            yield page
+            page = _page_dict(page["page"] + 1, [], [])
+            blocks = 0
+            current_list = None
+
+    if blocks:
+        yield page
+
+
+# HTML
+
+def iter_html_pages(path: str) -> Iterator[Dict]:
+    """Yield an HTML file as a single page using the DOM extraction engine."""
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        html = f.read()
+    extracted = extract_all(html, Path(os.path.abspath(path)).as_uri())
+    text = extracted["text"]
+    yield {
+        "page": 1,
+        "text": text["full_text"],
+        "headings": text["headings"],
+        "paragraphs": text["paragraphs"],
+        "lists": text["lists"],
+        "tables": extracted["tables"],
+        "links": extracted["links"],
+        "title": extracted["meta"].get("title"),
+    }
+
+
+def iter_pages(path: str, start: int = 0, stop: Optional[int] = None, tables: bool = True) -> Iterator[Dict]:
+    """
+    Yield the pages of any supported file, one at a time.
+
+    ``start``/``stop`` select a 0-based page range for PDFs and are ignored
+    for formats without physical pages.
+    """
+    fmt = detect_format(path)
+    if fmt == "pdf":
+        return iter_pdf_pages(path, start, stop, tables)
+    if fmt == "docx":
+        return iter_docx_pages(path, tables)
+    return iter_html_pages(path)
+
+
+def parse_page_range(path: str, start: int = 0, stop: Optional[int] = None, tables: bool = True) -> List[Dict]:
+    """Parse one page range in a worker process (module-level so it pickles)."""
+    return list(iter_pages(path, start, stop, tables))
+
+
+async def aiter_pages(path: str,
+                      executor: Optional[ExtractionExecutor] = None,
+                      batch_pages: int = DEFAULT_BATCH_PAGES,
+                      max_pending: Optional[int] = None,
+                      tables: bool = True) -> AsyncIterator[Dict]:
+    """
+    Yield a document's pages in order, parsing page ranges in parallel.
+
+    Args:
+        path (str): File on disk
+        executor (ExtractionExecutor, optional): Defaults to the shared extraction executor
+        batch_pages (int): Pages per worker task
+        max_pending (int, optional): Ranges in flight at once (defaults to twice the workers)
+        tables (bool): Extract tables
+
+    Yields:
+        Dict: One page with ``page``, ``text``, ``headings``, ``paragraphs``, ``lists``, ``tables`` and ``links``
+    """
+    executor = executor or get_extraction_executor()
+    fmt = detect_format(path)
+    total = await asyncio.to_thread(page_count, path, fmt) if fmt == "pdf" else None
+    if total is None:
+        for page in await executor.run(parse_page_range, path, 0, None, tables):
+            yield page
+        return
+
+    ranges = iter([(start, min(start + batch_pages, total)) for start in range(0, total, batch_pages)])
+    max_pending = max_pending or executor.max_workers * 2
+    pending = deque()
+
+    def schedule():
+        page_range = next(ranges, None)
+        if page_range is not None:
+            pending.append(asyncio.ensure_future(executor.run(parse_page_range, path, *page_range, tables)))
+
+    try:
+        for _ in range(max_pending):
+            schedule()
+        while pending:
+            pages = await pending.popleft()
+            schedule()
+            for page in pages:
+                yield page
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+class DocumentAccumulator:
+    """
+    Folds pages into the ``text_content``/``tables`` shape used for web pages.
+
+    ``full_text`` and ``paragraphs`` each stop growing at ``max_text_chars``
+    (``truncated`` is then set); headings, lists and up to ``MAX_TABLES``
+    tables are kept in full with the page they came from.
+    """
+
+    def __init__(self, max_text_chars: int = DEFAULT_MAX_TEXT_CHARS):
+        self.max_text_chars = max_text_chars
+        self.text_parts: List[str] = []
+        self.text_chars = 0
+        self.paragraph_chars = 0
+        self.headings: List[Dict] = []
+        self.paragraphs: List[str] = []
+        self.lists: List[Dict] = []
+        self.tables: List[Dict] = []
+        self.links: List[Dict] = []
+        self.pages = 0
+        self.truncated = False
+        self.title = None
+
+    def add(self, page: Dict):
+        self.pages += 1
+        number = page["page"]
+        if self.title is None:
+            self.title = page.get("title")
+
+        text = page["text"]
+        if text:
+            room = self.max_text_chars - self.text_chars
+            if room <= 0:
+                self.truncated = True
+            else:
+                if len(text) > room:
+                    text = text[:room]
+                    self.truncated = True
+                self.text_parts.append(text)
+                self.text_chars += len(text) + 1
+
+        for paragraph in page["paragraphs"]:
+            if self.paragraph_chars + len(paragraph) > self.max_text_chars:
+                self.truncated = True
+                break
+            self.paragraphs.append(paragraph)
+            self.paragraph_chars += len(paragraph)
+
+        self.headings.extend({**heading, "page": number} for heading in page["headings"])
+        self.lists.extend({**entry, "page": number} for entry in page["lists"])
+        for table in page["tables"]:
+            if len(self.tables) >= MAX_TABLES:
+                self.truncated = True
+                break
+            self.tables.append({**table, "page": number})
+        self.links.extend(page.get("links", []))
+
+    def text_content(self) -> Dict:
+        return {
+            "full_text": " ".join(self.text_parts),
+            "headings": self.headings,
+            "paragraphs": self.paragraphs,
+            "lists": self.lists,
+        }
+
+
+async def ingest_document(path: str,
+                          executor: Optional[ExtractionExecutor] = None,
+                          max_text_chars: int = DEFAULT_MAX_TEXT_CHARS,
+                          tables: bool = True) -> Dict:
+    """
+    Parse a PDF, DOCX or HTML file into the agent's raw-content shape.
+
+    Args:
+        path (str): File on disk
+        executor (ExtractionExecutor, optional): Defaults to the shared extraction executor
+        max_text_chars (int): Cap on ``full_text`` (and on total paragraph text)
+        tables (bool): Extract tables
+
+    Returns:
+        Dict: ``text_content``, ``tables``, ``links`` etc. as produced for web pages
+    """
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"No such file: {path}")
+    fmt = detect_format(path)
+    accumulator = DocumentAccumulator(max_text_chars)
+    async for page in aiter_pages(path, executor, tables=tables):
+        accumulator.add(page)
+
+    if accumulator.truncated:
+        logger.info(f"Text of {path} truncated at {max_text_chars} characters")
+
+    first_heading = accumulator.headings[0]["text"] if accumulator.headings else None
+    return {
+        "source_type": "file",
+        "file_path": path,
+        "title": accumulator.title or first_heading or Path(path).stem,
+        "text_content": accumulator.text_content(),
+        "links": accumulator.links,
+        "forms": [],
+        "tables": accumulator.tables,
+        "meta": {
+            "format": fmt,
+            "pages": accumulator.pages,
+            "truncated": accumulator.truncated,
+            "size_bytes": os.path.getsize(path),
+        },
+        "screenshot": None
+    }
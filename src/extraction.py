@@ -0,0 +1,661 @@
+"""
+Single-pass DOM extraction engine.
+
+Produces the same text/links/images/tables/meta/navigation structures as the
+``WebScraper._extract_*`` methods, but in one walk over the document instead
+of one ``find_all`` traversal per extractor. When lxml is installed the HTML
+is streamed through lxml's parser-target interface, so no tree is built at
+all; otherwise a BeautifulSoup ``html.parser`` tree is walked once.
+
+Results are identical to running the legacy extractors on a soup built with
+the same parser (lxml or html.parser respectively), except for tables: by
+default each table is also recorded cell by cell (spans, ``<th>`` flags,
+``thead``/``tbody``/``tfoot``, nested tables kept apart) and laid out on a
+grid by ``table_engine``. ``tables="legacy"`` keeps the old row lists.
+"""
+
+import re
+from typing import Dict, List, Optional
+from urllib.parse import urljoin, urlparse
+
+from bs4 import BeautifulSoup, CData, NavigableString, Tag
+
+from table_engine import build_table
+
+try:
+    from lxml import etree
+    HAS_LXML = True
+except ImportError:  # pragma: no cover - exercised only without lxml
+    etree = None
+    HAS_LXML = False
+
+DEFAULT_PARSER = "lxml" if HAS_LXML else "html.parser"
+
+# Subtrees removed before extraction (the legacy text extractor decomposes them)
+SKIPPED_TAGS = frozenset(["script", "style"])
+
+# BeautifulSoup stores strings under these tags as special subclasses that
+# get_text() ignores
+NON_CONTENT_STRING_TAGS = frozenset(["template", "rt", "rp"])
+
+# Tags whose whitespace-only strings BeautifulSoup keeps verbatim
+PRESERVE_WHITESPACE_TAGS = frozenset(["pre", "textarea"])
+
+ASCII_SPACES = "\x20\x0a\x09\x0c\x0d"
+
+MAIN_STRING_TYPES = (NavigableString, CData)
+
+HEADING_LEVELS = {f"h{i}": i for i in range(1, 7)}
+
+TABLE_SECTIONS = frozenset(["thead", "tbody", "tfoot"])
+
+TABLE_MODES = ("grid", "legacy")
+
+NAV_CLASS_RE = re.compile(r'nav|menu|breadcrumb', re.I)
+
+WHITESPACE_RE = re.compile(r'\s+')
+
+
+class _Slot:
+    """Placeholder for an element's text, filled in when the element closes."""
+
+    __slots__ = ("start", "text")
+
+    def __init__(self, start: int):
+        self.start = start
+        self.text = ""
+
+
+class _Span:
+    """Index range of the strings inside an element, for texts joined in ``result()``."""
+
+    __slots__ = ("start", "end")
+
+    def __init__(self, start: int):
+        self.start = start
+        self.end = start
+
+
+FORM_FIELD_TAGS = frozenset(["input", "select", "textarea"])
+
+
+class ExtractionHandler:
+    """
+    Event-driven collector shared by both parser drivers.
+
+    Text is appended to one flat list; every element of interest remembers the
+    index range of the strings it contains, so its ``get_text()`` equivalent
+    is a single join taken when the element closes.
+    """
+
+    def __init__(self, base_url: str, tables: str = "grid", forms: bool = False):
+        self.base_url = base_url
+        self.table_mode = tables
+        self.collect_forms = forms
+        self.base_netloc = urlparse(base_url).netloc
+        self.strings: List[str] = []
+        self.stack: List = []
+
+        self.headings = {level: [] for level in range(1, 7)}
+        self.paragraphs: List[_Slot] = []
+        self.lists: List[Dict] = []
+        self.links: List[Dict] = []
+        self.images: List[Dict] = []
+        self.tables: List[Dict] = []
+        self.meta: Dict[str, str] = {}
+        self.title: Optional[_Slot] = None
+        self.navs: List[Dict] = []
+        self.menus: List[Dict] = []
+
+        self.open_lists: List[Dict] = []
+        self.open_tables: List[Dict] = []
+        self.open_rows: List[List] = []
+        self.open_grid_rows: List[Dict] = []
+        self.open_navs: List[Dict] = []
+
+        # Static forms (only with ``forms``), shaped like extract_forms' output
+        self.forms: List[Dict] = []
+        self.open_forms: List[Dict] = []
+        self.open_labels: List[_Span] = []
+        self.open_selects: List[Dict] = []
+        self.labels_for: Dict[str, _Span] = {}
+        self.id_spans: Dict[str, _Span] = {}
+
+    def text(self, string: str):
+        self.strings.append(string)
+
+    def _close_slot(self, slot: _Slot):
+        slot.text = "".join(self.strings[slot.start:]).strip()
+
+    def _span_text(self, span: _Span, separator: Optional[str] = None) -> str:
+        strings = self.strings[span.start:span.end]
+        if separator is None:
+            return "".join(strings)
+        # get_text(separator, strip=True)
+        return separator.join(string.strip() for string in strings if string.strip())
+
+    def _start_form_element(self, name: str, attrs, position: int, closers: List):
+        element_id = attrs.get("id")
+        if element_id and element_id not in self.id_spans:
+            # aria-labelledby may point at any element, before or after the field
+            span = self.id_spans[element_id] = _Span(position)
+            closers.append(("span", span))
+
+        if name == "form":
+            form = {"attrs": attrs, "fields": []}
+            self.forms.append(form)
+            self.open_forms.append(form)
+            closers.append(("pop", self.open_forms))
+
+        elif name == "label":
+            span = _Span(position)
+            if attrs.get("for"):
+                self.labels_for.setdefault(attrs["for"], span)
+            self.open_labels.append(span)
+            closers.append(("span", span))
+            closers.append(("pop", self.open_labels))
+
+        elif name in FORM_FIELD_TAGS:
+            if not self.open_forms:
+                return
+            field = {
+                "tag": name,
+                "attrs": attrs,
+                "label": self.open_labels[-1] if self.open_labels else None,
+                "text": None,
+                "options": [],
+            }
+            for form in self.open_forms:
+                form["fields"].append(field)
+            if name == "textarea":
+                field["text"] = _Span(position)
+                closers.append(("span", field["text"]))
+            elif name == "select":
+                self.open_selects.append(field)
+                closers.append(("pop", self.open_selects))
+
+        elif name == "option":
+            if self.open_selects:
+                option = {"attrs": attrs, "text": _Span(position)}
+                for field in self.open_selects:
+                    field["options"].append(option)
+                closers.append(("span", option["text"]))
+
+    def _field_label(self, field: Dict) -> str:
+        attrs = field["attrs"]
+        if attrs.get("id") and attrs["id"] in self.labels_for:
+            return self._span_text(self.labels_for[attrs["id"]], " ")
+        if field["label"] is not None:
+            return self._span_text(field["label"], " ")
+        if attrs.get("aria-label"):
+            return attrs["aria-label"].strip()
+        if attrs.get("aria-labelledby"):
+            spans = [self.id_spans.get(ref) for ref in attrs["aria-labelledby"].split()]
+            return " ".join(self._span_text(span, " ") for span in spans if span is not None)
+        return (attrs.get("title") or "").strip()
+
+    def _describe_field(self, field: Dict) -> Dict:
+        tag, attrs = field["tag"], field["attrs"]
+        field_type = attrs.get("type") or "text"
+        secret = field_type.lower() == "password"
+        if tag == "textarea":
+            default = self._span_text(field["text"])
+        elif tag == "select":
+            default = None
+        else:
+            default = attrs.get("value") or ""
+        described = {
+            "tag": tag,
+            "type": field_type,
+            "name": attrs.get("name") or "",
+            "id": attrs.get("id") or "",
+            "placeholder": attrs.get("placeholder") or "",
+            "required": "required" in attrs,
+            "disabled": "disabled" in attrs,
+            "label": self._field_label(field),
+            "default_value": "" if secret else default,
+            "value": "" if secret else (default or ""),
+        }
+        if tag == "select":
+            options = []
+            for option in field["options"]:
+                text = self._span_text(option["text"]).strip()
+                options.append({
+                    "value": option["attrs"].get("value", text),
+                    "text": text,
+                    "selected": "selected" in option["attrs"],
+                    "default_selected": "selected" in option["attrs"],
+                    "disabled": "disabled" in option["attrs"],
+                })
+            described["multiple"] = "multiple" in attrs
+            described["options"] = options
+            defaults = [option for option in options if option["default_selected"]]
+            if not defaults and options and not described["multiple"]:
+                defaults = options[:1]  # browsers select the first option
+            described["default_value"] = defaults[0]["value"] if defaults else None
+            described["value"] = described["default_value"] or ""
+        if tag == "input" and field_type.lower() in ("checkbox", "radio"):
+            described["checked"] = "checked" in attrs
+            described["default_checked"] = "checked" in attrs
+        return described
+
+    def start(self, name: str, attrs: Dict):
+        closers = []
+        position = len(self.strings)
+
+        if self.collect_forms:
+            self._start_form_element(name, attrs, position, closers)
+
+        level = HEADING_LEVELS.get(name)
+        if level:
+            slot = _Slot(position)
+            self.headings[level].append(slot)
+            closers.append(("slot", slot))
+
+        elif name == "p":
+            slot = _Slot(position)
+            self.paragraphs.append(slot)
+            closers.append(("slot", slot))
+
+        elif name == "ul" or name == "ol":
+            entry = {"type": name, "items": []}
+            self.lists.append(entry)
+            self.open_lists.append(entry)
+            closers.append(("pop", self.open_lists))
+
+            classes = attrs.get("class") or []
+            if isinstance(classes, str):
+                classes = classes.split()
+            if any(NAV_CLASS_RE.search(cls) for cls in classes):
+                menu = {"type": "menu", "links": []}
+                self.menus.append(menu)
+                self.open_navs.append(menu)
+                closers.append(("pop", self.open_navs))
+
+        elif name == "li":
+            if self.open_lists:
+                slot = _Slot(position)
+                for entry in self.open_lists:
+                    entry["items"].append(slot)
+                closers.append(("slot", slot))
+
+        elif name == "a":
+            href = attrs.get("href")
+            if href is not None:
+                slot = _Slot(position)
+                absolute_url = urljoin(self.base_url, href)
+                self.links.append({
+                    "text": slot,
+                    "href": href,
+                    "absolute_url": absolute_url,
+                    "is_external": urlparse(absolute_url).netloc != self.base_netloc
+                })
+                for nav in self.open_navs:
+                    nav["links"].append({"text": slot, "href": href})
+                closers.append(("slot", slot))
+
+        elif name == "img":
+            src = attrs.get("src", "")
+            if src:
+                self.images.append({
+                    "src": src,
+                    "absolute_url": urljoin(self.base_url, src),
+                    "alt": attrs.get("alt", "")
+                })
+
+        elif name == "table":
+            entry = {
+                "rows": [],
+                "grid": [],
+                "section": None,
+                "caption": None,
+                "parent": self.open_tables[-1]["index"] if self.open_tables else None,
+                "index": len(self.tables),
+            }
+            self.tables.append(entry)
+            self.open_tables.append(entry)
+            closers.append(("pop", self.open_tables))
+
+        elif name == "tr":
+            if self.open_tables:
+                row = []
+                for entry in self.open_tables:
+                    entry["rows"].append(row)
+                self.open_rows.append(row)
+                closers.append(("pop", self.open_rows))
+
+                # Grid rows belong to the innermost table only
+                table = self.open_tables[-1]
+                grid_row = {"table": table["index"], "section": table["section"], "cells": []}
+                table["grid"].append(grid_row)
+                self.open_grid_rows.append(grid_row)
+                closers.append(("pop", self.open_grid_rows))
+
+        elif name == "td" or name == "th":
+            if self.open_rows:
+                slot = _Slot(position)
+                for row in self.open_rows:
+                    row.append(slot)
+                closers.append(("slot", slot))
+
+                grid_row = self.open_grid_rows[-1]
+                if grid_row["table"] == self.open_tables[-1]["index"]:
+                    grid_row["cells"].append((slot, attrs.get("rowspan", 1), attrs.get("colspan", 1), name == "th"))
+
+        elif name in TABLE_SECTIONS:
+            if self.open_tables:
+                table = self.open_tables[-1]
+                closers.append(("restore", (table, table["section"])))
+                table["section"] = name
+
+        elif name == "caption":
+            if self.open_tables and self.open_tables[-1]["caption"] is None:
+                slot = _Slot(position)
+                self.open_tables[-1]["caption"] = slot
+                closers.append(("slot", slot))
+
+        elif name == "meta":
+            key = attrs.get("name") or attrs.get("property") or attrs.get("http-equiv")
+            content = attrs.get("content")
+            if key and content:
+                self.meta[key] = content
+
+        elif name == "title":
+            if self.title is None:
+                self.title = _Slot(position)
+                closers.append(("slot", self.title))
+
+        elif name == "nav":
+            nav = {"type": "nav", "links": []}
+            self.navs.append(nav)
+            self.open_navs.append(nav)
+            closers.append(("pop", self.open_navs))
+
+        self.stack.append(closers)
+
+    def end(self, name: str):
+        for kind, target in self.stack.pop():
+            if kind == "slot":
+                self._close_slot(target)
+            elif kind == "span":
+                target.end = len(self.strings)
+            elif kind == "restore":
+                table, section = target
+                table["section"] = section
+            else:
+                target.pop()
+
+    def result(self) -> Dict:
+        # Elements left open by a truncated document still get their text
+        while self.stack:
+            self.end(None)
+
+        full_text = WHITESPACE_RE.sub(" ", "".join(self.strings)).strip()
+
+        headings = []
+        for level in range(1, 7):
+            for slot in self.headings[level]:
+                headings.append({"level": level, "text": slot.text})
+
+        tables = []
+        for entry in self.tables:
+            if self.table_mode == "grid":
+                table = build_table({
+                    "rows": [
+                        {"section": row["section"],
+                         "cells": [(slot.text, rowspan, colspan, is_header)
+                                   for slot, rowspan, colspan, is_header in row["cells"]]}
+                        for row in entry["grid"]
+                    ],
+                    "caption": entry["caption"].text if entry["caption"] is not None else None,
+                    "parent": entry["parent"],
+                })
+                if table:
+                    tables.append(table)
+                continue
+            rows = [[cell.text for cell in row] for row in entry["rows"] if row]
+            if rows:
+                tables.append({
+                    "headers": rows[0] if rows else [],
+                    "rows": rows[1:] if len(rows) > 1 else [],
+                    "total_rows": len(rows)
+                })
+
+        for link in self.links:
+            link["text"] = link["text"].text
+
+        navigation = []
+        for nav in self.navs + self.menus:
+            if nav["links"]:
+                navigation.append({
+                    "type": nav["type"],
+                    "links": [{"text": link["text"].text, "href": link["href"]} for link in nav["links"]]
+                })
+
+        meta = dict(self.meta)
+        if self.title is not None:
+            meta["title"] = self.title.text
+
+        extracted = {
+            "text": {
+                "full_text": full_text,
+                "headings": headings,
+                "paragraphs": [slot.text for slot in self.paragraphs if slot.text],
+                "lists": [
+                    {"type": entry["type"], "items": [slot.text for slot in entry["items"]]}
+                    for entry in self.lists
+                ]
+            },
+            "links": self.links,
+            "images": self.images,
+            "tables": tables,
+            "meta": meta,
+            "navigation": navigation
+        }
+        if self.collect_forms:
+            extracted["forms"] = [{
+                "action": form["attrs"].get("action") or "",
+                "method": (form["attrs"].get("method") or "GET").upper(),
+                "id": form["attrs"].get("id") or "",
+                "name": form["attrs"].get("name") or "",
+                "inputs": [self._describe_field(field) for field in form["fields"]],
+            } for form in self.forms]
+        return extracted
+
+
+class _LxmlTarget:
+    """
+    lxml parser target translating raw parse events into handler events.
+
+    Mirrors what BeautifulSoup's lxml tree builder would store: adjacent text
+    is merged, whitespace-only runs collapse to a single space or newline, and
+    strings that get_text() would ignore are dropped.
+    """
+
+    def __init__(self, handler: ExtractionHandler):
+        self.handler = handler
+        self.pending: List[str] = []
+        self.skip_depth = 0
+        self.non_content_depth = 0
+        self.preserve_depth = 0
+
+    def _flush(self):
+        if not self.pending:
+            return
+        data = "".join(self.pending)
+        self.pending = []
+        if not data or self.skip_depth or self.non_content_depth:
+            return
+        if not self.preserve_depth and not data.strip(ASCII_SPACES):
+            data = "\n" if "\n" in data else " "
+        self.handler.text(data)
+
+    def start(self, tag, attrib, nsmap=None):
+        self._flush()
+        if self.skip_depth or tag in SKIPPED_TAGS:
+            self.skip_depth += 1
+            return
+        if tag in NON_CONTENT_STRING_TAGS:
+            self.non_content_depth += 1
+        if tag in PRESERVE_WHITESPACE_TAGS:
+            self.preserve_depth += 1
+        self.handler.start(tag, attrib)
+
+    def end(self, tag):
+        self._flush()
+        if self.skip_depth:
+            self.skip_depth -= 1
+            return
+        if tag in NON_CONTENT_STRING_TAGS:
+            self.non_content_depth -= 1
+        if tag in PRESERVE_WHITESPACE_TAGS:
+            self.preserve_depth -= 1
+        self.handler.end(tag)
+
+    def data(self, content):
+        self.pending.append(content)
+
+    def comment(self, text):
+        self._flush()
+
+    def pi(self, target, data=None):
+        self._flush()
+
+    def doctype(self, *args):
+        self._flush()
+
+    def close(self):
+        self._flush()
+        return self.handler
+
+
+def _feed_lxml(html: str, handler: ExtractionHandler):
+    if html.startswith("\ufeff"):
+        html = html[1:]
+    target = _LxmlTarget(handler)
+    try:
+        parser = etree.HTMLParser(target=target, recover=True)
+        parser.feed(html)
+        parser.close()
+    except (ValueError, etree.ParserError, etree.XMLSyntaxError):
+        # Unicode input with an encoding declaration, or an empty document
+        if handler.stack or handler.strings:
+            return
+        parser = etree.HTMLParser(target=target, recover=True, encoding="utf8")
+        try:
+            parser.feed(html.encode("utf8"))
+            parser.close()
+        except (etree.ParserError, etree.XMLSyntaxError):
+            pass
+
+
+def _walk_soup(root: Tag, handler: ExtractionHandler):
+    iterators = [iter(root.contents)]
+    names = [None]
+    while iterators:
+        node = next(iterators[-1], None)
+        if node is None:
+            iterators.pop()
+            name = names.pop()
+            if name is not None:
+                handler.end(name)
+            continue
+        if isinstance(node, Tag):
+            if node.name in SKIPPED_TAGS:
+                continue
+            handler.start(node.name, node.attrs)
+            iterators.append(iter(node.contents))
+            names.append(node.name)
+        elif type(node) in MAIN_STRING_TYPES:
+            handler.text(node)
+
+
+def extract_from_soup(soup: BeautifulSoup, base_url: str, tables: str = "grid", forms: bool = False) -> Dict:
+    """Run the single-pass extractor over an already parsed soup (not mutated)."""
+    handler = ExtractionHandler(base_url, tables, forms)
+    _walk_soup(soup, handler)
+    return handler.result()
+
+
+def extract_all(html: str, base_url: str, parser: Optional[str] = None, tables: str = "grid",
+                forms: bool = False) -> Dict:
+    """
+    Extract text, links, images, tables, meta and navigation in one pass.
+
+    Args:
+        html (str): Page HTML
+        base_url (str): URL used to resolve relative links and images
+        parser (str, optional): ``lxml`` or ``html.parser`` (defaults to lxml when installed)
+        tables (str): ``grid`` (span-aware cell grid with inferred headers and
+            column types) or ``legacy`` (first row as headers, as the old extractor)
+        forms (bool): Also collect the static forms (as ``http_fetch.extract_forms`` describes them)
+
+    Returns:
+        Dict: ``text``, ``links``, ``images``, ``tables``, ``meta`` and
+        ``navigation``, plus ``forms`` when asked for
+    """
+    parser = parser or DEFAULT_PARSER
+    if parser == "lxml" and HAS_LXML:
+        handler = ExtractionHandler(base_url, tables, forms)
+        _feed_lxml(html, handler)
+        return handler.result()
+    return extract_from_soup(BeautifulSoup(html, parser), base_url, tables, forms)
+
+
+def check_parity(html: str, base_url: str, parser: Optional[str] = None) -> Dict:
+    """
+    Compare the engine against the legacy ``WebScraper._extract_*`` methods.
+
+    Returns:
+        Dict: ``match`` flag, the mismatching sections and both timings
+    """
+    import asyncio
+    import time
+    from web_scraper import WebScraper
+
+    parser = parser or DEFAULT_PARSER
+    legacy_scraper = WebScraper.__new__(WebScraper)
+
+    started = time.perf_counter()
+    soup = BeautifulSoup(html, parser)
+    legacy = {"text": legacy_scraper._extract_text_content(soup)}
+    legacy["links"] = asyncio.run(legacy_scraper._extract_links(soup, base_url))
+    legacy["images"] = legacy_scraper._extract_images(soup, base_url)
+    legacy["tables"] = legacy_scraper._extract_tables(soup)
+    legacy["meta"] = legacy_scraper._extract_meta_info(soup)
+    legacy["navigation"] = legacy_scraper._extract_navigation(soup)
+    legacy_ms = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    engine = extract_all(html, base_url, parser, tables="legacy")
+    engine_ms = (time.perf_counter() - started) * 1000
+
+    mismatched = [key for key in legacy if legacy[key] != engine.get(key)]
+    return {
+        "parser": parser,
+        "match": not mismatched,
+        "mismatched": mismatched,
+        "legacy_ms": round(legacy_ms, 1),
+        "engine_ms": round(engine_ms, 1),
+    }
+
+
+# Parity check against saved pages: python src/extraction.py page.html [...]
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) < 2:
+        print("Usage: python src/extraction.py PAGE.html [PAGE.html ...]")
+        sys.exit(2)
+
+    all_match = True
+    for path in sys.argv[1:]:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            page = f.read()
+        for page_parser in sorted({DEFAULT_PARSER, "html.parser"}):
+            report = check_parity(page, "https://example.com/", page_parser)
+            all_match = all_match and report["match"]
+            status = "✅" if report["match"] else f"❌ {', '.join(report['mismatched'])}"
+            print(f"{status} {path} [{page_parser}] legacy {report['legacy_ms']}ms → "
+                  f"engine {report['engine_ms']}ms")
+    sys.exit(0 if all_match else 1)
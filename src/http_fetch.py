@@ -0,0 +1,422 @@
+"""
+HTTP fast path for static pages.
+
+Most procurement portals serve their content as plain server-rendered HTML.
+``HttpFetcher`` fetches such pages with one pooled async HTTP client
+(keep-alive, gzip/deflate, plus brotli and HTTP/2 when the optional packages
+are installed) and the page is run through the same extractors as a browser
+render. ``needs_javascript`` decides from the response whether the page
+only comes alive in a browser (empty body, SPA root, "enable JavaScript"
+notices, bot challenges); only those are escalated to Playwright.
+
+The fetch mode is ``auto`` (HTTP first, browser when needed), ``http`` or
+``browser``, chosen per request or per domain (``SCRAPER_FETCH_MODES``).
+In ``auto`` mode domains that keep needing the browser are learned and sent
+straight to it.
+"""
+
+import asyncio
+import os
+import re
+import threading
+import time
+from typing import Dict, List, Optional
+import logging
+
+import requests
+from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+
+from extraction import DEFAULT_PARSER, extract_all
+from scrape_cache import response_validators
+from url_utils import url_domain
+
+try:
+    import httpx
+    HAS_HTTPX = True
+except ImportError:
+    httpx = None
+    HAS_HTTPX = False
+
+try:
+    import h2  # noqa: F401 - enables HTTP/2 in httpx
+    HAS_HTTP2 = True
+except ImportError:
+    HAS_HTTP2 = False
+
+logger = logging.getLogger(__name__)
+
+FETCH_MODES = ("auto", "http", "browser")
+DEFAULT_FETCH_MODE = os.environ.get("SCRAPER_FETCH_MODE", "auto")
+
+FETCH_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (X11; Linux x86_64; rv:128.0) Gecko/20100101 Firefox/128.0",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.5",
+}
+
+# Responses with less visible text than this are assumed to be JS shells
+MIN_TEXT_LENGTH = 200
+# JS markers only count when the page also carries little text
+THIN_TEXT_LENGTH = 1500
+MAX_BODY_BYTES = 10 * 1024 * 1024
+
+SPA_ROOT_RE = re.compile(
+    r'<div[^>]+id=["\'](?:root|app|__next|__nuxt|main-app|ember-app)["\'][^>]*>\s*</div>', re.I
+)
+NOSCRIPT_RE = re.compile(r'<noscript[^>]*>(.*?)</noscript>', re.I | re.S)
+JS_REQUIRED_RE = re.compile(
+    r'enable javascript|javascript (?:is )?(?:required|disabled|turned off)|requires javascript'
+    r'|turn on javascript|need(?:s)? javascript',
+    re.I
+)
+CHALLENGE_RE = re.compile(
+    r'cf-browser-verification|challenge-platform|<title>\s*just a moment|checking your browser'
+    r'|_incapsula_resource|px-captcha',
+    re.I
+)
+SCRIPT_TAG_RE = re.compile(r'<script\b', re.I)
+
+
+def needs_javascript(status: int, content_type: str, html: str, extracted: Optional[Dict]) -> Optional[str]:
+    """
+    Decide whether a plain HTTP response is missing content a browser would show.
+
+    Args:
+        status (int): HTTP status
+        content_type (str): Response Content-Type
+        html (str): Response body
+        extracted (Dict, optional): ``extract_all`` output for ``html``
+
+    Returns:
+        str: Reason to escalate to the browser, or None when the response is usable
+    """
+    if status >= 400:
+        # Often a WAF refusing non-browser clients; the browser gets a real try
+        return f"http_{status}"
+    if content_type and "html" not in content_type and "xml" not in content_type:
+        return "not_html"
+    if extracted is None:
+        return "too_large"
+    if CHALLENGE_RE.search(html):
+        return "bot_challenge"
+
+    text_length = len(extracted["text"].get("full_text", "").strip())
+    if text_length < MIN_TEXT_LENGTH:
+        return "empty_body"
+    if text_length < THIN_TEXT_LENGTH:
+        if SPA_ROOT_RE.search(html):
+            return "spa_root"
+        if any(JS_REQUIRED_RE.search(block) for block in NOSCRIPT_RE.findall(html)):
+            return "noscript"
+        # Mostly scripts around a little text: content is built client-side
+        if len(SCRIPT_TAG_RE.findall(html)) * 100 > text_length:
+            return "script_heavy"
+    return None
+
+
+def _field_label(field, soup: BeautifulSoup, labels: Dict[str, str]) -> str:
+    if field.get("id") and field["id"] in labels:
+        return labels[field["id"]]
+    wrapping = field.find_parent("label")
+    if wrapping is not None:
+        return wrapping.get_text(" ", strip=True)
+    if field.get("aria-label"):
+        return field["aria-label"].strip()
+    if field.get("aria-labelledby"):
+        parts = [soup.find(id=ref) for ref in field["aria-labelledby"].split()]
+        return " ".join(part.get_text(" ", strip=True) for part in parts if part is not None)
+    return (field.get("title") or "").strip()
+
+
+def extract_forms(html: str) -> List[Dict]:
+    """
+    Forms from static HTML, in the shape the browser's ``FORMS_SCRIPT`` returns.
+
+    Values are the ones in the markup (no script has run), so ``value``
+    equals ``default_value``. ``extract_static`` collects the same forms in
+    its single extraction pass; this standalone parse is the reference.
+    """
+    soup = BeautifulSoup(html, DEFAULT_PARSER)
+    labels = {}
+    for label in soup.find_all("label"):
+        if label.get("for"):
+            labels.setdefault(label["for"], label.get_text(" ", strip=True))
+
+    forms = []
+    for form in soup.find_all("form"):
+        inputs = []
+        for field in form.find_all(["input", "select", "textarea"]):
+            tag = field.name
+            field_type = field.get("type") or "text"
+            secret = field_type.lower() == "password"
+            if tag == "textarea":
+                default = field.get_text()
+            elif tag == "select":
+                default = None
+            else:
+                default = field.get("value") or ""
+            described = {
+                "tag": tag,
+                "type": field_type,
+                "name": field.get("name") or "",
+                "id": field.get("id") or "",
+                "placeholder": field.get("placeholder") or "",
+                "required": field.has_attr("required"),
+                "disabled": field.has_attr("disabled"),
+                "label": _field_label(field, soup, labels),
+                "default_value": "" if secret else default,
+                "value": "" if secret else (default or ""),
+            }
+            if tag == "select":
+                options = [{
+                    "value": option.get("value", option.get_text().strip()),
+                    "text": option.get_text().strip(),
+                    "selected": option.has_attr("selected"),
+                    "default_selected": option.has_attr("selected"),
+                    "disabled": option.has_attr("disabled"),
+                } for option in field.find_all("option")]
+                described["multiple"] = field.has_attr("multiple")
+                described["options"] = options
+                defaults = [option for option in options if option["default_selected"]]
+                if not defaults and options and not described["multiple"]:
+                    defaults = options[:1]  # browsers select the first option
+                described["default_value"] = defaults[0]["value"] if defaults else None
+                described["value"] = described["default_value"] or ""
+            if tag == "input" and field_type.lower() in ("checkbox", "radio"):
+                described["checked"] = field.has_attr("checked")
+                described["default_checked"] = field.has_attr("checked")
+            inputs.append(described)
+        forms.append({
+            "action": form.get("action") or "",
+            "method": (form.get("method") or "GET").upper(),
+            "id": form.get("id") or "",
+            "name": form.get("name") or "",
+            "inputs": inputs,
+        })
+    return forms
+
+
+def extract_static(html: str, base_url: str) -> Dict:
+    """``extract_all`` plus static forms, in one parse (runs on the extraction pool)."""
+    extracted = extract_all(html, base_url, forms="<form" in html.lower())
+    extracted.setdefault("forms", [])
+    return extracted
+
+
+class FetchProfiles:
+    """
+    Per-domain fetch modes: configured ones (``mn.gov=browser``, covering
+    subdomains) plus, in ``auto`` mode, what was learned about each domain.
+    """
+
+    # After this many auto attempts a domain that almost never serves usable
+    # HTML goes straight to the browser, re-trying HTTP every RETRY_EVERY visits
+    LEARN_AFTER = 5
+    HTTP_RATE_FLOOR = 0.2
+    RETRY_EVERY = 20
+
+    def __init__(self, domain_modes: Optional[Dict[str, str]] = None, default_mode: str = DEFAULT_FETCH_MODE):
+        for domain, mode in (domain_modes or {}).items():
+            if mode not in FETCH_MODES:
+                raise ValueError(f"Unknown fetch mode for {domain}: {mode}")
+        if default_mode not in FETCH_MODES:
+            raise ValueError(f"fetch mode must be one of: {', '.join(FETCH_MODES)}")
+        self.domain_modes = domain_modes or {}
+        self.default_mode = default_mode
+        self.learned: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def parse(spec: str) -> Dict[str, str]:
+        """Parse ``"mn.gov=browser,sam.gov=http"`` into a domain → mode map."""
+        modes = {}
+        for item in filter(None, (part.strip() for part in spec.split(","))):
+            domain, _, mode = item.partition("=")
+            modes[domain.strip().lower()] = mode.strip()
+        return modes
+
+    @classmethod
+    def from_env(cls) -> "FetchProfiles":
+        return cls(cls.parse(os.environ.get("SCRAPER_FETCH_MODES", "")))
+
+    def mode_for(self, url: str, requested: Optional[str] = None) -> str:
+        """The mode for ``url``: an explicit request wins, then the domain's, then the default."""
+        if requested and requested != "auto":
+            return requested
+        domain = url_domain(url)
+        while domain:
+            if domain in self.domain_modes:
+                return self.domain_modes[domain]
+            domain = domain.partition(".")[2]
+        return requested or self.default_mode
+
+    def should_try_http(self, url: str) -> bool:
+        """In auto mode: False once the domain has shown it needs the browser."""
+        with self._lock:
+            stats = self.learned.setdefault(url_domain(url), {"http": 0, "browser": 0, "skipped": 0})
+            attempts = stats["http"] + stats["browser"]
+            if attempts < self.LEARN_AFTER or stats["http"] >= self.HTTP_RATE_FLOOR * attempts:
+                return True
+            stats["skipped"] += 1
+            return stats["skipped"] % self.RETRY_EVERY == 0
+
+    def record(self, url: str, served_by: str):
+        with self._lock:
+            stats = self.learned.setdefault(url_domain(url), {"http": 0, "browser": 0, "skipped": 0})
+            stats[served_by] += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "default_mode": self.default_mode,
+                "domain_modes": dict(self.domain_modes),
+                "browser_domains": sorted(
+                    domain for domain, stats in self.learned.items()
+                    if stats["http"] + stats["browser"] >= self.LEARN_AFTER
+                    and stats["http"] < self.HTTP_RATE_FLOOR * (stats["http"] + stats["browser"])
+                ),
+            }
+
+
+class HttpFetcher:
+    """
+    One pooled HTTP client for page fetches.
+
+    Uses httpx.AsyncClient (keep-alive pool bound to the running loop, HTTP/2
+    when ``h2`` is installed) when httpx is available, otherwise a pooled
+    requests.Session driven from worker threads.
+    """
+
+    def __init__(self, timeout: float = 20.0, max_connections: int = 32, max_bytes: int = MAX_BODY_BYTES):
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.max_bytes = max_bytes
+        self._client = None
+        self._client_loop = None
+        self._session: Optional[requests.Session] = None
+        self.counters = {"requests": 0, "errors": 0, "bytes": 0}
+        self.versions: Dict[str, int] = {}
+
+    @classmethod
+    def from_env(cls) -> "HttpFetcher":
+        return cls(
+            timeout=float(os.environ.get("SCRAPER_HTTP_TIMEOUT", "20")),
+            max_connections=int(os.environ.get("SCRAPER_HTTP_CONNECTIONS", "32")),
+        )
+
+    def _httpx_client(self):
+        loop = asyncio.get_running_loop()
+        # An AsyncClient's pool belongs to the loop that created it
+        if self._client is None or self._client_loop is not loop:
+            self._client = httpx.AsyncClient(
+                headers=FETCH_HEADERS,
+                timeout=self.timeout,
+                follow_redirects=True,
+                http2=HAS_HTTP2,
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections),
+            )
+            self._client_loop = loop
+        return self._client
+
+    def _requests_session(self) -> requests.Session:
+        if self._session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=16, pool_maxsize=self.max_connections)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update(FETCH_HEADERS)
+            self._session = session
+        return self._session
+
+    async def _get_httpx(self, url: str):
+        async with self._httpx_client().stream("GET", url) as response:
+            body = bytearray()
+            async for chunk in response.aiter_bytes():
+                body += chunk
+                if len(body) > self.max_bytes:
+                    break
+            return response, bytes(body), response.http_version
+
+    def _get_requests(self, url: str):
+        with self._requests_session().get(url, timeout=self.timeout, stream=True) as response:
+            body = bytearray()
+            for chunk in response.iter_content(64 * 1024):
+                body += chunk
+                if len(body) > self.max_bytes:
+                    break
+            return response, bytes(body), "HTTP/1.1"
+
+    async def fetch(self, url: str) -> Dict:
+        """
+        GET ``url`` (following redirects).
+
+        The body is streamed and reading stops once it passes ``max_bytes``,
+        so an oversized page never sits in memory whole.
+
+        Returns:
+            Dict: ``status``, ``final_url``, ``content_type``, ``html`` (None
+            when the body is too large), ``bytes`` (read), ``validators`` (see
+            ``response_validators``), ``http_version`` and ``elapsed_ms``
+
+        Raises:
+            Exception: Connection errors and timeouts from the HTTP client
+        """
+        started = time.perf_counter()
+        self.counters["requests"] += 1
+        try:
+            if HAS_HTTPX:
+                response, body, version = await self._get_httpx(url)
+            else:
+                response, body, version = await asyncio.to_thread(self._get_requests, url)
+        except Exception:
+            self.counters["errors"] += 1
+            raise
+        complete = len(body) <= self.max_bytes
+        self.counters["bytes"] += len(body)
+        self.versions[version] = self.versions.get(version, 0) + 1
+        return {
+            "status": response.status_code,
+            "final_url": str(response.url),
+            "content_type": response.headers.get("Content-Type", ""),
+            "html": body.decode(response.encoding or "utf-8", errors="replace") if complete else None,
+            "bytes": len(body),
+            "validators": response_validators(response.status_code, response.headers, body if complete else None),
+            "http_version": version,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+    def stats(self) -> Dict:
+        return {**self.counters, "http_versions": dict(self.versions), "http2_available": HAS_HTTP2}
+
+
+_fetcher: Optional[HttpFetcher] = None
+_profiles: Optional[FetchProfiles] = None
+_lock = threading.Lock()
+
+
+def get_http_fetcher() -> HttpFetcher:
+    """Return the process-wide HTTP fetcher."""
+    global _fetcher
+    with _lock:
+        if _fetcher is None:
+            _fetcher = HttpFetcher.from_env()
+        return _fetcher
+
+
+def get_fetch_profiles() -> FetchProfiles:
+    """Return the process-wide per-domain fetch modes."""
+    global _profiles
+    with _lock:
+        if _profiles is None:
+            _profiles = FetchProfiles.from_env()
+        return _profiles
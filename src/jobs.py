@@ -0,0 +1,369 @@
+import asyncio
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+FINISHED_STATES = ("succeeded", "failed", "cancelled")
+
+
+class QueueFull(Exception):
+    """Raised when a job is submitted while the queue is at max depth."""
+
+
+class Job:
+    """A unit of background work and its progress history."""
+
+    def __init__(self, kind: str, payload: Dict, priority: int = 0, job_id: Optional[str] = None):
+        self.id = job_id or uuid.uuid4().hex
+        self.kind = kind
+        self.payload = payload
+        self.priority = priority
+        self.status = "queued"
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+        self.events: List[Dict] = []
+        self.task = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATES
+
+    def to_dict(self, include_result: bool = True) -> Dict[str, Any]:
+        data = {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "priority": self.priority,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+            "progress": self.events[-1] if self.events else None,
+        }
+        if include_result:
+            data["result"] = self.result
+        return data
+
+
+class JobStore:
+    """SQLite persistence so queued jobs and finished results survive a restart."""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                priority INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL,
+                result TEXT,
+                error TEXT
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status)")
+        self._db.commit()
+
+    def save(self, job: Job):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO jobs "
+                "(id, kind, payload, priority, status, created_at, started_at, finished_at, result, error) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job.id, job.kind, json.dumps(job.payload), job.priority, job.status,
+                 job.created_at, job.started_at, job.finished_at,
+                 json.dumps(job.result, default=str) if job.result is not None else None,
+                 job.error)
+            )
+            self._db.commit()
+
+    def load(self, limit: int = 1000) -> List[Job]:
+        """Unfinished jobs plus the most recent finished ones, oldest first."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, kind, payload, priority, status, created_at, started_at, finished_at, result, error "
+                "FROM jobs WHERE status NOT IN (?, ?, ?) "
+                "UNION ALL SELECT * FROM ("
+                "  SELECT id, kind, payload, priority, status, created_at, started_at, finished_at, result, error "
+                "  FROM jobs WHERE status IN (?, ?, ?) ORDER BY finished_at DESC LIMIT ?"
+                ") ORDER BY created_at",
+                (*FINISHED_STATES, *FINISHED_STATES, limit)
+            ).fetchall()
+        jobs = []
+        for row in rows:
+            job = Job(row[1], json.loads(row[2]), row[3], job_id=row[0])
+            job.status, job.created_at, job.started_at, job.finished_at = row[4], row[5], row[6], row[7]
+            job.result = json.loads(row[8]) if row[8] else None
+            job.error = row[9]
+            jobs.append(job)
+        return jobs
+
+    def prune(self, keep: int):
+        with self._lock:
+            self._db.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?, ?) AND id NOT IN ("
+                "  SELECT id FROM jobs WHERE status IN (?, ?, ?) ORDER BY finished_at DESC LIMIT ?"
+                ")",
+                (*FINISHED_STATES, *FINISHED_STATES, keep)
+            )
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+JobHandler = Callable[[Job, Callable[[Dict], None]], Awaitable[Any]]
+
+
+class JobQueue:
+    """
+    Priority job queue executed by workers on a long-lived event loop.
+
+    ``submit`` is thread-safe and returns immediately, so Flask workers
+    never wait on a browser. Submissions beyond ``max_depth`` pending jobs
+    raise QueueFull (surfaced as HTTP 429). Higher ``priority`` runs first.
+    """
+
+    def __init__(self,
+                 handlers: Dict[str, JobHandler],
+                 workers: int = 4,
+                 max_depth: int = 100,
+                 store: Optional[JobStore] = None,
+                 keep_finished: int = 1000):
+        self.handlers = handlers
+        self.workers = workers
+        self.max_depth = max_depth
+        self.store = store
+        self.keep_finished = keep_finished
+
+        self.jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self.loop = None
+        self._queue = None
+        self._worker_tasks = []
+        self._sequence = itertools.count()
+        self._depth = 0
+        self._running = 0
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+
+    @property
+    def depth(self) -> int:
+        return self._depth
+
+    async def start(self):
+        """Start workers on the current loop and re-queue persisted unfinished jobs."""
+        if self.loop is not None:
+            return
+        self.loop = asyncio.get_running_loop()
+        self._queue = asyncio.PriorityQueue()
+
+        if self.store:
+            for job in await asyncio.to_thread(self.store.load, self.keep_finished):
+                self.jobs[job.id] = job
+                if not job.finished:
+                    # Jobs interrupted mid-run start over
+                    job.status = "queued"
+                    job.started_at = None
+                    self._depth += 1
+                    self._queue.put_nowait((-job.priority, next(self._sequence), job.id))
+            if self._depth:
+                logger.info(f"Re-queued {self._depth} persisted jobs")
+
+        self._worker_tasks = [self.loop.create_task(self._worker()) for _ in range(self.workers)]
+        logger.info(f"Job queue started with {self.workers} workers (max depth {self.max_depth})")
+
+    def submit(self, kind: str, payload: Dict, priority: int = 0) -> Job:
+        """Queue a job from any thread."""
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        if self.loop is None:
+            raise RuntimeError("Job queue has not been started")
+
+        job = Job(kind, payload, priority)
+        with self._changed:
+            if self._depth >= self.max_depth:
+                raise QueueFull(f"Job queue is full ({self.max_depth} pending)")
+            self._depth += 1
+            self.jobs[job.id] = job
+            self._record(job, "queued", {"depth": self._depth})
+        self._persist(job)
+        self.loop.call_soon_threadsafe(
+            self._queue.put_nowait, (-priority, next(self._sequence), job.id)
+        )
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued or running job from any thread."""
+        job = self.jobs.get(job_id)
+        if job is None:
+            return False
+        with self._changed:
+            if job.finished:
+                return False
+            if job.status == "queued":
+                self._depth -= 1
+            self._finish(job, "cancelled")
+            # The worker creates the task under the same lock, so it is either here or never made
+            task = job.task
+        if task is not None:
+            self.loop.call_soon_threadsafe(task.cancel)
+        self._persist(job)
+        return True
+
+    def _record(self, job: Job, event: str, data: Optional[Dict] = None):
+        # Caller holds self._changed
+        job.events.append({
+            "seq": len(job.events),
+            "event": event,
+            "status": job.status,
+            "timestamp": time.time(),
+            "data": data or {},
+        })
+        self._changed.notify_all()
+
+    def _finish(self, job: Job, status: str, result: Any = None, error: Optional[str] = None):
+        # Caller holds self._changed; the first final status wins (e.g. a cancel over a late success)
+        if job.finished:
+            return
+        job.status = status
+        job.finished_at = time.time()
+        job.result = result
+        job.error = error
+        self._record(job, status, {"error": error} if error else None)
+        self._trim()
+
+    def _trim(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self.jobs[job_id]
+
+    def _persist(self, job: Job):
+        if self.store:
+            try:
+                self.store.save(job)
+            except sqlite3.Error as e:
+                logger.warning(f"Could not persist job {job.id}: {str(e)}")
+
+    async def _worker(self):
+        while True:
+            _, _, job_id = await self._queue.get()
+            job = self.jobs.get(job_id)
+            if job is None or job.status != "queued":
+                continue
+
+            with self._changed:
+                self._depth -= 1
+                self._running += 1
+                job.status = "running"
+                job.started_at = time.time()
+                self._record(job, "started")
+            await asyncio.to_thread(self._persist, job)
+
+            def report(data: Dict, job=job):
+                with self._changed:
+                    self._record(job, "progress", data)
+
+            with self._changed:
+                # cancel() may have finished the job while its start was being persisted
+                if not job.finished:
+                    # Run the handler as its own task so cancelling a job leaves the worker alive
+                    job.task = self.loop.create_task(self.handlers[job.kind](job, report))
+            if job.task is None:
+                with self._changed:
+                    self._running -= 1
+                    self._changed.notify_all()
+                # The "running" row may have been written after cancel() saved the cancellation
+                await asyncio.to_thread(self._persist, job)
+                continue
+
+            try:
+                result = await job.task
+                with self._changed:
+                    self._finish(job, "succeeded", result=result)
+            except asyncio.CancelledError:
+                if not job.finished:
+                    # The worker itself is being stopped
+                    raise
+            except Exception as e:
+                logger.error(f"Job {job.id} ({job.kind}) failed: {str(e)}")
+                with self._changed:
+                    self._finish(job, "failed", error=str(e))
+            finally:
+                job.task = None
+                with self._changed:
+                    self._running -= 1
+                    self._changed.notify_all()
+            await asyncio.to_thread(self._persist, job)
+            if self.store:
+                await asyncio.to_thread(self.store.prune, self.keep_finished)
+
+    def events(self, job_id: str, since: int = 0, keepalive: float = 15.0) -> Iterator[Optional[Dict]]:
+        """
+        Blocking iterator over a job's events for streaming (e.g. SSE).
+
+        Yields None every ``keepalive`` seconds without news so the caller can
+        send a heartbeat; ends after the job's final event.
+        """
+        job = self.jobs.get(job_id)
+        if job is None:
+            return
+        position = since
+        while True:
+            with self._changed:
+                if position >= len(job.events) and not job.finished:
+                    self._changed.wait(keepalive)
+                pending = job.events[position:]
+                finished = job.finished
+            if not pending:
+                if finished:
+                    return
+                yield None
+                continue
+            for event in pending:
+                yield event
+            position += len(pending)
+            if finished and position >= len(job.events):
+                return
+
+    def stats(self) -> Dict[str, Any]:
+        with self._changed:
+            counts: Dict[str, int] = {}
+            for job in self.jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+            return {
+                "workers": self.workers,
+                "max_depth": self.max_depth,
+                "depth": self._depth,
+                "running": self._running,
+                "jobs": counts,
+                "persistent": self.store is not None,
+            }
+
+    async def stop(self):
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+        if self.store:
+            self.store.close()
@@ -0,0 +1,507 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Optional
+import logging
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import httpx
+    HAS_HTTPX = True
+except ImportError:  # pragma: no cover - optional dependency
+    HAS_HTTPX = False
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "gpt-4o"
+OPENAI_BASE_URL = "https://api.openai.com/v1"
+RETRYABLE_STATUS = (408, 409, 429, 500, 502, 503, 504)
+
+
+class LLMError(Exception):
+    """A model call failed; ``retryable`` errors are retried by LLMClient."""
+
+    def __init__(self, message: str, status: Optional[int] = None, retryable: bool = False,
+                 retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status = status
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+def estimate_tokens(messages: List[Dict[str, str]]) -> int:
+    """Rough prompt size (~4 characters per token) used for rate limiting."""
+    return sum(len(message.get("content", "")) for message in messages) // 4 + 4 * len(messages)
+
+
+class TokenBucket:
+    """
+    Async token bucket refilled continuously at ``rate_per_minute``.
+
+    Used once for requests (1 per call) and once for tokens (prompt +
+    max completion), so calls slow down before the provider starts returning
+    429s. ``observe`` pulls the bucket down to the provider's own
+    ``x-ratelimit-remaining-*`` figure when that is lower.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self.level = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1.0) -> float:
+        """Wait until ``amount`` is available and take it. Returns seconds waited."""
+        amount = min(amount, self.capacity)  # an oversized request must still pass eventually
+        waited = 0.0
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.level >= amount:
+                    self.level -= amount
+                    return waited
+                delay = (amount - self.level) / self.rate
+                waited += delay
+                await asyncio.sleep(delay)
+
+    def observe(self, remaining: Optional[float]):
+        if remaining is None:
+            return
+        self._refill()
+        self.level = min(self.level, float(remaining))
+
+
+class ResponseCache:
+    """
+    Disk-backed model responses keyed by model + request hash.
+
+    Temperature-0 completions are deterministic enough to reuse, so analyzing
+    the same RFP chunk again costs nothing.
+    """
+
+    def __init__(self, path: str, max_age: Optional[float] = None):
+        self.path = path
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                stored_at REAL NOT NULL,
+                response TEXT NOT NULL
+            )
+        """)
+        self._db.commit()
+
+    @staticmethod
+    def make_key(model: str, messages: List[Dict[str, str]], params: Dict[str, Any]) -> str:
+        body = json.dumps({"messages": messages, "params": params}, sort_keys=True, ensure_ascii=False)
+        return f"{model}:{hashlib.sha256(body.encode('utf-8')).hexdigest()}"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute("SELECT stored_at, response FROM llm_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        if self.max_age is not None and time.time() - row[0] > self.max_age:
+            return None
+        return json.loads(row[1])
+
+    def put(self, key: str, model: str, response: Dict[str, Any]):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, model, stored_at, response) VALUES (?, ?, ?, ?)",
+                (key, model, time.time(), json.dumps(response))
+            )
+            self._db.commit()
+
+    def count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class LLMBackend(ABC):
+    """A chat-completion provider. Returns ``{"text", "model", "usage"}``."""
+
+    name = "backend"
+
+    @abstractmethod
+    async def complete(self, model: str, messages: List[Dict[str, str]], **params) -> Dict[str, Any]:
+        ...
+
+    async def close(self):
+        pass
+
+
+class OpenAIBackend(LLMBackend):
+    """
+    OpenAI-compatible chat completions over one pooled HTTP client.
+
+    Uses httpx.AsyncClient (HTTP keep-alive pool bound to the running loop)
+    when httpx is installed, otherwise a pooled requests.Session driven from
+    worker threads.
+    """
+
+    name = "openai"
+
+    def __init__(self, api_key: str, base_url: str = OPENAI_BASE_URL, timeout: float = 60.0,
+                 max_connections: int = 16):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.last_rate_limits: Dict[str, Optional[float]] = {}
+        self._client = None
+        self._client_loop = None
+        self._session: Optional[requests.Session] = None
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"}
+
+    def _httpx_client(self):
+        loop = asyncio.get_running_loop()
+        # An AsyncClient's pool belongs to the loop that created it
+        if self._client is None or self._client_loop is not loop:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=self.headers,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections),
+            )
+            self._client_loop = loop
+        return self._client
+
+    def _requests_session(self) -> requests.Session:
+        if self._session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_connections)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update(self.headers)
+            self._session = session
+        return self._session
+
+    async def _post(self, body: Dict[str, Any]):
+        """Returns (status, headers, parsed json or text)."""
+        try:
+            if HAS_HTTPX:
+                response = await self._httpx_client().post("/chat/completions", json=body)
+            else:
+                response = await asyncio.to_thread(
+                    self._requests_session().post, f"{self.base_url}/chat/completions",
+                    json=body, timeout=self.timeout
+                )
+        except Exception as e:
+            # Connection resets and timeouts are worth another try
+            raise LLMError(f"{type(e).__name__}: {e}", retryable=True)
+        try:
+            payload = response.json()
+        except ValueError:
+            payload = response.text
+        return response.status_code, response.headers, payload
+
+    async def complete(self, model: str, messages: List[Dict[str, str]], **params) -> Dict[str, Any]:
+        body = {"model": model, "messages": messages}
+        body.update({key: value for key, value in params.items() if value is not None})
+        status, headers, payload = await self._post(body)
+
+        self.last_rate_limits = {
+            "requests": _header_float(headers, "x-ratelimit-remaining-requests"),
+            "tokens": _header_float(headers, "x-ratelimit-remaining-tokens"),
+        }
+        if status != 200:
+            message = payload.get("error", {}).get("message") if isinstance(payload, dict) else str(payload)[:200]
+            raise LLMError(
+                f"HTTP {status}: {message}",
+                status=status,
+                retryable=status in RETRYABLE_STATUS,
+                retry_after=_header_float(headers, "retry-after"),
+            )
+        choice = payload["choices"][0]
+        return {
+            "text": choice["message"].get("content") or "",
+            "model": payload.get("model", model),
+            "usage": payload.get("usage", {}),
+            "finish_reason": choice.get("finish_reason"),
+        }
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+
+def _header_float(headers, name: str) -> Optional[float]:
+    value = headers.get(name) if headers is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class FakeBackend(LLMBackend):
+    """
+    Offline backend for tests and local runs.
+
+    ``responder(messages, params)`` returns the completion text (a JSON
+    ``{}`` by default); ``latency`` simulates network time and ``fail_first``
+    makes the first N calls raise a retryable error.
+    """
+
+    name = "fake"
+
+    def __init__(self, responder: Optional[Callable[[List[Dict[str, str]], Dict], str]] = None,
+                 latency: float = 0.0, fail_first: int = 0):
+        self.responder = responder or (lambda messages, params: "{}")
+        self.latency = latency
+        self.fail_first = fail_first
+        self.calls = 0
+
+    async def complete(self, model: str, messages: List[Dict[str, str]], **params) -> Dict[str, Any]:
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.calls <= self.fail_first:
+            raise LLMError("Simulated rate limit", status=429, retryable=True, retry_after=0.0)
+        text = self.responder(messages, params)
+        prompt_tokens = estimate_tokens(messages)
+        return {
+            "text": text,
+            "model": model,
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(text) // 4,
+                      "total_tokens": prompt_tokens + len(text) // 4},
+            "finish_reason": "stop",
+        }
+
+
+class LLMClient:
+    """
+    Front door for model calls: cache, coalescing, rate limits and retries.
+
+    1. Identical requests are answered from the response cache.
+    2. Identical requests already in flight share one call.
+    3. Calls wait on request and token buckets and a concurrency cap.
+    4. Retryable failures back off exponentially with full jitter,
+       honouring Retry-After.
+    """
+
+    def __init__(self,
+                 backend: LLMBackend,
+                 model: str = DEFAULT_MODEL,
+                 cache: Optional[ResponseCache] = None,
+                 requests_per_minute: float = 500,
+                 tokens_per_minute: float = 30000,
+                 max_concurrency: int = 8,
+                 max_retries: int = 4,
+                 backoff_base: float = 1.0,
+                 backoff_max: float = 30.0):
+        self.backend = backend
+        self.model = model
+        self.cache = cache
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self.counters = {
+            "requests": 0, "calls": 0, "cache_hits": 0, "coalesced": 0,
+            "retries": 0, "errors": 0, "prompt_tokens": 0, "completion_tokens": 0,
+            "rate_limited_seconds": 0.0,
+        }
+
+    @classmethod
+    def from_env(cls, api_key: Optional[str] = None) -> Optional["LLMClient"]:
+        """
+        Client configured from SCRAPER_LLM_* (None when no backend is available).
+
+        ``SCRAPER_LLM_BACKEND=fake`` selects the offline backend; otherwise an
+        OpenAI key (argument or OPENAI_API_KEY) is required.
+        """
+        backend_name = os.environ.get("SCRAPER_LLM_BACKEND", "openai")
+        if backend_name == "fake":
+            backend: LLMBackend = FakeBackend()
+        else:
+            api_key = api_key or os.environ.get("OPENAI_API_KEY")
+            if not api_key:
+                return None
+            backend = OpenAIBackend(api_key, base_url=os.environ.get("SCRAPER_LLM_BASE_URL", OPENAI_BASE_URL))
+
+        cache = None
+        if os.environ.get("SCRAPER_LLM_CACHE", "1") != "0":
+            cache_dir = os.environ.get("SCRAPER_CACHE_DIR", ".cache")
+            cache = ResponseCache(os.path.join(cache_dir, "llm_cache.sqlite"))
+        return cls(
+            backend,
+            model=os.environ.get("SCRAPER_LLM_MODEL", DEFAULT_MODEL),
+            cache=cache,
+            requests_per_minute=float(os.environ.get("SCRAPER_LLM_RPM", "500")),
+            tokens_per_minute=float(os.environ.get("SCRAPER_LLM_TPM", "30000")),
+            max_concurrency=int(os.environ.get("SCRAPER_LLM_CONCURRENCY", "8")),
+        )
+
+    async def complete(self,
+                       prompt: str,
+                       system: Optional[str] = None,
+                       model: Optional[str] = None,
+                       max_tokens: int = 800,
+                       temperature: float = 0.0,
+                       json_mode: bool = False) -> Dict[str, Any]:
+        """
+        Run one chat completion.
+
+        Args:
+            prompt (str): User message
+            system (str, optional): System message
+            model (str, optional): Model name (client default otherwise)
+            max_tokens (int): Completion token limit
+            temperature (float): Sampling temperature (only 0 is cached)
+            json_mode (bool): Ask for a JSON object response
+
+        Returns:
+            Dict: ``text``, ``model``, ``usage`` and ``cached`` (True when no call was made)
+        """
+        model = model or self.model
+        messages = ([{"role": "system", "content": system}] if system else []) + [{"role": "user", "content": prompt}]
+        params = {"max_tokens": max_tokens, "temperature": temperature}
+        if json_mode:
+            params["response_format"] = {"type": "json_object"}
+        key = ResponseCache.make_key(model, messages, params)
+        cacheable = self.cache is not None and temperature == 0
+        self.counters["requests"] += 1
+
+        if cacheable:
+            cached = await asyncio.to_thread(self.cache.get, key)
+            if cached is not None:
+                self.counters["cache_hits"] += 1
+                return {**cached, "cached": True}
+
+        # The call runs in its own task: a cancelled caller must not fail the callers coalesced onto it
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.counters["coalesced"] += 1
+            return {**await asyncio.shield(task), "cached": True}
+
+        task = asyncio.ensure_future(self._call_and_store(key, model, messages, params, max_tokens, cacheable))
+        self._in_flight[key] = task
+        task.add_done_callback(lambda done: self._call_done(key, done))
+        return {**await asyncio.shield(task), "cached": False}
+
+    async def _call_and_store(self, key: str, model: str, messages: List[Dict[str, str]], params: Dict[str, Any],
+                              max_tokens: int, cacheable: bool) -> Dict[str, Any]:
+        response = await self._call_with_retries(model, messages, params, max_tokens)
+        if cacheable:
+            await asyncio.to_thread(self.cache.put, key, model, response)
+        return response
+
+    def _call_done(self, key: str, task: "asyncio.Future"):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Every caller may have been cancelled; don't log the error as never retrieved
+        if not task.cancelled():
+            task.exception()
+
+    async def _call_with_retries(self, model: str, messages: List[Dict[str, str]], params: Dict[str, Any],
+                                 max_tokens: int) -> Dict[str, Any]:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        attempt = 0
+        while True:
+            async with self._semaphore:
+                waited = await self.request_bucket.acquire(1)
+                waited += await self.token_bucket.acquire(estimate_tokens(messages) + max_tokens)
+                self.counters["rate_limited_seconds"] += waited
+                self.counters["calls"] += 1
+                try:
+                    response = await self.backend.complete(model, messages, **params)
+                except LLMError as e:
+                    error = e
+                else:
+                    limits = getattr(self.backend, "last_rate_limits", {})
+                    self.request_bucket.observe(limits.get("requests"))
+                    self.token_bucket.observe(limits.get("tokens"))
+                    usage = response.get("usage", {})
+                    self.counters["prompt_tokens"] += usage.get("prompt_tokens", 0)
+                    self.counters["completion_tokens"] += usage.get("completion_tokens", 0)
+                    return response
+
+            if not error.retryable or attempt >= self.max_retries:
+                self.counters["errors"] += 1
+                raise error
+            # Full jitter: spread retries so a burst of 429s doesn't come back in lockstep
+            delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+            if error.retry_after is not None:
+                delay = max(delay, error.retry_after)
+            attempt += 1
+            self.counters["retries"] += 1
+            logger.warning(f"LLM call failed ({error}); retry {attempt}/{self.max_retries} in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    async def complete_json(self, prompt: str, **kwargs) -> Dict[str, Any]:
+        """``complete`` in JSON mode with the text parsed (``{}`` when unparseable)."""
+        response = await self.complete(prompt, json_mode=True, **kwargs)
+        try:
+            data = json.loads(response["text"])
+        except (TypeError, ValueError):
+            logger.warning("LLM returned invalid JSON")
+            data = {}
+        return {**response, "data": data if isinstance(data, dict) else {}}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend.name,
+            "model": self.model,
+            "in_flight": len(self._in_flight),
+            "cached_responses": self.cache.count() if self.cache else None,
+            **{key: round(value, 3) if isinstance(value, float) else value for key, value in self.counters.items()},
+        }
+
+    async def close(self):
+        # Calls now outlive their callers; stop them before the backend goes away
+        for task in list(self._in_flight.values()):
+            task.cancel()
+        await self.backend.close()
+        if self.cache is not None:
+            self.cache.close()
+
+
+_clients: Dict[Optional[str], Optional[LLMClient]] = {}
+_clients_lock = threading.Lock()
+
+
+def get_llm_client(api_key: Optional[str] = None) -> Optional[LLMClient]:
+    """Process-wide client per API key from SCRAPER_LLM_* settings (None when unconfigured)."""
+    with _clients_lock:
+        if api_key not in _clients:
+            _clients[api_key] = LLMClient.from_env(api_key)
+        return _clients[api_key]
@@ -0,0 +1,455 @@
+"""
+Metrics, per-stage timings and a sampling profiler for slow requests.
+
+Every phase of a scrape or an RFP analysis runs inside a ``span``: its
+duration goes into the ``scraper_stage_duration_seconds`` histogram and,
+when a request asked for it, into that request's ``Timings`` (collected
+through a context variable, so it follows the work onto the background
+event loop). Counters, histograms and callback gauges (pool usage, cache
+hits, queue depth, ...) are rendered in the Prometheus text format on
+``/metrics``.
+
+The profiler is opt-in (``SCRAPER_PROFILE_SLOW_MS``): while requests are in
+flight it samples every thread's stack, and keeps the aggregated stacks of
+those that end up slower than the threshold.
+"""
+
+import asyncio
+import contextvars
+import functools
+import os
+import sys
+import threading
+import time
+from collections import Counter as StackCounter, deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Seconds; scrapes range from a few ms (cache hits) to a minute (slow renders)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Label sets per metric before new ones are folded into ``other`` (e.g. domains)
+MAX_SERIES = 500
+OVERFLOW_LABEL = "other"
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(key: LabelKey) -> str:
+    if not key:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in key) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, max_series: int = MAX_SERIES):
+        self.name = name
+        self.help = help_text
+        self.max_series = max_series
+        self._lock = threading.Lock()
+
+    def _bounded(self, series: Dict, key: LabelKey) -> LabelKey:
+        # Unbounded label values (domains) must not grow memory without limit
+        if key in series or len(series) < self.max_series:
+            return key
+        return tuple((name, OVERFLOW_LABEL) for name, _ in key)
+
+
+class Counter(_Metric):
+    """Monotonic count per label set."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, max_series: int = MAX_SERIES):
+        super().__init__(name, help_text, max_series)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            key = self._bounded(self._values, key)
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(_label_key(labels), 0)
+
+    def samples(self) -> List[Tuple[str, LabelKey, float]]:
+        with self._lock:
+            return [(self.name, key, value) for key, value in self._values.items()]
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram per label set."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+                 max_series: int = MAX_SERIES):
+        super().__init__(name, help_text, max_series)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[LabelKey, List] = {}
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            key = self._bounded(self._series, key)
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for position, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][position] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def summary(self, **labels) -> Optional[Dict[str, float]]:
+        with self._lock:
+            series = self._series.get(_label_key(labels))
+            if series is None:
+                return None
+            return {"count": series[2], "sum": series[1]}
+
+    def samples(self) -> List[Tuple[str, LabelKey, float]]:
+        samples = []
+        with self._lock:
+            for key, (counts, total, count) in self._series.items():
+                cumulative = 0
+                for bound, bucket in zip(self.buckets, counts):
+                    cumulative += bucket
+                    samples.append((f"{self.name}_bucket", key + (("le", _format_value(bound)),), cumulative))
+                samples.append((f"{self.name}_bucket", key + (("le", "+Inf"),), count))
+                samples.append((f"{self.name}_sum", key, total))
+                samples.append((f"{self.name}_count", key, count))
+        return samples
+
+
+class Collected(_Metric):
+    """
+    Values read from a callback at scrape time, e.g. a component's ``stats()``.
+
+    The callback returns a number, or a list of ``(labels, value)`` pairs.
+    """
+
+    def __init__(self, name: str, help_text: str, collect: Callable[[], Any], kind: str = "gauge"):
+        super().__init__(name, help_text)
+        self.kind = kind
+        self.collect = collect
+
+    def samples(self) -> List[Tuple[str, LabelKey, float]]:
+        try:
+            collected = self.collect()
+        except Exception as e:
+            logger.debug(f"Metric {self.name} collection failed: {str(e)}")
+            return []
+        if collected is None:
+            return []
+        if isinstance(collected, (int, float)):
+            return [(self.name, (), collected)]
+        return [(self.name, _label_key(labels), value) for labels, value in collected if value is not None]
+
+
+class MetricsRegistry:
+    """Named metrics rendered together in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None and not isinstance(metric, Collected):
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help_text: str, max_series: int = MAX_SERIES) -> Counter:
+        return self._register(Counter(name, help_text, max_series))
+
+    def histogram(self, name: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, buckets))
+
+    def collected(self, name: str, help_text: str, collect: Callable[[], Any], kind: str = "gauge") -> Collected:
+        """Register (or replace) a callback metric."""
+        return self._register(Collected(name, help_text, collect, kind))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            samples = metric.samples()
+            if not samples:
+                continue
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, key, value in samples:
+                lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram("scraper_stage_duration_seconds", "Duration of scrape and analysis stages")
+STAGE_ERRORS = REGISTRY.counter("scraper_stage_errors_total", "Stages that raised")
+PAGES = REGISTRY.counter("scraper_pages_total", "Scrape results by how they were served and their status")
+DOMAIN_ERRORS = REGISTRY.counter("scraper_errors_total", "Failed scrapes by domain")
+
+
+class Timings:
+    """Stage durations collected for one request (or one result)."""
+
+    __slots__ = ("parent", "started", "stages", "calls")
+
+    def __init__(self, parent: Optional["Timings"] = None):
+        self.parent = parent
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.calls: Dict[str, int] = {}
+
+    def add(self, stage: str, seconds: float):
+        timings = self
+        while timings is not None:
+            timings.stages[stage] = timings.stages.get(stage, 0.0) + seconds
+            timings.calls[stage] = timings.calls.get(stage, 0) + 1
+            timings = timings.parent
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "total_ms": round((time.perf_counter() - self.started) * 1000, 1),
+            "stages": {stage: round(seconds * 1000, 1) for stage, seconds in self.stages.items()},
+            "calls": dict(self.calls),
+        }
+
+    def server_timing(self) -> str:
+        """The stages as a ``Server-Timing`` header value."""
+        return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in self.stages.items())
+
+
+_timings: contextvars.ContextVar = contextvars.ContextVar("scraper_timings", default=None)
+
+
+def current_timings() -> Optional[Timings]:
+    return _timings.get()
+
+
+@contextmanager
+def collect_timings() -> Iterator[Timings]:
+    """
+    Collect the durations of every span run inside this block (including on
+    the background loop via ``run_sync``). Nested collectors also report to
+    the enclosing one.
+    """
+    timings = Timings(_timings.get())
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
+
+
+@contextmanager
+def untimed() -> Iterator[None]:
+    """Start long-lived background work (queue workers, watchers) outside any request's timings."""
+    token = _timings.set(None)
+    try:
+        yield
+    finally:
+        _timings.reset(token)
+
+
+def record(stage: str, seconds: float):
+    """Record a duration measured elsewhere (e.g. in an extraction worker)."""
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    timings = _timings.get()
+    if timings is not None:
+        timings.add(stage, seconds)
+
+
+class span:
+    """
+    Time a stage, as a ``with`` block or a (sync or async) function decorator.
+
+        with span("navigate"):
+            await page.goto(url)
+
+        @span("rfp_fetch")
+        async def fetch(...): ...
+    """
+
+    __slots__ = ("stage", "started")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self.started = 0.0
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        record(self.stage, time.perf_counter() - self.started)
+        if exc_type is not None and not issubclass(exc_type, asyncio.CancelledError):
+            STAGE_ERRORS.inc(stage=self.stage)
+        return False
+
+    def __call__(self, fn: Callable) -> Callable:
+        stage = self.stage
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(stage):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+
+
+def record_result(result: Dict[str, Any], domain: Optional[str] = None):
+    """Count a scrape result (and its domain when it failed)."""
+    status = result.get("status", "unknown")
+    if (result.get("cache") or {}).get("status") in ("hit", "revalidated"):
+        served_by = "cache"
+    else:
+        served_by = result.get("served_by") or "none"
+    PAGES.inc(served_by=served_by, status=status)
+    if status != "success" and domain:
+        DOMAIN_ERRORS.inc(domain=domain)
+
+
+class SamplingProfiler:
+    """
+    Stack sampler for slow requests.
+
+    While at least one ``profile()`` block is open, a daemon thread samples
+    the stacks of all other threads every ``interval`` seconds (the scrape
+    itself runs on the background loop thread, not the request thread).
+    Blocks that take longer than ``slow_ms`` keep their aggregated stacks.
+    """
+
+    def __init__(self, slow_ms: float, interval: float = 0.01, keep: int = 20, top: int = 25,
+                 max_depth: int = 40):
+        self.slow_ms = slow_ms
+        self.interval = interval
+        self.top = top
+        self.max_depth = max_depth
+        self.reports = deque(maxlen=keep)
+        self.profiled = 0
+        self._sessions: Dict[int, Dict[str, Any]] = {}
+        self._ids = 0
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_env(cls) -> Optional["SamplingProfiler"]:
+        """Profiler configured from SCRAPER_PROFILE_* (disabled unless SCRAPER_PROFILE_SLOW_MS is set)."""
+        slow_ms = os.environ.get("SCRAPER_PROFILE_SLOW_MS")
+        if not slow_ms:
+            return None
+        return cls(float(slow_ms), interval=float(os.environ.get("SCRAPER_PROFILE_INTERVAL_MS", "10")) / 1000)
+
+    def _stack(self, frame) -> str:
+        parts = []
+        while frame is not None and len(parts) < self.max_depth:
+            code = frame.f_code
+            parts.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+            frame = frame.f_back
+        return ";".join(reversed(parts))
+
+    def _run(self):
+        own = threading.get_ident()
+        while True:
+            with self._lock:
+                if not self._sessions:
+                    self._thread = None
+                    return
+                sessions = list(self._sessions.values())
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            stacks = [
+                f"{names.get(ident, ident)};{self._stack(frame)}"
+                for ident, frame in sys._current_frames().items() if ident != own
+            ]
+            for session in sessions:
+                session["stacks"].update(stacks)
+                session["samples"] += 1
+            time.sleep(self.interval)
+
+    @contextmanager
+    def profile(self, label: str) -> Iterator[None]:
+        """Sample while the block runs; keep the stacks if it turns out slow."""
+        session = {"stacks": StackCounter(), "samples": 0}
+        with self._lock:
+            self._ids += 1
+            session_id = self._ids
+            self._sessions[session_id] = session
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="scraper-profiler", daemon=True)
+                self._thread.start()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            with self._lock:
+                self._sessions.pop(session_id, None)
+                self.profiled += 1
+            if elapsed_ms >= self.slow_ms:
+                report = {
+                    "label": label,
+                    "duration_ms": round(elapsed_ms, 1),
+                    "finished_at": time.time(),
+                    "samples": session["samples"],
+                    "stacks": [{"stack": stack, "samples": count}
+                               for stack, count in session["stacks"].most_common(self.top)],
+                }
+                self.reports.append(report)
+                logger.warning(f"Slow request {label}: {report['duration_ms']}ms ({report['samples']} samples kept)")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "slow_ms": self.slow_ms,
+            "interval_ms": self.interval * 1000,
+            "profiled": self.profiled,
+            "active": len(self._sessions),
+            "slow_reports": len(self.reports),
+        }
+
+
+_profiler: Optional[SamplingProfiler] = None
+_profiler_loaded = False
+_profiler_lock = threading.Lock()
+
+
+def get_profiler() -> Optional[SamplingProfiler]:
+    """Return the process-wide profiler, or None when slow-request profiling is off."""
+    global _profiler, _profiler_loaded
+    with _profiler_lock:
+        if not _profiler_loaded:
+            _profiler = SamplingProfiler.from_env()
+            _profiler_loaded = True
+        return _profiler
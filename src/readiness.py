@@ -0,0 +1,346 @@
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlparse
+import logging
+
+try:
+    import fcntl
+except ImportError:  # Windows: writers are not serialized across processes
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Resolves true once the DOM has gone `quietMs` without child/text mutations,
+# or false if it is still churning after `timeoutMs` (e.g. long-polling widgets).
+QUIESCENCE_SCRIPT = """
+([quietMs, timeoutMs]) => new Promise((resolve) => {
+    let quietTimer = null;
+    let capTimer = null;
+    const observer = new MutationObserver(() => {
+        clearTimeout(quietTimer);
+        quietTimer = setTimeout(() => finish(true), quietMs);
+    });
+    const finish = (settled) => {
+        observer.disconnect();
+        clearTimeout(quietTimer);
+        clearTimeout(capTimer);
+        resolve(settled);
+    };
+    observer.observe(document, {childList: true, subtree: true, characterData: true});
+    quietTimer = setTimeout(() => finish(true), quietMs);
+    capTimer = setTimeout(() => finish(false), timeoutMs);
+})
+"""
+
+READINESS_STRATEGIES = (
+    "auto", "dom_quiescence", "selector_present", "dom_content_settle", "network_idle"
+)
+
+TEXT_LENGTH_SCRIPT = "() => (document.body && document.body.innerText || '').length"
+
+
+class ReadinessStrategy:
+    """Decides when a freshly navigated page is ready to be extracted."""
+
+    name = "base"
+    wait_until = "domcontentloaded"
+
+    async def wait(self, page) -> bool:
+        """Wait for readiness; return False if the bound was hit first."""
+        return True
+
+
+class NetworkIdle(ReadinessStrategy):
+    """Legacy behaviour: navigation waits for network idle."""
+
+    name = "network_idle"
+    wait_until = "networkidle"
+
+
+class DomQuiescence(ReadinessStrategy):
+    """Ready once the DOM stops mutating for ``quiet_ms``."""
+
+    name = "dom_quiescence"
+
+    def __init__(self, quiet_ms: int = 500, timeout_ms: int = 10000):
+        self.quiet_ms = quiet_ms
+        self.timeout_ms = timeout_ms
+
+    async def wait(self, page) -> bool:
+        try:
+            return bool(await page.evaluate(QUIESCENCE_SCRIPT, [self.quiet_ms, self.timeout_ms]))
+        except Exception as e:
+            # A client-side redirect destroys the execution context; settle on the new document
+            logger.debug(f"Quiescence probe interrupted: {str(e)}")
+            await page.wait_for_load_state("domcontentloaded")
+            return bool(await page.evaluate(QUIESCENCE_SCRIPT, [self.quiet_ms, self.timeout_ms]))
+
+
+class SelectorPresent(ReadinessStrategy):
+    """Ready once ``selector`` is attached to the DOM."""
+
+    name = "selector_present"
+
+    def __init__(self, selector: str, timeout_ms: int = 10000):
+        self.selector = selector
+        self.timeout_ms = timeout_ms
+
+    async def wait(self, page) -> bool:
+        try:
+            await page.wait_for_selector(self.selector, state="attached", timeout=self.timeout_ms)
+            return True
+        except Exception:
+            return False
+
+
+class DomContentSettle(ReadinessStrategy):
+    """Ready at DOMContentLoaded plus up to ``settle_ms`` for the load event."""
+
+    name = "dom_content_settle"
+
+    def __init__(self, settle_ms: int = 750):
+        self.settle_ms = settle_ms
+
+    async def wait(self, page) -> bool:
+        try:
+            await page.wait_for_load_state("load", timeout=self.settle_ms)
+            return True
+        except Exception:
+            return False
+
+
+class DomainProfileStore:
+    """
+    Remembers per-domain outcomes of each strategy so later scrapes of the
+    same portal start with whichever strategy was fast and produced content.
+
+    ``record`` runs on the event loop, so it only marks the domain dirty; the
+    file is rewritten at most every ``flush_interval`` seconds from a timer
+    thread. Several processes (cluster workers) may share the file: writes
+    hold a ``.lock`` file, merge in the other domains found on disk and go
+    through their own temp file.
+    """
+
+    def __init__(self, path: Optional[str] = None, flush_interval: float = 5.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.profiles: Dict[str, Dict[str, Dict]] = {}
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._dirty = set()
+        self._timer: Optional[threading.Timer] = None
+        if path:
+            self.profiles = self._load()
+            atexit.register(self.flush)
+
+    def _load(self) -> Dict[str, Dict[str, Dict]]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable readiness profiles {self.path}: {str(e)}")
+            return {}
+
+    def record(self, domain: str, strategy: str, ready: bool, wait_ms: float):
+        with self._lock:
+            stats = self.profiles.setdefault(domain, {}).setdefault(
+                strategy, {"runs": 0, "ready": 0, "total_wait_ms": 0.0}
+            )
+            stats["runs"] += 1
+            stats["ready"] += int(ready)
+            stats["total_wait_ms"] += wait_ms
+            if not self.path:
+                return
+            self._dirty.add(domain)
+            if self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def best(self, domain: str, candidates) -> Optional[str]:
+        """Strategy with the best ready-rate, then lowest mean wait."""
+        profile = self.profiles.get(domain)
+        if not profile:
+            return None
+        scored = []
+        for name in candidates:
+            stats = profile.get(name)
+            if stats and stats["runs"]:
+                scored.append((
+                    -stats["ready"] / stats["runs"],
+                    stats["total_wait_ms"] / stats["runs"],
+                    name
+                ))
+        return min(scored)[2] if scored else None
+
+    def ready_rate(self, domain: str, strategy: str) -> float:
+        stats = self.profiles.get(domain, {}).get(strategy)
+        if not stats or not stats["runs"]:
+            return 0.0
+        return stats["ready"] / stats["runs"]
+
+    def get(self, domain: str) -> Dict:
+        return self.profiles.get(domain, {})
+
+    def flush(self):
+        """Write the domains recorded since the last flush (blocking; not for the event loop)."""
+        with self._save_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                if not self._dirty:
+                    return
+                dirty, self._dirty = self._dirty, set()
+                changed = {domain: json.loads(json.dumps(self.profiles[domain])) for domain in dirty}
+
+            try:
+                with open(f"{self.path}.lock", "a") as lock:
+                    if fcntl is not None:
+                        fcntl.flock(lock, fcntl.LOCK_EX)
+                    self._merge_and_write(changed)
+            except OSError as e:
+                logger.warning(f"Could not persist readiness profiles: {str(e)}")
+
+    def _merge_and_write(self, changed: Dict[str, Dict[str, Dict]]):
+        # Keep what other processes learned about their domains
+        profiles = self._load()
+        profiles.update(changed)
+        with self._lock:
+            for domain, profile in profiles.items():
+                if domain not in changed and domain not in self._dirty:
+                    self.profiles[domain] = profile
+
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(os.path.abspath(self.path)),
+            prefix=f"{os.path.basename(self.path)}.", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(profiles, f)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+
+class ReadinessEngine:
+    """
+    Navigates a page and waits for it to be ready using a named strategy.
+
+    Strategies: ``auto`` (learned per domain), ``dom_quiescence``,
+    ``selector_present`` (needs ``selector``), ``dom_content_settle`` and
+    ``network_idle`` (the legacy fixed wait).
+    """
+
+    LEARNED_STRATEGIES = ("dom_quiescence", "dom_content_settle")
+
+    def __init__(self,
+                 profiles: Optional[DomainProfileStore] = None,
+                 quiet_ms: int = 500,
+                 settle_ms: int = 750,
+                 strategy_timeout_ms: int = 10000,
+                 min_text_length: int = 50):
+        self.profiles = profiles or DomainProfileStore()
+        self.quiet_ms = quiet_ms
+        self.settle_ms = settle_ms
+        self.strategy_timeout_ms = strategy_timeout_ms
+        self.min_text_length = min_text_length
+
+    def build(self, name: str, selector: Optional[str] = None) -> ReadinessStrategy:
+        if name == "dom_quiescence":
+            return DomQuiescence(self.quiet_ms, self.strategy_timeout_ms)
+        if name == "selector_present":
+            if not selector:
+                raise ValueError("selector_present readiness requires a selector")
+            return SelectorPresent(selector, self.strategy_timeout_ms)
+        if name == "dom_content_settle":
+            return DomContentSettle(self.settle_ms)
+        if name == "network_idle":
+            return NetworkIdle()
+        raise ValueError(f"Unknown readiness strategy: {name}")
+
+    def choose(self, domain: str, strategy: str = "auto", selector: Optional[str] = None) -> str:
+        if strategy != "auto":
+            return strategy
+        if selector:
+            return "selector_present"
+        best = self.profiles.best(domain, self.LEARNED_STRATEGIES)
+        if best is None:
+            return self.LEARNED_STRATEGIES[0]
+        # Explore an untried strategy while the best known one is unreliable here
+        untried = [name for name in self.LEARNED_STRATEGIES if name not in self.profiles.get(domain)]
+        if untried and self.profiles.ready_rate(domain, best) < 1.0:
+            return untried[0]
+        return best
+
+    async def navigate(self,
+                       page,
+                       url: str,
+                       strategy: str = "auto",
+                       selector: Optional[str] = None,
+                       timeout_ms: int = 30000) -> Dict:
+        """
+        Navigate ``page`` to ``url`` and wait until it is ready.
+
+        Args:
+            page: Playwright page
+            url (str): Target URL
+            strategy (str): Strategy name or ``auto``
+            selector (str, optional): CSS selector for ``selector_present``
+            timeout_ms (int): Navigation timeout
+
+        Returns:
+            Dict: Strategy used, whether it reported ready, the time spent and
+            the HTTP status of the main response (None if there was none)
+        """
+        domain = urlparse(url).netloc.lower()
+        name = self.choose(domain, strategy, selector)
+        readiness = self.build(name, selector)
+
+        started = time.perf_counter()
+        response = await page.goto(url, wait_until=readiness.wait_until, timeout=timeout_ms)
+        navigated = time.perf_counter()
+        ready = await readiness.wait(page)
+        finished = time.perf_counter()
+
+        # A strategy only "worked" if the page also rendered real content
+        if ready and name in self.LEARNED_STRATEGIES and self.min_text_length:
+            try:
+                ready = await page.evaluate(TEXT_LENGTH_SCRIPT) >= self.min_text_length
+            except Exception:
+                ready = False
+
+        wait_ms = (finished - navigated) * 1000
+        if strategy == "auto" and name in self.LEARNED_STRATEGIES:
+            self.profiles.record(domain, name, ready, wait_ms)
+
+        return {
+            "strategy": name,
+            "ready": ready,
+            "navigation_ms": round((navigated - started) * 1000, 1),
+            "wait_ms": round(wait_ms, 1),
+            "total_ms": round((finished - started) * 1000, 1),
+            "http_status": response.status if response is not None else None,
+        }
+
+
+_engine: Optional[ReadinessEngine] = None
+
+
+def get_readiness_engine() -> ReadinessEngine:
+    """Return the process-wide readiness engine (profiles persisted if configured)."""
+    global _engine
+    if _engine is None:
+        _engine = ReadinessEngine(DomainProfileStore(os.environ.get("SCRAPER_READINESS_PROFILES")))
+    return _engine
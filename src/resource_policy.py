@@ -0,0 +1,150 @@
+import os
+from typing import Dict, Iterable, Optional
+from urllib.parse import urlparse
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Analytics, ad and session-replay hosts that never carry RFP content
+TRACKER_DOMAINS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "googleadservices.com",
+    "googlesyndication.com",
+    "doubleclick.net",
+    "facebook.net",
+    "connect.facebook.net",
+    "hotjar.com",
+    "clarity.ms",
+    "newrelic.com",
+    "nr-data.net",
+    "segment.io",
+    "segment.com",
+    "mixpanel.com",
+    "quantserve.com",
+    "scorecardresearch.com",
+    "adnxs.com",
+    "taboola.com",
+    "outbrain.com",
+    "siteimproveanalytics.com",
+    "crazyegg.com",
+    "fullstory.com",
+)
+
+# Playwright resource types blocked by each preset
+PRESETS: Dict[str, Dict] = {
+    "full": {
+        "blocked_types": (),
+        "block_trackers": False,
+    },
+    "no-media": {
+        "blocked_types": ("image", "media", "font"),
+        "block_trackers": True,
+    },
+    "text-only": {
+        "blocked_types": ("image", "media", "font", "stylesheet", "texttrack", "manifest", "other"),
+        "block_trackers": True,
+    },
+}
+
+DEFAULT_PRESET = os.environ.get("SCRAPER_RESOURCE_POLICY", "no-media")
+
+
+def _host_matches(host: str, domains: Iterable[str]) -> bool:
+    return any(host == domain or host.endswith(f".{domain}") for domain in domains)
+
+
+class ResourcePolicy:
+    """
+    Decides which subresources a page may download while being scraped.
+
+    Only bytes are blocked: ``<img src>`` and friends stay in the DOM, so
+    ``_extract_images`` still reports image URLs. The top-level document is
+    never blocked. ``allow_domains`` overrides every other rule and
+    ``deny_domains`` blocks a host outright.
+    """
+
+    def __init__(self,
+                 name: str = "custom",
+                 blocked_types: Iterable[str] = (),
+                 block_trackers: bool = False,
+                 allow_domains: Iterable[str] = (),
+                 deny_domains: Iterable[str] = ()):
+        self.name = name
+        self.blocked_types = frozenset(blocked_types)
+        self.block_trackers = block_trackers
+        self.allow_domains = tuple(d.lower().lstrip(".") for d in allow_domains)
+        self.deny_domains = tuple(d.lower().lstrip(".") for d in deny_domains)
+
+    @classmethod
+    def from_preset(cls,
+                    preset: Optional[str] = None,
+                    allow_domains: Iterable[str] = (),
+                    deny_domains: Iterable[str] = ()) -> "ResourcePolicy":
+        preset = preset or DEFAULT_PRESET
+        if preset not in PRESETS:
+            raise ValueError(f"resource_policy must be one of: {', '.join(PRESETS)}")
+        return cls(name=preset, allow_domains=allow_domains, deny_domains=deny_domains,
+                   **PRESETS[preset])
+
+    @property
+    def blocks_anything(self) -> bool:
+        return bool(self.blocked_types or self.block_trackers or self.deny_domains)
+
+    def should_block(self, resource_type: str, url: str) -> bool:
+        host = (urlparse(url).hostname or "").lower()
+        if self.allow_domains and _host_matches(host, self.allow_domains):
+            return False
+        if self.deny_domains and _host_matches(host, self.deny_domains):
+            return True
+        if resource_type == "document":
+            return False
+        if resource_type in self.blocked_types:
+            return True
+        return self.block_trackers and _host_matches(host, TRACKER_DOMAINS)
+
+    def describe(self) -> Dict:
+        return {
+            "name": self.name,
+            "blocked_types": sorted(self.blocked_types),
+            "block_trackers": self.block_trackers,
+            "allow_domains": list(self.allow_domains),
+            "deny_domains": list(self.deny_domains),
+        }
+
+
+class RouteBlocker:
+    """Playwright route handler enforcing a ResourcePolicy and counting what it did."""
+
+    def __init__(self, policy: ResourcePolicy):
+        self.policy = policy
+        self.allowed = 0
+        self.blocked: Dict[str, int] = {}
+
+    async def handle(self, route):
+        request = route.request
+        try:
+            if self.policy.should_block(request.resource_type, request.url):
+                self.blocked[request.resource_type] = self.blocked.get(request.resource_type, 0) + 1
+                await route.abort("blockedbyclient")
+            else:
+                self.allowed += 1
+                await route.continue_()
+        except Exception as e:
+            # The page may have navigated away or closed mid-request
+            logger.debug(f"Route handling failed for {request.url}: {str(e)}")
+
+    async def attach(self, target):
+        """Install on a Page or BrowserContext."""
+        await target.route("**/*", self.handle)
+
+    async def detach(self, target):
+        await target.unroute("**/*", self.handle)
+
+    def stats(self) -> Dict:
+        return {
+            "policy": self.policy.name,
+            "allowed_requests": self.allowed,
+            "blocked_requests": sum(self.blocked.values()),
+            "blocked_by_type": dict(self.blocked),
+        }
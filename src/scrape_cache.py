@@ -0,0 +1,376 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+import logging
+
+import requests
+
+from screenshots import get_screenshot_pipeline
+from url_utils import normalize_url, url_domain
+
+logger = logging.getLogger(__name__)
+
+PROBE_HEADERS = {"User-Agent": "Mozilla/5.0 (compatible; BidBotBuddy/1.0)"}
+
+_sessions = threading.local()
+
+
+def _session() -> requests.Session:
+    # One keep-alive session per worker thread
+    session = getattr(_sessions, "session", None)
+    if session is None:
+        session = _sessions.session = requests.Session()
+        session.headers.update(PROBE_HEADERS)
+    return session
+
+
+def response_validators(status: int, headers, body: Optional[bytes]) -> Dict[str, Optional[str]]:
+    """
+    What later revalidation can use from an HTTP response: ETag,
+    Last-Modified and a hash of the raw body (empty for error responses;
+    no hash when ``body`` is None, e.g. a body cut off at the size limit).
+    """
+    if status >= 400:
+        return {}
+    return {
+        "etag": headers.get("ETag"),
+        "last_modified": headers.get("Last-Modified"),
+        "body_hash": hashlib.sha256(body).hexdigest() if body is not None else None,
+    }
+
+
+def capture_validators(url: str, timeout: float = 10.0) -> Dict[str, Optional[str]]:
+    """
+    Fetch ``url`` over plain HTTP and record its validators (see
+    ``response_validators``). Only needed for browser renders; the HTTP
+    fast path returns them with its result.
+    """
+    try:
+        response = _session().get(url, timeout=timeout)
+    except requests.RequestException as e:
+        logger.debug(f"Validator capture failed for {url}: {str(e)}")
+        return {}
+    return response_validators(response.status_code, response.headers, response.content)
+
+
+def check_unchanged(url: str, validators: Dict[str, Optional[str]], timeout: float = 10.0) -> bool:
+    """
+    Cheap HTTP-level check that the page has not changed since ``validators``
+    were captured: a conditional HEAD when the server gave ETag/Last-Modified,
+    otherwise a GET compared by body hash.
+    """
+    etag = validators.get("etag")
+    last_modified = validators.get("last_modified")
+    try:
+        if etag or last_modified:
+            headers = {}
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+            response = _session().head(url, headers=headers, timeout=timeout, allow_redirects=True)
+            if response.status_code == 304:
+                return True
+            if response.status_code < 400:
+                if etag and response.headers.get("ETag") == etag:
+                    return True
+                if not etag and last_modified and response.headers.get("Last-Modified") == last_modified:
+                    return True
+                return False
+            # Some portals reject HEAD; fall through to a body hash when we have one
+
+        if validators.get("body_hash"):
+            response = _session().get(url, timeout=timeout)
+            if response.status_code >= 400:
+                return False
+            return hashlib.sha256(response.content).hexdigest() == validators["body_hash"]
+    except requests.RequestException as e:
+        logger.debug(f"Revalidation failed for {url}: {str(e)}")
+    return False
+
+
+def parse_domain_ttls(spec: str) -> Dict[str, float]:
+    """Parse ``"mn.gov=3600,sam.gov=600"`` into a domain → seconds map."""
+    ttls = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        domain, _, seconds = item.partition("=")
+        ttls[domain.strip().lower()] = float(seconds)
+    return ttls
+
+
+class ScrapeCache:
+    """
+    Two-tier cache of scrape results keyed by normalized URL + options.
+
+    Fresh entries (younger than the domain TTL or the caller's ``max_age``)
+    are served straight from memory or disk. Stale entries are revalidated
+    over plain HTTP before paying for a browser render; unchanged pages are
+    re-stamped and served as ``revalidated``.
+    """
+
+    def __init__(self,
+                 path: Optional[str] = None,
+                 memory_items: int = 256,
+                 max_disk_bytes: int = 512 * 1024 * 1024,
+                 default_ttl: float = 900.0,
+                 domain_ttls: Optional[Dict[str, float]] = None,
+                 probe_timeout: float = 10.0):
+        self.path = path
+        self.memory_items = memory_items
+        self.max_disk_bytes = max_disk_bytes
+        self.default_ttl = default_ttl
+        self.domain_ttls = domain_ttls or {}
+        self.probe_timeout = probe_timeout
+
+        self._memory: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self.counters = {"hit": 0, "revalidated": 0, "miss": 0}
+
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS scrape_cache (
+                    key TEXT PRIMARY KEY,
+                    url TEXT NOT NULL,
+                    domain TEXT NOT NULL,
+                    stored_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    validators TEXT NOT NULL,
+                    payload BLOB NOT NULL,
+                    size INTEGER NOT NULL
+                )
+            """)
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_scrape_cache_accessed ON scrape_cache(accessed_at)")
+            self._db.commit()
+
+    @classmethod
+    def from_env(cls) -> Optional["ScrapeCache"]:
+        """Shared cache configured from SCRAPER_CACHE_* (``SCRAPER_CACHE=0`` disables it)."""
+        if os.environ.get("SCRAPER_CACHE", "1") == "0":
+            return None
+        cache_dir = os.environ.get("SCRAPER_CACHE_DIR", ".cache")
+        return cls(
+            path=os.path.join(cache_dir, "scrape_cache.sqlite"),
+            memory_items=int(os.environ.get("SCRAPER_CACHE_MEMORY_ITEMS", "256")),
+            max_disk_bytes=int(os.environ.get("SCRAPER_CACHE_MAX_BYTES", str(512 * 1024 * 1024))),
+            default_ttl=float(os.environ.get("SCRAPER_CACHE_TTL", "900")),
+            domain_ttls=parse_domain_ttls(os.environ.get("SCRAPER_CACHE_TTLS", "")),
+        )
+
+    @staticmethod
+    def make_key(url: str, options: Optional[Dict] = None) -> str:
+        material = json.dumps([normalize_url(url), options or {}], sort_keys=True, default=str)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def ttl_for(self, url: str) -> float:
+        domain = url_domain(url)
+        while domain:
+            if domain in self.domain_ttls:
+                return self.domain_ttls[domain]
+            # A TTL set for mn.gov also covers www.mn.gov and other subdomains
+            domain = domain.partition(".")[2]
+        return self.default_ttl
+
+    # ---- storage tiers -------------------------------------------------
+
+    def _remember(self, key: str, entry: Dict):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def get_entry(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                return entry
+            if self._db is None:
+                return None
+            row = self._db.execute(
+                "SELECT url, stored_at, validators, payload FROM scrape_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE scrape_cache SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+            entry = {
+                "url": row[0],
+                "stored_at": row[1],
+                "validators": json.loads(row[2]),
+                "payload": zlib.decompress(row[3]).decode("utf-8"),
+            }
+            self._remember(key, entry)
+            return entry
+
+    def put_entry(self, key: str, url: str, result: Dict, validators: Dict, stored_at: Optional[float] = None):
+        payload = json.dumps(result, default=str)
+        entry = {
+            "url": url,
+            "stored_at": stored_at or time.time(),
+            "validators": validators,
+            "payload": payload,
+        }
+        with self._lock:
+            self._remember(key, entry)
+            if self._db is None:
+                return
+            blob = zlib.compress(payload.encode("utf-8"))
+            self._db.execute(
+                "INSERT OR REPLACE INTO scrape_cache "
+                "(key, url, domain, stored_at, accessed_at, validators, payload, size) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, url, url_domain(url), entry["stored_at"], time.time(),
+                 json.dumps(validators), blob, len(blob))
+            )
+            self._db.commit()
+            self._evict_disk()
+
+    def _evict_disk(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM scrape_cache").fetchone()[0]
+        if total <= self.max_disk_bytes:
+            return
+        # Drop least recently used entries until 10% under the limit
+        target = self.max_disk_bytes * 0.9
+        rows = self._db.execute("SELECT key, size FROM scrape_cache ORDER BY accessed_at").fetchall()
+        doomed = []
+        for key, size in rows:
+            if total <= target:
+                break
+            doomed.append((key,))
+            total -= size
+        self._db.executemany("DELETE FROM scrape_cache WHERE key = ?", doomed)
+        self._db.commit()
+        logger.info(f"Evicted {len(doomed)} scrape cache entries")
+
+    def touch(self, key: str, entry: Dict):
+        """Mark an entry as freshly validated."""
+        entry["stored_at"] = time.time()
+        with self._lock:
+            if self._db is not None:
+                self._db.execute(
+                    "UPDATE scrape_cache SET stored_at = ?, accessed_at = ? WHERE key = ?",
+                    (entry["stored_at"], entry["stored_at"], key)
+                )
+                self._db.commit()
+
+    def invalidate(self, url: str, options: Optional[Dict] = None):
+        key = self.make_key(url, options)
+        with self._lock:
+            self._memory.pop(key, None)
+            if self._db is not None:
+                self._db.execute("DELETE FROM scrape_cache WHERE key = ?", (key,))
+                self._db.commit()
+
+    # ---- read-through API ------------------------------------------------
+
+    @staticmethod
+    def _materialize(entry: Dict, status: str, key: str) -> Dict:
+        result = json.loads(entry["payload"])
+        # Don't point at a screenshot that retention has evicted since
+        screenshot = result.get("screenshot")
+        if screenshot:
+            pipeline = get_screenshot_pipeline()
+            if not pipeline.available(screenshot):
+                result["screenshot"] = None
+                result["screenshot_status"] = None
+            elif result.get("screenshot_status"):
+                result["screenshot_status"] = pipeline.status(result["screenshot_status"]["id"]) \
+                    or result["screenshot_status"]
+        result["cache"] = {
+            "status": status,
+            "age_s": round(time.time() - entry["stored_at"], 1),
+            "key": key,
+        }
+        return result
+
+    async def fetch(self,
+                    url: str,
+                    options: Optional[Dict],
+                    render: Callable[[], Awaitable[Dict]],
+                    max_age: Optional[float] = None,
+                    force_refresh: bool = False) -> Dict:
+        """
+        Return a cached result for ``url`` or render it.
+
+        Args:
+            url (str): Page URL
+            options (Dict): Extraction options that affect the result
+            render: Coroutine factory producing a fresh scrape result, carrying
+                the page's HTTP ``validators`` when it has them
+            max_age (float, optional): Oldest acceptable entry in seconds (caps the domain TTL)
+            force_refresh (bool): Skip the cache and re-render
+
+        Returns:
+            Dict: Scrape result with a ``cache`` block (hit, revalidated or miss)
+        """
+        key = self.make_key(url, options)
+
+        if not force_refresh:
+            entry = await asyncio.to_thread(self.get_entry, key)
+            if entry is not None:
+                ttl = self.ttl_for(url)
+                if max_age is not None:
+                    ttl = min(ttl, max_age)
+                if time.time() - entry["stored_at"] <= ttl:
+                    self.counters["hit"] += 1
+                    return self._materialize(entry, "hit", key)
+
+                if entry["validators"] and await asyncio.to_thread(
+                    check_unchanged, url, entry["validators"], self.probe_timeout
+                ):
+                    await asyncio.to_thread(self.touch, key, entry)
+                    self.counters["revalidated"] += 1
+                    return self._materialize(entry, "revalidated", key)
+
+        result = await render()
+        self.counters["miss"] += 1
+        if result.get("status") == "success":
+            await asyncio.to_thread(self.put_entry, key, url, result, result.get("validators") or {})
+        result["cache"] = {"status": "miss", "age_s": 0.0, "key": key}
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            disk = None
+            if self._db is not None:
+                count, size = self._db.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM scrape_cache"
+                ).fetchone()
+                disk = {"entries": count, "bytes": size, "max_bytes": self.max_disk_bytes}
+            return {
+                **self.counters,
+                "memory_entries": len(self._memory),
+                "disk": disk,
+            }
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+_cache: Optional[ScrapeCache] = None
+_cache_initialized = False
+_cache_lock = threading.Lock()
+
+
+def get_scrape_cache() -> Optional[ScrapeCache]:
+    """Return the process-wide scrape cache, or None when disabled."""
+    global _cache, _cache_initialized
+    with _cache_lock:
+        if not _cache_initialized:
+            _cache = ScrapeCache.from_env()
+            _cache_initialized = True
+        return _cache
@@ -0,0 +1,396 @@
+"""
+Screenshot pipeline: capture on the page, encode and store off the hot path.
+
+A scrape only pays for the browser's capture (a lossless PNG of the
+viewport, the full page or one element). Encoding to WebP/JPEG, the
+thumbnail and the disk writes run on the extraction pool afterwards; the
+result carries a handle (``screenshot_status``) whose status moves from
+``pending`` to ``ready``, and ``wait`` blocks until it gets there.
+
+Files are content-addressed by the capture's SHA-256 plus the encoding
+(``<sha256>-webp80.webp``, ``<sha256>-webp80-t320.webp``), so an unchanged
+page is never re-encoded. ``SCRAPER_SCREENSHOT_MAX_BYTES`` and
+``SCRAPER_SCREENSHOT_MAX_AGE_DAYS`` bound the store: the least recently
+served files are evicted first.
+"""
+
+import asyncio
+import hashlib
+import io
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Union
+import logging
+
+from cpu_pool import ExtractionExecutor, get_extraction_executor
+from storage import ScreenshotStore, get_screenshot_store
+
+try:
+    from PIL import Image
+    HAS_PIL = True
+except ImportError:
+    Image = None
+    HAS_PIL = False
+
+logger = logging.getLogger(__name__)
+
+CAPTURE_MODES = ("viewport", "full_page", "element")
+IMAGE_FORMATS = ("webp", "jpeg", "png")
+EXTENSIONS = {"webp": "webp", "jpeg": "jpg", "png": "png"}
+
+# Thumbnails keep the top of the page at this height/width ratio (full pages are very tall)
+THUMBNAIL_ASPECT = 1.5
+MAX_THUMBNAIL_WIDTH = 1024
+
+PUBLIC_PREFIX = "/screenshots/"
+
+
+class ScreenshotOptions:
+    """What to capture and how to encode it."""
+
+    def __init__(self,
+                 capture: str = "full_page",
+                 selector: Optional[str] = None,
+                 image_format: str = "webp",
+                 quality: int = 80,
+                 thumbnail: int = 320):
+        """
+        Args:
+            capture (str): ``viewport``, ``full_page`` or ``element``
+            selector (str, optional): CSS selector of the element (``element`` capture)
+            image_format (str): ``webp``, ``jpeg`` or ``png`` (``png`` without Pillow)
+            quality (int): Lossy encoding quality, 1-100
+            thumbnail (int): Thumbnail width in pixels (0 for none)
+        """
+        if capture not in CAPTURE_MODES:
+            raise ValueError(f"screenshot capture must be one of: {', '.join(CAPTURE_MODES)}")
+        if capture == "element" and not selector:
+            raise ValueError("screenshot selector is required for element capture")
+        if image_format not in IMAGE_FORMATS:
+            raise ValueError(f"screenshot format must be one of: {', '.join(IMAGE_FORMATS)}")
+        if not 1 <= quality <= 100:
+            raise ValueError("screenshot quality must be between 1 and 100")
+        if not 0 <= thumbnail <= MAX_THUMBNAIL_WIDTH:
+            raise ValueError(f"screenshot thumbnail must be between 0 and {MAX_THUMBNAIL_WIDTH} pixels")
+        self.capture = capture
+        self.selector = selector if capture == "element" else None
+        self.image_format = image_format if HAS_PIL else "png"
+        self.quality = quality
+        self.thumbnail = thumbnail if HAS_PIL else 0
+
+    @classmethod
+    def parse(cls, value: Union[None, bool, Dict, "ScreenshotOptions"]) -> Optional["ScreenshotOptions"]:
+        """
+        Options from a request value: ``true`` (defaults), ``false``/None (no
+        screenshot) or ``{"capture", "selector", "format", "quality", "thumbnail"}``.
+        """
+        if value is None or value is False or isinstance(value, ScreenshotOptions):
+            return value or None
+        if value is True:
+            return cls()
+        if not isinstance(value, dict):
+            raise ValueError("screenshot must be a boolean or an object")
+        try:
+            quality = int(value.get("quality", 80))
+            thumbnail = int(value.get("thumbnail", 320))
+        except (TypeError, ValueError):
+            raise ValueError("screenshot quality and thumbnail must be integers")
+        return cls(
+            capture=value.get("capture", "full_page"),
+            selector=value.get("selector"),
+            image_format=value.get("format", "webp"),
+            quality=quality,
+            thumbnail=thumbnail,
+        )
+
+    @property
+    def variant(self) -> str:
+        """File-name suffix identifying the encoding (``webp80``, ``png``)."""
+        return "png" if self.image_format == "png" else f"{self.image_format}{self.quality}"
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "capture": self.capture,
+            "selector": self.selector,
+            "format": self.image_format,
+            "quality": self.quality,
+            "thumbnail": self.thumbnail,
+        }
+
+
+async def capture_screenshot(page, options: ScreenshotOptions) -> bytes:
+    """The browser part: a lossless PNG of the viewport, full page or element."""
+    if options.capture == "element":
+        return await page.locator(options.selector).first.screenshot(type="png", timeout=10000)
+    return await page.screenshot(type="png", full_page=options.capture == "full_page")
+
+
+def _encode(image, image_format: str, quality: int) -> bytes:
+    buffer = io.BytesIO()
+    if image_format == "jpeg":
+        image.convert("RGB").save(buffer, "JPEG", quality=quality, optimize=True, progressive=True)
+    elif image_format == "webp":
+        image.save(buffer, "WEBP", quality=quality, method=4)
+    else:
+        image.save(buffer, "PNG", optimize=True)
+    return buffer.getvalue()
+
+
+def encode_screenshot(png: bytes, root: str, name: str, image_format: str, quality: int,
+                      thumbnail: int) -> Dict[str, Any]:
+    """
+    Encode a captured PNG (and its thumbnail) and write them to the store.
+
+    Runs on the extraction pool, so it takes and returns plain data.
+
+    Returns:
+        Dict: ``filename``, ``thumbnail`` filename, ``width``, ``height`` and ``bytes`` written
+    """
+    store = ScreenshotStore(root)
+    extension = EXTENSIONS[image_format]
+    filename = f"{name}.{extension}"
+    thumbnail_name = f"{name}-t{thumbnail}.{extension}" if thumbnail else None
+
+    if not HAS_PIL:
+        store.write(filename, png)
+        return {"filename": filename, "thumbnail": None, "width": None, "height": None, "bytes": len(png)}
+
+    with Image.open(io.BytesIO(png)) as image:
+        image.load()
+        width, height = image.size
+        # Raw PNG is already what the browser produced; don't re-encode it
+        data = png if image_format == "png" else _encode(image, image_format, quality)
+        written = len(data)
+        store.write(filename, data)
+        if thumbnail_name:
+            crop = image.crop((0, 0, width, min(height, int(width * THUMBNAIL_ASPECT))))
+            crop.thumbnail((thumbnail, int(thumbnail * THUMBNAIL_ASPECT)))
+            small = _encode(crop, image_format, quality)
+            written += len(small)
+            store.write(thumbnail_name, small)
+    return {"filename": filename, "thumbnail": thumbnail_name, "width": width, "height": height, "bytes": written}
+
+
+class ScreenshotPipeline:
+    """
+    Encodes and stores captured screenshots in the background.
+
+    ``submit`` returns at once with a handle; encoding runs on the
+    extraction executor, at most ``concurrency`` at a time, and at most
+    ``max_pending`` captures are held in memory waiting for it.
+    """
+
+    def __init__(self,
+                 store: Optional[ScreenshotStore] = None,
+                 executor: Optional[ExtractionExecutor] = None,
+                 concurrency: int = 2,
+                 max_pending: int = 64,
+                 max_bytes: Optional[int] = None,
+                 max_age: Optional[float] = None,
+                 retention_interval: float = 60.0,
+                 keep_recent: float = 300.0,
+                 keep_handles: int = 1000):
+        self.store = store or get_screenshot_store()
+        self.executor = executor
+        self.concurrency = concurrency
+        self.max_pending = max_pending
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.retention_interval = retention_interval
+        # Fresh files are what pending handles and result URLs point at
+        self.keep_recent = keep_recent
+        self.keep_handles = keep_handles
+        self._handles: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._events: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._tasks = set()
+        self._last_retention = 0.0
+        self.pending = 0
+        self.counters = {"submitted": 0, "deduplicated": 0, "encoded": 0, "failed": 0, "rejected": 0,
+                         "bytes_written": 0, "evicted_files": 0, "evicted_bytes": 0}
+
+    @classmethod
+    def from_env(cls) -> "ScreenshotPipeline":
+        max_bytes = os.environ.get("SCRAPER_SCREENSHOT_MAX_BYTES")
+        max_age_days = os.environ.get("SCRAPER_SCREENSHOT_MAX_AGE_DAYS")
+        return cls(
+            concurrency=int(os.environ.get("SCRAPER_SCREENSHOT_CONCURRENCY", "2")),
+            max_pending=int(os.environ.get("SCRAPER_SCREENSHOT_MAX_PENDING", "64")),
+            max_bytes=int(max_bytes) if max_bytes else None,
+            max_age=float(max_age_days) * 86400 if max_age_days else None,
+        )
+
+    def _remember(self, handle: Dict[str, Any]):
+        with self._lock:
+            self._handles[handle["id"]] = handle
+            self._handles.move_to_end(handle["id"])
+            while len(self._handles) > self.keep_handles:
+                old_id, old = self._handles.popitem(last=False)
+                if old["status"] == "pending":
+                    self._handles[old_id] = old  # still encoding; keep it
+                    self._handles.move_to_end(old_id, last=False)
+                    break
+                self._events.pop(old_id, None)
+
+    def _handle(self, handle_id: str, status: str, options: ScreenshotOptions, **extra) -> Dict[str, Any]:
+        extension = EXTENSIONS[options.image_format]
+        return {
+            "id": handle_id,
+            "status": status,
+            "url": f"{PUBLIC_PREFIX}{handle_id}.{extension}",
+            "thumbnail_url": f"{PUBLIC_PREFIX}{handle_id}-t{options.thumbnail}.{extension}" if options.thumbnail else None,
+            **options.describe(),
+            **extra,
+        }
+
+    async def submit(self, png: bytes, options: ScreenshotOptions) -> Dict[str, Any]:
+        """
+        Queue a captured PNG for encoding.
+
+        Returns:
+            Dict: The handle: ``id``, ``status`` (``pending``, ``ready`` or
+            ``error``), the image and thumbnail ``url``s, the capture ``hash``
+            and the encoding options
+        """
+        digest = hashlib.sha256(png).hexdigest()
+        handle_id = f"{digest}-{options.variant}"
+        self.counters["submitted"] += 1
+
+        existing = self.status(handle_id)
+        if existing is not None and existing["status"] in ("pending", "ready"):
+            self.counters["deduplicated"] += 1
+            return existing
+        handle = self._handle(handle_id, "pending", options, hash=digest, submitted_at=time.time())
+        if self.store.exists(handle["url"]) and (not handle["thumbnail_url"] or self.store.exists(handle["thumbnail_url"])):
+            # Same capture, same encoding: already on disk
+            self.counters["deduplicated"] += 1
+            handle["status"] = "ready"
+            self._remember(handle)
+            return dict(handle)
+        if self.pending >= self.max_pending:
+            self.counters["rejected"] += 1
+            return {**handle, "status": "error", "error": "Screenshot encoding queue is full"}
+
+        self.pending += 1
+        with self._lock:
+            self._events[handle_id] = threading.Event()
+        self._remember(handle)
+        task = asyncio.ensure_future(self._encode(handle, png, options))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return dict(handle)
+
+    async def _encode(self, handle: Dict[str, Any], png: bytes, options: ScreenshotOptions):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        try:
+            async with self._semaphore:
+                started = time.perf_counter()
+                encoded = await (self.executor or get_extraction_executor()).run(
+                    encode_screenshot, png, self.store.root, handle["id"],
+                    options.image_format, options.quality, options.thumbnail
+                )
+            handle.update(status="ready", width=encoded["width"], height=encoded["height"],
+                          bytes=encoded["bytes"], encode_ms=round((time.perf_counter() - started) * 1000, 1))
+            self.counters["encoded"] += 1
+            self.counters["bytes_written"] += encoded["bytes"]
+        except asyncio.CancelledError:
+            handle.update(status="error", error="Cancelled")
+            raise
+        except Exception as e:
+            logger.warning(f"Screenshot encoding failed for {handle['id']}: {str(e)}")
+            handle.update(status="error", error=str(e) or type(e).__name__)
+            self.counters["failed"] += 1
+        finally:
+            self.pending -= 1
+            with self._lock:
+                event = self._events.pop(handle["id"], None)
+            if event is not None:
+                event.set()
+        await self._maybe_enforce_retention()
+
+    async def _maybe_enforce_retention(self):
+        if self.max_bytes is None and self.max_age is None:
+            return
+        now = time.monotonic()
+        if now - self._last_retention < self.retention_interval:
+            return
+        self._last_retention = now
+        evicted = await asyncio.to_thread(self.store.evict, self.max_bytes, self.max_age, self.keep_recent)
+        self.counters["evicted_files"] += evicted["files"]
+        self.counters["evicted_bytes"] += evicted["bytes"]
+        if evicted["files"]:
+            logger.info(f"Evicted {evicted['files']} screenshot files ({evicted['bytes']} bytes)")
+
+    def status(self, handle_id: str) -> Optional[Dict[str, Any]]:
+        """The handle for ``handle_id`` (rebuilt from disk after a restart), or None."""
+        with self._lock:
+            handle = self._handles.get(handle_id)
+            if handle is not None:
+                return dict(handle)
+        digest, _, variant = handle_id.partition("-")
+        for image_format, extension in EXTENSIONS.items():
+            filename = f"{handle_id}.{extension}"
+            if variant.startswith(image_format) and self.store.exists(filename):
+                return {"id": handle_id, "status": "ready", "url": f"{PUBLIC_PREFIX}{filename}", "hash": digest}
+        return None
+
+    def wait(self, handle_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """Block (a request thread, not the loop) until the handle is no longer pending."""
+        with self._lock:
+            event = self._events.get(handle_id)
+        if event is not None:
+            event.wait(timeout)
+        return self.status(handle_id)
+
+    def handle_for_file(self, filename: str) -> Optional[str]:
+        """The handle id a served file belongs to (image or thumbnail)."""
+        name = os.path.splitext(os.path.basename(filename))[0]
+        base, _, suffix = name.rpartition("-t")
+        return base if base and suffix.isdigit() else name
+
+    def touch(self, filename: str):
+        """Mark a file as recently used so retention evicts it last."""
+        try:
+            os.utime(os.path.join(self.store.root, os.path.basename(filename)))
+        except OSError:
+            pass
+
+    def available(self, url: str) -> bool:
+        """True if a published screenshot URL is stored or still being encoded."""
+        if not url.startswith(PUBLIC_PREFIX):
+            return os.path.exists(url)
+        if self.store.exists(url):
+            return True
+        handle = self.status(self.handle_for_file(url))
+        return handle is not None and handle["status"] == "pending"
+
+    async def drain(self):
+        """Wait for queued encodes (on shutdown)."""
+        if self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.counters,
+            "pending": self.pending,
+            "encoder": "pillow" if HAS_PIL else None,
+            "max_bytes": self.max_bytes,
+            "max_age_s": self.max_age,
+        }
+
+
+_pipeline: Optional[ScreenshotPipeline] = None
+_pipeline_lock = threading.Lock()
+
+
+def get_screenshot_pipeline() -> ScreenshotPipeline:
+    """Process-wide screenshot pipeline."""
+    global _pipeline
+    with _pipeline_lock:
+        if _pipeline is None:
+            _pipeline = ScreenshotPipeline.from_env()
+        return _pipeline
@@ -0,0 +1,377 @@
+"""
+Compact serialization of scrape results.
+
+A page with a 50k-row table encodes to about 10 MB of JSON, which ``jsonify``
+builds as one string before sending a byte. This module shapes results before
+they are encoded (field selection, pagination of large collections, a
+columnar table format) and encodes them as a stream of bounded chunks
+(JSON or NDJSON, via orjson when installed), optionally gzip/brotli
+compressed on the fly, so a response never exists in memory as a whole.
+"""
+
+import json
+import zlib
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    orjson = None
+    HAS_ORJSON = False
+
+try:
+    import brotli
+    HAS_BROTLI = True
+except ImportError:
+    brotli = None
+    HAS_BROTLI = False
+
+# Always kept, whatever fields were selected
+ENVELOPE_FIELDS = ("url", "final_url", "title", "status", "error", "served_by", "index", "timings")
+
+CONTENT_FIELDS = ("text", "links", "forms", "images", "tables", "navigation")
+TEXT_FIELDS = ("full_text", "headings", "paragraphs", "lists")
+EXTRA_FIELDS = ("meta", "statistics", "screenshot", "resources", "extraction", "fetch", "readiness", "session")
+SELECTABLE_FIELDS = CONTENT_FIELDS + tuple(f"text.{name}" for name in TEXT_FIELDS) + EXTRA_FIELDS
+
+# Collections paged by limit/offset (table rows are paged separately)
+PAGED_COLLECTIONS = ("links", "forms", "images", "tables", "navigation")
+PAGED_TEXT_COLLECTIONS = ("headings", "paragraphs", "lists")
+
+TABLE_FORMATS = ("rows", "columnar")
+OUTPUT_FORMATS = ("json", "ndjson")
+ENCODINGS = ("br", "gzip")
+
+# Items encoded per chunk when streaming a large list, and bytes per yielded chunk
+STREAM_BATCH = 500
+CHUNK_BYTES = 64 * 1024
+
+
+def dumps(value: Any) -> bytes:
+    """Encode one value as UTF-8 JSON (orjson when installed)."""
+    if HAS_ORJSON:
+        return orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, default=str, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class OutputOptions:
+    """How a result should be shaped and encoded."""
+
+    def __init__(self,
+                 fields: Optional[Iterable[str]] = None,
+                 limit: Optional[int] = None,
+                 offset: int = 0,
+                 row_limit: Optional[int] = None,
+                 row_offset: int = 0,
+                 table_format: str = "rows",
+                 output_format: str = "json"):
+        """
+        Args:
+            fields (Iterable[str], optional): Parts to keep (see SELECTABLE_FIELDS); all when omitted
+            limit (int, optional): Items per collection (links, paragraphs, tables, ...)
+            offset (int): First item of each collection
+            row_limit (int, optional): Rows per table
+            row_offset (int): First row of each table
+            table_format (str): ``rows`` or ``columnar`` (headers plus one array per column)
+            output_format (str): ``json`` or ``ndjson`` (one record per line)
+        """
+        self.fields = tuple(fields) if fields else None
+        unknown = set(self.fields or ()) - set(SELECTABLE_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))} "
+                             f"(choose from {', '.join(SELECTABLE_FIELDS)})")
+        for name, value in (("limit", limit), ("row_limit", row_limit)):
+            if value is not None and value < 0:
+                raise ValueError(f"{name} must not be negative")
+        if offset < 0 or row_offset < 0:
+            raise ValueError("offset and row_offset must not be negative")
+        if table_format not in TABLE_FORMATS:
+            raise ValueError(f"table_format must be one of: {', '.join(TABLE_FORMATS)}")
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"format must be one of: {', '.join(OUTPUT_FORMATS)}")
+        if output_format == "ndjson" and table_format == "columnar":
+            raise ValueError("columnar tables are only available with the json format")
+        self.limit = limit
+        self.offset = offset
+        self.row_limit = row_limit
+        self.row_offset = row_offset
+        self.table_format = table_format
+        self.output_format = output_format
+
+    @property
+    def reshapes(self) -> bool:
+        return bool(self.fields or self.limit is not None or self.offset or self.row_limit is not None
+                    or self.row_offset or self.table_format != "rows")
+
+    @property
+    def mimetype(self) -> str:
+        return "application/x-ndjson" if self.output_format == "ndjson" else "application/json"
+
+
+def select_fields(result: Dict[str, Any], fields: Iterable[str]) -> Dict[str, Any]:
+    """
+    A shallow view of ``result`` with only the envelope and ``fields``.
+
+    Values are shared with ``result``, not copied.
+    """
+    fields = set(fields)
+    selected = {key: result[key] for key in ENVELOPE_FIELDS if key in result}
+    content = result.get("content") or {}
+    selected_content = {name: content[name] for name in CONTENT_FIELDS if name in fields and name in content}
+    text_parts = [name for name in TEXT_FIELDS if f"text.{name}" in fields]
+    if text_parts and "text" not in fields and "text" in content:
+        selected_content["text"] = {name: content["text"][name] for name in text_parts if name in content["text"]}
+    if content or selected_content:
+        selected["content"] = selected_content
+    for name in EXTRA_FIELDS:
+        if name in fields and name in result:
+            selected[name] = result[name]
+            if name == "screenshot":
+                for extra in ("screenshot_hash", "screenshot_status"):
+                    if extra in result:
+                        selected[extra] = result[extra]
+    return selected
+
+
+def _page(items: List[Any], offset: int, limit: Optional[int]) -> List[Any]:
+    return items[offset:] if limit is None else items[offset:offset + limit]
+
+
+def paginate(result: Dict[str, Any], options: OutputOptions) -> Dict[str, Any]:
+    """
+    Slice large collections per ``options`` and record a ``pagination`` block
+    (``total``/``offset``/``returned`` per collection) so clients can page on.
+    """
+    content = result.get("content")
+    if not content:
+        return result
+    pages: Dict[str, Dict[str, int]] = {}
+    content = dict(content)
+
+    def page(key: str, items: List[Any]) -> List[Any]:
+        sliced = _page(items, options.offset, options.limit)
+        pages[key] = {"total": len(items), "offset": options.offset, "returned": len(sliced)}
+        return sliced
+
+    if options.limit is not None or options.offset:
+        for name in PAGED_COLLECTIONS:
+            if isinstance(content.get(name), list):
+                content[name] = page(name, content[name])
+        if isinstance(content.get("text"), dict):
+            text = dict(content["text"])
+            for name in PAGED_TEXT_COLLECTIONS:
+                if isinstance(text.get(name), list):
+                    text[name] = page(f"text.{name}", text[name])
+            content["text"] = text
+
+    if (options.row_limit is not None or options.row_offset) and content.get("tables"):
+        tables = []
+        for table in content["tables"]:
+            rows = table.get("rows", [])
+            sliced = _page(rows, options.row_offset, options.row_limit)
+            tables.append({**table, "rows": sliced,
+                           "row_page": {"total": len(rows), "offset": options.row_offset, "returned": len(sliced)}})
+        content["tables"] = tables
+
+    shaped = {**result, "content": content}
+    if pages:
+        shaped["pagination"] = pages
+    return shaped
+
+
+def columnar_table(table: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    ``{"headers", "rows"}`` as ``{"headers", "columns"}``: one array per
+    column, ragged rows padded with None. Repeated keys and row brackets
+    disappear, which roughly halves the encoded size of wide tables.
+    """
+    headers = table.get("headers", [])
+    rows = table.get("rows", [])
+    width = max([len(headers)] + [len(row) for row in rows])
+    columns = [[row[i] if i < len(row) else None for row in rows] for i in range(width)]
+    converted = {key: value for key, value in table.items() if key != "rows"}
+    converted["columns"] = columns
+    converted["format"] = "columnar"
+    return converted
+
+
+def shape_result(result: Dict[str, Any], options: OutputOptions) -> Dict[str, Any]:
+    """Apply field selection, pagination and the table format (values are shared, not copied)."""
+    if not options.reshapes:
+        return result
+    shaped = select_fields(result, options.fields) if options.fields else result
+    shaped = paginate(shaped, options)
+    content = shaped.get("content")
+    if options.table_format == "columnar" and content and content.get("tables"):
+        shaped = {**shaped, "content": {**content, "tables": [columnar_table(t) for t in content["tables"]]}}
+    return shaped
+
+
+def _is_flat(value: Any) -> bool:
+    if isinstance(value, dict):
+        value = value.values()
+    elif not isinstance(value, (list, tuple)):
+        return True
+    return not any(isinstance(item, (dict, list, tuple)) for item in value)
+
+
+def _iter_value(value: Any, batch: int) -> Iterator[bytes]:
+    if isinstance(value, dict) and not _is_flat(value):
+        yield b"{"
+        for position, (key, item) in enumerate(value.items()):
+            yield (b"," if position else b"") + dumps(str(key)) + b":"
+            yield from _iter_value(item, batch)
+        yield b"}"
+    elif isinstance(value, (list, tuple)) and (len(value) > batch or not _is_flat(value)):
+        yield b"["
+        for start in range(0, len(value), batch):
+            group = value[start:start + batch]
+            separator = b"," if start else b""
+            if all(_is_flat(item) for item in group):
+                yield separator + dumps(group)[1:-1]
+                continue
+            for position, item in enumerate(group):
+                yield separator if position == 0 else b","
+                yield from _iter_value(item, batch)
+        yield b"]"
+    else:
+        yield dumps(value)
+
+
+def _buffered(pieces: Iterable[bytes], size: int) -> Iterator[bytes]:
+    buffer = bytearray()
+    for piece in pieces:
+        buffer += piece
+        if len(buffer) >= size:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+def iter_json(value: Any, batch: int = STREAM_BATCH, chunk_bytes: int = CHUNK_BYTES) -> Iterator[bytes]:
+    """
+    Encode ``value`` as JSON in chunks of about ``chunk_bytes``.
+
+    Large lists are encoded ``batch`` items at a time, so the encoded form is
+    never held in memory at once.
+    """
+    return _buffered(_iter_value(value, batch), chunk_bytes)
+
+
+def _ndjson_records(result: Dict[str, Any]) -> Iterator[bytes]:
+    content = result.get("content") or {}
+    text = content.get("text") if isinstance(content.get("text"), dict) else {}
+
+    # Header record: everything but the large collections, which follow as one line per item
+    header_content = {key: value for key, value in content.items() if key not in PAGED_COLLECTIONS and key != "text"}
+    if text:
+        header_content["text"] = {key: value for key, value in text.items() if key not in PAGED_TEXT_COLLECTIONS}
+    header = {key: value for key, value in result.items() if key != "content"}
+    header["content"] = header_content
+    header["type"] = "page"
+    yield dumps(header) + b"\n"
+
+    for name in PAGED_TEXT_COLLECTIONS:
+        record_type = name[:-1] if name != "lists" else "list"
+        for item in text.get(name, []):
+            yield dumps({"type": record_type, "data": item}) + b"\n"
+    for name in ("links", "images", "forms", "navigation"):
+        record_type = name[:-1] if name != "navigation" else "navigation"
+        for item in content.get(name, []):
+            yield dumps({"type": record_type, "data": item}) + b"\n"
+    for position, table in enumerate(content.get("tables", [])):
+        yield dumps({"type": "table", "table": position,
+                     **{key: value for key, value in table.items() if key != "rows"}}) + b"\n"
+        for row in table.get("rows", []):
+            yield dumps({"type": "row", "table": position, "data": row}) + b"\n"
+
+
+def iter_ndjson(results: Iterable[Dict[str, Any]], chunk_bytes: int = CHUNK_BYTES) -> Iterator[bytes]:
+    """
+    Encode results as NDJSON: per result a ``page`` record, then one record
+    per paragraph, link, table row, ... so clients can process them as they arrive.
+
+    Records are only buffered within one result; each result's last chunk is
+    flushed before the next result is waited for.
+    """
+    for result in results:
+        yield from _buffered(_ndjson_records(result), chunk_bytes)
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Best supported content coding the client accepts (``br`` only with the brotli package)."""
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        if coding:
+            accepted[coding.lower()] = quality
+    for coding in ENCODINGS:
+        if coding == "br" and not HAS_BROTLI:
+            continue
+        if accepted.get(coding, accepted.get("*", 0.0)) > 0:
+            return coding
+    return None
+
+
+def compress_stream(chunks: Iterable[bytes], encoding: Optional[str], level: int = 5,
+                    flush_each: bool = False) -> Iterator[bytes]:
+    """
+    Compress a chunk stream incrementally (``gzip`` or ``br``); unchanged when ``encoding`` is None.
+
+    With ``flush_each`` every input chunk is flushed through, so a streaming
+    client can decode it right away (at some cost in ratio).
+    """
+    if encoding is None:
+        yield from chunks
+        return
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=level)
+        for chunk in chunks:
+            out = compressor.process(chunk)
+            if flush_each:
+                out += compressor.flush()
+            if out:
+                yield out
+        yield compressor.finish()
+        return
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    for chunk in chunks:
+        out = compressor.compress(chunk)
+        if flush_each:
+            out += compressor.flush(zlib.Z_SYNC_FLUSH)
+        if out:
+            yield out
+    yield compressor.flush()
+
+
+def encode_stream(results: Iterable[Dict[str, Any]], options: OutputOptions, single: bool = True) -> Iterator[bytes]:
+    """
+    Shape and encode results as chunks.
+
+    Args:
+        results (Iterable[Dict]): Results to encode (lazily consumed)
+        options (OutputOptions): Shaping and format
+        single (bool): Encode the only result as one JSON document; otherwise
+            JSON results are written one per line
+
+    Yields:
+        bytes: Encoded chunks
+    """
+    shaped = (shape_result(result, options) for result in results)
+    if options.output_format == "ndjson":
+        yield from iter_ndjson(shaped)
+    elif single:
+        for result in shaped:
+            yield from iter_json(result)
+    else:
+        for result in shaped:
+            yield from iter_json(result)
+            yield b"\n"
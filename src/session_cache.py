@@ -0,0 +1,779 @@
+"""
+Per-domain browser sessions for stateful procurement portals.
+
+Portals such as PeopleSoft supplier sites only show the bid listing after a
+chain of redirects, cookie handshakes or a search-form submission. Every
+scrape used to start from a blank browser context and pay for that chain
+again. This module keeps the Playwright storage state (cookies and
+localStorage) of each domain with an expiry, so later scrapes start from a
+warm session instead.
+
+Domains that need more than cookies get a *navigation recipe*: scripted
+steps (go to a page, fill the search form found by the form extractor,
+click, paginate) that run once. The URL the recipe lands on and the result
+pages it paginated through are kept with the session; a later scrape of the
+recipe's start URL goes straight to the data page. Sessions of recipe
+domains are refreshed in the background before they expire.
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from urllib.parse import urlparse
+import logging
+
+from url_utils import normalize_url, url_domain
+
+logger = logging.getLogger(__name__)
+
+RECIPE_ACTIONS = ("goto", "click", "fill", "select", "fill_form", "wait", "paginate")
+
+MAX_RECIPE_STEPS = 50
+MAX_RECIPE_PAGES = 100
+MAX_STEP_TIMEOUT_MS = 120000
+DEFAULT_STEP_TIMEOUT_MS = 30000
+
+# Seeds localStorage for one origin before the page's own scripts run
+LOCAL_STORAGE_SCRIPT = """
+(() => {
+    const origin = %s;
+    const items = %s;
+    if (window.location.origin !== origin) return;
+    try {
+        for (const [name, value] of items) {
+            if (window.localStorage.getItem(name) === null) window.localStorage.setItem(name, value);
+        }
+    } catch (e) {}
+})();
+"""
+
+
+def _pack(data: Any) -> bytes:
+    return zlib.compress(json.dumps(data).encode("utf-8"), 3)
+
+
+def _unpack(blob: Optional[bytes]) -> Any:
+    return json.loads(zlib.decompress(blob)) if blob else None
+
+
+def _matches_domain(cookie_domain: str, domain: str) -> bool:
+    cookie_domain = cookie_domain.lstrip(".").lower()
+    return domain == cookie_domain or domain.endswith("." + cookie_domain)
+
+
+def filter_state(state: Dict[str, Any], domain: str) -> Dict[str, Any]:
+    """The part of a Playwright storage state that ``domain`` can see."""
+    return {
+        "cookies": [cookie for cookie in state.get("cookies", []) if _matches_domain(cookie.get("domain", ""), domain)],
+        "origins": [origin for origin in state.get("origins", []) if url_domain(origin.get("origin", "")) == domain],
+    }
+
+
+def state_expiry(state: Dict[str, Any], now: float, ttl: float) -> float:
+    """When a session expires: its first persistent cookie to expire, at most ``ttl`` from now."""
+    expiries = [cookie["expires"] for cookie in state.get("cookies", [])
+                if cookie.get("expires", -1) > now]
+    return min([now + ttl] + expiries)
+
+
+def _require_text(step: Dict[str, Any], key: str) -> str:
+    value = step.get(key)
+    if not isinstance(value, str) or not value.strip():
+        raise ValueError(f"{step['action']} step requires a '{key}' string")
+    return value
+
+
+class NavigationRecipe:
+    """Scripted steps that take a fresh browser from ``start_url`` to a portal's data pages."""
+
+    def __init__(self,
+                 start_url: str,
+                 steps: List[Dict[str, Any]],
+                 expect: Optional[str] = None,
+                 ttl: Optional[float] = None,
+                 prewarm: bool = True):
+        """
+        Args:
+            start_url (str): Where the recipe starts; scraping this URL uses the recipe
+            steps (List[Dict]): Validated steps (see ``parse``)
+            expect (str, optional): Selector present on the data page; a cached
+                session whose data page lacks it is treated as expired
+            ttl (float, optional): Session lifetime in seconds (default: the cache's)
+            prewarm (bool): Refresh the session in the background before it expires
+        """
+        self.start_url = start_url
+        self.domain = url_domain(start_url)
+        self.steps = steps
+        self.expect = expect
+        self.ttl = ttl
+        self.prewarm = prewarm
+
+    @classmethod
+    def parse(cls, value: Dict[str, Any]) -> "NavigationRecipe":
+        """
+        Validate a recipe from JSON, e.g.::
+
+            {"start_url": "https://portal.example.gov/bids",
+             "steps": [{"action": "fill_form", "form": "search", "values": {"Status": "Open"}},
+                       {"action": "paginate", "next": "a.next", "max_pages": 5}],
+             "expect": "table.results"}
+
+        Actions: ``goto`` (url), ``click`` (selector), ``fill``/``select``
+        (selector, value), ``fill_form`` (form index, id or name; ``values``
+        keyed by field name, id, label or placeholder; ``submit`` true or a
+        button selector), ``wait`` (selector or ms) and ``paginate`` (``next``
+        selector, ``max_pages``; must be the last step). Every step accepts
+        ``timeout_ms``.
+
+        Raises:
+            ValueError: If the recipe is malformed
+        """
+        if not isinstance(value, dict):
+            raise ValueError("recipe must be an object")
+        start_url = value.get("start_url")
+        if (not isinstance(start_url, str) or urlparse(start_url).scheme not in ("http", "https")
+                or not urlparse(start_url).hostname):
+            raise ValueError("recipe start_url must be an http(s) URL")
+        steps = value.get("steps", [])
+        if not isinstance(steps, list) or len(steps) > MAX_RECIPE_STEPS:
+            raise ValueError(f"recipe steps must be a list of at most {MAX_RECIPE_STEPS} steps")
+
+        parsed = []
+        for index, step in enumerate(steps):
+            if not isinstance(step, dict) or step.get("action") not in RECIPE_ACTIONS:
+                raise ValueError(f"step {index}: action must be one of: {', '.join(RECIPE_ACTIONS)}")
+            parsed.append(cls._parse_step(step))
+            if step["action"] == "paginate" and index != len(steps) - 1:
+                raise ValueError("paginate must be the last step")
+
+        expect = value.get("expect")
+        if expect is not None and (not isinstance(expect, str) or not expect.strip()):
+            raise ValueError("recipe expect must be a CSS selector")
+        ttl = value.get("ttl")
+        if ttl is not None:
+            try:
+                ttl = float(ttl)
+            except (TypeError, ValueError):
+                raise ValueError("recipe ttl must be a number of seconds")
+            if ttl <= 0:
+                raise ValueError("recipe ttl must be positive")
+        return cls(start_url, parsed, expect=expect, ttl=ttl, prewarm=bool(value.get("prewarm", True)))
+
+    @staticmethod
+    def _parse_step(step: Dict[str, Any]) -> Dict[str, Any]:
+        action = step["action"]
+        timeout_ms = step.get("timeout_ms", DEFAULT_STEP_TIMEOUT_MS)
+        if not isinstance(timeout_ms, int) or not 0 < timeout_ms <= MAX_STEP_TIMEOUT_MS:
+            raise ValueError(f"timeout_ms must be an integer between 1 and {MAX_STEP_TIMEOUT_MS}")
+        parsed = {"action": action, "timeout_ms": timeout_ms}
+
+        if action == "goto":
+            url = _require_text(step, "url")
+            if urlparse(url).scheme not in ("http", "https"):
+                raise ValueError("goto step requires an http(s) url")
+            parsed["url"] = url
+        elif action == "click":
+            parsed["selector"] = _require_text(step, "selector")
+        elif action in ("fill", "select"):
+            parsed["selector"] = _require_text(step, "selector")
+            if not isinstance(step.get("value"), str):
+                raise ValueError(f"{action} step requires a 'value' string")
+            parsed["value"] = step["value"]
+        elif action == "fill_form":
+            form = step.get("form", 0)
+            if not isinstance(form, (int, str)) or isinstance(form, bool):
+                raise ValueError("fill_form form must be an index, id or name")
+            values = step.get("values")
+            if not isinstance(values, dict) or not values:
+                raise ValueError("fill_form step requires a 'values' object")
+            submit = step.get("submit", True)
+            if not isinstance(submit, (bool, str)):
+                raise ValueError("fill_form submit must be true, false or a button selector")
+            parsed.update(form=form, values=values, submit=submit)
+        elif action == "wait":
+            if "selector" in step:
+                parsed["selector"] = _require_text(step, "selector")
+            else:
+                ms = step.get("ms")
+                if not isinstance(ms, int) or not 0 < ms <= MAX_STEP_TIMEOUT_MS:
+                    raise ValueError("wait step requires a selector or ms")
+                parsed["ms"] = ms
+        elif action == "paginate":
+            parsed["next"] = _require_text(step, "next")
+            max_pages = step.get("max_pages", 10)
+            if not isinstance(max_pages, int) or not 1 <= max_pages <= MAX_RECIPE_PAGES:
+                raise ValueError(f"paginate max_pages must be between 1 and {MAX_RECIPE_PAGES}")
+            parsed["max_pages"] = max_pages
+        return parsed
+
+    def starts_at(self, url: str) -> bool:
+        return normalize_url(url) == normalize_url(self.start_url)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "domain": self.domain,
+            "start_url": self.start_url,
+            "steps": self.steps,
+            "expect": self.expect,
+            "ttl": self.ttl,
+            "prewarm": self.prewarm,
+        }
+
+
+def _field_matches(field: Dict[str, Any], key: str) -> bool:
+    key = key.strip().lower()
+    return any((field.get(attr) or "").strip().lower() == key for attr in ("name", "id", "label", "placeholder"))
+
+
+def _field_selector(field: Dict[str, Any]) -> str:
+    if field.get("name"):
+        return f'{field["tag"]}[name={json.dumps(field["name"])}]'
+    return f'{field["tag"]}[id={json.dumps(field["id"])}]'
+
+
+def _find_form(forms: List[Dict[str, Any]], form) -> int:
+    if isinstance(form, int):
+        if not 0 <= form < len(forms):
+            raise ValueError(f"fill_form: page has {len(forms)} forms, no form {form}")
+        return form
+    for index, candidate in enumerate(forms):
+        if form in (candidate.get("id"), candidate.get("name")):
+            return index
+    raise ValueError(f"fill_form: no form with id or name {form!r}")
+
+
+async def _settle(page, readiness):
+    await page.wait_for_load_state("domcontentloaded")
+    if readiness is not None:
+        await readiness.build("dom_quiescence").wait(page)
+
+
+async def run_recipe(page,
+                     recipe: NavigationRecipe,
+                     extract_forms: Callable[[], Awaitable[List[Dict]]],
+                     readiness=None,
+                     navigate: bool = True) -> Dict[str, Any]:
+    """
+    Play ``recipe`` on ``page``.
+
+    Args:
+        page: Playwright page
+        recipe (NavigationRecipe): Steps to run
+        extract_forms: Coroutine function returning the page's forms (as the
+            scraper extracts them), used to resolve ``fill_form`` fields
+        readiness (ReadinessEngine, optional): Used to let pages settle after each step
+        navigate (bool): Open ``start_url`` first (False replays on the current page)
+
+    Returns:
+        Dict: ``landing_url`` (the data page), ``pages`` (result page URLs
+        found by ``paginate``), ``steps`` run and ``elapsed_ms``
+    """
+    started = time.perf_counter()
+    if navigate:
+        await page.goto(recipe.start_url, wait_until="domcontentloaded", timeout=DEFAULT_STEP_TIMEOUT_MS)
+        await _settle(page, readiness)
+
+    pages: List[str] = []
+    for step in recipe.steps:
+        action, timeout_ms = step["action"], step["timeout_ms"]
+        if action == "goto":
+            await page.goto(step["url"], wait_until="domcontentloaded", timeout=timeout_ms)
+        elif action == "click":
+            await page.click(step["selector"], timeout=timeout_ms)
+        elif action == "fill":
+            await page.fill(step["selector"], step["value"], timeout=timeout_ms)
+        elif action == "select":
+            await page.select_option(step["selector"], step["value"], timeout=timeout_ms)
+        elif action == "fill_form":
+            await _fill_form(page, step, await extract_forms())
+        elif action == "wait":
+            if "selector" in step:
+                await page.wait_for_selector(step["selector"], state="attached", timeout=timeout_ms)
+            else:
+                await page.wait_for_timeout(step["ms"])
+        elif action == "paginate":
+            pages = await _paginate(page, step, readiness)
+            continue
+        await _settle(page, readiness)
+
+    landing_url = pages[0] if pages else page.url
+    if pages and page.url != landing_url:
+        # Result pages with their own URLs: come back to the first one
+        await page.goto(landing_url, wait_until="domcontentloaded", timeout=DEFAULT_STEP_TIMEOUT_MS)
+        await _settle(page, readiness)
+    return {
+        "landing_url": landing_url,
+        "pages": pages,
+        "steps": len(recipe.steps),
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+async def _fill_form(page, step: Dict[str, Any], forms: List[Dict[str, Any]]):
+    index = _find_form(forms, step["form"])
+    form = page.locator("form").nth(index)
+    fields = forms[index]["inputs"]
+    for key, value in step["values"].items():
+        field = next((field for field in fields if _field_matches(field, key)), None)
+        if field is None:
+            raise ValueError(f"fill_form: no field matching {key!r}")
+        locator = form.locator(_field_selector(field)).first
+        if field["tag"] == "select":
+            await locator.select_option(str(value), timeout=step["timeout_ms"])
+        elif field["type"].lower() in ("checkbox", "radio"):
+            await locator.set_checked(bool(value), timeout=step["timeout_ms"])
+        else:
+            await locator.fill(str(value), timeout=step["timeout_ms"])
+
+    submit = step["submit"]
+    if isinstance(submit, str):
+        await page.click(submit, timeout=step["timeout_ms"])
+    elif submit:
+        button = form.locator("[type=submit], button:not([type])").first
+        if await button.count():
+            await button.click(timeout=step["timeout_ms"])
+        else:
+            await form.evaluate("(form) => form.requestSubmit ? form.requestSubmit() : form.submit()")
+
+
+async def _paginate(page, step: Dict[str, Any], readiness) -> List[str]:
+    """Click ``next`` up to ``max_pages`` - 1 times; the distinct URLs of the pages seen."""
+    pages = [page.url]
+    for _ in range(step["max_pages"] - 1):
+        link = page.locator(step["next"]).first
+        if not await link.count() or not await link.is_enabled():
+            break
+        await link.click(timeout=step["timeout_ms"])
+        await _settle(page, readiness)
+        if page.url not in pages:
+            pages.append(page.url)
+    # Postback pagination keeps one URL for every page: nothing to revisit directly
+    return pages if len(pages) > 1 else []
+
+
+class SessionStore:
+    """SQLite persistence for per-domain storage states and navigation recipes."""
+
+    SESSION_COLUMNS = ("domain", "source", "landing_url", "pages", "created_at", "expires_at", "uses")
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                domain TEXT PRIMARY KEY,
+                source TEXT NOT NULL,
+                state BLOB NOT NULL,
+                landing_url TEXT,
+                pages TEXT NOT NULL DEFAULT '[]',
+                created_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                uses INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions(expires_at);
+
+            CREATE TABLE IF NOT EXISTS recipes (
+                domain TEXT PRIMARY KEY,
+                recipe TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            );
+        """)
+        self._db.commit()
+
+    def _public(self, row: sqlite3.Row) -> Dict[str, Any]:
+        session = {column: row[column] for column in self.SESSION_COLUMNS}
+        session["pages"] = json.loads(session["pages"])
+        return session
+
+    def get(self, domain: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute("SELECT * FROM sessions WHERE domain = ?", (domain,)).fetchone()
+        if row is None:
+            return None
+        return {**self._public(row), "state": _unpack(row["state"])}
+
+    def put(self, session: Dict[str, Any]):
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO sessions (domain, source, state, landing_url, pages, created_at, expires_at, uses) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (session["domain"], session["source"], _pack(session["state"]), session["landing_url"],
+                 json.dumps(session["pages"]), session["created_at"], session["expires_at"], session["uses"])
+            )
+
+    def touch(self, domain: str):
+        with self._lock, self._db:
+            self._db.execute("UPDATE sessions SET uses = uses + 1 WHERE domain = ?", (domain,))
+
+    def remove(self, domain: str) -> bool:
+        with self._lock, self._db:
+            return self._db.execute("DELETE FROM sessions WHERE domain = ?", (domain,)).rowcount > 0
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._db.execute("SELECT * FROM sessions ORDER BY domain").fetchall()
+        return [self._public(row) for row in rows]
+
+    def purge_expired(self, now: float) -> int:
+        with self._lock, self._db:
+            return self._db.execute("DELETE FROM sessions WHERE expires_at <= ?", (now,)).rowcount
+
+    def recipes(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._db.execute("SELECT recipe FROM recipes ORDER BY domain").fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def put_recipe(self, recipe: NavigationRecipe):
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO recipes (domain, recipe, updated_at) VALUES (?, ?, ?)",
+                (recipe.domain, json.dumps(recipe.to_dict()), time.time())
+            )
+
+    def remove_recipe(self, domain: str) -> bool:
+        with self._lock, self._db:
+            return self._db.execute("DELETE FROM recipes WHERE domain = ?", (domain,)).rowcount > 0
+
+    def count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class SessionCache:
+    """
+    Storage states per domain, navigation recipes, and a loop that refreshes
+    recipe sessions before they expire.
+
+    Sessions are only ever read and applied on the event loop that runs the
+    browser, with the SQLite reads and writes behind them sent to worker
+    threads; the per-domain locks make concurrent scrapes of a cold portal
+    wait for one recipe run instead of each running it.
+    """
+
+    def __init__(self,
+                 store: SessionStore,
+                 ttl: float = 1800.0,
+                 refresh_ahead: float = 300.0,
+                 poll_interval: float = 60.0,
+                 capture: bool = True):
+        """
+        Args:
+            store (SessionStore): Sessions and recipes
+            ttl (float): Longest a session is reused, in seconds (cookies may expire it sooner)
+            refresh_ahead (float): Recipe sessions are re-run this long before they expire
+            poll_interval (float): How often the prewarm loop looks for expiring sessions
+            capture (bool): Also keep the cookies of domains without a recipe after a render
+        """
+        self.store = store
+        self.ttl = ttl
+        self.refresh_ahead = refresh_ahead
+        self.poll_interval = poll_interval
+        self.capture = capture
+
+        self._recipes: Dict[str, NavigationRecipe] = {}
+        self._recipes_lock = threading.Lock()
+        self._sessions: Dict[str, Optional[Dict[str, Any]]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._failures: Dict[str, Dict[str, Any]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._owns: Optional[Callable[[str], bool]] = None
+        self.counters = {"hit": 0, "miss": 0, "expired": 0, "saved": 0, "recipe_runs": 0,
+                         "recipe_failures": 0, "invalidated": 0, "prewarmed": 0}
+
+        self._load_recipes()
+
+    @classmethod
+    def from_env(cls) -> Optional["SessionCache"]:
+        """Cache configured from SCRAPER_SESSION_* (``SCRAPER_SESSIONS=0`` disables it)."""
+        if os.environ.get("SCRAPER_SESSIONS", "1") == "0":
+            return None
+        cache = cls(
+            SessionStore(os.environ.get("SCRAPER_SESSION_DB", os.path.join("data", "sessions.sqlite"))),
+            ttl=float(os.environ.get("SCRAPER_SESSION_TTL", "1800")),
+            refresh_ahead=float(os.environ.get("SCRAPER_SESSION_REFRESH_AHEAD", "300")),
+            capture=os.environ.get("SCRAPER_SESSION_CAPTURE", "1") != "0",
+        )
+        recipes_path = os.environ.get("SCRAPER_SESSION_RECIPES")
+        if recipes_path:
+            with open(recipes_path, "r", encoding="utf-8") as handle:
+                for value in json.load(handle):
+                    cache.add_recipe(value)
+        return cache
+
+    # ---- recipes -------------------------------------------------------
+
+    def _load_recipes(self):
+        recipes = {}
+        for value in self.store.recipes():
+            recipe = NavigationRecipe.parse(value)
+            recipes[recipe.domain] = recipe
+        with self._recipes_lock:
+            self._recipes = recipes
+
+    def reload(self, domain: Optional[str] = None):
+        """Re-read recipes and forget remembered sessions (one domain's or all) after another process changed them."""
+        self._load_recipes()
+        if domain is None:
+            self._sessions.clear()
+        else:
+            self._sessions.pop(domain.lower(), None)
+
+    def add_recipe(self, value: Dict[str, Any]) -> NavigationRecipe:
+        """Validate and store a recipe (replacing the domain's previous one and its session)."""
+        recipe = NavigationRecipe.parse(value)
+        self.store.put_recipe(recipe)
+        with self._recipes_lock:
+            self._recipes[recipe.domain] = recipe
+        self.invalidate(recipe.domain)
+        return recipe
+
+    def remove_recipe(self, domain: str) -> bool:
+        with self._recipes_lock:
+            self._recipes.pop(domain, None)
+        return self.store.remove_recipe(domain)
+
+    def recipe_for(self, url_or_domain: str) -> Optional[NavigationRecipe]:
+        domain = url_domain(url_or_domain) if "://" in url_or_domain else url_or_domain.lower()
+        with self._recipes_lock:
+            return self._recipes.get(domain)
+
+    def recipes(self) -> List[Dict[str, Any]]:
+        with self._recipes_lock:
+            return [recipe.to_dict() for recipe in self._recipes.values()]
+
+    # ---- sessions ------------------------------------------------------
+
+    def lock(self, domain: str) -> asyncio.Lock:
+        if domain not in self._locks:
+            self._locks[domain] = asyncio.Lock()
+        return self._locks[domain]
+
+    async def peek(self, domain: str) -> Optional[Dict[str, Any]]:
+        """The domain's unexpired session, without counting a lookup."""
+        if domain not in self._sessions:
+            stored = await asyncio.to_thread(self.store.get, domain)
+            # A scrape may have saved or dropped the session while we read
+            self._sessions.setdefault(domain, stored)
+        session = self._sessions[domain]
+        if session is not None and session["expires_at"] <= time.time():
+            return None
+        return session
+
+    async def get(self, domain: str) -> Optional[Dict[str, Any]]:
+        """The domain's session if it has one that has not expired."""
+        session = await self.peek(domain)
+        if session is not None:
+            self.counters["hit"] += 1
+        elif self._sessions.get(domain) is not None:
+            self.counters["expired"] += 1
+            await self.drop(domain)
+        else:
+            self.counters["miss"] += 1
+        return session
+
+    def needs_refresh(self, session: Optional[Dict[str, Any]]) -> bool:
+        """True when a render should re-capture the session (none yet, or past half its life)."""
+        if session is None:
+            return True
+        return time.time() > (session["created_at"] + session["expires_at"]) / 2
+
+    async def save(self,
+                   domain: str,
+                   state: Dict[str, Any],
+                   source: str = "scrape",
+                   landing_url: Optional[str] = None,
+                   pages: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Keep ``state`` (as returned by ``context.storage_state()``) for ``domain``.
+
+        Cookies of other domains are dropped unless the session came from a
+        recipe, whose redirect chain may pass through a single sign-on host.
+        A refresh of a recipe session keeps its landing URL and pages.
+        """
+        if source != "recipe":
+            state = filter_state(state, domain)
+        previous = self._sessions.get(domain)
+        if previous is not None and landing_url is None:
+            landing_url, pages = previous["landing_url"], previous["pages"]
+            source = previous["source"]
+        recipe = self.recipe_for(domain)
+        now = time.time()
+        session = {
+            "domain": domain,
+            "source": source,
+            "state": state,
+            "landing_url": landing_url,
+            "pages": pages or [],
+            "created_at": now,
+            "expires_at": state_expiry(filter_state(state, domain), now, (recipe and recipe.ttl) or self.ttl),
+            "uses": previous["uses"] if previous else 0,
+        }
+        await asyncio.to_thread(self.store.put, session)
+        self._sessions[domain] = session
+        self._failures.pop(domain, None)
+        self.counters["saved"] += 1
+        return session
+
+    async def use(self, session: Dict[str, Any]):
+        session["uses"] += 1
+        await asyncio.to_thread(self.store.touch, session["domain"])
+
+    def invalidate(self, domain: str) -> bool:
+        """Forget the domain's session (e.g. the portal logged it out)."""
+        self._sessions[domain] = None
+        removed = self.store.remove(domain)
+        if removed:
+            self.counters["invalidated"] += 1
+        return removed
+
+    async def drop(self, domain: str) -> bool:
+        """``invalidate`` from the event loop."""
+        self._sessions[domain] = None
+        removed = await asyncio.to_thread(self.store.remove, domain)
+        if removed:
+            self.counters["invalidated"] += 1
+        return removed
+
+    def describe(self, session: Dict[str, Any], source: str) -> Dict[str, Any]:
+        """Session summary for scrape results and the API (never the cookies themselves)."""
+        now = time.time()
+        return {
+            "domain": session["domain"],
+            "source": source,
+            "age_s": round(now - session["created_at"], 1),
+            "expires_in_s": round(session["expires_at"] - now, 1),
+            "landing_url": session["landing_url"],
+            "pages": session["pages"],
+        }
+
+    def list(self) -> List[Dict[str, Any]]:
+        now = time.time()
+        return [{**session, "expires_in_s": round(session["expires_at"] - now, 1),
+                 "recipe": self.recipe_for(session["domain"]) is not None}
+                for session in self.store.list()]
+
+    @staticmethod
+    async def apply(context, session: Dict[str, Any]):
+        """Load a session's cookies and localStorage into a browser context."""
+        state = session["state"]
+        if state.get("cookies"):
+            await context.add_cookies(state["cookies"])
+        for origin in state.get("origins", []):
+            items = [[item["name"], item["value"]] for item in origin.get("localStorage", [])]
+            if items:
+                await context.add_init_script(
+                    LOCAL_STORAGE_SCRIPT % (json.dumps(origin["origin"]), json.dumps(items))
+                )
+
+    # ---- background prewarming ------------------------------------------
+
+    async def due_for_prewarm(self, now: float) -> List[str]:
+        """Recipe domains whose session is missing or expires within ``refresh_ahead``."""
+        due = []
+        with self._recipes_lock:
+            recipes = [recipe for recipe in self._recipes.values()
+                       if recipe.prewarm and (self._owns is None or self._owns(recipe.domain))]
+        for recipe in recipes:
+            failure = self._failures.get(recipe.domain)
+            if failure and failure["retry_at"] > now:
+                continue
+            session = await self.peek(recipe.domain)
+            if session is None or session["expires_at"] - self.refresh_ahead <= now:
+                due.append(recipe.domain)
+        return due
+
+    def record_failure(self, domain: str, error: Exception):
+        self.counters["recipe_failures"] += 1
+        failures = self._failures.get(domain, {}).get("failures", 0) + 1
+        # Back off on repeated failures, up to 32 poll intervals
+        self._failures[domain] = {
+            "failures": failures,
+            "error": (str(error).splitlines() or [type(error).__name__])[0],
+            "retry_at": time.time() + self.poll_interval * min(32, 2 ** failures),
+        }
+
+    async def prewarm(self, warm: Callable[[NavigationRecipe], Awaitable[Any]]) -> int:
+        """Run ``warm`` for every recipe whose session is due; returns how many succeeded."""
+        warmed = 0
+        for domain in await self.due_for_prewarm(time.time()):
+            recipe = self.recipe_for(domain)
+            if recipe is None:
+                continue
+            try:
+                await warm(recipe)
+            except Exception as e:
+                logger.warning(f"Prewarming the session for {domain} failed: {str(e)}")
+                self.record_failure(domain, e)
+                continue
+            self.counters["prewarmed"] += 1
+            warmed += 1
+        return warmed
+
+    async def _loop(self, warm):
+        while True:
+            try:
+                await self.prewarm(warm)
+                await asyncio.to_thread(self.store.purge_expired, time.time())
+            except Exception as e:
+                logger.error(f"Session prewarm loop error: {str(e)}")
+            await asyncio.sleep(self.poll_interval)
+
+    def start(self, warm: Callable[[NavigationRecipe], Awaitable[Any]],
+              owns: Optional[Callable[[str], bool]] = None):
+        """
+        Keep recipe sessions warm in the background (call on the running loop).
+
+        Args:
+            warm: Runs a recipe and saves its session
+            owns: Only prewarm domains it returns True for (one worker per domain)
+        """
+        self._owns = owns
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._loop(warm))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._recipes_lock:
+            recipes = len(self._recipes)
+        return {
+            "sessions": self.store.count(),
+            "recipes": recipes,
+            "ttl": self.ttl,
+            "capture": self.capture,
+            "prewarming": self._task is not None,
+            "failing": {domain: failure["error"] for domain, failure in self._failures.items()},
+            **self.counters,
+        }
+
+
+_session_cache: Optional[SessionCache] = None
+_session_cache_initialized = False
+_session_cache_lock = threading.Lock()
+
+
+def get_session_cache() -> Optional[SessionCache]:
+    """Return the process-wide session cache, or None when disabled."""
+    global _session_cache, _session_cache_initialized
+    with _session_cache_lock:
+        if not _session_cache_initialized:
+            _session_cache = SessionCache.from_env()
+            _session_cache_initialized = True
+        return _session_cache
@@ -0,0 +1,536 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import logging
+
+from url_utils import url_domain
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SCREENSHOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'screenshots')
+RFP_STATUSES = ("open", "closed", "undated", "all")
+RFP_ORDERINGS = {
+    "due_date": "due_date IS NULL, due_date ASC",
+    "analyzed_at": "analyzed_at DESC",
+    "confidence": "confidence DESC",
+}
+
+
+def text_hash(text: str) -> str:
+    """Stable hash of page text, whitespace-insensitive."""
+    return hashlib.sha1(" ".join((text or "").split()).encode("utf-8")).hexdigest()
+
+
+def _pack(data: Any) -> bytes:
+    return zlib.compress(json.dumps(data, default=str).encode("utf-8"), 3)
+
+
+def _unpack(blob: Optional[bytes]) -> Any:
+    return json.loads(zlib.decompress(blob)) if blob else None
+
+
+class ScreenshotStore:
+    """
+    Content-addressed screenshot files: ``<root>/<sha256>.<ext>``.
+
+    Identical captures are stored once, and names cannot collide the way
+    ``hash(url) % 10000`` names did.
+    """
+
+    def __init__(self, root: str = DEFAULT_SCREENSHOT_DIR):
+        self.root = os.path.abspath(root)
+        os.makedirs(self.root, exist_ok=True)
+
+    @classmethod
+    def from_env(cls) -> "ScreenshotStore":
+        return cls(os.environ.get("SCRAPER_SCREENSHOT_DIR", DEFAULT_SCREENSHOT_DIR))
+
+    def path_for(self, digest: str, ext: str = "png") -> str:
+        return os.path.join(self.root, f"{digest}.{ext}")
+
+    def write(self, filename: str, data: bytes) -> str:
+        """Write ``data`` under ``filename`` atomically (readers never see a partial file)."""
+        path = os.path.join(self.root, filename)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return path
+
+    def exists(self, filename: str) -> bool:
+        return os.path.exists(os.path.join(self.root, os.path.basename(filename)))
+
+    def put(self, data: bytes, ext: str = "png") -> Dict[str, Any]:
+        """
+        Store image bytes under their SHA-256.
+
+        Returns:
+            Dict: ``hash``, ``path``, ``filename``, ``size`` and ``deduplicated``
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path_for(digest, ext)
+        deduplicated = os.path.exists(path)
+        if not deduplicated:
+            self.write(os.path.basename(path), data)
+        return {
+            "hash": digest,
+            "path": path,
+            "filename": os.path.basename(path),
+            "size": len(data),
+            "deduplicated": deduplicated,
+        }
+
+    def contains(self, filename: str) -> bool:
+        return os.path.dirname(os.path.abspath(filename)) == self.root
+
+    def evict(self, max_bytes: Optional[int] = None, max_age: Optional[float] = None,
+              keep_recent: float = 0.0) -> Dict[str, int]:
+        """
+        Delete files older than ``max_age`` seconds, then the least recently
+        used ones until the store fits in ``max_bytes``. Files used within
+        the last ``keep_recent`` seconds are never deleted.
+
+        Returns:
+            Dict: ``files`` and ``bytes`` removed, and the ``bytes`` still stored
+        """
+        entries = []
+        for entry in os.scandir(self.root):
+            if entry.is_file() and not entry.name.endswith(".tmp"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        now = time.time()
+        cutoff = now - max_age if max_age else None
+        removed = freed = 0
+        for mtime, size, path in entries:
+            if not (cutoff is not None and mtime < cutoff) and not (max_bytes is not None and total > max_bytes):
+                break
+            if mtime > now - keep_recent:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            removed += 1
+            freed += size
+            total -= size
+        return {"files": removed, "bytes": freed, "stored_bytes": total}
+
+
+# COUNT(*) walks the whole table, so row counts on /metrics are cached this long (seconds)
+ROW_COUNT_MAX_AGE = 60.0
+
+
+class ResultStore:
+    """
+    Indexed SQLite storage for scraped pages and analyzed RFPs.
+
+    Pages keep their latest snapshot (full result compressed, plus links and
+    tables in their own tables); RFPs keep their extracted fields as columns
+    so listings like "open RFPs due in the next 14 days" are index lookups
+    that never touch the compressed payloads.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._row_counts: Optional[Dict[str, int]] = None
+        self._row_counts_at = 0.0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                domain TEXT NOT NULL,
+                title TEXT,
+                status TEXT,
+                fetched_at REAL NOT NULL,
+                content_hash TEXT,
+                screenshot_hash TEXT,
+                text_chars INTEGER,
+                link_count INTEGER,
+                table_count INTEGER,
+                result BLOB
+            );
+            CREATE INDEX IF NOT EXISTS idx_pages_domain ON pages(domain, fetched_at);
+            CREATE INDEX IF NOT EXISTS idx_pages_fetched ON pages(fetched_at);
+            CREATE INDEX IF NOT EXISTS idx_pages_hash ON pages(content_hash);
+
+            CREATE TABLE IF NOT EXISTS links (
+                page_url TEXT NOT NULL,
+                href TEXT NOT NULL,
+                text TEXT,
+                domain TEXT,
+                is_external INTEGER
+            );
+            CREATE INDEX IF NOT EXISTS idx_links_page ON links(page_url);
+            CREATE INDEX IF NOT EXISTS idx_links_domain ON links(domain);
+
+            CREATE TABLE IF NOT EXISTS page_tables (
+                page_url TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                headers TEXT,
+                rows BLOB,
+                total_rows INTEGER,
+                column_types TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_page_tables_page ON page_tables(page_url);
+
+            CREATE TABLE IF NOT EXISTS rfps (
+                id INTEGER PRIMARY KEY,
+                source TEXT NOT NULL UNIQUE,
+                domain TEXT,
+                title TEXT,
+                reference_number TEXT,
+                due_date TEXT,
+                budget_min REAL,
+                budget_max REAL,
+                contact_email TEXT,
+                contact_phone TEXT,
+                confidence REAL,
+                analysis_status TEXT,
+                analyzed_at REAL NOT NULL,
+                content_hash TEXT,
+                data BLOB
+            );
+            CREATE INDEX IF NOT EXISTS idx_rfps_due ON rfps(due_date);
+            CREATE INDEX IF NOT EXISTS idx_rfps_domain ON rfps(domain, due_date);
+            CREATE INDEX IF NOT EXISTS idx_rfps_analyzed ON rfps(analyzed_at);
+            CREATE INDEX IF NOT EXISTS idx_rfps_hash ON rfps(content_hash);
+        """)
+        # Stores created before tables carried inferred column types
+        columns = {row["name"] for row in self._db.execute("PRAGMA table_info(page_tables)")}
+        if "column_types" not in columns:
+            self._db.execute("ALTER TABLE page_tables ADD COLUMN column_types TEXT")
+        self._db.commit()
+
+    @classmethod
+    def from_env(cls) -> Optional["ResultStore"]:
+        """Store configured from SCRAPER_STORE_* (``SCRAPER_STORE=0`` disables it)."""
+        if os.environ.get("SCRAPER_STORE", "1") == "0":
+            return None
+        return cls(os.environ.get("SCRAPER_STORE_DB", os.path.join("data", "results.sqlite")))
+
+    # Pages
+
+    @staticmethod
+    def _page_rows(result: Dict[str, Any], fetched_at: float):
+        url = result["url"]
+        content = result.get("content", {})
+        text = content.get("text", {}).get("full_text", "")
+        links = content.get("links", [])
+        tables = content.get("tables", [])
+        page = (
+            url, url_domain(url), result.get("title"), result.get("status"), fetched_at,
+            text_hash(text), result.get("screenshot_hash"), len(text), len(links), len(tables),
+            _pack(result),
+        )
+        link_rows = [
+            (url, link.get("absolute_url") or link.get("href", ""), (link.get("text") or "")[:500],
+             url_domain(link.get("absolute_url") or link.get("href", "")), int(bool(link.get("is_external"))))
+            for link in links
+        ]
+        table_rows = [
+            (url, position, json.dumps(table.get("headers", [])), _pack(table.get("rows", [])),
+             table.get("total_rows", len(table.get("rows", []))),
+             json.dumps(table["column_types"]) if table.get("column_types") else None)
+            for position, table in enumerate(tables)
+        ]
+        return page, link_rows, table_rows
+
+    def save_pages(self, results: Iterable[Dict[str, Any]]) -> int:
+        """
+        Upsert successful scrape results in one transaction.
+
+        Returns:
+            int: Number of pages written
+        """
+        now = time.time()
+        pages, links, tables = [], [], []
+        for result in results:
+            if not result or result.get("status") != "success" or not result.get("url"):
+                continue
+            page, link_rows, table_rows = self._page_rows(result, now)
+            pages.append(page)
+            links.extend(link_rows)
+            tables.extend(table_rows)
+        if not pages:
+            return 0
+
+        urls = [(page[0],) for page in pages]
+        with self._lock, self._db:
+            self._db.executemany("DELETE FROM links WHERE page_url = ?", urls)
+            self._db.executemany("DELETE FROM page_tables WHERE page_url = ?", urls)
+            self._db.executemany(
+                "INSERT OR REPLACE INTO pages (url, domain, title, status, fetched_at, content_hash, "
+                "screenshot_hash, text_chars, link_count, table_count, result) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                pages
+            )
+            self._db.executemany("INSERT INTO links VALUES (?, ?, ?, ?, ?)", links)
+            self._db.executemany("INSERT INTO page_tables (page_url, position, headers, rows, total_rows, column_types) "
+                                 "VALUES (?, ?, ?, ?, ?, ?)", tables)
+        return len(pages)
+
+    def save_page(self, result: Dict[str, Any]) -> bool:
+        return self.save_pages([result]) == 1
+
+    def get_page(self, url: str) -> Optional[Dict[str, Any]]:
+        """Latest stored scrape result for ``url``"""
+        with self._lock:
+            row = self._db.execute("SELECT result, fetched_at FROM pages WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return None
+        return {**_unpack(row["result"]), "stored_at": row["fetched_at"]}
+
+    def query_pages(self, domain: Optional[str] = None, since: Optional[float] = None,
+                    content_hash: Optional[str] = None, limit: int = 100, offset: int = 0) -> Dict[str, Any]:
+        """Page summaries, newest first"""
+        where, params = [], []
+        if domain:
+            where.append("domain = ?")
+            params.append(domain.lower())
+        if since is not None:
+            where.append("fetched_at >= ?")
+            params.append(since)
+        if content_hash:
+            where.append("content_hash = ?")
+            params.append(content_hash)
+        clause = f"WHERE {' AND '.join(where)}" if where else ""
+        with self._lock:
+            total = self._db.execute(f"SELECT COUNT(*) FROM pages {clause}", params).fetchone()[0]
+            rows = self._db.execute(
+                f"SELECT url, domain, title, status, fetched_at, content_hash, screenshot_hash, "
+                f"text_chars, link_count, table_count FROM pages {clause} "
+                f"ORDER BY fetched_at DESC LIMIT ? OFFSET ?",
+                params + [limit, offset]
+            ).fetchall()
+        return {"total": total, "pages": [dict(row) for row in rows]}
+
+    def links_to(self, domain: str, limit: int = 100) -> List[Dict[str, Any]]:
+        """Stored links pointing at ``domain``"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT page_url, href, text FROM links WHERE domain = ? LIMIT ?", (domain.lower(), limit)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def tables_version(self) -> tuple:
+        """Changes whenever stored tables do (pages rewrite their tables on save)."""
+        with self._lock:
+            return tuple(self._db.execute("SELECT MAX(rowid), COUNT(*) FROM page_tables").fetchone())
+
+    def iter_tables(self, domain: Optional[str] = None) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+        """Stored tables grouped by page: ``(url, [{"headers", "rows", "total_rows", "column_types"}, ...])``"""
+        query = "SELECT page_url, headers, rows, total_rows, column_types FROM page_tables"
+        params = []
+        if domain:
+            query += " WHERE page_url IN (SELECT url FROM pages WHERE domain = ?)"
+            params.append(domain.lower())
+        with self._lock:
+            rows = self._db.execute(query + " ORDER BY page_url, position", params).fetchall()
+        url, tables = None, []
+        for row in rows:
+            if row["page_url"] != url:
+                if tables:
+                    yield url, tables
+                url, tables = row["page_url"], []
+            tables.append({"headers": json.loads(row["headers"] or "[]"), "rows": _unpack(row["rows"]) or [],
+                           "total_rows": row["total_rows"], "column_types": json.loads(row["column_types"] or "[]")})
+        if tables:
+            yield url, tables
+
+    # RFPs
+
+    @staticmethod
+    def _rfp_row(result: Dict[str, Any], analyzed_at: float):
+        data = result.get("data", {})
+        budget = data.get("budget_range") if isinstance(data.get("budget_range"), dict) else {}
+        contact = data.get("contact_info") if isinstance(data.get("contact_info"), dict) else {}
+        raw_text = (result.get("raw_scraped") or {}).get("text_content", {}).get("full_text")
+        stored = {key: value for key, value in result.items() if key != "raw_scraped"}
+        source = result["source"]
+        return (
+            source,
+            url_domain(source) if source.startswith(("http://", "https://")) else None,
+            data.get("title"),
+            data.get("reference_number"),
+            data.get("due_date") if isinstance(data.get("due_date"), str) else None,
+            budget.get("min"),
+            budget.get("max"),
+            contact.get("email"),
+            contact.get("phone"),
+            result.get("confidence", {}).get("overall"),
+            data.get("status"),
+            analyzed_at,
+            text_hash(raw_text) if raw_text else hashlib.sha1(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest(),
+            _pack(stored),
+        )
+
+    def save_rfps(self, results: Iterable[Dict[str, Any]]) -> int:
+        """
+        Upsert successful ``analyze_rfp`` results (keyed by source) in one transaction.
+
+        Returns:
+            int: Number of RFPs written
+        """
+        now = time.time()
+        rows = [self._rfp_row(result, now) for result in results
+                if result and result.get("status") == "success" and result.get("source")]
+        if not rows:
+            return 0
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT INTO rfps (source, domain, title, reference_number, due_date, budget_min, budget_max, "
+                "contact_email, contact_phone, confidence, analysis_status, analyzed_at, content_hash, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(source) DO UPDATE SET domain = excluded.domain, title = excluded.title, "
+                "reference_number = excluded.reference_number, due_date = excluded.due_date, "
+                "budget_min = excluded.budget_min, budget_max = excluded.budget_max, "
+                "contact_email = excluded.contact_email, contact_phone = excluded.contact_phone, "
+                "confidence = excluded.confidence, analysis_status = excluded.analysis_status, "
+                "analyzed_at = excluded.analyzed_at, content_hash = excluded.content_hash, data = excluded.data",
+                rows
+            )
+        return len(rows)
+
+    def save_rfp(self, result: Dict[str, Any]) -> bool:
+        return self.save_rfps([result]) == 1
+
+    def query_rfps(self,
+                   status: str = "open",
+                   due_within: Optional[int] = None,
+                   domain: Optional[str] = None,
+                   search: Optional[str] = None,
+                   min_confidence: Optional[float] = None,
+                   order: str = "due_date",
+                   limit: int = 100,
+                   offset: int = 0,
+                   today: Optional[date] = None) -> Dict[str, Any]:
+        """
+        RFP summaries filtered on indexed columns.
+
+        Args:
+            status (str): ``open`` (due today or later), ``closed``, ``undated`` or ``all``
+            due_within (int, optional): Only RFPs due within this many days from today
+            domain (str, optional): Source domain
+            search (str, optional): Substring of the title or reference number
+            min_confidence (float, optional): Minimum overall confidence
+            order (str): ``due_date``, ``analyzed_at`` or ``confidence``
+            limit (int): Page size
+            offset (int): Rows to skip
+            today (date, optional): Reference date (defaults to today)
+
+        Returns:
+            Dict: ``total`` matching rows and the ``rfps`` page
+        """
+        if status not in RFP_STATUSES:
+            raise ValueError(f"status must be one of: {', '.join(RFP_STATUSES)}")
+        if order not in RFP_ORDERINGS:
+            raise ValueError(f"order must be one of: {', '.join(RFP_ORDERINGS)}")
+        today = (today or date.today()).isoformat()
+
+        # ISO dates (with or without a time) compare correctly as strings
+        where, params = [], []
+        if status == "open":
+            where.append("due_date >= ?")
+            params.append(today)
+        elif status == "closed":
+            where.append("due_date < ?")
+            params.append(today)
+        elif status == "undated":
+            where.append("due_date IS NULL")
+        if due_within is not None:
+            until = (date.fromisoformat(today) + timedelta(days=due_within + 1)).isoformat()
+            where.append("due_date >= ? AND due_date < ?")
+            params += [today, until]
+        if domain:
+            where.append("domain = ?")
+            params.append(domain.lower())
+        if search:
+            where.append("(title LIKE ? OR reference_number LIKE ?)")
+            params += [f"%{search}%", f"%{search}%"]
+        if min_confidence is not None:
+            where.append("confidence >= ?")
+            params.append(min_confidence)
+        clause = f"WHERE {' AND '.join(where)}" if where else ""
+
+        with self._lock:
+            total = self._db.execute(f"SELECT COUNT(*) FROM rfps {clause}", params).fetchone()[0]
+            rows = self._db.execute(
+                f"SELECT id, source, domain, title, reference_number, due_date, budget_min, budget_max, "
+                f"contact_email, contact_phone, confidence, analysis_status, analyzed_at FROM rfps {clause} "
+                f"ORDER BY {RFP_ORDERINGS[order]} LIMIT ? OFFSET ?",
+                params + [limit, offset]
+            ).fetchall()
+        return {"total": total, "rfps": [dict(row) for row in rows]}
+
+    def get_rfp(self, rfp_id: int) -> Optional[Dict[str, Any]]:
+        """Full stored analysis of one RFP"""
+        with self._lock:
+            row = self._db.execute("SELECT id, data, analyzed_at FROM rfps WHERE id = ?", (rfp_id,)).fetchone()
+        if row is None:
+            return None
+        return {"id": row["id"], **_unpack(row["data"]), "stored_at": row["analyzed_at"]}
+
+    def stats(self) -> Dict[str, Any]:
+        """Cheap enough for /health: no table scans (row counts are on /metrics)"""
+        return {"path": self.path}
+
+    def row_counts(self, max_age: float = ROW_COUNT_MAX_AGE) -> Dict[str, int]:
+        """
+        Rows per table, recounted at most every ``max_age`` seconds.
+
+        Args:
+            max_age (float): How old the cached counts may be
+
+        Returns:
+            Dict[str, int]: Row count of pages, links, page_tables and rfps
+        """
+        with self._lock:
+            if self._row_counts is None or time.time() - self._row_counts_at >= max_age:
+                self._row_counts = {
+                    table: self._db.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                    for table in ("pages", "links", "page_tables", "rfps")
+                }
+                self._row_counts_at = time.time()
+            return dict(self._row_counts)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+_store: Optional[ResultStore] = None
+_store_loaded = False
+_screenshots: Optional[ScreenshotStore] = None
+_singletons_lock = threading.Lock()
+
+
+def get_result_store() -> Optional[ResultStore]:
+    """Process-wide result store from SCRAPER_STORE_* (None when disabled)."""
+    global _store, _store_loaded
+    with _singletons_lock:
+        if not _store_loaded:
+            _store = ResultStore.from_env()
+            _store_loaded = True
+        return _store
+
+
+def get_screenshot_store() -> ScreenshotStore:
+    """Process-wide content-addressed screenshot store."""
+    global _screenshots
+    with _singletons_lock:
+        if _screenshots is None:
+            _screenshots = ScreenshotStore.from_env()
+        return _screenshots
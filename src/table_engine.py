@@ -0,0 +1,538 @@
+"""
+Table engine: HTML tables as correct cell grids with typed columns.
+
+The extraction handler records every table's rows and cells (with
+``rowspan``/``colspan``, ``<th>`` flags and ``thead``/``tbody``/``tfoot``
+sections, nested tables kept apart). ``build_table`` lays the cells out on
+a grid the way a browser does, infers how many rows are headers and what
+each column holds (dates, money, numbers or text).
+
+Tables can be turned into pandas DataFrames or Arrow tables / Parquet files
+(when those packages are installed), and ``TableIndex`` filters rows across
+thousands of tables at once, e.g. every row with a due date after today.
+"""
+
+import importlib.util
+import re
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import logging
+
+# Optional array libraries are imported on first use: extraction workers load
+# this module for every page but only need the grid/typing code
+HAS_NUMPY = importlib.util.find_spec("numpy") is not None
+HAS_PANDAS = importlib.util.find_spec("pandas") is not None
+HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+logger = logging.getLogger(__name__)
+
+COLUMN_TYPES = ("date", "money", "number", "text", "empty")
+
+# HTML caps spans at these values; anything larger is malformed markup
+MAX_COLSPAN = 1000
+MAX_ROWSPAN = 65534
+
+# Share of a column's non-empty cells that must parse for it to get a type
+TYPE_THRESHOLD = 0.8
+
+MONTHS = {
+    name: number
+    for number, names in enumerate((
+        ("jan", "january"), ("feb", "february"), ("mar", "march"), ("apr", "april"),
+        ("may",), ("jun", "june"), ("jul", "july"), ("aug", "august"),
+        ("sep", "sept", "september"), ("oct", "october"), ("nov", "november"), ("dec", "december"),
+    ), start=1)
+    for name in names
+}
+
+ISO_DATE_RE = re.compile(r'^(\d{4})-(\d{1,2})-(\d{1,2})(?:[ T]\d{1,2}:\d{2}(?::\d{2})?)?$')
+US_DATE_RE = re.compile(r'^(\d{1,2})/(\d{1,2})/(\d{2}|\d{4})(?:\s+\d{1,2}:\d{2}(?:\s*[ap]\.?m\.?)?)?$', re.I)
+TEXT_DATE_RE = re.compile(
+    r'^(?:[a-z]+,?\s+)?([a-z]{3,9})\.?\s+(\d{1,2})(?:st|nd|rd|th)?,?\s+(\d{4})'
+    r'(?:,?\s+(?:at\s+)?\d{1,2}(?::\d{2})?\s*(?:[ap]\.?m\.?)?(?:\s+[a-z]{2,4})?)?$',
+    re.I
+)
+MONEY_RE = re.compile(r'^(?:usd\s*)?\$\s*(-?[\d,]+(?:\.\d+)?)\s*(k|m|million|thousand)?(?:\s*usd)?$', re.I)
+NUMBER_RE = re.compile(r'^[-+]?(?:\d{1,3}(?:,\d{3})+|\d+)(?:\.\d+)?%?$')
+MULTIPLIERS = {"k": 1e3, "thousand": 1e3, "m": 1e6, "million": 1e6}
+
+# Cell values that say "no value yet" rather than making a column text
+PLACEHOLDERS = frozenset(["-", "--", "\u2013", "\u2014", "n/a", "na", "tbd", "tba", "none", "pending"])
+
+
+def parse_date(text: str) -> Optional[date]:
+    """A calendar date from a table cell (``2026-03-05``, ``3/5/2026``, ``March 5, 2026``)."""
+    text = text.strip()
+    try:
+        match = ISO_DATE_RE.match(text)
+        if match:
+            return date(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+        match = US_DATE_RE.match(text)
+        if match:
+            year = int(match.group(3))
+            return date(year + 2000 if year < 100 else year, int(match.group(1)), int(match.group(2)))
+        match = TEXT_DATE_RE.match(text)
+        if match and match.group(1).lower() in MONTHS:
+            return date(int(match.group(3)), MONTHS[match.group(1).lower()], int(match.group(2)))
+    except ValueError:
+        pass  # e.g. 2/30/2026
+    return None
+
+
+def parse_money(text: str) -> Optional[float]:
+    match = MONEY_RE.match(text.strip())
+    if not match:
+        return None
+    value = float(match.group(1).replace(",", ""))
+    return value * MULTIPLIERS.get((match.group(2) or "").lower(), 1)
+
+
+def parse_number(text: str) -> Optional[float]:
+    text = text.strip()
+    if not NUMBER_RE.match(text):
+        return None
+    return float(text.rstrip("%").replace(",", ""))
+
+
+def classify_cell(text: str) -> str:
+    """The type of one cell: ``date``, ``money``, ``number``, ``text`` or ``empty``."""
+    text = text.strip()
+    if not text or text.lower() in PLACEHOLDERS:
+        return "empty"
+    if text[0].isdigit() or text[0] in "$uU-+" or text[0].isalpha():
+        if parse_money(text) is not None:
+            return "money"
+        if parse_number(text) is not None:
+            return "number"
+        if parse_date(text) is not None:
+            return "date"
+    return "text"
+
+
+def parse_cell(text: str, kind: str) -> Any:
+    """``text`` as a value of column type ``kind`` (None when it doesn't parse)."""
+    if kind == "date":
+        return parse_date(text)
+    if kind == "money":
+        # Money columns also hold the plain numbers inference counted towards them
+        value = parse_money(text)
+        return value if value is not None else parse_number(text)
+    if kind == "number":
+        return parse_number(text)
+    return text if text.strip() else None
+
+
+def _span(value: Any, limit: int) -> int:
+    try:
+        span = int(str(value).strip() or 1)
+    except ValueError:
+        return 1
+    return min(max(span, 0), limit)
+
+
+def layout_grid(rows: List[List[Tuple[str, Any, Any, bool]]]) -> Tuple[List[List[str]], List[List[bool]], List[List[bool]], int]:
+    """
+    Place cells on a grid honouring ``rowspan``/``colspan``.
+
+    Args:
+        rows: Per row, ``(text, rowspan, colspan, is_header)`` for each cell
+
+    Returns:
+        Tuple: text grid, header-flag grid, grid of slots covered by a
+        ``colspan`` (annotations like "Cancelled" across a row) and the
+        number of merged cells
+    """
+    grid: List[List[Optional[str]]] = []
+    flags: List[List[bool]] = []
+    wide: List[List[bool]] = []
+    merged = 0
+    row_count = len(rows)
+    for r, cells in enumerate(rows):
+        while len(grid) <= r:
+            grid.append([])
+            flags.append([])
+            wide.append([])
+        column = 0
+        for text, rowspan, colspan, is_header in cells:
+            # Skip slots already covered by a rowspan from above
+            while column < len(grid[r]) and grid[r][column] is not None:
+                column += 1
+            colspan = _span(colspan, MAX_COLSPAN) or 1
+            rowspan = _span(rowspan, MAX_ROWSPAN)
+            # rowspan=0 spans the rest of the table; never past its last row
+            rowspan = row_count - r if rowspan == 0 else min(rowspan, row_count - r)
+            if rowspan > 1 or colspan > 1:
+                merged += 1
+            for dr in range(rowspan):
+                while len(grid) <= r + dr:
+                    grid.append([])
+                    flags.append([])
+                    wide.append([])
+                target, target_flags, target_wide = grid[r + dr], flags[r + dr], wide[r + dr]
+                if len(target) < column + colspan:
+                    missing = column + colspan - len(target)
+                    target.extend([None] * missing)
+                    target_flags.extend([False] * missing)
+                    target_wide.extend([False] * missing)
+                for dc in range(colspan):
+                    target[column + dc] = text
+                    target_flags[column + dc] = is_header
+                    target_wide[column + dc] = colspan > 1
+            column += colspan
+
+    width = max((len(row) for row in grid), default=0)
+    texts = [[cell if cell is not None else "" for cell in row] + [""] * (width - len(row)) for row in grid]
+    header_flags = [row + [False] * (width - len(row)) for row in flags]
+    wide_flags = [row + [False] * (width - len(row)) for row in wide]
+    return texts, header_flags, wide_flags, merged
+
+
+def infer_header_rows(grid: List[List[str]], flags: List[List[bool]], sections: List[Optional[str]]) -> int:
+    """
+    How many leading grid rows are headers: ``<thead>`` rows, else rows made
+    only of ``<th>`` cells, else a first row of labels above typed data.
+    """
+    thead = 0
+    while thead < len(sections) and sections[thead] == "thead":
+        thead += 1
+    if thead:
+        return min(thead, len(grid))
+
+    header = 0
+    while header < len(grid) - 1:
+        filled = [flag for text, flag in zip(grid[header], flags[header]) if text.strip()]
+        if not filled or not all(filled):
+            break
+        header += 1
+    if header:
+        return header
+
+    if len(grid) < 2:
+        return 0
+    first = [text.strip() for text in grid[0]]
+    if any(not text or classify_cell(text) != "text" or len(text) > 60 for text in first):
+        return 0
+    if len(set(first)) < len(first):
+        return 0  # repeated labels look more like data (or a key/value table)
+    if len(first) == 2 and all(flag for flag in (row[0] for row in flags[1:] if row)):
+        return 0  # <th> down the first column: a key/value table
+    return 1
+
+
+def _header_names(grid: List[List[str]], header_rows: int, width: int) -> List[str]:
+    headers = []
+    for column in range(width):
+        parts = []
+        for row in grid[:header_rows]:
+            text = row[column].strip()
+            if text and text not in parts:
+                parts.append(text)
+        headers.append(" / ".join(parts))
+    return headers
+
+
+def infer_column_types(rows: List[List[str]], width: int, wide: Optional[List[List[bool]]] = None) -> List[str]:
+    """
+    Per column, the type most of its cells parse as (``TYPE_THRESHOLD`` of
+    the non-empty ones), ignoring placeholders and cells spread across
+    several columns.
+    """
+    types = []
+    for column in range(width):
+        counts: Dict[str, int] = {}
+        filled = 0
+        for position, row in enumerate(rows):
+            if wide is not None and wide[position][column]:
+                continue
+            kind = classify_cell(row[column])
+            if kind != "empty":
+                filled += 1
+                counts[kind] = counts.get(kind, 0) + 1
+        if not filled:
+            types.append("empty")
+            continue
+        kind, count = max(counts.items(), key=lambda item: item[1])
+        if kind != "text" and count >= TYPE_THRESHOLD * filled:
+            types.append(kind)
+        elif counts.get("money", 0) + counts.get("number", 0) >= TYPE_THRESHOLD * filled:
+            types.append("money" if counts.get("money", 0) >= counts.get("number", 0) else "number")
+        else:
+            types.append("text")
+    return types
+
+
+def build_table(raw: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    A grid table from the rows/cells the extractor recorded.
+
+    Args:
+        raw (Dict): ``rows`` (each ``{"section", "cells"}`` with cells as
+            ``(text, rowspan, colspan, is_header)``), ``caption`` and ``parent``
+
+    Returns:
+        Dict: ``headers``/``rows`` (as before, now aligned) plus ``header_rows``,
+        ``column_types``, ``caption``, ``nested``, ``merged_cells`` and ``total_rows``;
+        None for a table without cells
+    """
+    rows = [row for row in raw["rows"] if row["cells"]]
+    if not rows:
+        return None
+    grid, flags, wide, merged = layout_grid([row["cells"] for row in rows])
+    width = len(grid[0]) if grid else 0
+    sections = [row["section"] for row in rows] + [rows[-1]["section"]] * (len(grid) - len(rows))
+    header_rows = infer_header_rows(grid, flags, sections)
+    body = grid[header_rows:]
+    return {
+        "headers": _header_names(grid, header_rows, width) if header_rows else [],
+        "rows": body,
+        "total_rows": len(grid),
+        "header_rows": header_rows,
+        "column_types": infer_column_types(body, width, wide[header_rows:]),
+        "caption": raw.get("caption"),
+        "nested": raw.get("parent") is not None,
+        "merged_cells": merged,
+    }
+
+
+def column_names(table: Dict[str, Any]) -> List[str]:
+    """Unique, non-empty column names (``col_3`` for blank headers)."""
+    width = max([len(table.get("headers", []))] + [len(row) for row in table.get("rows", [])[:1]])
+    headers = list(table.get("headers", [])) + [""] * width
+    names, seen = [], {}
+    for column in range(width):
+        name = headers[column].strip() or f"col_{column + 1}"
+        seen[name] = seen.get(name, 0) + 1
+        names.append(name if seen[name] == 1 else f"{name}_{seen[name]}")
+    return names
+
+
+def table_types(table: Dict[str, Any]) -> List[str]:
+    """Column types, inferred for tables that don't carry them (e.g. documents, stored pages)."""
+    if table.get("column_types"):
+        return table["column_types"]
+    rows = table.get("rows", [])
+    width = max([len(table.get("headers", []))] + [len(row) for row in rows[:50]])
+    padded = [row + [""] * (width - len(row)) for row in rows]
+    return infer_column_types(padded, width)
+
+
+def typed_columns(table: Dict[str, Any]) -> Dict[str, List[Any]]:
+    """Column name → parsed values (dates, floats, strings; None where a cell doesn't parse)."""
+    names = column_names(table)
+    types = table_types(table) + ["text"] * len(names)
+    rows = table.get("rows", [])
+    return {
+        name: [parse_cell(row[column] if column < len(row) else "", types[column]) for row in rows]
+        for column, name in enumerate(names)
+    }
+
+
+def to_dataframe(table: Dict[str, Any]):
+    """The table as a pandas DataFrame with datetime/float columns where the types allow."""
+    if not HAS_PANDAS:
+        raise RuntimeError("pandas is not installed")
+    import pandas as pd
+
+    types = table_types(table)
+    frame = pd.DataFrame(typed_columns(table))
+    for name, kind in zip(frame.columns, types):
+        if kind == "date":
+            frame[name] = pd.to_datetime(frame[name])
+        elif kind in ("money", "number"):
+            frame[name] = frame[name].astype("float64")
+    return frame
+
+
+def to_arrow(table: Dict[str, Any]):
+    """The table as a pyarrow Table (date32 / float64 / string columns)."""
+    if not HAS_PYARROW:
+        raise RuntimeError("pyarrow is not installed")
+    import pyarrow as pa
+
+    arrow_types = {"date": pa.date32(), "money": pa.float64(), "number": pa.float64()}
+    types = table_types(table)
+    columns = typed_columns(table)
+    arrays = [
+        pa.array(values, type=arrow_types.get(types[position] if position < len(types) else "text", pa.string()))
+        for position, values in enumerate(columns.values())
+    ]
+    metadata = {"caption": table.get("caption") or "", "column_types": ",".join(types)}
+    return pa.Table.from_arrays(arrays, names=list(columns), metadata=metadata)
+
+
+def write_parquet(table: Dict[str, Any], path: str):
+    """Write one table to a Parquet file."""
+    import pyarrow.parquet as pq
+
+    pq.write_table(to_arrow(table), path)
+
+
+class TableIndex:
+    """
+    Typed cells of many tables in flat columns, for filtering across all of
+    them at once (numpy-vectorized when installed).
+
+    Each typed cell (date, money or number) is one entry: its table, row,
+    column and numeric value (dates as ordinals). A query narrows columns
+    by header first (a regex over the few distinct headers), then compares
+    values in one pass over the arrays.
+    """
+
+    def __init__(self):
+        self.tables: List[Dict[str, Any]] = []
+        self.column_headers: List[str] = []
+        self.column_kinds: List[str] = []
+        self._cell_columns: List[int] = []
+        self._cell_rows: List[int] = []
+        self._cell_values: List[float] = []
+        self._arrays = None
+
+    def add(self, source: str, tables: Iterable[Dict[str, Any]]) -> int:
+        """
+        Index the typed columns of ``tables`` found at ``source``.
+
+        Returns:
+            int: Number of tables added
+        """
+        added = 0
+        for position, table in enumerate(tables):
+            rows = table.get("rows", [])
+            if not rows:
+                continue
+            table_id = len(self.tables)
+            self.tables.append({"source": source, "table": position, "headers": column_names(table),
+                                "rows": rows, "caption": table.get("caption")})
+            for column, kind in enumerate(table_types(table)):
+                if kind not in ("date", "money", "number"):
+                    continue
+                column_id = len(self.column_headers)
+                self.column_headers.append(self.tables[table_id]["headers"][column]
+                                           if column < len(self.tables[table_id]["headers"]) else "")
+                self.column_kinds.append(kind)
+                for row_number, row in enumerate(rows):
+                    value = parse_cell(row[column], kind) if column < len(row) else None
+                    if value is None:
+                        continue
+                    self._cell_columns.append(column_id << 24 | table_id)
+                    self._cell_rows.append(row_number)
+                    self._cell_values.append(value.toordinal() if kind == "date" else value)
+            added += 1
+        self._arrays = None
+        return added
+
+    def _columns(self, header: Optional[str], kinds: Optional[Tuple[str, ...]]) -> List[int]:
+        pattern = re.compile(header, re.I) if header else None
+        return [
+            column_id for column_id, (name, column_kind) in enumerate(zip(self.column_headers, self.column_kinds))
+            if (kinds is None or column_kind in kinds) and (pattern is None or pattern.search(name))
+        ]
+
+    def query(self,
+              header: Optional[str] = None,
+              kind: Optional[str] = None,
+              after: Optional[date] = None,
+              before: Optional[date] = None,
+              min_value: Optional[float] = None,
+              max_value: Optional[float] = None,
+              limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Rows whose typed cells match.
+
+        Args:
+            header (str, optional): Regex the column header must match (e.g. ``due|deadline``)
+            kind (str, optional): ``date``, ``money`` or ``number``
+            after / before (date, optional): Date bounds (exclusive); imply ``kind="date"``
+            min_value / max_value (float, optional): Numeric bounds (inclusive); only
+                money and number columns unless ``kind`` says otherwise
+            limit (int, optional): Most rows to return
+
+        Returns:
+            List[Dict]: ``source``, ``table``, ``row``, the row as ``values``
+            (header → cell) and the ``matched`` header/value
+        """
+        if after is not None or before is not None:
+            kind = "date"
+        low = after.toordinal() + 1 if after is not None else min_value
+        high = before.toordinal() - 1 if before is not None else max_value
+        if kind is not None:
+            kinds = (kind,)
+        elif min_value is not None or max_value is not None:
+            # Dates are stored as ordinals; a numeric bound must not match them
+            kinds = ("money", "number")
+        else:
+            kinds = None
+        columns = self._columns(header, kinds)
+        if not columns:
+            return []
+
+        if HAS_NUMPY:
+            import numpy as np
+
+            if self._arrays is None:
+                self._arrays = (
+                    np.asarray(self._cell_columns, dtype=np.int64),
+                    np.asarray(self._cell_rows, dtype=np.int64),
+                    np.asarray(self._cell_values, dtype=np.float64),
+                )
+            cell_columns, cell_rows, cell_values = self._arrays
+            mask = np.isin(cell_columns >> 24, np.asarray(columns, dtype=np.int64))
+            if low is not None:
+                mask &= cell_values >= low
+            if high is not None:
+                mask &= cell_values <= high
+            hits = zip(cell_columns[mask].tolist(), cell_rows[mask].tolist(), cell_values[mask].tolist())
+        else:
+            wanted = set(columns)
+            hits = (
+                (key, row, value)
+                for key, row, value in zip(self._cell_columns, self._cell_rows, self._cell_values)
+                if key >> 24 in wanted and (low is None or value >= low) and (high is None or value <= high)
+            )
+
+        results, seen = [], set()
+        for key, row_number, value in hits:
+            column_id, table_id = key >> 24, key & 0xFFFFFF
+            if (table_id, row_number) in seen:
+                continue
+            seen.add((table_id, row_number))
+            table = self.tables[table_id]
+            kind_of = self.column_kinds[column_id]
+            results.append({
+                "source": table["source"],
+                "table": table["table"],
+                "row": row_number,
+                "values": dict(zip(table["headers"], table["rows"][row_number])),
+                "matched": {
+                    "header": self.column_headers[column_id],
+                    "type": kind_of,
+                    "value": date.fromordinal(int(value)).isoformat() if kind_of == "date" else value,
+                },
+            })
+            if limit is not None and len(results) >= limit:
+                break
+        return results
+
+    def to_dataframe(self):
+        """All indexed typed cells as one long DataFrame (source, table, row, header, type, value)."""
+        if not HAS_PANDAS:
+            raise RuntimeError("pandas is not installed")
+        import pandas as pd
+
+        column_ids = [key >> 24 for key in self._cell_columns]
+        table_ids = [key & 0xFFFFFF for key in self._cell_columns]
+        return pd.DataFrame({
+            "source": [self.tables[t]["source"] for t in table_ids],
+            "table": [self.tables[t]["table"] for t in table_ids],
+            "row": self._cell_rows,
+            "header": [self.column_headers[c] for c in column_ids],
+            "type": [self.column_kinds[c] for c in column_ids],
+            "value": self._cell_values,
+        })
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "tables": len(self.tables),
+            "typed_columns": len(self.column_headers),
+            "typed_cells": len(self._cell_values),
+            "vectorized": HAS_NUMPY,
+        }
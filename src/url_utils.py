@@ -0,0 +1,48 @@
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+# Query parameters that only track the visitor and never change page content
+TRACKING_PARAMS = frozenset([
+    "utm_source", "utm_medium", "utm_campaign", "utm_term", "utm_content",
+    "gclid", "fbclid", "mc_cid", "mc_eid",
+])
+
+
+def normalize_url(url: str) -> str:
+    """
+    Canonical form of a URL for cache keys and dedup.
+
+    Lowercases scheme and host, drops default ports, fragments and tracking
+    parameters, sorts the query string and gives empty paths a ``/``.
+
+    Raises:
+        ValueError: The URL has no host, or a malformed port or IPv6 host
+    """
+    try:
+        parsed = urlparse(url.strip())
+        port = parsed.port
+    except ValueError as e:
+        raise ValueError(f"Invalid URL {url!r}: {str(e)}") from None
+    if not parsed.hostname:
+        raise ValueError(f"Invalid URL {url!r}: no host")
+    scheme = parsed.scheme.lower()
+    host = (parsed.hostname or "").lower()
+    # hostname drops the brackets an IPv6 literal needs in a netloc
+    netloc = f"[{host}]" if ":" in host else host
+    if parsed.username:
+        netloc = f"{parsed.username}@{netloc}"
+    if port and DEFAULT_PORTS.get(scheme) != port:
+        netloc = f"{netloc}:{port}"
+
+    query = sorted(
+        (key, value)
+        for key, value in parse_qsl(parsed.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS
+    )
+    return urlunparse((scheme, netloc, parsed.path or "/", parsed.params, urlencode(query), ""))
+
+
+def url_domain(url: str) -> str:
+    """Lowercased host of a URL (without port)."""
+    return (urlparse(url).hostname or "").lower()
@@ -1,53 +1,385 @@
 import asyncio
-from playwright.async_api import async_playwright
 from bs4 import BeautifulSoup
 import json
 import re
+import time
 from urllib.parse import urljoin, urlparse
-from typing import Dict, List, Optional
+from collections import deque
+from typing import AsyncIterator, Dict, Iterable, List, Optional
 import logging
 
+from browser_pool import BrowserPool, get_browser_pool
+from readiness import ReadinessEngine, get_readiness_engine
+from resource_policy import ResourcePolicy, RouteBlocker
+from extraction import extract_all
+from cpu_pool import ExtractionExecutor, get_extraction_executor
+from scrape_cache import ScrapeCache, capture_validators, get_scrape_cache
+from screenshots import ScreenshotOptions, capture_screenshot, get_screenshot_pipeline
+from session_cache import NavigationRecipe, SessionCache, filter_state, get_session_cache, run_recipe
+from http_fetch import (FETCH_MODES, FetchProfiles, HttpFetcher, extract_static, get_fetch_profiles,
+                        get_http_fetcher, needs_javascript)
+from metrics import record, record_result, span
+from url_utils import normalize_url, url_domain
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Collects every form with its inputs, selects and textareas in one evaluate()
+# call instead of four get_attribute() round-trips per field.
+FORMS_SCRIPT = """
+() => {
+    const text = (el) => (el && (el.innerText || el.textContent) || '').trim();
+    const labelFor = (el) => {
+        if (el.labels && el.labels.length) {
+            return Array.from(el.labels).map(text).filter(Boolean).join(' ');
+        }
+        const aria = el.getAttribute('aria-label');
+        if (aria) return aria.trim();
+        const labelledBy = el.getAttribute('aria-labelledby');
+        if (labelledBy) {
+            return labelledBy.split(/\\s+/).map((id) => text(document.getElementById(id)))
+                .filter(Boolean).join(' ');
+        }
+        return (el.getAttribute('title') || '').trim();
+    };
+    const describe = (el) => {
+        const tag = el.tagName.toLowerCase();
+        const type = el.getAttribute('type') || 'text';
+        const secret = type.toLowerCase() === 'password';
+        const field = {
+            tag: tag,
+            type: type,
+            name: el.getAttribute('name') || '',
+            id: el.id || '',
+            placeholder: el.getAttribute('placeholder') || '',
+            required: el.hasAttribute('required'),
+            disabled: !!el.disabled,
+            label: labelFor(el),
+            default_value: secret ? '' : (tag === 'select' ? null : (el.defaultValue || '')),
+            value: secret ? '' : (el.value || '')
+        };
+        if (tag === 'select') {
+            field.multiple = el.multiple;
+            field.options = Array.from(el.options).map((option) => ({
+                value: option.value,
+                text: option.text.trim(),
+                selected: option.selected,
+                default_selected: option.defaultSelected,
+                disabled: option.disabled
+            }));
+            const defaults = field.options.filter((option) => option.default_selected);
+            field.default_value = defaults.length ? defaults[0].value : null;
+        }
+        if (tag === 'input' && ['checkbox', 'radio'].includes(type.toLowerCase())) {
+            field.checked = el.checked;
+            field.default_checked = el.defaultChecked;
+        }
+        return field;
+    };
+    return Array.from(document.querySelectorAll('form')).map((form) => ({
+        action: form.getAttribute('action') || '',
+        method: (form.getAttribute('method') || 'GET').toUpperCase(),
+        id: form.id || '',
+        name: form.getAttribute('name') || '',
+        inputs: Array.from(form.querySelectorAll('input, select, textarea')).map(describe)
+    }));
+}
+"""
+
+
+def record_extraction(timing: Dict):
+    """Report an extraction pool run as its queue wait and execution stages."""
+    record("extract_queue", timing["queued_ms"] / 1000)
+    record("extract", timing["exec_ms"] / 1000)
+
+
 class WebScraper:
-    def __init__(self):
+    def __init__(self, pool: Optional[BrowserPool] = None,
+                 readiness: Optional[ReadinessEngine] = None,
+                 executor: Optional[ExtractionExecutor] = None,
+                 cache: Optional[ScrapeCache] = None,
+                 use_cache: bool = True,
+                 fetcher: Optional[HttpFetcher] = None,
+                 fetch_profiles: Optional[FetchProfiles] = None,
+                 sessions: Optional[SessionCache] = None,
+                 use_sessions: bool = True):
+        self.pool = pool
+        self.readiness = readiness or get_readiness_engine()
+        self.executor = executor or get_extraction_executor()
+        self.cache = (cache or get_scrape_cache()) if use_cache else None
+        self.fetcher = fetcher or get_http_fetcher()
+        self.fetch_profiles = fetch_profiles or get_fetch_profiles()
+        self.sessions = (sessions or get_session_cache()) if use_sessions else None
+        self.session_domains = set()
+        self.route_blocker = None
+        self.lease = None
         self.browser = None
         self.context = None
         self.page = None
     
     async def __aenter__(self):
-        self.playwright = await async_playwright().start()
-        self.browser = await self.playwright.firefox.launch(headless=True)
-        self.context = await self.browser.new_context()
-        self.page = await self.context.new_page()
+        # The pool is started and a context leased lazily, so cache hits and
+        # pages served over plain HTTP never touch the browser
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if self.browser:
-            await self.browser.close()
-        if self.playwright:
-            await self.playwright.stop()
+        await self._release_page()
+    
+    async def _ensure_page(self):
+        """Lease an isolated context from the shared warm browser pool."""
+        if self.page is not None:
+            return self.page
+        with span("browser_acquire"):
+            if self.pool is None:
+                self.pool = await get_browser_pool()
+            self.lease = await self.pool.acquire()
+            self.browser = self.lease.browser
+            self.context = self.lease.context
+            try:
+                self.page = await self.lease.new_page()
+            except Exception:
+                await self._release_page()
+                raise
+        return self.page
+    
+    async def _release_page(self):
+        if self.lease:
+            crashed = not self.browser.is_connected()
+            await self.pool.release(self.lease, crashed=crashed)
+        self.lease = None
+        self.browser = None
+        self.context = None
+        self.page = None
+        self.route_blocker = None
+        self.session_domains = set()
+    
+    @property
+    def crashed(self) -> bool:
+        """True if the leased browser or page died under this scraper."""
+        if self.browser is not None and not self.browser.is_connected():
+            return True
+        return self.page is not None and self.page.is_closed()
     
-    async def scrape_page(self, url: str) -> Dict:
+    async def _apply_resource_policy(self, policy: ResourcePolicy) -> Optional[RouteBlocker]:
+        """Swap the page's request routing over to ``policy``."""
+        if self.route_blocker:
+            await self.route_blocker.detach(self.page)
+            self.route_blocker = None
+        if policy.blocks_anything:
+            self.route_blocker = RouteBlocker(policy)
+            await self.route_blocker.attach(self.page)
+        return self.route_blocker
+    
+    @staticmethod
+    def _error_result(url: str, error: Exception) -> Dict:
+        return {
+            "url": url,
+            "status": "error",
+            "error": str(error),
+            "content": {},
+            "meta": {},
+            "statistics": {}
+        }
+    
+    async def scrape_page(self, url: str,
+                          readiness: str = "auto",
+                          wait_selector: Optional[str] = None,
+                          resource_policy=None,
+                          max_age: Optional[float] = None,
+                          force_refresh: bool = False,
+                          fetch_mode: Optional[str] = None,
+                          screenshot=False) -> Dict:
         """
         Scrape comprehensive content from a webpage.
         
+        Static pages are served over plain HTTP when the response carries the
+        content (see ``http_fetch``); the rest are rendered in the browser.
+        The result's ``served_by`` says which path was used.
+        
         Args:
             url (str): The URL to scrape
+            readiness (str): Readiness strategy (see ReadinessEngine), ``auto`` learns per domain
+            wait_selector (str, optional): CSS selector that marks the page as ready
+            resource_policy (str | ResourcePolicy, optional): Preset name or policy
+                controlling which subresources are downloaded (default: ``no-media``)
+            max_age (float, optional): Oldest cached result to accept, in seconds
+            force_refresh (bool): Ignore any cached result and re-render
+            fetch_mode (str, optional): ``auto``, ``http`` or ``browser`` (default: per domain)
+            screenshot (bool | Dict | ScreenshotOptions): Capture a screenshot (forces a
+                browser render); encoding and storage finish in the background, see
+                the result's ``screenshot_status``
             
         Returns:
             Dict: Extracted content including text, links, forms, images, etc.
         """
+        try:
+            normalize_url(url)  # malformed ports and IPv6 hosts; the cache keys on this
+            if not isinstance(resource_policy, ResourcePolicy):
+                resource_policy = ResourcePolicy.from_preset(resource_policy)
+            if fetch_mode is not None and fetch_mode not in FETCH_MODES:
+                raise ValueError(f"fetch_mode must be one of: {', '.join(FETCH_MODES)}")
+            screenshot = ScreenshotOptions.parse(screenshot)
+        except ValueError as e:
+            return self._error_result(url, e)
+        
+        # A screenshot or a portal recipe needs the browser whatever the mode
+        if screenshot is not None or (fetch_mode is None and self.sessions is not None
+                                      and self.sessions.recipe_for(url) is not None):
+            mode = "browser"
+        else:
+            mode = self.fetch_profiles.mode_for(url, fetch_mode)
+        
+        async def render():
+            return await self._fetch_page(url, mode, readiness, wait_selector, resource_policy, screenshot)
+        
+        with span("scrape"):
+            if self.cache is None:
+                result = await render()
+            else:
+                options = {
+                    "readiness": readiness,
+                    "wait_selector": wait_selector,
+                    "resource_policy": resource_policy.describe(),
+                    "fetch_mode": mode,
+                    "screenshot": screenshot.describe() if screenshot is not None else False
+                }
+                result = await self.cache.fetch(url, options, render, max_age=max_age, force_refresh=force_refresh)
+        record_result(result, url_domain(url))
+        return result
+    
+    async def _fetch_page(self, url: str,
+                          mode: str,
+                          readiness: str,
+                          wait_selector: Optional[str],
+                          resource_policy: ResourcePolicy,
+                          screenshot: Optional[ScreenshotOptions]) -> Dict:
+        """Serve ``url`` over plain HTTP if ``mode`` allows and the page doesn't need JS, else render it."""
+        escalated, validators = None, None
+        if mode == "http" or (mode == "auto" and self.fetch_profiles.should_try_http(url)):
+            result, escalated, validators = await self._fetch_static(url, resource_policy, strict=mode == "http")
+            if result is not None:
+                if mode == "auto":
+                    self.fetch_profiles.record(url, "http")
+                return result
+            if mode == "http":
+                return self._error_result(url, Exception(f"Plain HTTP fetch failed: {escalated}"))
+            self.fetch_profiles.record(url, "browser")
+        
+        if validators is None and self.cache is not None:
+            # No HTTP response to take validators from: probe alongside the render
+            result, validators = await asyncio.gather(
+                self._render_page(url, readiness, wait_selector, resource_policy, screenshot),
+                asyncio.to_thread(capture_validators, url, self.cache.probe_timeout)
+            )
+        else:
+            result = await self._render_page(url, readiness, wait_selector, resource_policy, screenshot)
+        if result.get("status") == "success":
+            result["served_by"] = "browser"
+            result["fetch"] = {"mode": mode, "escalated": escalated}
+            result["validators"] = validators or {}
+        return result
+    
+    async def _fetch_static(self, url: str, resource_policy: ResourcePolicy, strict: bool = False):
+        """
+        Fetch ``url`` without a browser.
+        
+        Returns:
+            Tuple: (result, None, validators) when the HTTP response is usable,
+            otherwise (None, reason to escalate, validators). ``validators`` is
+            None when no response arrived. With ``strict`` (http mode) pages
+            that look like they need JavaScript are still returned.
+        """
+        try:
+            with span("http_fetch"):
+                response = await self.fetcher.fetch(url)
+        except Exception as e:
+            logger.debug(f"HTTP fetch failed for {url}: {str(e)}")
+            return None, f"fetch_error: {type(e).__name__}", None
+        
+        html = response["html"]
+        extracted, extraction_timing = None, {}
+        if html is not None and response["status"] < 400 and "html" in (response["content_type"] or "html"):
+            extracted, extraction_timing = await self.executor.run_timed(extract_static, html, response["final_url"])
+            record_extraction(extraction_timing)
+        reason = needs_javascript(response["status"], response["content_type"], html or "", extracted)
+        if reason and (not strict or extracted is None):
+            logger.info(f"Escalating {url} to the browser: {reason}")
+            return None, reason, response["validators"]
+        
+        text_content = extracted["text"]
+        forms = extracted["forms"]
+        logger.info(f"Served {url} over plain HTTP ({response['http_version']}, {response['elapsed_ms']}ms)")
+        return {
+            "url": url,
+            "final_url": response["final_url"],
+            "title": extracted["meta"].get("title", ""),
+            "timestamp": None,
+            "status": "success",
+            "readiness": None,
+            "served_by": "http",
+            "fetch": {
+                "mode": "http" if strict else "auto",
+                "http_status": response["status"],
+                "http_version": response["http_version"],
+                "bytes": response["bytes"],
+                "elapsed_ms": response["elapsed_ms"],
+                "needs_javascript": reason
+            },
+            "content": {
+                "text": text_content,
+                "links": extracted["links"],
+                "forms": forms,
+                "images": extracted["images"],
+                "tables": extracted["tables"],
+                "navigation": extracted["navigation"]
+            },
+            "meta": extracted["meta"],
+            "screenshot": None,
+            "screenshot_hash": None,
+            "resources": {"policy": resource_policy.name},
+            "validators": response["validators"],
+            "extraction": extraction_timing,
+            "statistics": {
+                "total_links": len(extracted["links"]),
+                "total_forms": len(forms),
+                "total_images": len(extracted["images"]),
+                "total_tables": len(extracted["tables"]),
+                "text_length": len(text_content.get("full_text", ""))
+            }
+        }, None, response["validators"]
+    
+    async def _render_page(self, url: str,
+                           readiness: str,
+                           wait_selector: Optional[str],
+                           resource_policy: ResourcePolicy,
+                           screenshot: Optional[ScreenshotOptions] = None) -> Dict:
+        """Render ``url`` in the browser and extract everything from it."""
         try:
             logger.info(f"Starting to scrape: {url}")
+            await self._ensure_page()
+            self.lease.record_page()
             
-            # Navigate to the page
-            await self.page.goto(url, wait_until="networkidle", timeout=30000)
+            # Block subresources we don't need for extraction
+            route_blocker = await self._apply_resource_policy(resource_policy)
             
-            # Wait a bit for dynamic content
-            await self.page.wait_for_timeout(2000)
+            # Start from the domain's cached session (running its recipe if it has one)
+            with span("session"):
+                session_info, target = await self._prepare_session(url)
+            
+            # Navigate and wait until the page is actually ready
+            if target is None:
+                # A recipe just left the page on the data page
+                readiness_info = {"strategy": "recipe", "ready": True, "total_ms": session_info["recipe_ms"]}
+            else:
+                with span("navigate"):
+                    readiness_info = await self.readiness.navigate(
+                        self.page, target, strategy=readiness, selector=wait_selector, timeout_ms=30000
+                    )
+                if session_info is not None and not await self._session_still_valid(url, session_info):
+                    # The portal dropped the session: start over from the recipe
+                    with span("session"):
+                        session_info = await self._restart_session(url)
             
             # Basic page information
             page_info = {
@@ -55,41 +387,47 @@ class WebScraper:
                 "final_url": self.page.url,
                 "title": await self.page.title(),
                 "timestamp": None,
-                "status": "success"
+                "status": "success",
+                "readiness": readiness_info
             }
             
             # Get page content
-            html_content = await self.page.content()
-            soup = BeautifulSoup(html_content, 'html.parser')
-            
-            # Extract text content
-            text_content = self._extract_text_content(soup)
-            
-            # Extract links
-            links = await self._extract_links(soup, url)
+            with span("page_content"):
+                html_content = await self.page.content()
             
-            # Extract forms and inputs
-            forms = await self._extract_forms()
+            # Extract text, links, images, tables, meta and navigation in one pass,
+            # off the event loop so other pages keep navigating meanwhile
+            extracted, extraction_timing = await self.executor.run_timed(extract_all, html_content, url)
+            record_extraction(extraction_timing)
+            text_content = extracted["text"]
+            links = extracted["links"]
+            images = extracted["images"]
+            tables = extracted["tables"]
+            meta_info = extracted["meta"]
+            navigation = extracted["navigation"]
             
-            # Extract images
-            images = self._extract_images(soup, url)
+            # Extract forms and inputs (live DOM state, one evaluate call)
+            forms_started = time.perf_counter()
+            with span("forms"):
+                forms = await self._extract_forms()
+            extraction_timing["forms_ms"] = round((time.perf_counter() - forms_started) * 1000, 1)
             
-            # Extract tables
-            tables = self._extract_tables(soup)
+            # Screenshots are opt-in; only the capture happens here, encoding and
+            # storage finish in the background (see screenshot_status)
+            screenshot_status = None
+            if screenshot is not None:
+                with span("screenshot"):
+                    image = await capture_screenshot(self.page, screenshot)
+                screenshot_status = await get_screenshot_pipeline().submit(image, screenshot)
+            published = screenshot_status is not None and screenshot_status["status"] != "error"
             
-            # Extract meta information
-            meta_info = self._extract_meta_info(soup)
-            
-            # Check for common elements
-            navigation = self._extract_navigation(soup)
-            
-            # Take screenshot
-            screenshot_path = f"screenshot_{urlparse(url).netloc}_{hash(url) % 10000}.png"
-            await self.page.screenshot(path=screenshot_path)
+            if self.sessions is not None:
+                await self._capture_session(url)
             
             # Compile results
             result = {
                 **page_info,
+                "session": session_info,
                 "content": {
                     "text": text_content,
                     "links": links,
@@ -99,7 +437,11 @@ class WebScraper:
                     "navigation": navigation
                 },
                 "meta": meta_info,
-                "screenshot": screenshot_path,
+                "screenshot": screenshot_status["url"] if published else None,
+                "screenshot_hash": screenshot_status["hash"] if published else None,
+                "screenshot_status": screenshot_status,
+                "resources": route_blocker.stats() if route_blocker else {"policy": resource_policy.name},
+                "extraction": extraction_timing,
                 "statistics": {
                     "total_links": len(links),
                     "total_forms": len(forms),
@@ -114,14 +456,7 @@ class WebScraper:
             
         except Exception as e:
             logger.error(f"Error scraping {url}: {str(e)}")
-            return {
-                "url": url,
-                "status": "error",
-                "error": str(e),
-                "content": {},
-                "meta": {},
-                "statistics": {}
-            }
+            return self._error_result(url, e)
     
     def _extract_text_content(self, soup: BeautifulSoup) -> Dict:
         """Extract various text content from the page."""
@@ -176,41 +511,98 @@ class WebScraper:
         return links
     
     async def _extract_forms(self) -> List[Dict]:
-        """Extract form information from the page."""
-        forms = []
-        form_elements = await self.page.query_selector_all('form')
+        """Extract form information from the page in a single browser round-trip."""
+        return await self.page.evaluate(FORMS_SCRIPT)
+    
+    async def _run_recipe(self, recipe: NavigationRecipe) -> Dict:
+        """Play ``recipe`` on the leased page and keep the session it ends with."""
+        with span("recipe"):
+            outcome = await run_recipe(self.page, recipe, self._extract_forms, self.readiness)
+        self.sessions.counters["recipe_runs"] += 1
+        state = await self.context.storage_state()
+        session = await self.sessions.save(recipe.domain, state, source="recipe",
+                                           landing_url=outcome["landing_url"], pages=outcome["pages"])
+        self.session_domains.add(recipe.domain)
+        logger.info(f"Ran navigation recipe for {recipe.domain} in {outcome['elapsed_ms']}ms "
+                    f"({outcome['steps']} steps, landed on {outcome['landing_url']})")
+        return {**self.sessions.describe(session, "recipe"), "recipe_ms": outcome["elapsed_ms"]}
+    
+    async def _prepare_session(self, url: str):
+        """
+        Load the cached session of ``url``'s domain into the leased context.
         
-        for form in form_elements:
-            action = await form.get_attribute('action') or ''
-            method = await form.get_attribute('method') or 'GET'
-            
-            # Get form inputs
-            inputs = []
-            input_elements = await form.query_selector_all('input, select, textarea')
-            
-            for input_elem in input_elements:
-                input_type = await input_elem.get_attribute('type') or 'text'
-                name = await input_elem.get_attribute('name') or ''
-                placeholder = await input_elem.get_attribute('placeholder') or ''
-                required = await input_elem.get_attribute('required') is not None
-                
-                inputs.append({
-                    "type": input_type,
-                    "name": name,
-                    "placeholder": placeholder,
-                    "required": required
-                })
-            
-            forms.append({
-                "action": action,
-                "method": method.upper(),
-                "inputs": inputs
-            })
+        Without a valid session, a domain with a navigation recipe runs it
+        first (one scrape at a time per domain; the others wait and reuse the
+        result). Scraping a recipe's start URL goes straight to its data page.
+        
+        Returns:
+            Tuple: (session summary or None, URL to navigate to, or None when
+            the page is already on the data page)
+        """
+        if self.sessions is None:
+            return None, url
+        domain = url_domain(url)
+        recipe = self.sessions.recipe_for(domain)
+        session = await self.sessions.get(domain)
+        if session is None and recipe is not None:
+            async with self.sessions.lock(domain):
+                session = await self.sessions.peek(domain)
+                if session is None:
+                    info = await self._run_recipe(recipe)
+                    return info, None if recipe.starts_at(url) else url
+        if session is None:
+            return None, url
         
-        return forms
+        if domain not in self.session_domains:
+            await self.sessions.apply(self.context, session)
+            self.session_domains.add(domain)
+        await self.sessions.use(session)
+        if recipe is None or not recipe.starts_at(url):
+            return self.sessions.describe(session, "cache"), url
+        if session["landing_url"] and not recipe.starts_at(session["landing_url"]):
+            return self.sessions.describe(session, "cache"), session["landing_url"]
+        # The data page has no URL of its own (e.g. a search postback): replay
+        # the steps, which skip the handshakes now that the cookies are warm
+        info = await self._run_recipe(recipe)
+        return {**info, "source": "replay"}, None
+    
+    async def _session_still_valid(self, url: str, session_info: Dict) -> bool:
+        """False when a cached session's data page lacks the recipe's ``expect`` selector."""
+        recipe = self.sessions.recipe_for(url)
+        if recipe is None or not recipe.expect or session_info["source"] != "cache" or not recipe.starts_at(url):
+            return True
+        try:
+            await self.page.wait_for_selector(recipe.expect, state="attached", timeout=5000)
+            return True
+        except Exception:
+            logger.info(f"Cached session for {recipe.domain} no longer reaches its data page")
+            return False
+    
+    async def _restart_session(self, url: str) -> Dict:
+        """Drop the stale session of ``url``'s domain and re-run its recipe from a clean context."""
+        recipe = self.sessions.recipe_for(url)
+        await self.sessions.drop(recipe.domain)
+        await self.context.clear_cookies()
+        async with self.sessions.lock(recipe.domain):
+            return await self._run_recipe(recipe)
+    
+    async def _capture_session(self, url: str):
+        """Keep the cookies a render left for ``url``'s domain once per half session lifetime."""
+        domain = url_domain(url)
+        if not self.sessions.needs_refresh(await self.sessions.peek(domain)):
+            return
+        if not self.sessions.capture and self.sessions.recipe_for(domain) is None:
+            return
+        try:
+            state = await self.context.storage_state()
+        except Exception as e:
+            logger.debug(f"Could not read the storage state for {domain}: {str(e)}")
+            return
+        if any(filter_state(state, domain).values()):
+            await self.sessions.save(domain, state)
     
     def _extract_images(self, soup: BeautifulSoup, base_url: str) -> List[Dict]:
-        """Extract image information from the page."""
+        """Extract image information from the page (from the DOM, so it works when image bytes are blocked)."""
         images = []
         for img in soup.find_all('img'):
             src = img.get('src', '')
@@ -298,15 +690,200 @@ class WebScraper:
         return nav_elements
 
 
-async def scrape_url(url: str) -> Dict:
+async def warm_session(recipe: NavigationRecipe, pool: Optional[BrowserPool] = None) -> Dict:
+    """
+    Run a navigation recipe in a fresh context and keep the session it ends with.
+    
+    Args:
+        recipe (NavigationRecipe): Recipe to run
+        pool (BrowserPool, optional): Pool to lease from (defaults to the shared pool)
+        
+    Returns:
+        Dict: Summary of the new session
+    """
+    async with WebScraper(pool, use_cache=False) as scraper:
+        if scraper.sessions is None:
+            raise RuntimeError("Session cache is disabled")
+        await scraper._ensure_page()
+        scraper.lease.record_page()
+        await scraper._apply_resource_policy(ResourcePolicy.from_preset(None))
+        async with scraper.sessions.lock(recipe.domain):
+            return await scraper._run_recipe(recipe)
+
+
+async def scrape_url(url: str, pool: Optional[BrowserPool] = None, **scrape_options) -> Dict:
     """
     Convenience function to scrape a single URL.
     
     Args:
         url (str): The URL to scrape
+        pool (BrowserPool, optional): Pool to lease from (defaults to the shared pool)
+        **scrape_options: Passed through to ``WebScraper.scrape_page``
         
     Returns:
         Dict: Scraped content and metadata
     """
-    async with WebScraper() as scraper:
-        return await scraper.scrape_page(url) 
\ No newline at end of file
+    async with WebScraper(pool) as scraper:
+        return await scraper.scrape_page(url, **scrape_options)
+
+
+class _HostScheduler:
+    """Hands out pending URLs round-robin by host, honouring a per-host cap."""
+
+    def __init__(self, urls: Iterable[str], per_host_limit: int):
+        self.per_host_limit = per_host_limit
+        self.pending = {}
+        self.active = {}
+        for index, url in enumerate(urls):
+            host = urlparse(url).netloc.lower()
+            self.pending.setdefault(host, deque()).append((index, url))
+        self.hosts = deque(self.pending)
+        self.condition = asyncio.Condition()
+
+    def _take(self):
+        for _ in range(len(self.hosts)):
+            host = self.hosts[0]
+            self.hosts.rotate(-1)
+            if self.pending[host] and self.active.get(host, 0) < self.per_host_limit:
+                self.active[host] = self.active.get(host, 0) + 1
+                return host, self.pending[host].popleft()
+        return None
+
+    def _exhausted(self) -> bool:
+        return not any(self.pending.values())
+
+    async def next(self):
+        """Return (host, index, url), or None once every URL has been handed out."""
+        async with self.condition:
+            while True:
+                if self._exhausted():
+                    return None
+                taken = self._take()
+                if taken:
+                    host, (index, url) = taken
+                    return host, index, url
+                await self.condition.wait()
+
+    async def done(self, host: str):
+        async with self.condition:
+            self.active[host] -= 1
+            self.condition.notify_all()
+
+
+async def iter_scrape_many(urls: Iterable[str],
+                           concurrency: int = 4,
+                           per_host_limit: int = 2,
+                           pool: Optional[BrowserPool] = None,
+                           **scrape_options) -> AsyncIterator[Dict]:
+    """
+    Scrape many URLs concurrently, yielding each result as soon as it finishes.
+    
+    Each worker leases one context from the browser pool and reuses its page
+    for successive URLs, so throughput scales with ``concurrency`` rather than
+    with the number of browser launches.
+    
+    Args:
+        urls: URLs to scrape
+        concurrency (int): Maximum pages in flight at once
+        per_host_limit (int): Maximum pages in flight per host
+        pool (BrowserPool, optional): Pool to lease from (defaults to the shared pool)
+        **scrape_options: Passed through to ``WebScraper.scrape_page``
+        
+    Yields:
+        Dict: Scrape result with an added ``index`` into ``urls``
+    """
+    urls = list(urls)
+    if not urls:
+        return
+    if concurrency < 1 or per_host_limit < 1:
+        raise ValueError("concurrency and per_host_limit must be at least 1")
+
+    scheduler = _HostScheduler(urls, per_host_limit)
+    results = asyncio.Queue()
+
+    async def worker():
+        scraper = None
+        try:
+            while True:
+                task = await scheduler.next()
+                if task is None:
+                    break
+                host, index, url = task
+                result = None
+                # A claimed URL always gets a result, or the consumer would wait for it forever
+                try:
+                    try:
+                        if scraper is None:
+                            scraper = WebScraper(pool)
+                            await scraper.__aenter__()
+                        result = await scraper.scrape_page(url, **scrape_options)
+                    except Exception as e:
+                        result = WebScraper._error_result(url, e)
+                    finally:
+                        await scheduler.done(host)
+                    
+                    # Lease a fresh context if the browser died under this page
+                    if scraper is not None and scraper.crashed:
+                        crashed, scraper = scraper, None
+                        await crashed.__aexit__(None, None, None)
+                except Exception as e:
+                    logger.warning(f"Scrape worker error after {url}: {str(e)}")
+                    if result is None:
+                        result = WebScraper._error_result(url, e)
+                
+                await results.put({**result, "index": index})
+        finally:
+            if scraper is not None:
+                await scraper.__aexit__(None, None, None)
+
+    async def watch():
+        # Once every worker has exited, unblock the consumer even if URLs were lost
+        outcomes = await asyncio.gather(*workers, return_exceptions=True)
+        for outcome in outcomes:
+            if isinstance(outcome, Exception):
+                logger.error(f"Scrape worker failed: {str(outcome)}")
+        await results.put(None)
+
+    workers = [asyncio.create_task(worker()) for _ in range(min(concurrency, len(urls)))]
+    watcher = asyncio.create_task(watch())
+    try:
+        remaining = set(range(len(urls)))
+        while remaining:
+            result = await results.get()
+            if result is None:
+                for index in sorted(remaining):
+                    error = RuntimeError("Scrape worker exited before this URL finished")
+                    yield {**WebScraper._error_result(urls[index], error), "index": index}
+                break
+            remaining.discard(result["index"])
+            yield result
+    finally:
+        for task in workers:
+            task.cancel()
+        watcher.cancel()
+        await asyncio.gather(*workers, watcher, return_exceptions=True)
+
+
+async def scrape_many(urls: Iterable[str],
+                      concurrency: int = 4,
+                      per_host_limit: int = 2,
+                      pool: Optional[BrowserPool] = None,
+                      **scrape_options) -> List[Dict]:
+    """
+    Scrape many URLs concurrently and return results in input order.
+    
+    Args:
+        urls: URLs to scrape
+        concurrency (int): Maximum pages in flight at once
+        per_host_limit (int): Maximum pages in flight per host
+        pool (BrowserPool, optional): Pool to lease from (defaults to the shared pool)
+        **scrape_options: Passed through to ``WebScraper.scrape_page``
+        
+    Returns:
+        List[Dict]: One scrape result per URL
+    """
+    urls = list(urls)
+    results = [None] * len(urls)
+    async for result in iter_scrape_many(urls, concurrency, per_host_limit, pool, **scrape_options):
+        results[result.pop("index")] = result
+    return results
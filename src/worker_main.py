@@ -0,0 +1,8 @@
+"""
+Main module of spawned worker processes (extraction pool, cluster workers).
+
+A spawned child re-runs its parent's main module before it unpickles its
+target. When the parent is ``python app.py`` that would build the Flask app,
+the registries and the atexit hooks in every child, so ``cpu_pool.spawn_context``
+points the children here instead. Keep this module free of imports.
+"""
@@ -52,7 +52,7 @@ async function scrapePage(url) {
             headers: {
                 'Content-Type': 'application/json',
             },
-            body: JSON.stringify({ url: url })
+            body: JSON.stringify({ url: url, screenshot: true })
         });
 
         const data = await response.json();
@@ -172,7 +172,7 @@ function displayResults(data) {
 
                     <!-- Screenshot Tab -->
                     <div class="tab-pane fade" id="screenshot" role="tabpanel">
-                        ${generateScreenshotContent(data.screenshot)}
+                        ${generateScreenshotContent(data.screenshot, data.screenshot_status)}
                     </div>
 
                     <!-- Raw Data Tab -->
@@ -336,13 +336,15 @@ function generateImagesContent(images) {
 /**
  * Generate screenshot content display
  */
-function generateScreenshotContent(screenshot) {
+function generateScreenshotContent(screenshot, status) {
     if (!screenshot) {
         return '<p class="text-muted">No screenshot available.</p>';
     }
 
+    // The image may still be encoding; the server holds the request until it is ready
+    const preview = (status && status.thumbnail_url) || screenshot;
     return `<div class="text-center">
-        <img src="${escapeHtml(screenshot)}" class="img-fluid rounded shadow" alt="Page Screenshot" style="max-height: 600px;">
+        <img src="${escapeHtml(preview)}" class="img-fluid rounded shadow" alt="Page Screenshot" style="max-height: 600px;">
         <p class="mt-2">
             <a href="${escapeHtml(screenshot)}" target="_blank" class="btn btn-outline-primary">
                 <i class="fas fa-external-link-alt"></i> View Full Size
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# Modules import each other by bare name, as when run through app.py
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for directory in (ROOT, os.path.join(ROOT, "src"), os.path.join(ROOT, "agents")):
+    if directory not in sys.path:
+        sys.path.append(directory)
@@ -0,0 +1,144 @@
+"""
+The single-pass extraction engine must return what the legacy
+``WebScraper._extract_*`` methods return, with either parser.
+"""
+
+import pytest
+
+from extraction import HAS_LXML, check_parity, extract_all
+from http_fetch import extract_forms
+
+from benchmarks.fixtures import build_corpus
+
+BASE_URL = "https://procurement.example.gov/bids/"
+
+PARSERS = ["html.parser"] + (["lxml"] if HAS_LXML else [])
+
+PAGES = {
+    "spanned_tables": """<!DOCTYPE html>
+<html><head><title>Bid Tabulation</title>
+<meta name="description" content="Results for RFP 2024-17">
+<meta property="og:title" content="Bid Tabulation"></head>
+<body>
+<h1>Bid Tabulation</h1>
+<table>
+  <caption>Submitted bids</caption>
+  <thead><tr><th rowspan="2">Vendor</th><th colspan="2">Price</th></tr>
+  <tr><th>Base</th><th>Option</th></tr></thead>
+  <tbody>
+    <tr><td>Acme Corp</td><td>$1,200.00</td><td>$300</td></tr>
+    <tr><td rowspan="2">Globex</td><td colspan="2">$1,450.50 (all-in)</td></tr>
+    <tr><td>$1,100</td><td></td></tr>
+  </tbody>
+  <tfoot><tr><td colspan="3">3 bids received</td></tr></tfoot>
+</table>
+<table><tr><td>Outer<table><tr><th>Inner</th></tr><tr><td>nested cell</td></tr></table></td></tr></table>
+</body></html>""",
+
+    "forms": """<html><head><title>Vendor Registration</title></head>
+<body>
+<nav class="main-menu"><a href="/">Home</a> <a href="/bids/">Open Bids</a></nav>
+<form action="/register" method="post" id="vendor">
+  <label for="name">Company name</label><input id="name" name="name" value="Acme">
+  <label>Email <input type="email" name="email" placeholder="you@example.com"></label>
+  <select name="category"><option value="it">IT</option><option value="build" selected>Construction</option></select>
+  <textarea name="notes">  Keep   this
+     spacing  </textarea>
+  <input type="checkbox" name="minority" checked> Minority-owned
+  <input type="password" name="secret" value="hunter2">
+  <button type="submit">Register</button>
+</form>
+<p>Questions? <a href="mailto:bids@example.gov">Email us</a> or see the <a href="../faq.html#forms">FAQ</a>.</p>
+</body></html>""",
+
+    "nested_lists": """<html><head><title>Requirements</title></head><body>
+<div class="breadcrumb"><a href="/">Home</a> &gt; <a href="/rfp/42">RFP 42</a></div>
+<h2>Scope</h2>
+<ul>
+  <li>Phase one
+    <ul><li>Discovery</li><li>Design <ol><li>Wireframes</li><li>Mockups</li></ol></li></ul>
+  </li>
+  <li>Phase two</li>
+</ul>
+<ol start="3"><li><p>Submit <strong>three</strong> copies</p></li><li>Include <a href="forms/w9.pdf">W-9</a></li></ol>
+<dl><dt>Due</dt><dd>March 3, 2025</dd></dl>
+<img src="/img/seal.png" alt="State seal"><img src="data:image/gif;base64,R0lGODlhAQABAAAAACw=">
+</body></html>""",
+
+    "malformed": """<html><head><title>Broken &amp; unclosed
+<body>
+<h3>Notice<p>Unclosed paragraph <b>bold <i>both</b> italic?</i>
+<p>Second paragraph with &nbsp; entities &copy; 2024 &bogus; text
+<table><tr><td>no closing tags<td>second cell<tr><td colspan="x">bad span</td>
+<ul><li>item one<li>item two</ul>
+<a href="javascript:void(0)">js link</a><a>no href</a><a href="  /trim  ">spaced</a>
+<script>document.write("<p>not content</p>")</script><style>p { color: red }</style>
+<div>stray </span> close</div></div></div>
+<!-- comment --><![CDATA[ cdata ]]>
+<img alt="no src">""",
+}
+
+
+def _corpus_pages():
+    # One generated page of each kind the scrape benchmarks serve
+    picked = {}
+    for path, page in build_corpus(0.05).items():
+        picked.setdefault(f"corpus_{page['kind']}", page["html"])
+    return picked
+
+
+ALL_PAGES = {**PAGES, **_corpus_pages()}
+
+LABELLED_FORM = """<html><body>
+<span id="qty-label">Quantity <em>(units)</em></span>
+<form action="/bid" name="bid"><fieldset>
+  <input name="qty" aria-labelledby="qty-label unit-note">
+  <input name="ref" aria-label="  Reference  "><input name="po" title="PO number">
+  <label for="dup">First</label><label for="dup">Second</label><input id="dup" name="dup">
+  <select name="regions" multiple><optgroup label="North"><option>  Duluth </option></optgroup>
+    <option value="">None</option></select>
+  <select name="empty"></select>
+  <label>Agree <input type="radio" name="agree" value="y"> to terms</label>
+  <textarea name="blank"></textarea>
+</fieldset></form>
+<input name="outside">
+<p id="unit-note">per line item</p>
+<form><input type="submit" value="Go"></form>
+</body></html>"""
+
+
+@pytest.mark.parametrize("parser", PARSERS)
+@pytest.mark.parametrize("name", sorted(ALL_PAGES))
+def test_engine_matches_legacy_extractors(name, parser):
+    report = check_parity(ALL_PAGES[name], BASE_URL, parser)
+
+    assert report["parser"] == parser
+    assert report["match"], f"{name} [{parser}] differs in: {', '.join(report['mismatched'])}"
+
+
+@pytest.mark.parametrize("parser", PARSERS)
+@pytest.mark.parametrize("name", sorted(ALL_PAGES) + ["labelled_form"])
+def test_single_pass_forms_match_extract_forms(name, parser, monkeypatch):
+    import http_fetch
+
+    html = LABELLED_FORM if name == "labelled_form" else ALL_PAGES[name]
+    monkeypatch.setattr(http_fetch, "DEFAULT_PARSER", parser)
+
+    assert extract_all(html, BASE_URL, parser, forms=True)["forms"] == extract_forms(html)
+
+
+def test_parity_reports_mismatches(monkeypatch):
+    import extraction
+
+    real = extraction.extract_all
+
+    def without_links(*args, **kwargs):
+        result = real(*args, **kwargs)
+        result["links"] = []
+        return result
+
+    monkeypatch.setattr(extraction, "extract_all", without_links)
+    report = check_parity(PAGES["forms"], BASE_URL, "html.parser")
+
+    assert not report["match"]
+    assert report["mismatched"] == ["links"]
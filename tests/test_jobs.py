@@ -0,0 +1,58 @@
+import asyncio
+import threading
+
+from jobs import Job, JobQueue
+
+
+def test_cancel_while_start_is_persisted_is_not_lost(monkeypatch):
+    persisting_start = threading.Event()
+    release_start = threading.Event()
+    handled = []
+
+    async def handler(job, report):
+        handled.append(job.id)
+        return "done"
+
+    queue = JobQueue({"work": handler}, workers=1)
+    real_persist = queue._persist
+
+    def slow_persist(job):
+        if job.status == "running" and not persisting_start.is_set():
+            persisting_start.set()
+            release_start.wait(5)
+        real_persist(job)
+
+    monkeypatch.setattr(queue, "_persist", slow_persist)
+
+    async def scenario():
+        await queue.start()
+        job = await asyncio.to_thread(queue.submit, "work", {})
+        await asyncio.to_thread(persisting_start.wait, 5)
+        assert await asyncio.to_thread(queue.cancel, job.id)
+        release_start.set()
+        for _ in range(100):
+            if queue.stats()["running"] == 0:
+                break
+            await asyncio.sleep(0.01)
+        for task in queue._worker_tasks:
+            task.cancel()
+        return job
+
+    job = asyncio.run(scenario())
+
+    assert handled == []
+    assert job.status == "cancelled"
+    assert [event["event"] for event in job.events] == ["queued", "started", "cancelled"]
+
+
+def test_finish_keeps_the_first_final_status():
+    queue = JobQueue({})
+    job = Job("work", {})
+
+    with queue._changed:
+        queue._finish(job, "cancelled")
+        queue._finish(job, "succeeded", result="late")
+
+    assert job.status == "cancelled"
+    assert job.result is None
+    assert [event["event"] for event in job.events] == ["cancelled"]
@@ -0,0 +1,24 @@
+import asyncio
+
+from llm_client import FakeBackend, LLMClient
+
+
+def test_cancelled_caller_does_not_fail_coalesced_waiters():
+    backend = FakeBackend(responder=lambda messages, params: '{"ok": true}', latency=0.05)
+    client = LLMClient(backend)
+
+    async def scenario():
+        first = asyncio.ensure_future(client.complete("same prompt"))
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(client.complete("same prompt"))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return first, await second
+
+    first, second = asyncio.run(scenario())
+
+    assert first.cancelled()
+    assert second["text"] == '{"ok": true}'
+    assert second["cached"] is True
+    assert backend.calls == 1
+    assert client.stats()["in_flight"] == 0